@@ -11,7 +11,7 @@ from pydantic import EmailStr
 from ampf.auth.base_user_service import BaseUserService
 from ampf.base import BaseEmailSender, EmailTemplate
 
-from ..base import BaseAsyncFactory, BaseAsyncStorage, KeyExistsException, KeyNotExistsException
+from ..base import BaseAsyncFactory, BaseAsyncStorage, KeyExistsException, KeyNotExistsException, TtlAsyncStorage
 from .auth_config import AuthConfig
 from .auth_exceptions import (
     BlackListedRefreshTokenException,
@@ -45,7 +45,10 @@ class AuthService[T: AuthUser]:
         reset_mail_template: Optional[EmailTemplate] = None,
     ) -> None:
         self._storage_factory = storage_factory
-        self._storage = storage_factory.create_compact_storage("token_black_list", TokenExp, "token")
+        self._storage = TtlAsyncStorage(
+            storage_factory.get_compact_storage("token_black_list", TokenExp, "token"), "exp"
+        )
+        self._api_key_storage: Optional[TtlAsyncStorage[APIKeyInDB]] = None
 
         self.config = auth_config
         self._secret_key = self.config.jwt_secret_key or os.environ["JWT_SECRET_KEY"]
@@ -214,7 +217,11 @@ class AuthService[T: AuthUser]:
         return key
 
     def get_api_key_storage(self) -> BaseAsyncStorage[APIKeyInDB]:
-        return self._storage_factory.create_compact_storage("api_keys", APIKeyInDB, "key_hash")
+        if not self._api_key_storage:
+            self._api_key_storage = TtlAsyncStorage(
+                self._storage_factory.get_compact_storage("api_keys", APIKeyInDB, "key_hash"), "exp"
+            )
+        return self._api_key_storage
 
     async def get_api_keys(self, token_payload: TokenPayload):
         username = token_payload.sub
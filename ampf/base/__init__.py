@@ -1,3 +1,4 @@
+from .async_data_loader import AsyncDataLoader
 from .base_async_blob_storage import BaseAsyncBlobStorage
 from .base_async_collection_storage import BaseAsyncCollectionStorage
 from .base_async_factory import BaseAsyncFactory
@@ -14,10 +15,22 @@ from .base_query_storage import BaseQueryStorage
 from .base_storage import BaseStorage
 from .base_topic import BaseTopic
 from .blob_model import BaseBlobMetadata, Blob, BlobCreate, BlobData, BlobHeader, BlobLocation
+from .change_event import ChangeEvent, ChangeType
+from .change_tracker import ChangeTracker, FieldChanges
+from .collection_archive import ArchiveManifest, ArchivePartition, export_collection, import_collection
 from .collection_def import CollectionDef
 from .email_template import EmailTemplate
 from .exceptions import KeyExistsException, KeyNotExistsException
+from .migration_runner import MigrationCheckpoint, MigrationReport, MigrationRunner
+from .offloading_async_storage import OffloadingAsyncStorage
+from .replicated_async_storage import ReplicatedAsyncStorage
+from .sharded_counter import CounterShard, ShardedCounter
+from .single_flight import SingleFlight, SingleFlightAsyncBlobStorage, SingleFlightAsyncStorage
 from .smtp_email_sender import SmtpEmailSender
+from .snapshot_storage import SnapshotAsyncStorage, SnapshotStorage, SnapshotWriter
+from .text_index import InvertedIndex, Tokenizer, fuse_scores
+from .text_search_async_storage import TextSearchAsyncStorage
+from .ttl_async_storage import TtlAsyncQuery, TtlAsyncStorage
 from .versioned_base_model import VersionedBaseModel, StorageFormatFlags
 
 
@@ -32,6 +45,23 @@ __all__ = [
     "BaseQueryStorage",
     "BaseAsyncQuery",
     "BaseAsyncQueryStorage",
+    "ReplicatedAsyncStorage",
+    "OffloadingAsyncStorage",
+    "SnapshotStorage",
+    "SnapshotAsyncStorage",
+    "SnapshotWriter",
+    "AsyncDataLoader",
+    "SingleFlight",
+    "ShardedCounter",
+    "CounterShard",
+    "SingleFlightAsyncStorage",
+    "SingleFlightAsyncBlobStorage",
+    "TtlAsyncStorage",
+    "TtlAsyncQuery",
+    "TextSearchAsyncStorage",
+    "InvertedIndex",
+    "Tokenizer",
+    "fuse_scores",
     "KeyExistsException",
     "KeyNotExistsException",
     "BaseBlobStorage",
@@ -41,6 +71,14 @@ __all__ = [
     "SmtpEmailSender",
     "BaseCollectionStorage",
     "CollectionDef",
+    "export_collection",
+    "import_collection",
+    "ArchiveManifest",
+    "ArchivePartition",
+    "ChangeEvent",
+    "ChangeType",
+    "ChangeTracker",
+    "FieldChanges",
     "BaseAsyncBlobStorage",
     "BaseBlobMetadata",
     "Blob",
@@ -50,5 +88,8 @@ __all__ = [
     "BlobLocation",
     "BaseTopic",
     "VersionedBaseModel",
+    "MigrationRunner",
+    "MigrationCheckpoint",
+    "MigrationReport",
     "StorageFormatFlags"
 ]
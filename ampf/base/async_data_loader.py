@@ -0,0 +1,116 @@
+"""Batching and caching of storage reads (DataLoader pattern)"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from .base_async_storage import BaseAsyncStorage
+from .exceptions import KeyNotExistsException
+
+
+class AsyncDataLoader[T: BaseModel]:
+    """Collects all `load()` calls issued in the same event loop iteration,
+    de-duplicates keys and reads them with one `get_many()` call
+    (e.g. one Firestore `get_all` RPC instead of N `get` ones).
+
+    Loaded values are kept (identity map), so the same key is read only once
+    and all callers get the same object. The loader should live as long
+    as one request (see `ampf.fastapi.DataLoaders`) and it should be cleared
+    (`clear()`) after values are modified.
+
+    Args:
+        storage: Storage to read from.
+        max_batch_size: Maximum number of keys read by one `get_many()` call.
+    """
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(self, storage: BaseAsyncStorage[T], max_batch_size: int = 500):
+        self.storage = storage
+        self.max_batch_size = max_batch_size
+        self._cache: Dict[str, asyncio.Future[Optional[T]]] = {}
+        self._queue: List[Tuple[str, asyncio.Future[Optional[T]]]] = []
+        self._scheduled = False
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def load(self, key: Any) -> T:
+        """Returns the value with the key.
+
+        Args:
+            key: The key.
+        Returns:
+            The value.
+        Raises:
+            KeyNotExistsException: The key doesn't exist.
+        """
+        ret = await self._wait(str(key))
+        if ret is None:
+            raise KeyNotExistsException(self.storage.collection_name, self.storage.clazz, key)
+        return ret
+
+    async def load_optional(self, key: Any) -> Optional[T]:
+        """Returns the value with the key or `None` if it doesn't exist."""
+        return await self._wait(str(key))
+
+    async def load_many(self, keys: List[Any]) -> List[Optional[T]]:
+        """Returns values with the keys (`None` for keys which don't exist) in the same order."""
+        return list(await asyncio.gather(*(self._wait(str(key)) for key in keys)))
+
+    def prime(self, key: Any, value: Optional[T]) -> None:
+        """Puts the value into the cache (e.g. an item read by a query)."""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+        self._cache[str(key)] = future
+
+    def clear(self, key: Optional[Any] = None) -> None:
+        """Removes the key (or all keys) from the cache."""
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(str(key), None)
+
+    async def _wait(self, key: str) -> Optional[T]:
+        # The future is shared by all callers - cancelling one of them mustn't cancel it
+        return await asyncio.shield(self._get_future(key))
+
+    def _get_future(self, key: str) -> asyncio.Future[Optional[T]]:
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._cache[key] = future
+            self._queue.append((key, future))
+            if not self._scheduled:
+                # Callbacks already scheduled in this iteration (e.g. other tasks
+                # started by `gather()`) run before the batch is dispatched
+                self._scheduled = True
+                loop.call_soon(self._dispatch)
+        return future
+
+    def _dispatch(self) -> None:
+        self._scheduled = False
+        queue, self._queue = self._queue, []
+        for i in range(0, len(queue), self.max_batch_size):
+            task = asyncio.create_task(self._fetch(queue[i : i + self.max_batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, futures: List[Tuple[str, asyncio.Future[Optional[T]]]]) -> None:
+        try:
+            values = await self.storage.get_many(list(dict.fromkeys(key for key, _ in futures)))
+        except Exception as e:
+            self._log.warning("Error reading %d keys from %s: %s", len(futures), self.storage.collection_name, e)
+            for key, future in futures:
+                # Failed keys are not cached, so they can be read again
+                if self._cache.get(key) is future:
+                    self._cache.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in futures:
+            if not future.done():
+                future.set_result(values.get(key))
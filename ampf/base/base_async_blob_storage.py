@@ -38,18 +38,45 @@ class BaseAsyncBlobStorage[T: BaseBlobMetadata](ABC):
         pass
 
     @abstractmethod
-    async def download_async(self, name: str) -> Blob[T]:
+    async def download_async(self, name: str, stream: bool = False) -> Blob[T]:
         """
         Downloads binary data based on the blob key.
 
         Args:
             name: The name identifying the blob to download.
+            stream: Return the blob before its content is read into memory - it is read
+                by `blob.stream()` or `await blob.read()` (only once). Storages which
+                keep blobs in memory or in files return them as usual.
 
         Returns:
             The downloaded blob object.
         """
         pass
 
+    async def download_range(self, name: str, start: int, end: Optional[int] = None, stream: bool = False) -> Blob[T]:
+        """
+        Downloads a part of the blob (like `content[start:end]`).
+
+        The default implementation downloads the whole blob, storages which
+        can read a part of it override this method.
+
+        Args:
+            name: The name identifying the blob to download.
+            start: Position of the first byte.
+            end: Position after the last byte (`None` - to the end of the blob).
+            stream: Return the blob before its content is read into memory (see `download_async()`).
+
+        Returns:
+            The blob object with the part of its content.
+        Raises:
+            ValueError: If the range is empty.
+        """
+        blob = await self.download_async(name)
+        content = (await blob.read())[start:end]
+        if not content:
+            raise ValueError(f"Range {start}:{end} of blob {name} is empty")
+        return Blob[T](name=blob.name, content=content, metadata=blob.metadata)
+
     @abstractmethod
     @deprecated("Use delete_async instead")
     def delete(self, name: str) -> None:
@@ -70,8 +97,16 @@ class BaseAsyncBlobStorage[T: BaseBlobMetadata](ABC):
         pass
 
     @abstractmethod
-    def list_blobs(self, prefix: Optional[str] = None) -> AsyncGenerator[BlobHeader[T]]:
-        """Returns a list of blob headers, optionally filtered by a prefix."""
+    def list_blobs(
+        self, prefix: Optional[str] = None, delimiter: Optional[str] = None, max_results: Optional[int] = None
+    ) -> AsyncGenerator[BlobHeader[T]]:
+        """Returns a list of blob headers, optionally filtered by a prefix.
+
+        Args:
+            prefix: The prefix to filter the blobs by.
+            delimiter: Blobs "in subfolders" (with the delimiter after the prefix) are skipped.
+            max_results: The maximum number of returned blob headers (`None` - all).
+        """
         pass
 
     @abstractmethod
@@ -82,9 +117,40 @@ class BaseAsyncBlobStorage[T: BaseBlobMetadata](ABC):
     async def get_metadata(self, name: str) -> Optional[T]:
         pass
 
-    async def names(self, prefix: Optional[str] = None) -> AsyncGenerator[str]:
+    async def names(
+        self, prefix: Optional[str] = None, delimiter: Optional[str] = None, max_results: Optional[int] = None
+    ) -> AsyncGenerator[str]:
+        """Returns names of blobs, optionally filtered by a prefix.
+
+        Args:
+            prefix: The prefix to filter the blobs by.
+            delimiter: Blobs "in subfolders" (with the delimiter after the prefix) are returned
+                as one name ending with the delimiter.
+            max_results: The maximum number of returned names (`None` - all).
+        """
+        folders = set()
+        count = 0
         async for blob_header in self.list_blobs(prefix):
-            yield blob_header.name
+            if max_results is not None and count >= max_results:
+                return
+            name = blob_header.name
+            folder = self._subfolder(name, prefix, delimiter)
+            if folder is not None:
+                if folder in folders:
+                    continue
+                folders.add(folder)
+                name = folder
+            count += 1
+            yield name
+
+    @staticmethod
+    def _subfolder(name: str, prefix: Optional[str], delimiter: Optional[str]) -> Optional[str]:
+        """Returns the "subfolder" of the blob (the name up to the delimiter after the prefix)
+        or `None` if the blob isn't in a subfolder."""
+        if not delimiter:
+            return None
+        i = name.find(delimiter, len(prefix or ""))
+        return name[: i + len(delimiter)] if i >= 0 else None
 
     async def drop(self) -> None:
         names = [name async for name in self.names()]
@@ -7,6 +7,8 @@ from pydantic import BaseModel
 from .base_async_query_storage import BaseAsyncQueryStorage
 from .base_decorator import BaseDecorator
 from .collection_def import CollectionDef
+from .storage_cache import StorageCache
+from .ttl_async_storage import TtlAsyncStorage
 
 
 TModel = TypeVar("TModel", bound=BaseModel)
@@ -26,6 +28,9 @@ class BaseAsyncCollectionStorage(_StorageProxy[TModel]):
     Each element of collection can have its own subcollections
     """
 
+    subcollection_cache_size: int = 256
+    """Maximum number of subcollection objects kept by one collection (LRU)."""
+
     def __init__(
         self,
         create_storage: Callable[[str, Type[TModel], Optional[str | Callable[[TModel], str]]], BaseAsyncQueryStorage[TModel]],
@@ -33,10 +38,15 @@ class BaseAsyncCollectionStorage(_StorageProxy[TModel]):
     ):
         self.create_storage = create_storage
         storage = self.create_storage(definition.collection_name, definition.clazz, definition.key)
+        if definition.ttl_field:
+            storage = TtlAsyncStorage(storage, definition.ttl_field)
         super().__init__(storage)
         subcollections_list = definition.subcollections or []
         self.subcollections = {sc.collection_name: sc for sc in subcollections_list}
         self.sub_classes = {sc.clazz: sc.collection_name for sc in subcollections_list}
+        self._subcollection_cache: StorageCache[BaseAsyncCollectionStorage] = StorageCache(
+            self.subcollection_cache_size
+        )
 
     def get_collection[Y: BaseModel](
         self, parent_key: Any, subcollection_name_or_class: str | Type[Y] | Any
@@ -51,6 +61,13 @@ class BaseAsyncCollectionStorage(_StorageProxy[TModel]):
         Returns:
             (BaseAsyncCollectionStorage[Y]): Subcollection object
         """
+        subcollection_name = self._get_subcollection_name(subcollection_name_or_class)
+        return self._subcollection_cache.get_or_create(
+            (str(parent_key), subcollection_name),
+            lambda: self._create_subcollection(parent_key, subcollection_name),
+        )
+
+    def _get_subcollection_name(self, subcollection_name_or_class: str | Type | Any) -> str:
         if isinstance(subcollection_name_or_class, str):
             subcollection_name = subcollection_name_or_class
         else:
@@ -63,7 +80,9 @@ class BaseAsyncCollectionStorage(_StorageProxy[TModel]):
                     subcollection_name = self.sub_classes[origin]
                 else:
                     raise
+        return subcollection_name
 
+    def _create_subcollection(self, parent_key: Any, subcollection_name: str):
         sub = self.subcollections[subcollection_name]
 
         return BaseAsyncCollectionStorage(
@@ -73,5 +92,6 @@ class BaseAsyncCollectionStorage(_StorageProxy[TModel]):
                 clazz=sub.clazz,
                 key=sub.key,
                 subcollections=sub.subcollections,
+                ttl_field=sub.ttl_field,
             ),
-        )  # type: ignore
+        )
@@ -1,6 +1,6 @@
 import logging
 from abc import ABC, abstractmethod
-from typing import Any, Callable, Optional, Type
+from typing import TYPE_CHECKING, Any, Callable, Hashable, List, Optional, Type
 
 from pydantic import BaseModel
 
@@ -11,6 +11,15 @@ from .base_topic import BaseTopic
 from .blob_model import BaseBlobMetadata, Blob, BlobLocation
 from .collection_def import CollectionDef
 from .exceptions import KeyNotExistsException
+from .offloading_async_storage import OffloadingAsyncStorage
+from .replicated_async_storage import ReplicatedAsyncStorage
+from .single_flight import SingleFlight, SingleFlightAsyncBlobStorage, SingleFlightAsyncStorage
+from .storage_cache import StorageCache
+from .text_index import Tokenizer
+from .text_search_async_storage import TextSearchAsyncStorage
+
+if TYPE_CHECKING:
+    from ampf.instrumentation import BaseMetricsSink
 
 _log = logging.getLogger(__name__)
 
@@ -18,9 +27,18 @@ _log = logging.getLogger(__name__)
 class BaseAsyncFactory(ABC):
     """Factory creating async storage objects"""
 
+    storage_cache_size: int = 1024
+    """Maximum number of storage objects kept by the factory (LRU)."""
+    metrics_sink: Optional["BaseMetricsSink"] = None
+    """Sink receiving measurements of storages, blob storages and topics (`None` - no instrumentation)."""
+    single_flight: Optional[SingleFlight] = None
+    """Shared in-flight reads of storages and blobs (`None` - concurrent reads are not coalesced)."""
+
     def __init__(self):
         self._collection_defs: dict[str, CollectionDef] = {}
         self._type_to_collection_defs: dict[Type[BaseModel], CollectionDef] = {}
+        self._storage_cache: StorageCache[BaseAsyncQueryStorage] = StorageCache(self.storage_cache_size)
+        self._collection_cache: dict[str, BaseAsyncCollectionStorage] = {}
 
     @abstractmethod
     def create_storage[T: BaseModel](
@@ -61,6 +79,180 @@ class BaseAsyncFactory(ABC):
         """
         return self.create_storage(collection_name, clazz, key)
 
+    def get_storage[T: BaseModel](
+        self,
+        collection_name: str,
+        clazz: Type[T],
+        key: Optional[str | Callable[[T], str]] = None,
+    ) -> BaseAsyncQueryStorage[T]:
+        """Returns standard key-value storage for items of given class.
+
+        The storage is created by `create_storage()` only once and then
+        it is reused (storages are cached per collection name, class and key).
+
+        Args:
+            collection_name: name of collection where items are stored
+            clazz: class of items
+            key: name of item's property which is used as a key or a function to extract key
+
+        Returns:
+            Storage object.
+        """
+        cache_key = ("standard", collection_name, clazz, key)
+        return self._storage_cache.get_or_create(
+            cache_key,
+            lambda: self._coalesce(self._instrument(self.create_storage(collection_name, clazz, key)), cache_key),
+        )
+
+    def get_compact_storage[T: BaseModel](
+        self,
+        collection_name: str,
+        clazz: Type[T],
+        key: Optional[str | Callable[[T], str]] = None,
+    ) -> BaseAsyncQueryStorage[T]:
+        """Returns _compact_ key-value storage for items of given class.
+
+        The storage is created by `create_compact_storage()` only once and then
+        it is reused (storages are cached per collection name, class and key).
+
+        Args:
+            collection_name: name of collection where items are stored
+            clazz: class of items
+            key: name of item's property which is used as a key or a function to extract key
+
+        Returns:
+            Storage object.
+        """
+        cache_key = ("compact", collection_name, clazz, key)
+        return self._storage_cache.get_or_create(
+            cache_key,
+            lambda: self._coalesce(
+                self._instrument(self.create_compact_storage(collection_name, clazz, key)), cache_key
+            ),
+        )
+
+    def instrument(self, sink: Optional["BaseMetricsSink"]) -> None:
+        """Sets (or removes) the metrics sink of all storages returned by `get_storage()`,
+        `get_compact_storage()` and `get_collection()` as well as blobs and messages
+        sent by the factory. Cached storages are dropped so they are recreated
+        with (or without) instrumentation.
+
+        Args:
+            sink: Metrics sink (`None` - switches instrumentation off).
+        """
+        self.metrics_sink = sink
+        self._storage_cache.clear()
+        self._collection_cache.clear()
+
+    def _instrument[O](self, obj: O, name: Optional[str] = None) -> O:
+        """Wraps storage, blob storage or topic with instrumentation decorator if metrics sink is set."""
+        if self.metrics_sink is None:
+            return obj
+        from ampf.instrumentation import instrument
+
+        return instrument(obj, self.metrics_sink, name)
+
+    def enable_single_flight(self, enabled: bool = True) -> None:
+        """Switches coalescing of concurrent identical reads on (or off).
+
+        Concurrent `get()` calls for the same key of storages returned by `get_storage()`,
+        `get_compact_storage()` and `get_collection()` as well as concurrent `download_blob()`
+        calls for the same blob share one backend call. Cached storages are dropped
+        so they are recreated with (or without) coalescing.
+
+        Args:
+            enabled: Coalesce concurrent reads.
+        """
+        self.single_flight = SingleFlight() if enabled else None
+        self._storage_cache.clear()
+        self._collection_cache.clear()
+
+    def _coalesce[O](self, obj: O, namespace: Hashable) -> O:
+        """Wraps storage or blob storage with singleflight decorator if it is enabled.
+
+        Args:
+            obj: Storage or blob storage.
+            namespace: Keys of its calls in the shared singleflight (unique for each storage).
+        """
+        if self.single_flight is None:
+            return obj
+        if isinstance(obj, BaseAsyncBlobStorage):
+            return SingleFlightAsyncBlobStorage(obj, self.single_flight, namespace)  # type: ignore
+        return SingleFlightAsyncStorage(obj, self.single_flight, namespace)  # type: ignore
+
+    def create_replicated_storage[T: BaseModel](
+        self,
+        collection_name: str,
+        clazz: Type[T],
+        key: Optional[str | Callable[[T], str]] = None,
+    ) -> ReplicatedAsyncStorage[T]:
+        """Creates in-memory read replica of a storage (for small, rarely changed collections).
+
+        The replica has to be started (`await storage.start()`) before use.
+
+        Args:
+            collection_name: name of collection where items are stored
+            clazz: class of items
+            key: name of item's property which is used as a key or a function to extract key
+
+        Returns:
+            Replicated storage object.
+        """
+        return ReplicatedAsyncStorage(self.create_storage(collection_name, clazz, key))
+
+    def create_offloading_storage[T: BaseModel](
+        self,
+        collection_name: str,
+        clazz: Type[T],
+        key: Optional[str | Callable[[T], str]] = None,
+        threshold: int = 256 * 1024,
+        deferred: bool = False,
+        blob_collection_name: str = "offloaded",
+        bucket_name: Optional[str] = None,
+    ) -> OffloadingAsyncStorage[T]:
+        """Creates storage which moves large fields to a blob storage.
+
+        Args:
+            collection_name: name of collection where items are stored
+            clazz: class of items
+            key: name of item's property which is used as a key or a function to extract key
+            threshold: minimal size (in bytes of JSON) of an offloaded field
+            deferred: don't download offloaded fields on read (see `OffloadingAsyncStorage.rehydrate()`)
+            blob_collection_name: name of the blob collection of offloaded fields
+            bucket_name: name of the bucket of offloaded fields (default - the factory's one)
+
+        Returns:
+            Offloading storage object.
+        """
+        return OffloadingAsyncStorage(
+            self.create_storage(collection_name, clazz, key),
+            self.create_blob_storage(blob_collection_name, content_type="application/json", bucket_name=bucket_name),
+            threshold=threshold,
+            deferred=deferred,
+        )
+
+    def create_text_search_storage[T: BaseModel](
+        self,
+        collection_name: str,
+        clazz: Type[T],
+        fields: str | List[str],
+        key: Optional[str | Callable[[T], str]] = None,
+        tokenizer: Optional[Tokenizer] = None,
+    ) -> TextSearchAsyncStorage[T]:
+        """Creates storage with full-text indexes of text fields.
+
+        Args:
+            collection_name: name of collection where items are stored
+            clazz: class of items
+            fields: names of indexed text fields
+            key: name of item's property which is used as a key or a function to extract key
+            tokenizer: tokenizer of texts and queries
+
+        Returns:
+            Text search storage object.
+        """
+        return TextSearchAsyncStorage(self.create_storage(collection_name, clazz, key), fields, tokenizer)
+
     @abstractmethod
     def create_blob_storage[T: BaseBlobMetadata](
         self,
@@ -90,7 +282,7 @@ class BaseAsyncFactory(ABC):
         """
         if isinstance(definition, dict):
             definition = CollectionDef(**definition)
-        return BaseAsyncCollectionStorage(self.create_storage, definition)
+        return BaseAsyncCollectionStorage(self.get_storage, definition)
 
     def create_storage_tree[T: BaseModel](self, root: CollectionDef[T]) -> BaseAsyncCollectionStorage[T]:
         """Creates storage tree from its definition.
@@ -110,6 +302,7 @@ class BaseAsyncFactory(ABC):
         """
         for definition in definitions:
             self._collection_defs[definition.collection_name] = definition
+            self._collection_cache.pop(definition.collection_name, None)
             if definition.clazz:
                 self._type_to_collection_defs[definition.clazz] = definition
 
@@ -131,20 +324,29 @@ class BaseAsyncFactory(ABC):
             if collection_name_or_type not in self._type_to_collection_defs:
                 raise KeyNotExistsException(f"Collection for type {collection_name_or_type.__name__} not registered")
             definition = self._type_to_collection_defs[collection_name_or_type]
-        return self.create_collection(definition)
+        collection = self._collection_cache.get(definition.collection_name)
+        if collection is None:
+            collection = self.create_collection(definition)
+            self._collection_cache[definition.collection_name] = collection
+        return collection
 
-    async def download_blob(self, blob_location: BlobLocation) -> Blob:
+    async def download_blob(self, blob_location: BlobLocation, stream: bool = False) -> Blob:
         """Downloads a blob from the specified file location.
 
         Args:
             blob_location (BlobLocation): The location of the file to load.
+            stream: Return the blob before its content is read into memory
+                (e.g. for `BlobStreamingResponse`, see `BaseAsyncBlobStorage.download_async()`).
 
         Returns:
             Blob: The loaded blob.
         """
         try:
-            bs = self.create_blob_storage("", bucket_name=blob_location.bucket)
-            return await bs.download_async(blob_location.name)
+            bs = self._coalesce(
+                self._instrument(self.create_blob_storage("", bucket_name=blob_location.bucket)),
+                ("blob", blob_location.bucket),
+            )
+            return await bs.download_async(blob_location.name, stream=stream)
         except KeyNotExistsException as e:
             _log.warning("Error downloading blob: %s", blob_location.name)
             raise e
@@ -156,7 +358,7 @@ class BaseAsyncFactory(ABC):
             blob_location (BlobLocation): The location to save the blob.
             blob (Blob): The blob to save.
         """
-        bs = self.create_blob_storage("", bucket_name=blob_location.bucket)
+        bs = self._instrument(self.create_blob_storage("", bucket_name=blob_location.bucket))
         await bs.upload_async(blob)
 
     def create_topic(self, topic_id: str) -> BaseTopic[BaseModel]:
@@ -186,7 +388,7 @@ class BaseAsyncFactory(ABC):
         Returns:
             The message ID.
         """
-        topic = self.create_topic(topic_id)
+        topic = self._instrument(self.create_topic(topic_id), topic_id)
         return await topic.publish_async(data, response_topic=response_topic, sender_id=sender_id)
 
     def create_blob_location(self, name: str, bucket: Optional[str] = None) -> BlobLocation:
@@ -9,6 +9,8 @@ from pydantic import BaseModel
 from ampf.base.versioned_base_model import VersionedBaseModel
 
 from .base_query import OP
+from .similarity import NearestCollector
+from .text_index import contains_text
 
 
 class BaseAsyncQuery[T: BaseModel | VersionedBaseModel](ABC):
@@ -62,36 +64,45 @@ class BaseAsyncQuery[T: BaseModel | VersionedBaseModel](ABC):
                     case "array_contains_any":
                         if any(item in value for item in attr):
                             yield o
-        return BaseAsyncQuery(it)
+                    case "contains_text":
+                        if contains_text(attr, value):
+                            yield o
+        return BaseAsyncQuery(it, self.embedding_field_name, self.embedding_search_limit)
 
-    async def find_nearest(self, embedding: List[float], limit: Optional[int] = None) -> AsyncIterable[T]:
+    async def find_nearest(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> AsyncIterable[T]:
         """Finds the nearest knowledge base items to the given vector.
 
         Args:
             embedding: The vector to search for.
             limit: The maximum number of results to return.
+            distance_threshold: The maximum cosine distance of returned items.
         Returns:
             An iterator of the nearest items.
         """
-        try:
-            from sentence_transformers.util import cos_sim
-
-            self._log.warning("Embedding search is not optimized for performance.")
-            self._log.warning("Consider using a vector database for production.")
-
-            limit = limit or self.embedding_search_limit
-            ret: List[Tuple[T, float]] = []
-            async for item in self.get_all():
-                em = getattr(item, self.embedding_field_name)
-                if em:
-                    similarity = cos_sim(embedding, em)
-                    ret.append((item, similarity.item()))
-            ret.sort(key=lambda x: x[1], reverse=True)
-            for item in ret[:limit]:
-                yield item[0]
-        except ImportError:
-            self._log.error("The package `sentence_transformers` is not installed ")
-            self._log.error("Try: pip install ampf[huggingface]")
+        for item, _ in await self.find_nearest_with_distances(embedding, limit, distance_threshold):
+            yield item
+
+    async def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
+        """Finds the nearest items with their cosine distances (`1 - cosine similarity`).
+
+        Only items matching the filters of the query are scored and only
+        `limit` best of them are kept in memory.
+
+        Args:
+            embedding: The vector to search for.
+            limit: The maximum number of results to return.
+            distance_threshold: The maximum cosine distance of returned items.
+        Returns:
+            Items and their distances (the nearest first).
+        """
+        nearest = NearestCollector(embedding, limit or self.embedding_search_limit, distance_threshold)
+        async for item in self.get_all():
+            nearest.add(item, getattr(item, self.embedding_field_name, None))
+        return nearest.result()
 
     async def get_all(self) -> AsyncIterator[T]:
         """Get all the items after applying filters"""
@@ -2,8 +2,11 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from pathlib import Path
 from typing import (
     Any,
     AsyncGenerator,
@@ -12,6 +15,7 @@ from typing import (
     Callable,
     Coroutine,
     Dict,
+    Iterable,
     List,
     Literal,
     Optional,
@@ -25,14 +29,29 @@ from ampf.base.base_async_query import BaseAsyncQuery
 from ampf.base.base_storage import BaseStorage
 from ampf.base.versioned_base_model import VersionedBaseModel, resolve_versioned_class
 
+from .change_event import ChangeEvent, ChangeType
+from .change_tracker import ChangeTracker, FieldChanges
 from .exceptions import KeyExistsException, KeyNotExistsException
+from .similarity import NearestCollector
 
 _log = logging.getLogger(__name__)
 
+migrate_legacy_on_read: ContextVar[bool] = ContextVar("migrate_legacy_on_read", default=True)
+"""Can legacy data be migrated on read (`StorageFormatFlags.migrate_legacy_on_read`) in the current context?
+
+It is switched off by `MigrationRunner` which migrates data in batches.
+"""
+
 
 class BaseAsyncStorage[T: BaseModel | VersionedBaseModel](ABC):
     """Base class for storage implementations which store Pydantic objects"""
 
+    native_ttl: bool = False
+    """Storage deletes expired items itself (see `TtlAsyncStorage`)"""
+    change_tracker: Optional[ChangeTracker] = None
+    """Tracks fields of returned items, so `put()` writes only changed ones (see `track_changes()`)"""
+    _increment_lock: Optional[asyncio.Lock] = None
+
     def __init__(
         self,
         collection_name: str,
@@ -66,6 +85,44 @@ class BaseAsyncStorage[T: BaseModel | VersionedBaseModel](ABC):
     async def delete(self, key: Any) -> None:
         """Delete the value with the key"""
 
+    async def get_many(self, keys: List[Any]) -> Dict[str, T]:
+        """Get values with the keys (missing keys are ignored).
+
+        Storages override it to read all the values at once (one round trip).
+
+        Returns:
+            Found values by keys (converted to `str`).
+        """
+
+        async def get(key: str) -> Optional[T]:
+            try:
+                return await self.get(key)
+            except KeyNotExistsException:
+                return None
+
+        unique = list(dict.fromkeys(str(key) for key in keys))
+        values = await asyncio.gather(*(get(key) for key in unique))
+        return {key: value for key, value in zip(unique, values) if value is not None}
+
+    async def put_many(self, values: List[T]) -> None:
+        """Store the values (keys are calculated based on the values).
+
+        Storages override it to store all the values in one write (batch).
+        """
+        for value in values:
+            await self.save(value)
+
+    async def delete_many(self, keys: List[Any]) -> None:
+        """Delete values with the keys (missing keys are ignored).
+
+        Storages override it to delete all the values in one write (batch).
+        """
+        for key in keys:
+            try:
+                await self.delete(key)
+            except KeyNotExistsException:
+                pass
+
     async def create(self, value: T) -> None:
         """Adds to collection a new element but only if such key doesn't already exist"""
         key = self.get_key(value)
@@ -96,6 +153,27 @@ class BaseAsyncStorage[T: BaseModel | VersionedBaseModel](ABC):
         key = self.get_key(value)
         await self.put(key, value)
 
+    async def increment(self, key: Any, field: str, delta: int | float = 1) -> None:
+        """Atomically adds `delta` to the numeric field of the value (missing field is treated as 0).
+
+        The default implementation reads and writes the value under a lock of the storage
+        (atomic within the process). Storages override it with native atomic updates
+        (e.g. Firestore `Increment`).
+
+        Args:
+            key: The key of the value.
+            field: Name of the numeric field.
+            delta: Added amount (negative to decrement).
+        Raises:
+            KeyNotExistsException: The key doesn't exist.
+        """
+        if self._increment_lock is None:
+            self._increment_lock = asyncio.Lock()
+        async with self._increment_lock:
+            value = await self.get(key)
+            setattr(value, field, (getattr(value, field, None) or 0) + delta)
+            await self.put(key, value)
+
     def get_key(self, value: T) -> str:
         """Get the key for the value"""
         if self.key and isinstance(self.key, Callable):
@@ -109,12 +187,29 @@ class BaseAsyncStorage[T: BaseModel | VersionedBaseModel](ABC):
         """Delete all the values"""
         async for key in self.keys():
             await self.delete(key)
+        self._forget_tracked()
 
     async def get_all(self, sort: Any = None) -> AsyncGenerator[T]:
         """Get all the values"""
         async for key in self.keys():
             yield await self.get(key)
 
+    async def snapshot(self, path: str | Path) -> int:
+        """Writes all items to a read-only snapshot file opened by `SnapshotStorage`
+        (or `SnapshotAsyncStorage`), e.g. to start instances without loading the collection.
+
+        Args:
+            path: Path of the snapshot file (it is replaced when the snapshot is complete).
+        Returns:
+            Number of written items.
+        """
+        from .snapshot_storage import SnapshotWriter
+
+        with SnapshotWriter(path) as writer:
+            async for value in self.get_all():
+                writer.add_item(self.get_key(value), value)
+        return writer.count
+
     async def key_exists(self, key: Any) -> bool:
         try:
             await self.get(key)
@@ -128,38 +223,176 @@ class BaseAsyncStorage[T: BaseModel | VersionedBaseModel](ABC):
             return False
         return True
 
-    async def find_nearest(self, embedding: List[float], limit: Optional[int] = None) -> AsyncIterable[T]:
+    async def find_nearest(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> AsyncIterable[T]:
         """Finds the nearest knowledge base items to the given vector.
 
         Args:
             embedding: The vector to search for.
             limit: The maximum number of results to return.
+            distance_threshold: The maximum cosine distance of returned items.
         Returns:
             An iterator of the nearest items.
         """
-        try:
-            from sentence_transformers.util import cos_sim
-
-            _log.warning("Embedding search is not optimized for performance.")
-            _log.warning("Consider using a vector database for production.")
-
-            limit = limit or self.embedding_search_limit
-            ret: List[Tuple[T, float]] = []
-            async for item in self.get_all():
-                em = getattr(item, self.embedding_field_name)
-                if em:
-                    similarity = cos_sim(embedding, em)
-                    ret.append((item, similarity.item()))
-            ret.sort(key=lambda x: x[1], reverse=True)
-            for item in ret[:limit]:
-                yield item[0]
-        except ImportError:
-            _log.error("The package `sentence_transformers` is not installed ")
-            _log.error("Try: pip install ampf[huggingface]")
+        for item, _ in await self.find_nearest_with_distances(embedding, limit, distance_threshold):
+            yield item
+
+    async def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
+        """Finds the nearest items with their cosine distances (`1 - cosine similarity`).
+
+        The default implementation scores all items keeping only `limit` best of them.
+
+        Args:
+            embedding: The vector to search for.
+            limit: The maximum number of results to return.
+            distance_threshold: The maximum cosine distance of returned items.
+        Returns:
+            Items and their distances (the nearest first).
+        """
+        nearest = NearestCollector(embedding, limit or self.embedding_search_limit, distance_threshold)
+        async for item in self.get_all():
+            nearest.add(item, getattr(item, self.embedding_field_name, None))
+        return nearest.result()
+
+    async def text_search(self, field: str, query: str, limit: Optional[int] = None) -> AsyncIterator[T]:
+        """Finds items whose text field matches the query best (BM25).
+
+        The default implementation indexes all items on every call.
+        Use `TextSearchAsyncStorage` to keep the index between calls.
+
+        Args:
+            field: Name of the text field (`str` or list of `str`).
+            query: Searched text.
+            limit: The maximum number of results to return (`None` - all matching items).
+        Returns:
+            An iterator of items sorted by relevance.
+        """
+        from .text_index import InvertedIndex
+
+        index = InvertedIndex()
+        items: Dict[str, T] = {}
+        async for item in self.get_all():
+            key = self.get_key(item)
+            items[key] = item
+            index.update(key, getattr(item, field))
+        for key, _ in index.search(query, limit):
+            yield items[key]
+
+    async def watch(
+        self, poll_interval: float = 1.0, ready: Optional[asyncio.Event] = None
+    ) -> AsyncIterator[ChangeEvent[T]]:
+        """Watches the storage and yields changes made after the call.
+
+        The default implementation polls fingerprints of all items (see `_snapshot()`)
+        and reports differences. Implementations with native change notifications
+        override this method.
+
+        Args:
+            poll_interval: Time (in seconds) between two polls.
+            ready: Set when the watch is established (the first snapshot is taken),
+                all later changes are reported.
+        Returns:
+            An iterator of change events (added, modified or removed items).
+        """
+        previous = await self._snapshot()
+        if ready:
+            ready.set()
+        while True:
+            await asyncio.sleep(poll_interval)
+            current = await self._snapshot()
+            for change_type, key in self._diff_snapshots(previous, current):
+                if change_type == "removed":
+                    yield ChangeEvent(change_type, key)
+                    continue
+                try:
+                    value = await self.get(key)
+                except (KeyNotExistsException, ValueError):
+                    # Removed or being written in the meantime - it will be reported by the next poll
+                    if key in previous:
+                        current[key] = previous[key]
+                    else:
+                        current.pop(key, None)
+                    continue
+                yield ChangeEvent(change_type, key, value)
+            previous = current
+
+    async def _snapshot(self) -> Dict[str, Any]:
+        """Returns fingerprints of all items (key -> fingerprint) used by `watch()`.
+
+        Storages override it with cheaper fingerprints (e.g. file modification times).
+        """
+        ret: Dict[str, Any] = {}
+        async for item in self.get_all():
+            ret[self.get_key(item)] = hash(item.model_dump_json())
+        return ret
+
+    @staticmethod
+    def _diff_snapshots(previous: Dict[str, Any], current: Dict[str, Any]) -> List[Tuple[ChangeType, str]]:
+        ret: List[Tuple[ChangeType, str]] = []
+        for key, fingerprint in current.items():
+            if key not in previous:
+                ret.append(("added", key))
+            elif previous[key] != fingerprint:
+                ret.append(("modified", key))
+        for key in previous.keys() - current.keys():
+            ret.append(("removed", key))
+        return ret
 
     def where(self, field: str, op: Literal["==", "!=", "<", "<=", ">", ">="], value: Any) -> BaseAsyncQuery[T]:
         raise NotImplementedError
 
+    def track_changes(self, enabled: bool = True) -> None:
+        """Switches tracking of changed fields on (or off).
+
+        Storages supporting it remember fingerprints of fields of returned items
+        and `put()` / `save()` of such item writes only changed fields (or nothing
+        if no field has changed). It costs an extra serialization of each read item.
+        Fingerprints are forgotten when the item is deleted through this storage object,
+        so items deleted by other processes or storage objects must not be tracked.
+
+        Args:
+            enabled: Track changes.
+        """
+        self.change_tracker = ChangeTracker() if enabled else None
+
+    async def _track(self, value: T, data: Optional[Dict[str, Any]] = None) -> T:
+        """Remembers the stored state of the returned (or written) item if changes are tracked.
+
+        Args:
+            value: The item.
+            data: Stored representation of the item (calculated if not given).
+        Returns:
+            The item.
+        """
+        if self.change_tracker is not None:
+            if data is None:
+                data = self.to_storage(value)
+                if isinstance(data, Coroutine):
+                    data = await data
+            self.change_tracker.track(value, self.get_key(value), data)
+        return value
+
+    def _forget_tracked(self, keys: Optional[Iterable[Any]] = None) -> None:
+        """Forgets tracked items with the keys (`None` - all items) after they are deleted."""
+        if self.change_tracker is not None:
+            if keys is None:
+                self.change_tracker.clear()
+            else:
+                self.change_tracker.forget_keys(str(key) for key in keys)
+
+    def _changes(self, key: Any, value: T, data: Dict[str, Any]) -> Optional[FieldChanges]:
+        """Returns fields of the item changed since it was read or `None` if they are unknown
+        (changes are not tracked, the item isn't tracked or its key has changed)."""
+        if self.change_tracker is None:
+            return None
+        key = str(key)
+        if key != self.get_key(value):
+            return None
+        return self.change_tracker.changes(value, key, data)
+
     def to_storage(self, data: T) -> Dict[str, Any] | Coroutine[Any, Any, Dict[str, Any]]:
         if isinstance(data, VersionedBaseModel):
             return data.to_storage()
@@ -172,7 +405,7 @@ class BaseAsyncStorage[T: BaseModel | VersionedBaseModel](ABC):
         if issubclass(real_cls, VersionedBaseModel):
             ret = real_cls.from_storage(data)
 
-            if ret.FORMAT_FLAGS.migrate_legacy_on_read and ret.CURRENT_VERSION != ret.v:
+            if ret.FORMAT_FLAGS.migrate_legacy_on_read and ret.CURRENT_VERSION != ret.v and migrate_legacy_on_read.get():
 
                 async def save_and_return():
                     ret.v = ret.CURRENT_VERSION
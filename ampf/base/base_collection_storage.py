@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from .base_decorator import BaseDecorator
 from .base_query_storage import BaseQueryStorage
 from .collection_def import CollectionDef
+from .storage_cache import StorageCache
 
 TModel = TypeVar("TModel", bound=BaseModel)
 
@@ -24,17 +25,23 @@ class BaseCollectionStorage(_StorageProxy[TModel]):
     Each element of collection can have its own subcollections
     """
 
+    subcollection_cache_size: int = 256
+    """Maximum number of subcollection objects kept by one collection (LRU)."""
+
     def __init__(
         self,
         create_storage: Callable[[str, Type[TModel], Optional[str | Callable[[TModel], str]]], BaseQueryStorage[TModel]],
         definition: CollectionDef[TModel],
     ):
         self.create_storage = create_storage
+        if definition.ttl_field:
+            raise ValueError("TTL (ttl_field) is supported only by async storages")
         storage = self.create_storage(definition.collection_name, definition.clazz, definition.key)
         super().__init__(storage)
         subcollections_list = definition.subcollections or []
         self.subcollections = {sc.collection_name: sc for sc in subcollections_list}
         self.sub_classes = {sc.clazz: sc.collection_name for sc in subcollections_list}
+        self._subcollection_cache: StorageCache[BaseCollectionStorage] = StorageCache(self.subcollection_cache_size)
 
     def get_collection[Y: BaseModel](
         self, parent_key: Any, subcollection_name_or_class: str | Type[Y] | Any
@@ -49,6 +56,13 @@ class BaseCollectionStorage(_StorageProxy[TModel]):
         Returns:
             (BaseCollectionStorage[Y]): Subcollection object
         """
+        subcollection_name = self._get_subcollection_name(subcollection_name_or_class)
+        return self._subcollection_cache.get_or_create(
+            (str(parent_key), subcollection_name),
+            lambda: self._create_subcollection(parent_key, subcollection_name),
+        )
+
+    def _get_subcollection_name(self, subcollection_name_or_class: str | Type | Any) -> str:
         if isinstance(subcollection_name_or_class, str):
             subcollection_name = subcollection_name_or_class
         else:
@@ -61,7 +75,9 @@ class BaseCollectionStorage(_StorageProxy[TModel]):
                     subcollection_name = self.sub_classes[origin]
                 else:
                     raise
+        return subcollection_name
 
+    def _create_subcollection(self, parent_key: Any, subcollection_name: str):
         sub = self.subcollections[subcollection_name]
 
         return BaseCollectionStorage(
@@ -72,4 +88,4 @@ class BaseCollectionStorage(_StorageProxy[TModel]):
                 key=sub.key,
                 subcollections=sub.subcollections,
             ),
-        )  # type: ignore
+        )
@@ -1,6 +1,6 @@
 import logging
 from abc import ABC, abstractmethod
-from typing import Any, Callable, Optional, Type
+from typing import TYPE_CHECKING, Any, Callable, Optional, Type
 
 from pydantic import BaseModel
 
@@ -11,6 +11,10 @@ from .base_blob_storage import BaseBlobStorage
 from .base_collection_storage import BaseCollectionStorage
 from .base_query_storage import BaseQueryStorage
 from .blob_model import BaseBlobMetadata, Blob, BlobLocation
+from .storage_cache import StorageCache
+
+if TYPE_CHECKING:
+    from ampf.instrumentation import BaseMetricsSink
 
 _log = logging.getLogger(__name__)
 
@@ -18,9 +22,16 @@ _log = logging.getLogger(__name__)
 class BaseFactory(ABC):
     """Factory creating storage objects"""
 
+    storage_cache_size: int = 1024
+    """Maximum number of storage objects kept by the factory (LRU)."""
+    metrics_sink: Optional["BaseMetricsSink"] = None
+    """Sink receiving measurements of storages (`None` - no instrumentation)."""
+
     def __init__(self):
         self._collection_defs: dict[str, CollectionDef] = {}
         self._type_to_collection_defs: dict[Type[BaseModel], CollectionDef] = {}
+        self._storage_cache: StorageCache[BaseQueryStorage] = StorageCache(self.storage_cache_size)
+        self._collection_cache: dict[str, BaseCollectionStorage] = {}
 
     @abstractmethod
     def create_storage[T: BaseModel](
@@ -61,6 +72,74 @@ class BaseFactory(ABC):
         """
         return self.create_storage(collection_name, clazz, key)
 
+    def get_storage[T: BaseModel](
+        self,
+        collection_name: str,
+        clazz: Type[T],
+        key: Optional[str | Callable[[T], str]] = None,
+    ) -> BaseQueryStorage[T]:
+        """Returns standard key-value storage for items of given class.
+
+        The storage is created by `create_storage()` only once and then
+        it is reused (storages are cached per collection name, class and key).
+
+        Args:
+            collection_name: name of collection where items are stored
+            clazz: class of items
+            key: name of item's property which is used as a key or a function to extract key
+
+        Returns:
+            Storage object.
+        """
+        return self._storage_cache.get_or_create(
+            ("standard", collection_name, clazz, key),
+            lambda: self._instrument(self.create_storage(collection_name, clazz, key)),
+        )
+
+    def get_compact_storage[T: BaseModel](
+        self,
+        collection_name: str,
+        clazz: Type[T],
+        key: Optional[str | Callable[[T], str]] = None,
+    ) -> BaseQueryStorage[T]:
+        """Returns _compact_ key-value storage for items of given class.
+
+        The storage is created by `create_compact_storage()` only once and then
+        it is reused (storages are cached per collection name, class and key).
+
+        Args:
+            collection_name: name of collection where items are stored
+            clazz: class of items
+            key: name of item's property which is used as a key or a function to extract key
+
+        Returns:
+            Storage object.
+        """
+        return self._storage_cache.get_or_create(
+            ("compact", collection_name, clazz, key),
+            lambda: self._instrument(self.create_compact_storage(collection_name, clazz, key)),
+        )
+
+    def instrument(self, sink: Optional["BaseMetricsSink"]) -> None:
+        """Sets (or removes) the metrics sink of all storages returned by `get_storage()`,
+        `get_compact_storage()` and `get_collection()`. Cached storages are dropped
+        so they are recreated with (or without) instrumentation.
+
+        Args:
+            sink: Metrics sink (`None` - switches instrumentation off).
+        """
+        self.metrics_sink = sink
+        self._storage_cache.clear()
+        self._collection_cache.clear()
+
+    def _instrument[O](self, obj: O) -> O:
+        """Wraps storage with instrumentation decorator if metrics sink is set."""
+        if self.metrics_sink is None:
+            return obj
+        from ampf.instrumentation import instrument
+
+        return instrument(obj, self.metrics_sink)
+
     @abstractmethod
     def create_blob_storage[T: BaseBlobMetadata](
         self,
@@ -90,7 +169,7 @@ class BaseFactory(ABC):
         """
         if isinstance(definition, dict):
             definition = CollectionDef(**definition)
-        return BaseCollectionStorage(self.create_storage, definition)
+        return BaseCollectionStorage(self.get_storage, definition)
 
     def create_storage_tree[T: BaseModel](self, root: CollectionDef[T]) -> BaseCollectionStorage[T]:
         """Creates storage tree from its definition.
@@ -110,6 +189,7 @@ class BaseFactory(ABC):
         """
         for definition in definitions:
             self._collection_defs[definition.collection_name] = definition
+            self._collection_cache.pop(definition.collection_name, None)
             if definition.clazz:
                 self._type_to_collection_defs[definition.clazz] = definition
 
@@ -129,7 +209,11 @@ class BaseFactory(ABC):
             if collection_name_or_type not in self._type_to_collection_defs:
                 raise KeyNotExistsException(f"Collection for type {collection_name_or_type.__name__} not registered")
             definition = self._type_to_collection_defs[collection_name_or_type]
-        return self.create_collection(definition)
+        collection = self._collection_cache.get(definition.collection_name)
+        if collection is None:
+            collection = self.create_collection(definition)
+            self._collection_cache[definition.collection_name] = collection
+        return collection
 
     def create_blob_location(self, name: str, bucket: Optional[str] = None) -> BlobLocation:
         """Creates a BlobLocation object.
@@ -7,7 +7,10 @@ from typing import Any, Callable, Iterator, List, Optional, Tuple
 from pydantic import BaseModel
 from typing_extensions import Literal
 
-OP = Literal["==", "!=", "<", "<=", ">", ">=", "in", "array_contains_any"]
+from .similarity import NearestCollector
+from .text_index import contains_text
+
+OP = Literal["==", "!=", "<", "<=", ">", ">=", "in", "array_contains_any", "contains_text"]
 
 
 class BaseQuery[T: BaseModel](ABC):
@@ -46,39 +49,47 @@ class BaseQuery[T: BaseModel](ABC):
                     return (o for o in src() if o.__getattribute__(field) in value)
                 case "array_contains_any":
                     return (o for o in src() if any(e in value for e in o.__getattribute__(field)))
+                case "contains_text":
+                    return (o for o in src() if contains_text(o.__getattribute__(field), value))
                 case _:
                     raise ValueError(f"Unknown operator {op}")
 
-        return BaseQuery(it)
+        return BaseQuery(it, self.embedding_field_name, self.embedding_search_limit)
 
-    def find_nearest(self, embedding: List[float], limit: Optional[int] = None) -> Iterator[T]:
+    def find_nearest(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> Iterator[T]:
         """Finds the nearest knowledge base items to the given vector.
 
         Args:
             embedding: The vector to search for.
             limit: The maximum number of results to return.
+            distance_threshold: The maximum cosine distance of returned items.
         Returns:
             An iterator of the nearest items.
         """
-        try:
-            from sentence_transformers.util import cos_sim
-
-            self._log.warning("Embedding search is not optimized for performance.")
-            self._log.warning("Consider using a vector database for production.")
-
-            limit = limit or self.embedding_search_limit
-            ret: List[Tuple[T, float]] = []
-            for item in self.get_all():
-                em = getattr(item, self.embedding_field_name)
-                if em:
-                    similarity = cos_sim(embedding, em)
-                    ret.append((item, similarity.item()))
-            ret.sort(key=lambda x: x[1], reverse=True)
-            for item in ret[:limit]:
-                yield item[0]
-        except ImportError:
-            self._log.error("The package `sentence_transformers` is not installed ")
-            self._log.error("Try: pip install ampf[huggingface]")
+        for item, _ in self.find_nearest_with_distances(embedding, limit, distance_threshold):
+            yield item
+
+    def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
+        """Finds the nearest items with their cosine distances (`1 - cosine similarity`).
+
+        Only items matching the filters of the query are scored and only
+        `limit` best of them are kept in memory.
+
+        Args:
+            embedding: The vector to search for.
+            limit: The maximum number of results to return.
+            distance_threshold: The maximum cosine distance of returned items.
+        Returns:
+            Items and their distances (the nearest first).
+        """
+        nearest = NearestCollector(embedding, limit or self.embedding_search_limit, distance_threshold)
+        for item in self.get_all():
+            nearest.add(item, getattr(item, self.embedding_field_name, None))
+        return nearest.result()
 
     def get_all(self) -> Iterator[T]:
         """Get all the items after applying filters"""
@@ -5,6 +5,7 @@ from __future__ import annotations
 import copy
 import logging
 from abc import ABC, abstractmethod
+from pathlib import Path
 from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type
 
 from pydantic import BaseModel
@@ -13,6 +14,7 @@ from ampf.base.versioned_base_model import VersionedBaseModel
 
 from .base_query import OP, BaseQuery
 from .exceptions import KeyExistsException
+from .similarity import NearestCollector
 
 
 class BaseStorage[T: BaseModel | VersionedBaseModel](ABC):
@@ -91,6 +93,14 @@ class BaseStorage[T: BaseModel | VersionedBaseModel](ABC):
         self.put(key, data)
         return data
 
+    def put_many(self, values: List[T]) -> None:
+        """Store the values (keys are calculated based on the values).
+
+        Storages override it to store all the values in one write (batch).
+        """
+        for value in values:
+            self.save(value)
+
     def save(self, value: T) -> None:
         """Save the value in the storage. The key is calculated based on the value.
         If the key already exists, it will be overwritten.
@@ -134,6 +144,21 @@ class BaseStorage[T: BaseModel | VersionedBaseModel](ABC):
     def count(self) -> int:
         return len(list(self.keys()))
 
+    def snapshot(self, path: str | Path) -> int:
+        """Writes all items to a read-only snapshot file opened by `SnapshotStorage`.
+
+        Args:
+            path: Path of the snapshot file (it is replaced when the snapshot is complete).
+        Returns:
+            Number of written items.
+        """
+        from .snapshot_storage import SnapshotWriter
+
+        with SnapshotWriter(path) as writer:
+            for value in self.get_all():
+                writer.add_item(self.get_key(value), value)
+        return writer.count
+
     def create_collection(
         self,
         parent_key: str,
@@ -144,35 +169,39 @@ class BaseStorage[T: BaseModel | VersionedBaseModel](ABC):
         new_collection_name = f"{self.collection_name}/{parent_key}/{collection_name}"
         return self.__class__(new_collection_name, clazz, key=key)
 
-    def find_nearest(self, embedding: List[float], limit: Optional[int] = None) -> Iterator[T]:
+    def find_nearest(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> Iterator[T]:
         """Finds the nearest knowledge base items to the given vector.
 
         Args:
             embedding: The vector to search for.
             limit: The maximum number of results to return.
+            distance_threshold: The maximum cosine distance of returned items.
         Returns:
             An iterator of the nearest items.
         """
-        try:
-            self._log
-            from sentence_transformers.util import cos_sim
-
-            self._log.warning("Embedding search is not optimized for performance.")
-            self._log.warning("Consider using a vector database for production.")
-
-            limit = limit or self.embedding_search_limit
-            ret: List[Tuple[T, float]] = []
-            for item in self.get_all():
-                em = getattr(item, self.embedding_field_name)
-                if em:
-                    similarity = cos_sim(embedding, em)
-                    ret.append((item, similarity.item()))
-            ret.sort(key=lambda x: x[1], reverse=True)
-            for item in ret[:limit]:
-                yield item[0]
-        except ImportError:
-            self._log.error("The package `sentence_transformers` is not installed ")
-            self._log.error("Try: pip install ampf[huggingface]")
+        for item, _ in self.find_nearest_with_distances(embedding, limit, distance_threshold):
+            yield item
+
+    def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
+        """Finds the nearest items with their cosine distances (`1 - cosine similarity`).
+
+        The default implementation scores all items keeping only `limit` best of them.
+
+        Args:
+            embedding: The vector to search for.
+            limit: The maximum number of results to return.
+            distance_threshold: The maximum cosine distance of returned items.
+        Returns:
+            Items and their distances (the nearest first).
+        """
+        nearest = NearestCollector(embedding, limit or self.embedding_search_limit, distance_threshold)
+        for item in self.get_all():
+            nearest.add(item, getattr(item, self.embedding_field_name, None))
+        return nearest.result()
 
     @abstractmethod
     def where(self, field: str, op: OP, value: Any) -> BaseQuery[T]:
@@ -5,7 +5,7 @@ from io import BytesIO
 from mimetypes import guess_file_type
 from pathlib import Path
 from tempfile import SpooledTemporaryFile
-from typing import Any, AsyncGenerator, BinaryIO, Generator, Optional, Self
+from typing import Any, AsyncGenerator, AsyncIterator, BinaryIO, Generator, Optional, Self
 from urllib.parse import quote, unquote
 from uuid import uuid4
 
@@ -119,8 +119,17 @@ class BlobError(ValueError):
         super().__init__("Provide either 'data' or 'content', but not both")
 
 
+class BlobStreamError(ValueError):
+    def __init__(self):
+        super().__init__("Blob data is an async stream, use 'await blob.read()' or 'blob.stream()'")
+
+
 class Blob[T: BaseBlobMetadata]:
-    """Blob, containing data and metadata. Data can be a file-like object or bytes. Metadata is optional."""
+    """Blob, containing data and metadata. Data can be a file-like object or bytes. Metadata is optional.
+
+    Data can also be an async stream of bytes (`async_data`, e.g. a download which is not
+    buffered). Such a blob can be read only once - with `stream()` or `read()`.
+    """
 
     def __init__(
         self,
@@ -129,6 +138,8 @@ class Blob[T: BaseBlobMetadata]:
         content: Optional[bytes | str] = None,
         content_type: Optional[str] = None,
         metadata: T = empty_blob_metadata,
+        async_data: Optional[AsyncIterator[bytes]] = None,
+        size: Optional[int] = None,
     ):
         self.name = name
         if metadata == empty_blob_metadata:
@@ -143,9 +154,9 @@ class Blob[T: BaseBlobMetadata]:
         self._content: Optional[bytes] = None
         if content:
             self._content = content.encode() if isinstance(content, str) else content
-        if not data and not content:
-            raise BlobError()
-        if data and content:
+        self._async_data = async_data
+        self._size = size
+        if sum(1 for source in (data, content, async_data) if source) != 1:
             raise BlobError()
 
     @property
@@ -187,6 +198,8 @@ class Blob[T: BaseBlobMetadata]:
     def content(self) -> bytes:
         if self._content:
             return self._content
+        elif self._async_data is not None:
+            raise BlobStreamError()
         else:
             with self.data() as data:
                 self._content = data.read()
@@ -200,12 +213,31 @@ class Blob[T: BaseBlobMetadata]:
         else:
             self._content = v.encode() if isinstance(v, str) else v
 
+    @property
+    def size(self) -> Optional[int]:
+        """Size of the blob in bytes (`None` if data is not seekable) - data are not read."""
+        if self._content is not None:
+            return len(self._content)
+        if self._async_data is not None:
+            return self._size
+        if self._data is not None and self._data.seekable():
+            position = self._data.tell()
+            size = self._data.seek(0, 2)
+            self._data.seek(position)
+            return size
+        return None
+
     async def stream(self, chunk_size=1024 * 1024) -> AsyncGenerator[bytes]:
         if self._content:
             # If content is already loaded in memory, yield chunks from it
             for i in range(0, len(self._content), chunk_size):
                 yield self._content[i : i + chunk_size]
             return
+        elif self._async_data is not None:
+            # The stream can be consumed only once
+            async_data, self._async_data = self._async_data, None
+            async for chunk in async_data:
+                yield chunk
         else:
             with self.data() as data:
                 while True:
@@ -216,6 +248,20 @@ class Blob[T: BaseBlobMetadata]:
                     yield chunk
 
 
+    async def read(self) -> bytes:
+        """Returns the content, reading the async stream (if any) into memory."""
+        if self._async_data is not None:
+            self._content = b"".join([chunk async for chunk in self.stream()])
+            return self._content
+        return self.content
+
+    async def aclose(self) -> None:
+        """Closes the async stream which is not going to be read (releases the connection)."""
+        async_data, self._async_data = self._async_data, None
+        if async_data is not None and hasattr(async_data, "aclose"):
+            await async_data.aclose()  # type: ignore
+
+
 class BlobHeader[T: BaseBlobMetadata](BaseModel):
     """Header for a blob, containing metadata."""
 
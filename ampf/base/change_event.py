@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+type ChangeType = Literal["added", "modified", "removed"]
+
+
+@dataclass
+class ChangeEvent[T: BaseModel]:
+    """Single change of a storage item reported by `watch()`"""
+
+    type: ChangeType
+    key: str
+    value: Optional[T] = None
+    """New value (`None` for removed items)"""
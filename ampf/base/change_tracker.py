@@ -0,0 +1,116 @@
+"""Tracking of changed fields of items read from a storage"""
+
+from __future__ import annotations
+
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+@dataclass
+class FieldChanges:
+    """Top level fields changed since the item was read (or written)"""
+
+    updated: Dict[str, Any] = field(default_factory=dict)
+    """New values of added or modified fields"""
+    removed: List[str] = field(default_factory=list)
+    """Names of removed fields (e.g. set to `None`)"""
+
+    def __bool__(self) -> bool:
+        return bool(self.updated or self.removed)
+
+
+class ChangeTracker:
+    """Remembers fingerprints of top level fields of items returned by a storage,
+    so the storage can write only changed fields (or skip the write at all).
+
+    Items are tracked by identity as long as they exist (weak references),
+    fingerprints are hashes of JSON serialized field values. A snapshot is valid
+    only while the item is stored, so the storage forgets snapshots of deleted keys
+    (`forget_keys()`, `clear()`).
+    """
+
+    def __init__(self):
+        self._snapshots: Dict[int, Tuple[weakref.ref, str, Dict[str, int]]] = {}
+        self._keys: Dict[str, Set[int]] = {}
+
+    @staticmethod
+    def fingerprints(data: Dict[str, Any]) -> Dict[str, int]:
+        """Returns fingerprints of fields of the stored item."""
+        return {name: hash(to_json(value)) for name, value in data.items()}
+
+    def track(self, value: BaseModel, key: str, data: Dict[str, Any]) -> None:
+        """Remembers the stored state of the item.
+
+        Args:
+            value: The item.
+            key: Key of the item.
+            data: Stored representation of the item (`to_storage()`).
+        """
+        ident = id(value)
+        entry = self._snapshots.get(ident)
+        if entry and entry[0]() is value:
+            ref = entry[0]
+            self._unindex(ident, entry[1])
+        else:
+            ref = weakref.ref(value, lambda _: self._forget(ident))
+        self._snapshots[ident] = (ref, key, self.fingerprints(data))
+        self._keys.setdefault(key, set()).add(ident)
+
+    def changes(self, value: BaseModel, key: str, data: Dict[str, Any]) -> Optional[FieldChanges]:
+        """Returns fields changed since the item was tracked.
+
+        Args:
+            value: The item.
+            key: Key of the item.
+            data: Stored representation of the item (`to_storage()`).
+        Returns:
+            Changed fields or `None` if the item isn't tracked (with this key).
+        """
+        entry = self._snapshots.get(id(value))
+        if entry is None or entry[0]() is not value or entry[1] != key:
+            return None
+        previous = entry[2]
+        ret = FieldChanges()
+        for name, value_fingerprint in self.fingerprints(data).items():
+            if previous.get(name) != value_fingerprint:
+                ret.updated[name] = data[name]
+        ret.removed = [name for name in previous if name not in data]
+        return ret
+
+    def forget(self, value: BaseModel) -> None:
+        """Stops tracking the item."""
+        entry = self._snapshots.get(id(value))
+        if entry and entry[0]() is value:
+            del self._snapshots[id(value)]
+            self._unindex(id(value), entry[1])
+
+    def forget_keys(self, keys: Iterable[str]) -> None:
+        """Stops tracking items with the keys (e.g. they were deleted)."""
+        for key in keys:
+            for ident in self._keys.pop(key, ()):
+                self._snapshots.pop(ident, None)
+
+    def clear(self) -> None:
+        """Stops tracking all items (e.g. the collection was dropped)."""
+        self._snapshots.clear()
+        self._keys.clear()
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def _forget(self, ident: int) -> None:
+        entry = self._snapshots.get(ident)
+        if entry and entry[0]() is None:
+            del self._snapshots[ident]
+            self._unindex(ident, entry[1])
+
+    def _unindex(self, ident: int, key: str) -> None:
+        idents = self._keys.get(key)
+        if idents is not None:
+            idents.discard(ident)
+            if not idents:
+                del self._keys[key]
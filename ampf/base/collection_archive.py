@@ -0,0 +1,263 @@
+"""Streaming export / import of a collection tree (with subcollections) to / from an archive"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+from collections.abc import Coroutine
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from .base_async_collection_storage import BaseAsyncCollectionStorage
+from .base_async_factory import BaseAsyncFactory
+from .base_async_storage import migrate_legacy_on_read
+from .collection_def import CollectionDef
+
+_log = logging.getLogger(__name__)
+
+type ArchiveFormat = Literal["jsonl", "msgpack"]
+
+MANIFEST_FILE = "manifest.json"
+
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+class ArchivePartition(BaseModel):
+    """One file of an archive"""
+
+    file_name: str
+    records: int = 0
+
+
+class ArchiveManifest(BaseModel):
+    """Description of an archive (`manifest.json`)"""
+
+    version: int = 1
+    format: ArchiveFormat = "jsonl"
+    collection_name: str
+    created_at: datetime
+    records: int = 0
+    partitions: List[ArchivePartition] = []
+
+
+type _Path = List[Tuple[str, str]]
+"""Path to a subcollection: list of (parent key, subcollection name)"""
+
+
+async def export_collection(
+    factory: BaseAsyncFactory,
+    definition: CollectionDef | str | Any,
+    sink: str | os.PathLike,
+    format: ArchiveFormat = "jsonl",
+    partition_size: int = 100_000,
+    compresslevel: int = 6,
+) -> ArchiveManifest:
+    """Exports all items of the collection and its subcollections to an archive.
+
+    The archive is a folder with `manifest.json` and gzipped partition files
+    (`part-00000.jsonl.gz`, ...) with at most `partition_size` records each.
+    Items are streamed, so memory usage doesn't depend on the collection size.
+
+    Args:
+        factory: Source factory.
+        definition: Collection definition (or name / class of a registered collection).
+        sink: Folder of the archive (created if it doesn't exist).
+        format: `jsonl` or `msgpack` (`msgpack` package is required).
+        partition_size: Maximum number of records in one partition file.
+        compresslevel: Gzip compression level (1 - fastest, 9 - smallest).
+    Returns:
+        Manifest of the archive.
+    """
+    collection = _get_collection(factory, definition)
+    folder = Path(sink)
+    folder.mkdir(parents=True, exist_ok=True)
+    manifest = ArchiveManifest(
+        format=format, collection_name=collection.collection_name, created_at=datetime.now(timezone.utc)
+    )
+    writer = _ArchiveWriter(folder, manifest, partition_size, compresslevel)
+    # Export doesn't modify the source collection
+    token = migrate_legacy_on_read.set(False)
+    try:
+        await _export_tree(collection, [], writer)
+    finally:
+        migrate_legacy_on_read.reset(token)
+        await writer.close()
+    (folder / MANIFEST_FILE).write_text(manifest.model_dump_json(indent=2))
+    _log.info("Exported %d records of %s to %s", manifest.records, manifest.collection_name, folder)
+    return manifest
+
+
+async def import_collection(
+    factory: BaseAsyncFactory,
+    definition: CollectionDef | str | Any,
+    source: str | os.PathLike,
+    partitions: Optional[List[int]] = None,
+    concurrency: int = 4,
+    batch_size: int = 500,
+) -> int:
+    """Imports items exported by `export_collection()`.
+
+    Items are written in batches (`put_many()`). Partitions are loaded in parallel
+    (at most `concurrency` at once), they can be also split between processes
+    or machines with `partitions` argument.
+
+    Args:
+        factory: Target factory.
+        definition: Collection definition (or name / class of a registered collection).
+        source: Folder of the archive.
+        partitions: Indexes of partitions to load (default - all).
+        concurrency: Maximum number of partitions loaded at once.
+        batch_size: Maximum number of items written in one batch.
+    Returns:
+        Number of imported items.
+    """
+    collection = _get_collection(factory, definition)
+    folder = Path(source)
+    manifest = ArchiveManifest.model_validate_json((folder / MANIFEST_FILE).read_text())
+    selected = [manifest.partitions[i] for i in partitions] if partitions is not None else manifest.partitions
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def load(partition: ArchivePartition) -> int:
+        async with semaphore:
+            return await _import_partition(collection, folder / partition.file_name, manifest.format, batch_size)
+
+    token = migrate_legacy_on_read.set(False)
+    try:
+        counts = await asyncio.gather(*(load(p) for p in selected))
+    finally:
+        migrate_legacy_on_read.reset(token)
+    imported = sum(counts)
+    _log.info("Imported %d records of %s from %s", imported, manifest.collection_name, folder)
+    return imported
+
+
+def _get_collection(factory: BaseAsyncFactory, definition: CollectionDef | str | Any) -> BaseAsyncCollectionStorage:
+    if isinstance(definition, CollectionDef):
+        return factory.create_collection(definition)
+    return factory.get_collection(definition)
+
+
+async def _export_tree(collection: BaseAsyncCollectionStorage, path: _Path, writer: _ArchiveWriter) -> None:
+    async for item in collection.get_all():
+        data = collection.to_storage(item)
+        if isinstance(data, Coroutine):
+            data = await data
+        await writer.write(path, data)
+        if collection.subcollections:
+            key = collection.get_key(item)
+            for name in collection.subcollections:
+                await _export_tree(collection.get_collection(key, name), path + [(key, name)], writer)
+
+
+async def _import_partition(
+    collection: BaseAsyncCollectionStorage, file_path: Path, format: ArchiveFormat, batch_size: int
+) -> int:
+    imported = 0
+    with gzip.open(file_path, "rb") as f:
+        records = _read_records(f, format)
+        while True:
+            batch = await asyncio.to_thread(_next_batch, records, batch_size)
+            if not batch:
+                break
+            groups: Dict[str, Tuple[_Path, List[Dict[str, Any]]]] = {}
+            for path, data in batch:
+                groups.setdefault(json.dumps(path), (path, []))[1].append(data)
+            for path, values in groups.values():
+                target = collection
+                for key, name in path:
+                    target = target.get_collection(key, name)
+                items = []
+                for data in values:
+                    item = target.from_storage(data)
+                    if isinstance(item, Coroutine):
+                        item = await item
+                    items.append(item)
+                await target.put_many(items)
+                imported += len(items)
+    return imported
+
+
+def _read_records(f: IO[bytes], format: ArchiveFormat) -> Iterator[Tuple[_Path, Dict[str, Any]]]:
+    if format == "msgpack":
+        for record in _msgpack().Unpacker(f, raw=False):
+            yield [tuple(p) for p in record["p"]], record["v"]
+    else:
+        for line in f:
+            record = json.loads(line)
+            yield [tuple(p) for p in record["p"]], record["v"]
+
+
+def _next_batch(records: Iterator[Tuple[_Path, Dict[str, Any]]], batch_size: int) -> List[Tuple[_Path, Dict[str, Any]]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            break
+    return batch
+
+
+def _msgpack() -> Any:
+    try:
+        import msgpack
+
+        return msgpack
+    except ImportError:
+        _log.error("The package `msgpack` is not installed")
+        _log.error("Try: pip install ampf[msgpack]")
+        raise
+
+
+class _ArchiveWriter:
+    """Writes records to gzipped partition files (the file is written in a thread)"""
+
+    def __init__(self, folder: Path, manifest: ArchiveManifest, partition_size: int, compresslevel: int):
+        self.folder = folder
+        self.manifest = manifest
+        self.partition_size = partition_size
+        self.compresslevel = compresslevel
+        self._file: Optional[gzip.GzipFile] = None
+        self._buffer: List[bytes] = []
+        self._buffer_size = 0
+        self._packer = _msgpack().Packer() if manifest.format == "msgpack" else None
+
+    async def write(self, path: _Path, data: Dict[str, Any]) -> None:
+        if self._file is None or self.manifest.partitions[-1].records >= self.partition_size:
+            await self._next_partition()
+        if self._packer:
+            # Values are converted to JSON compatible ones (datetime, UUID, ...)
+            record = self._packer.pack({"p": path, "v": json.loads(to_json(data))})
+        else:
+            record = b'{"p":' + to_json(path) + b',"v":' + to_json(data) + b"}\n"
+        self._buffer.append(record)
+        self._buffer_size += len(record)
+        self.manifest.partitions[-1].records += 1
+        self.manifest.records += 1
+        if self._buffer_size >= _WRITE_BUFFER_SIZE:
+            await self._flush()
+
+    async def close(self) -> None:
+        if self._file:
+            await self._flush()
+            await asyncio.to_thread(self._file.close)
+            self._file = None
+
+    async def _next_partition(self) -> None:
+        await self.close()
+        ext = "msgpack" if self.manifest.format == "msgpack" else "jsonl"
+        partition = ArchivePartition(file_name=f"part-{len(self.manifest.partitions):05d}.{ext}.gz")
+        self.manifest.partitions.append(partition)
+        self._file = gzip.open(self.folder / partition.file_name, "wb", compresslevel=self.compresslevel)
+
+    async def _flush(self) -> None:
+        if self._buffer and self._file:
+            data = b"".join(self._buffer)
+            self._buffer = []
+            self._buffer_size = 0
+            await asyncio.to_thread(self._file.write, data)
@@ -12,3 +12,5 @@ class CollectionDef[T: BaseModel]:
     clazz: Type[T] | Any
     key: str | Callable[[T], str] | None = None
     subcollections: list["CollectionDef"] = field(default_factory=list)
+    ttl_field: str | None = None
+    """Name of the field with expiration time of items (see `TtlAsyncStorage`)"""
@@ -0,0 +1,218 @@
+"""Background migration of versioned data (`VersionedBaseModel`)"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, List, Optional, Set
+
+from pydantic import BaseModel, computed_field
+
+from .base_async_collection_storage import BaseAsyncCollectionStorage
+from .base_async_storage import BaseAsyncStorage, migrate_legacy_on_read
+from .exceptions import KeyNotExistsException
+from .versioned_base_model import VersionedBaseModel
+
+
+class MigrationCheckpoint(BaseModel):
+    """Progress of the migration of one collection"""
+
+    id: str
+    collection_name: str
+    last_key: Optional[str] = None
+    """All items up to this key (in scan order) are migrated"""
+    scanned: int = 0
+    migrated: int = 0
+    finished: bool = False
+
+
+class MigrationReport(BaseModel):
+    """Result of the migration of one collection"""
+
+    collection_name: str
+    scanned: int = 0
+    """Scanned items (including items scanned before the resumed checkpoint)"""
+    migrated: int = 0
+    """Migrated items (including items migrated before the resumed checkpoint)"""
+    run_scanned: int = 0
+    """Items scanned by the (last) run"""
+    run_migrated: int = 0
+    """Items migrated by the (last) run"""
+    elapsed: float = 0.0
+    """Time of the (last) run in seconds"""
+    resumed: bool = False
+
+    @computed_field
+    @property
+    def throughput(self) -> float:
+        """Items scanned by the (last) run per second"""
+        return self.run_scanned / self.elapsed if self.elapsed else 0.0
+
+
+class MigrationRunner:
+    """Migrates all legacy items (`v` < `CURRENT_VERSION`) of a collection or a collection tree.
+
+    Items are scanned with `get_all()` and upgraded ones are written in batches
+    (`put_many()`), at most `concurrency` batches at once. Migration on read
+    (`StorageFormatFlags.migrate_legacy_on_read`) is switched off during the scan.
+    Progress is stored in `checkpoint_storage` every `checkpoint_every` batches,
+    so a broken migration is resumed after the last checkpoint.
+
+    Data must be saved in the new format (`StorageFormatFlags.save_new_format`).
+
+    Args:
+        checkpoint_storage: Storage for checkpoints (`None` - migration is not resumable).
+        batch_size: Number of items written in one batch.
+        concurrency: Maximum number of batches written at once.
+        checkpoint_every: Number of batches between checkpoints.
+    """
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        checkpoint_storage: Optional[BaseAsyncStorage[MigrationCheckpoint]] = None,
+        batch_size: int = 100,
+        concurrency: int = 4,
+        checkpoint_every: int = 10,
+    ):
+        self.checkpoint_storage = checkpoint_storage
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.checkpoint_every = checkpoint_every
+
+    async def run(self, storage: BaseAsyncStorage[Any] | BaseAsyncCollectionStorage[Any]) -> MigrationReport:
+        """Migrates all legacy items of the storage.
+
+        Args:
+            storage: Migrated storage.
+        Returns:
+            Migration report.
+        """
+        checkpoint = await self._load_checkpoint(storage.collection_name)
+        report = MigrationReport(
+            collection_name=storage.collection_name,
+            scanned=checkpoint.scanned,
+            migrated=checkpoint.migrated,
+            resumed=checkpoint.last_key is not None,
+        )
+        start = time.monotonic()
+        token = migrate_legacy_on_read.set(False)
+        try:
+            if not await self._scan(storage, checkpoint, report):
+                self._log.warning("Checkpoint of %s not found - starting from scratch", storage.collection_name)
+                checkpoint.last_key = None
+                report.scanned = report.migrated = 0
+                report.resumed = False
+                await self._scan(storage, checkpoint, report)
+        finally:
+            migrate_legacy_on_read.reset(token)
+        checkpoint.finished = True
+        await self._save_checkpoint(checkpoint, report)
+        report.elapsed = time.monotonic() - start
+        self._log.info(
+            "Migrated %s: %d of %d items (%.1f items/s)",
+            report.collection_name,
+            report.migrated,
+            report.scanned,
+            report.throughput,
+        )
+        return report
+
+    async def run_tree(self, collection: BaseAsyncCollectionStorage[Any]) -> List[MigrationReport]:
+        """Migrates all legacy items of the collection and all its subcollections.
+
+        Args:
+            collection: Root collection (e.g. created by `factory.create_collection()`).
+        Returns:
+            Migration reports of all migrated collections.
+        """
+        reports = [await self.run(collection)]
+        if collection.subcollections:
+            async for key in collection.keys():
+                for subcollection_name in collection.subcollections:
+                    reports.extend(await self.run_tree(collection.get_collection(key, subcollection_name)))
+        return reports
+
+    async def _scan(self, storage: Any, checkpoint: MigrationCheckpoint, report: MigrationReport) -> bool:
+        """Scans the storage after the checkpoint. Returns `False` if the checkpoint was not found."""
+        skip_until = checkpoint.last_key
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending: Set[asyncio.Task] = set()
+        batch: List[VersionedBaseModel] = []
+        batches = 0
+        try:
+            async for item in storage.get_all():
+                key = storage.get_key(item)
+                if skip_until is not None:
+                    if key == skip_until:
+                        skip_until = None
+                    continue
+                report.scanned += 1
+                report.run_scanned += 1
+                if self._needs_migration(item):
+                    item.v = item.CURRENT_VERSION
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    await self._write(storage, batch, report, semaphore, pending)
+                    batch = []
+                    batches += 1
+                    if batches % self.checkpoint_every == 0:
+                        await self._drain(pending)
+                        checkpoint.last_key = key
+                        await self._save_checkpoint(checkpoint, report)
+            if batch:
+                await self._write(storage, batch, report, semaphore, pending)
+        finally:
+            await self._drain(pending)
+        return skip_until is None
+
+    def _needs_migration(self, item: Any) -> bool:
+        if not isinstance(item, VersionedBaseModel) or item.v >= item.CURRENT_VERSION:
+            return False
+        if not item.FORMAT_FLAGS.save_new_format:
+            raise ValueError(f"{item.__class__.__name__} is not saved in the new format (save_new_format)")
+        return True
+
+    async def _write(
+        self,
+        storage: Any,
+        batch: List[VersionedBaseModel],
+        report: MigrationReport,
+        semaphore: asyncio.Semaphore,
+        pending: Set[asyncio.Task],
+    ) -> None:
+        async def put_many():
+            try:
+                await storage.put_many(batch)
+                report.migrated += len(batch)
+                report.run_migrated += len(batch)
+            finally:
+                semaphore.release()
+
+        await semaphore.acquire()
+        task = asyncio.create_task(put_many())
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    async def _drain(self, pending: Set[asyncio.Task]) -> None:
+        if pending:
+            await asyncio.gather(*pending)
+
+    async def _load_checkpoint(self, collection_name: str) -> MigrationCheckpoint:
+        checkpoint_id = collection_name.replace("/", "|")
+        if self.checkpoint_storage:
+            try:
+                checkpoint = await self.checkpoint_storage.get(checkpoint_id)
+                if not checkpoint.finished:
+                    return checkpoint
+            except KeyNotExistsException:
+                pass
+        return MigrationCheckpoint(id=checkpoint_id, collection_name=collection_name)
+
+    async def _save_checkpoint(self, checkpoint: MigrationCheckpoint, report: MigrationReport) -> None:
+        checkpoint.scanned = report.scanned
+        checkpoint.migrated = report.migrated
+        if self.checkpoint_storage:
+            await self.checkpoint_storage.save(checkpoint)
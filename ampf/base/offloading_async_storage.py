@@ -0,0 +1,188 @@
+"""Storage decorator moving large fields to a blob storage"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import weakref
+from collections.abc import Coroutine
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+
+from .base_async_blob_storage import BaseAsyncBlobStorage
+from .base_async_storage import BaseAsyncStorage
+from .base_decorator import BaseDecorator
+from .blob_model import Blob, BlobLocation
+
+OFFLOADED = "$offloaded"
+"""Name of the property of a pointer to an offloaded field (`{"$offloaded": {"bucket": ..., "name": ...}}`)"""
+
+
+class OffloadingAsyncStorage[T: BaseModel](BaseDecorator[BaseAsyncStorage[T]]):
+    """Storage decorator which moves large fields (e.g. long texts or embeddings)
+    to a blob storage and keeps only a pointer (`BlobLocation`) in the stored item.
+
+    Fields which serialized value is longer than `threshold` bytes are uploaded
+    as JSON blobs named `{collection_name}/{key}/{field}`. On read they are
+    downloaded concurrently (eager mode) or left unloaded (`deferred=True`),
+    so scans which don't need them stay cheap. Deferred fields are not loaded on access:
+    they hold their default value until `rehydrate()` is called explicitly (see
+    `unloaded_fields()`), so only fields with a default value can be deferred.
+    Unloaded fields are kept offloaded when the item is written back.
+
+    The decorator plugs into `to_storage()` / `from_storage()` of the decorated storage,
+    so all its operations (including queries) handle offloaded fields.
+
+    Args:
+        decorated: Decorated storage.
+        blob_storage: Blob storage of offloaded fields.
+        threshold: Minimal size (in bytes of JSON) of an offloaded field.
+        fields: Names of fields which can be offloaded (default - all except the key).
+        deferred: Don't download offloaded fields on read, they are downloaded by `rehydrate()`.
+        concurrency: Maximum number of concurrent uploads / downloads of one item.
+    """
+
+    def __init__(
+        self,
+        decorated: BaseAsyncStorage[T],
+        blob_storage: BaseAsyncBlobStorage,
+        threshold: int = 256 * 1024,
+        fields: Optional[List[str]] = None,
+        deferred: bool = False,
+        concurrency: int = 8,
+    ):
+        super().__init__(decorated)
+        self.blob_storage = blob_storage
+        self.threshold = threshold
+        self.fields = set(fields) if fields is not None else None
+        self.deferred = deferred
+        self.bucket_name: Optional[str] = getattr(blob_storage, "bucket_name", None)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._unloaded: Dict[int, Tuple[weakref.ref, Dict[str, str]]] = {}
+        self._adapters: Dict[Tuple[type, str], TypeAdapter] = {}
+        self._to_storage = decorated.to_storage
+        self._from_storage = decorated.from_storage
+        decorated.to_storage = self._offload  # type: ignore
+        decorated.from_storage = self._load  # type: ignore
+
+    async def delete(self, key: Any) -> None:
+        await self.decorated.delete(key)
+        await self.blob_storage.delete_folder(self._folder(key))
+
+    async def delete_many(self, keys: List[Any]) -> None:
+        await self.decorated.delete_many(keys)
+        for key in keys:
+            await self.blob_storage.delete_folder(self._folder(key))
+
+    async def drop(self) -> None:
+        await self.decorated.drop()
+        await self.blob_storage.delete_folder(f"{self.decorated.collection_name}/")
+
+    def unloaded_fields(self, value: T) -> List[str]:
+        """Returns names of offloaded fields of the item which are not loaded yet (deferred mode)."""
+        return list(self._get_unloaded(value).keys())
+
+    async def rehydrate(self, value: T, fields: Optional[List[str]] = None) -> T:
+        """Downloads offloaded fields of the item read in deferred mode.
+
+        Args:
+            value: The item.
+            fields: Names of fields to download (default - all unloaded ones).
+        Returns:
+            The same item with downloaded fields.
+        """
+        unloaded = self._get_unloaded(value)
+        names = [name for name in unloaded if fields is None or name in fields]
+        contents = await asyncio.gather(*(self._download(unloaded[name]) for name in names))
+        for name, content in zip(names, contents):
+            setattr(value, name, self._adapter(type(value), name).validate_python(content))
+            del unloaded[name]
+        if not unloaded:
+            self._unloaded.pop(id(value), None)
+        return value
+
+    async def _offload(self, value: T) -> Dict[str, Any]:
+        data = self._to_storage(value)
+        if isinstance(data, Coroutine):
+            data = await data
+        data = dict(data)
+        key = self.decorated.get_key(value)
+        key_name = self.decorated.key if isinstance(self.decorated.key, str) else None
+        uploads = []
+        unloaded = self._get_unloaded(value)
+        for name, blob_name in list(unloaded.items()):
+            if getattr(value, name) != type(value).model_fields[name].get_default(call_default_factory=True):
+                # The field has been set in the meantime
+                del unloaded[name]
+                continue
+            # Not loaded field stays in the blob storage
+            data[name] = self._pointer(blob_name)
+        for name, field_value in data.items():
+            if name == key_name or (self.fields is not None and name not in self.fields):
+                continue
+            if isinstance(field_value, dict) and OFFLOADED in field_value:
+                continue
+            content = to_json(field_value)
+            if len(content) > self.threshold:
+                blob_name = f"{self._folder(key)}{name}"
+                uploads.append(self._upload(blob_name, content))
+                data[name] = self._pointer(blob_name)
+        await asyncio.gather(*uploads)
+        return data
+
+    async def _load(self, data: Dict[str, Any]) -> T:
+        pointers = {
+            name: BlobLocation.model_validate(value[OFFLOADED]).name
+            for name, value in data.items()
+            if isinstance(value, dict) and OFFLOADED in value
+        }
+        unloaded: Dict[str, str] = {}
+        if pointers:
+            data = dict(data)
+            if self.deferred:
+                model_fields = self.decorated.clazz.model_fields
+                for name in list(pointers):
+                    if name in model_fields and not model_fields[name].is_required():
+                        unloaded[name] = pointers.pop(name)
+                        del data[name]
+            names = list(pointers)
+            contents = await asyncio.gather(*(self._download(pointers[name]) for name in names))
+            data.update(zip(names, contents))
+        ret = self._from_storage(data)
+        if isinstance(ret, Coroutine):
+            ret = await ret
+        if unloaded:
+            ident = id(ret)
+            ref = weakref.ref(ret, lambda _: self._unloaded.pop(ident, None))
+            self._unloaded[ident] = (ref, unloaded)
+        return ret
+
+    async def _upload(self, name: str, content: bytes) -> None:
+        async with self._semaphore:
+            await self.blob_storage.upload_async(Blob(name=name, content=content, content_type="application/json"))
+
+    async def _download(self, name: str) -> Any:
+        async with self._semaphore:
+            blob = await self.blob_storage.download_async(name)
+            return json.loads(blob.content)
+
+    def _get_unloaded(self, value: T) -> Dict[str, str]:
+        entry = self._unloaded.get(id(value))
+        if entry is None or entry[0]() is not value:
+            return {}
+        return entry[1]
+
+    def _pointer(self, blob_name: str) -> Dict[str, Any]:
+        return {OFFLOADED: BlobLocation(bucket=self.bucket_name, name=blob_name).model_dump(exclude_none=True)}
+
+    def _folder(self, key: Any) -> str:
+        return f"{self.decorated.collection_name}/{key}/"
+
+    def _adapter(self, clazz: type, name: str) -> TypeAdapter:
+        adapter = self._adapters.get((clazz, name))
+        if adapter is None:
+            adapter = TypeAdapter(clazz.model_fields[name].annotation)  # type: ignore
+            self._adapters[(clazz, name)] = adapter
+        return adapter
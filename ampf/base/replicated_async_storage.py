@@ -0,0 +1,235 @@
+"""Read replica of an async storage kept in memory"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from pydantic import BaseModel
+
+from .base_async_query_storage import BaseAsyncQueryStorage
+from .base_async_storage import BaseAsyncStorage
+from .change_event import ChangeEvent
+from .exceptions import KeyExistsException, KeyNotExistsException
+
+
+class ReplicatedAsyncStorage[T: BaseModel](BaseAsyncQueryStorage[T]):
+    """Read replica of a storage kept in memory and synchronized by its `watch()` change feed.
+
+    It is intended for small collections which are read very often but change rarely
+    (configuration, feature flags, user roles). All items are loaded by `start()`,
+    then `get()`, `keys()`, `get_all()` and `where()` are served from memory and writes
+    are forwarded to the source storage. If the change feed disconnects, reads go
+    directly to the source storage until the replica reconnects and reloads.
+
+    Returned objects are shared with the replica and must not be modified.
+
+    Args:
+        source: Replicated storage (e.g. `GcpAsyncStorage`).
+        poll_interval: Passed to `source.watch()`.
+        reconnect_delay: Initial delay (in seconds) before reconnecting.
+        max_reconnect_delay: Maximum delay between reconnections (exponential backoff).
+    """
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        source: BaseAsyncStorage[T],
+        poll_interval: float = 1.0,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 60.0,
+    ):
+        super().__init__(
+            source.collection_name,
+            source.clazz,
+            source.key,
+            source.embedding_field_name,
+            source.embedding_search_limit,
+        )
+        self.source = source
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._items: Dict[str, T] = {}
+        self._live = False
+        self._consistent_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_live(self) -> bool:
+        """Is the replica synchronized (reads are served from memory)?"""
+        return self._live
+
+    @property
+    def staleness(self) -> float:
+        """Seconds since the replica was known to be consistent with the source.
+
+        It is `0` while the change feed is connected and `inf` before the first load.
+        """
+        if self._live:
+            return 0.0
+        if self._consistent_at is None:
+            return math.inf
+        return time.monotonic() - self._consistent_at
+
+    async def start(self) -> None:
+        """Loads the collection and starts following its changes.
+
+        It returns when the first load is finished (or failed - then the replica
+        reads from the source storage and keeps reconnecting in the background).
+        """
+        if self._task:
+            return
+        loaded = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._follow(loaded))
+        await loaded
+
+    async def stop(self) -> None:
+        """Stops following changes. Reads go to the source storage."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._disconnect()
+
+    async def __aenter__(self) -> ReplicatedAsyncStorage[T]:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def _follow(self, loaded: asyncio.Future) -> None:
+        delay = self.reconnect_delay
+        while True:
+            ready = asyncio.Event()
+            events = aiter(self.source.watch(self.poll_interval, ready))
+            next_event = asyncio.ensure_future(anext(events))
+            try:
+                # Load after the change feed is established, so no change is lost
+                await self._wait_ready(ready, next_event)
+                await self._load()
+                if not loaded.done():
+                    loaded.set_result(None)
+                delay = self.reconnect_delay
+                while True:
+                    self._apply(await next_event)
+                    next_event = asyncio.ensure_future(anext(events))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._log.warning("Replica of %s disconnected: %s", self.collection_name, e)
+            finally:
+                if not loaded.done():
+                    loaded.set_result(None)
+                self._disconnect()
+                next_event.cancel()
+                await asyncio.gather(next_event, return_exceptions=True)
+                await events.aclose()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    @staticmethod
+    async def _wait_ready(ready: asyncio.Event, next_event: asyncio.Future) -> None:
+        """Waits until the change feed is established (or fails)."""
+        ready_wait = asyncio.ensure_future(ready.wait())
+        try:
+            await asyncio.wait([ready_wait, next_event], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            ready_wait.cancel()
+        if not ready.is_set() and next_event.done():
+            # Raises the error of the change feed (an event is applied after loading)
+            next_event.result()
+
+    async def _load(self) -> None:
+        items: Dict[str, T] = {}
+        async for item in self.source.get_all():
+            items[self.get_key(item)] = item
+        self._items = items
+        self._live = True
+
+    def _apply(self, event: ChangeEvent[T]) -> None:
+        if event.type == "removed" or event.value is None:
+            self._items.pop(event.key, None)
+        else:
+            self._items[event.key] = event.value
+
+    def _disconnect(self) -> None:
+        if self._live:
+            self._consistent_at = time.monotonic()
+        self._live = False
+
+    async def put(self, key: Any, value: T) -> None:
+        await self.source.put(key, value)
+        if self._live:
+            self._items.pop(str(key), None)
+            self._items[self.get_key(value)] = value
+
+    async def get(self, key: Any) -> T:
+        if not self._live:
+            return await self.source.get(key)
+        try:
+            return self._items[str(key)]
+        except KeyError:
+            raise KeyNotExistsException(self.collection_name, self.clazz, key)
+
+    async def keys(self) -> AsyncIterator[str]:
+        if not self._live:
+            async for key in self.source.keys():
+                yield key
+            return
+        for key in list(self._items.keys()):
+            yield key
+
+    async def delete(self, key: Any) -> None:
+        await self.source.delete(key)
+        self._items.pop(str(key), None)
+
+    async def create(self, value: T) -> None:
+        key = self.get_key(value)
+        if self._live and key in self._items:
+            raise KeyExistsException
+        await self.source.create(value)
+        if self._live:
+            self._items[key] = value
+
+    async def patch(self, key: Any, patch_data: BaseModel | Dict[str, Any]) -> T:
+        ret = await self.source.patch(key, patch_data)
+        if self._live:
+            self._items.pop(str(key), None)
+            self._items[self.get_key(ret)] = ret
+        return ret
+
+    async def increment(self, key: Any, field: str, delta: int | float = 1) -> None:
+        await self.source.increment(key, field, delta)
+        if self._live:
+            self._items[str(key)] = await self.source.get(key)
+
+    async def drop(self) -> None:
+        await self.source.drop()
+        self._items.clear()
+
+    async def get_all(self, sort: Any = None) -> AsyncIterator[T]:
+        if not self._live:
+            async for item in self.source.get_all():
+                yield item
+            return
+        for item in list(self._items.values()):
+            yield item
+
+    async def key_exists(self, key: Any) -> bool:
+        if not self._live:
+            return await self.source.key_exists(key)
+        return str(key) in self._items
+
+    async def is_empty(self) -> bool:
+        if not self._live:
+            return await self.source.is_empty()
+        return not self._items
@@ -0,0 +1,74 @@
+"""Counter spreading writes over many shard items"""
+
+from __future__ import annotations
+
+import random
+from typing import List
+
+from pydantic import BaseModel
+
+from .base_async_storage import BaseAsyncStorage
+from .exceptions import KeyExistsException, KeyNotExistsException
+
+
+class CounterShard(BaseModel):
+    """One shard of a `ShardedCounter`"""
+
+    id: str
+    counter: str
+    value: int | float = 0
+
+
+class ShardedCounter:
+    """Counter which spreads increments over `num_shards` items (documents)
+    and sums them on read.
+
+    One Firestore document can be updated about once per second, so counters
+    updated more often (usage per API key, progress of a task, ...) should be
+    sharded. Each increment updates one randomly chosen shard (`increment()`
+    of the storage - Firestore `Increment` transform), a read gets all shards
+    in one `get_many()` call.
+
+    Args:
+        storage: Storage of shards (e.g. `factory.get_storage("counter_shards", CounterShard)`).
+        num_shards: Number of shards of each counter (it mustn't be decreased later).
+    """
+
+    def __init__(self, storage: BaseAsyncStorage[CounterShard], num_shards: int = 10):
+        if num_shards < 1:
+            raise ValueError("num_shards must be positive")
+        self.storage = storage
+        self.num_shards = num_shards
+
+    async def increment(self, name: str, delta: int | float = 1) -> None:
+        """Adds `delta` to the counter.
+
+        Args:
+            name: Name of the counter.
+            delta: Added amount (negative to decrement).
+        """
+        key = self._shard_key(name, random.randrange(self.num_shards))
+        try:
+            await self.storage.increment(key, "value", delta)
+        except KeyNotExistsException:
+            try:
+                await self.storage.create(CounterShard(id=key, counter=name, value=delta))
+            except KeyExistsException:
+                # Created by a concurrent call in the meantime
+                await self.storage.increment(key, "value", delta)
+
+    async def get(self, name: str) -> int | float:
+        """Returns the value of the counter (sum of all its shards, 0 if it doesn't exist)."""
+        shards = await self.storage.get_many(self._shard_keys(name))
+        return sum(shard.value for shard in shards.values())
+
+    async def reset(self, name: str) -> None:
+        """Deletes all shards of the counter."""
+        await self.storage.delete_many(self._shard_keys(name))
+
+    def _shard_keys(self, name: str) -> List[str]:
+        return [self._shard_key(name, shard) for shard in range(self.num_shards)]
+
+    @staticmethod
+    def _shard_key(name: str, shard: int) -> str:
+        return f"{name}-{shard}"
@@ -0,0 +1,59 @@
+"""Vector similarity without external dependencies"""
+
+import heapq
+import math
+from typing import List, Optional, Sequence, Tuple
+
+
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    """Returns cosine similarity of two vectors (0 if any of them is zero).
+
+    Args:
+        a: First vector.
+        b: Second vector (of the same length).
+    Returns:
+        Similarity from -1 to 1.
+    """
+    dot = math.sumprod(a, b)
+    norm = math.sqrt(math.sumprod(a, a) * math.sumprod(b, b))
+    return dot / norm if norm else 0.0
+
+
+class NearestCollector[I]:
+    """Keeps items nearest to the searched vector (cosine distance = 1 - similarity).
+
+    Only `limit` best items are kept (in a heap), so items can be streamed
+    without loading all of them into memory.
+
+    Args:
+        embedding: Searched vector.
+        limit: Maximal number of kept items.
+        distance_threshold: Maximal distance of kept items (`None` - no limit).
+    """
+
+    def __init__(self, embedding: Sequence[float], limit: int, distance_threshold: Optional[float] = None):
+        self.embedding = embedding
+        self.limit = limit
+        self.distance_threshold = distance_threshold
+        self._norm = math.sqrt(math.sumprod(embedding, embedding))
+        self._heap: List[Tuple[float, int, I]] = []
+        self._counter = 0
+
+    def add(self, item: I, vector: Optional[Sequence[float]]) -> None:
+        """Scores the item by its vector (items without vector are skipped)."""
+        if not vector or self.limit <= 0:
+            return
+        norm = self._norm * math.sqrt(math.sumprod(vector, vector))
+        distance = 1.0 - (math.sumprod(self.embedding, vector) / norm if norm else 0.0)
+        if self.distance_threshold is not None and distance > self.distance_threshold:
+            return
+        self._counter += 1
+        entry = (-distance, -self._counter, item)
+        if len(self._heap) < self.limit:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def result(self) -> List[Tuple[I, float]]:
+        """Returns kept items with their distances (the nearest first)."""
+        return [(item, -distance) for distance, _, item in sorted(self._heap, reverse=True)]
@@ -0,0 +1,188 @@
+"""Coalescing of concurrent identical reads (singleflight)"""
+
+from __future__ import annotations
+
+import asyncio
+from io import BytesIO
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .base_async_blob_storage import BaseAsyncBlobStorage
+from .base_async_storage import BaseAsyncStorage
+from .base_decorator import BaseDecorator
+from .blob_model import Blob
+
+
+class SingleFlight:
+    """Shares one in-flight call between concurrent callers with the same key.
+
+    The first caller starts the call, the others (arriving before it completes)
+    wait for its result. The result (or the exception) is passed to all of them
+    and then it is forgotten - nothing is cached after completion.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do[R](self, key: Hashable, func: Callable[[], Awaitable[R]]) -> R:
+        """Returns the result of `func()` shared with other concurrent callers with the same key.
+
+        Args:
+            key: Key of the call.
+            func: Function starting the call (it is called only if there is no call in flight).
+        Returns:
+            The result of the call.
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        # The call is shared - cancelling one caller mustn't cancel it
+        return await asyncio.shield(task)
+
+    def forget(self, key: Hashable) -> None:
+        """Next callers with the key start a new call (e.g. after the value is modified)."""
+        self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        """Returns number of calls in flight."""
+        return len(self._calls)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # The exception is retrieved even if all callers were cancelled
+            task.exception()
+
+
+class SingleFlightAsyncStorage[T: BaseModel](BaseDecorator[BaseAsyncStorage[T]]):
+    """Storage decorator coalescing concurrent `get()` calls for the same key.
+
+    All concurrent callers get the same object, so it shouldn't be modified in place.
+    Writes (`put()`, `delete()`, ...) make next reads start a new call.
+
+    Args:
+        decorated: Decorated storage.
+        single_flight: Shared in-flight calls (e.g. of the factory), a new one by default.
+        namespace: Prefix of keys in `single_flight`, unique for storages sharing it
+            (default - identity of the decorated storage).
+    """
+
+    def __init__(
+        self,
+        decorated: BaseAsyncStorage[T],
+        single_flight: Optional[SingleFlight] = None,
+        namespace: Optional[Hashable] = None,
+    ):
+        super().__init__(decorated)
+        self.single_flight = single_flight or SingleFlight()
+        self.namespace = namespace if namespace is not None else id(decorated)
+
+    async def get(self, key: Any) -> T:
+        return await self.single_flight.do(self._key(key), lambda: self.decorated.get(key))
+
+    async def put(self, key: Any, value: T) -> None:
+        self.single_flight.forget(self._key(key))
+        await self.decorated.put(key, value)
+
+    async def create(self, value: T) -> None:
+        self.single_flight.forget(self._key(self.decorated.get_key(value)))
+        await self.decorated.create(value)
+
+    async def save(self, value: T) -> None:
+        self.single_flight.forget(self._key(self.decorated.get_key(value)))
+        await self.decorated.save(value)
+
+    async def patch(self, key: Any, patch_data: BaseModel | Dict[str, Any]) -> T:
+        self.single_flight.forget(self._key(key))
+        return await self.decorated.patch(key, patch_data)
+
+    async def delete(self, key: Any) -> None:
+        self.single_flight.forget(self._key(key))
+        await self.decorated.delete(key)
+
+    async def increment(self, key: Any, field: str, delta: int | float = 1) -> None:
+        self.single_flight.forget(self._key(key))
+        await self.decorated.increment(key, field, delta)
+
+    async def put_many(self, values: List[T]) -> None:
+        for value in values:
+            self.single_flight.forget(self._key(self.decorated.get_key(value)))
+        await self.decorated.put_many(values)
+
+    async def delete_many(self, keys: List[Any]) -> None:
+        for key in keys:
+            self.single_flight.forget(self._key(key))
+        await self.decorated.delete_many(keys)
+
+    def _key(self, key: Any) -> Hashable:
+        return ("get", self.namespace, str(key))
+
+
+class SingleFlightAsyncBlobStorage[T: BaseModel](BaseDecorator[BaseAsyncBlobStorage]):
+    """Blob storage decorator coalescing concurrent `download_async()`
+    and `get_metadata()` calls for the same blob.
+
+    The content of a coalesced download is read into memory once and each caller
+    gets its own `Blob` (blobs backed by files or streams can't be shared).
+    Streamed downloads (`stream=True`) and `download_range()` are not coalesced.
+    Metadata returned by `get_metadata()` is shared, so it shouldn't be modified in place.
+    Writes (`upload_async()`, `put_metadata()`, `delete_async()`) make next reads start a new call.
+
+    Args:
+        decorated: Decorated blob storage.
+        single_flight: Shared in-flight calls (e.g. of the factory), a new one by default.
+        namespace: Prefix of keys in `single_flight`, unique for storages sharing it
+            (default - identity of the decorated storage).
+    """
+
+    def __init__(
+        self,
+        decorated: BaseAsyncBlobStorage,
+        single_flight: Optional[SingleFlight] = None,
+        namespace: Optional[Hashable] = None,
+    ):
+        super().__init__(decorated)
+        self.single_flight = single_flight or SingleFlight()
+        self.namespace = namespace if namespace is not None else id(decorated)
+
+    async def download_async(self, name: str, stream: bool = False) -> Blob:
+        if stream:
+            # A streamed blob can be read only once, so it can't be shared
+            return await self.decorated.download_async(name, stream=True)
+        blob_name, content, metadata = await self.single_flight.do(
+            ("download", self.namespace, name), lambda: self._download(name)
+        )
+        if not content:
+            return Blob(blob_name, data=BytesIO(content), metadata=metadata.model_copy())
+        return Blob(blob_name, content=content, metadata=metadata.model_copy())
+
+    async def download_range(self, name: str, start: int, end: Optional[int] = None, stream: bool = False) -> Blob:
+        # Ranges are not coalesced (they are rarely requested concurrently with the same bounds)
+        return await self.decorated.download_range(name, start, end, stream)
+
+    async def get_metadata(self, name: str) -> Any:
+        return await self.single_flight.do(("metadata", self.namespace, name), lambda: self.decorated.get_metadata(name))
+
+    async def upload_async(self, blob: Blob) -> None:
+        self._forget(blob.name)
+        await self.decorated.upload_async(blob)
+
+    async def put_metadata(self, name: str, metadata: Any) -> None:
+        self._forget(name)
+        await self.decorated.put_metadata(name, metadata)
+
+    async def delete_async(self, name: str) -> None:
+        self._forget(name)
+        await self.decorated.delete_async(name)
+
+    async def _download(self, name: str) -> Tuple[str, bytes, Any]:
+        blob = await self.decorated.download_async(name)
+        return blob.name, await blob.read(), blob.metadata
+
+    def _forget(self, name: str) -> None:
+        self.single_flight.forget(("download", self.namespace, name))
+        self.single_flight.forget(("metadata", self.namespace, name))
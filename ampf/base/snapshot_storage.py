@@ -0,0 +1,245 @@
+"""Read-only storage of a memory mapped snapshot of a collection"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Callable, Iterator, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from pydantic_core import from_json, to_json
+
+from .base_async_query_storage import BaseAsyncQueryStorage
+from .base_query_storage import BaseQueryStorage
+from .exceptions import KeyNotExistsException
+from .versioned_base_model import VersionedBaseModel
+
+_MAGIC = b"AMPFSNP1"
+_HEADER = struct.Struct("<8sQQQ")
+"""magic, number of items, offset of keys, offset of the index"""
+_HEADER_SIZE = 64
+_ENTRY = struct.Struct("<QIQI")
+"""offset and length of the key, offset and length of the item (JSON)"""
+
+
+class SnapshotWriter:
+    """Writes a snapshot file read by `SnapshotStorage`.
+
+    Layout: header, items (JSON), keys and a fixed size index entry per item
+    sorted by key. Items are streamed to the file, only keys are kept in memory.
+    The file is written to `{path}.tmp` and renamed on `close()`.
+
+    Args:
+        path: Path of the snapshot file.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        self._file: BinaryIO = open(self._tmp_path, "wb")
+        self._file.write(b"\0" * _HEADER_SIZE)
+        self._offset = _HEADER_SIZE
+        self._items: List[Tuple[bytes, int, int]] = []
+
+    def add(self, key: str, data: bytes) -> None:
+        """Adds an item.
+
+        Args:
+            key: Key of the item.
+            data: JSON of the item.
+        """
+        self._file.write(data)
+        self._items.append((key.encode(), self._offset, len(data)))
+        self._offset += len(data)
+
+    def add_item(self, key: str, value: BaseModel) -> None:
+        """Adds an item in the default storage format (`BaseStorage.to_storage()`)."""
+        if isinstance(value, VersionedBaseModel):
+            self.add(key, to_json(value.to_storage()))
+        else:
+            self.add(key, value.__pydantic_serializer__.to_json(value, by_alias=True, exclude_none=True))
+
+    @property
+    def count(self) -> int:
+        """Number of added items."""
+        return len(self._items)
+
+    def close(self) -> int:
+        """Writes keys and the index and renames the file.
+
+        Returns:
+            Number of items.
+        """
+        self._items.sort(key=lambda item: item[0])
+        keys_offset = self._offset
+        key_offset = keys_offset
+        entries = []
+        for key, offset, length in self._items:
+            self._file.write(key)
+            entries.append(_ENTRY.pack(key_offset, len(key), offset, length))
+            key_offset += len(key)
+        self._file.write(b"".join(entries))
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(_MAGIC, len(self._items), keys_offset, key_offset))
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        return len(self._items)
+
+    def __enter__(self) -> SnapshotWriter:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self._tmp_path)
+
+
+class SnapshotStorage[T: BaseModel](BaseQueryStorage[T]):
+    """Read-only storage of a snapshot written by `storage.snapshot(path)`.
+
+    The file is mapped into memory, so opening it doesn't read anything
+    and the page cache is shared by all processes using it. `get()` finds
+    the key by binary search in the index and only the returned items are decoded.
+
+    Args:
+        path: Path of the snapshot file.
+        clazz: Class of items.
+        key: Name of the key field or a function returning the key.
+        collection_name: Name of the collection (default - name of the file).
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        clazz: Type[T],
+        key: Optional[str | Callable[[T], str]] = None,
+        collection_name: Optional[str] = None,
+        embedding_field_name: str = "embedding",
+        embedding_search_limit: int = 5,
+    ):
+        self.path = Path(path)
+        super().__init__(collection_name or self.path.stem, clazz, key, embedding_field_name, embedding_search_limit)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, _, self._index_offset = _HEADER.unpack_from(self._mm)
+        if magic != _MAGIC:
+            self._mm.close()
+            raise ValueError(f"{self.path} is not a snapshot file")
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def get(self, key: Any) -> T:
+        row = self._find(str(key).encode())
+        if row is None:
+            raise KeyNotExistsException(self.collection_name, self.clazz, key)
+        return self._decode(row)
+
+    def keys(self) -> Iterator[str]:
+        for row in range(self._count):
+            key_offset, key_length, _, _ = self._entry(row)
+            yield self._mm[key_offset : key_offset + key_length].decode()
+
+    def get_all(self, sort: Any = None) -> Iterator[T]:
+        for row in range(self._count):
+            yield self._decode(row)
+
+    def key_exists(self, needle: Any) -> bool:
+        return self._find(str(needle).encode()) is not None
+
+    def is_empty(self) -> bool:
+        return self._count == 0
+
+    def count(self) -> int:
+        return self._count
+
+    def put(self, key: Any, value: T) -> None:
+        raise NotImplementedError("SnapshotStorage is read-only")
+
+    def delete(self, key: Any) -> None:
+        raise NotImplementedError("SnapshotStorage is read-only")
+
+    def drop(self) -> None:
+        raise NotImplementedError("SnapshotStorage is read-only")
+
+    def _find(self, key: bytes) -> Optional[int]:
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            key_offset, key_length, _, _ = self._entry(mid)
+            mid_key = self._mm[key_offset : key_offset + key_length]
+            if mid_key < key:
+                low = mid + 1
+            elif mid_key > key:
+                high = mid
+            else:
+                return mid
+        return None
+
+    def _entry(self, row: int) -> Tuple[int, int, int, int]:
+        return _ENTRY.unpack_from(self._mm, self._index_offset + row * _ENTRY.size)
+
+    def _decode(self, row: int) -> T:
+        _, _, offset, length = self._entry(row)
+        data = self._mm[offset : offset + length]
+        if issubclass(self.clazz, VersionedBaseModel):
+            return self.from_storage(from_json(data))
+        return self.clazz.model_validate_json(data)
+
+
+class SnapshotAsyncStorage[T: BaseModel](BaseAsyncQueryStorage[T]):
+    """Asynchronous interface of `SnapshotStorage` (reads don't do any I/O
+    if the file is in the page cache, so they are not delegated to threads).
+
+    Args:
+        path: Path of the snapshot file.
+        clazz: Class of items.
+        key: Name of the key field or a function returning the key.
+        collection_name: Name of the collection (default - name of the file).
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        clazz: Type[T],
+        key: Optional[str | Callable[[T], str]] = None,
+        collection_name: Optional[str] = None,
+        embedding_field_name: str = "embedding",
+        embedding_search_limit: int = 5,
+    ):
+        self.storage = SnapshotStorage(path, clazz, key, collection_name, embedding_field_name, embedding_search_limit)
+        super().__init__(self.storage.collection_name, clazz, key, embedding_field_name, embedding_search_limit)
+
+    def close(self) -> None:
+        self.storage.close()
+
+    async def get(self, key: Any) -> T:
+        return self.storage.get(key)
+
+    async def keys(self) -> AsyncIterator[str]:
+        for key in self.storage.keys():
+            yield key
+
+    async def get_all(self, sort: Any = None) -> AsyncIterator[T]:
+        for item in self.storage.get_all():
+            yield item
+
+    async def key_exists(self, key: Any) -> bool:
+        return self.storage.key_exists(key)
+
+    async def is_empty(self) -> bool:
+        return self.storage.is_empty()
+
+    async def put(self, key: Any, value: T) -> None:
+        self.storage.put(key, value)
+
+    async def delete(self, key: Any) -> None:
+        self.storage.delete(key)
+
+    async def drop(self) -> None:
+        self.storage.drop()
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+
+class StorageCache[V]:
+    """Bounded (LRU) cache of storage instances.
+
+    Storages are cheap to use but not always cheap to create (local storages create
+    folders, GCP storages build collection references), so factories and collection
+    storages keep already created instances here. When the cache is full the least
+    recently used instance is dropped.
+
+    Args:
+        maxsize: Maximum number of cached instances (`None` - unbounded).
+    """
+
+    def __init__(self, maxsize: Optional[int] = 1024):
+        self.maxsize = maxsize
+        self._items: OrderedDict[Hashable, V] = OrderedDict()
+
+    def get_or_create(self, key: Hashable, create: Callable[[], V]) -> V:
+        """Returns cached instance or creates (and caches) a new one.
+
+        Unhashable keys (e.g. annotated types with unhashable metadata) are not cached.
+
+        Args:
+            key: Cache key.
+            create: Function creating a new instance.
+        Returns:
+            Cached or created instance.
+        """
+        try:
+            value = self._items[key]
+        except KeyError:
+            value = create()
+            self.put(key, value)
+            return value
+        except TypeError:
+            return create()
+        self._items.move_to_end(key)
+        return value
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Returns cached instance (`None` if it is not cached)."""
+        try:
+            value = self._items.get(key)
+        except TypeError:
+            return None
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        """Stores the instance in the cache."""
+        try:
+            self._items[key] = value
+        except TypeError:
+            return
+        self._items.move_to_end(key)
+        if self.maxsize is not None and len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        """Removes the instance from the cache."""
+        try:
+            return self._items.pop(key, None)
+        except TypeError:
+            return None
+
+    def clear(self) -> None:
+        """Removes all instances from the cache."""
+        self._items.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        try:
+            return key in self._items
+        except TypeError:
+            return False
+
+    def __len__(self) -> int:
+        return len(self._items)
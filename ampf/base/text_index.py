@@ -0,0 +1,240 @@
+"""Tokenization and BM25 inverted index for keyword search"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+class Tokenizer:
+    """Splits texts into normalized terms.
+
+    Args:
+        lowercase: Convert terms to lower case.
+        strip_accents: Remove diacritics (`"zażółć"` -> `"zazołc"`).
+        stopwords: Terms which are skipped (after normalization).
+        min_length: Minimal length of a term.
+        pattern: Regular expression of a term.
+    """
+
+    def __init__(
+        self,
+        lowercase: bool = True,
+        strip_accents: bool = True,
+        stopwords: Iterable[str] = (),
+        min_length: int = 1,
+        pattern: str = r"\w+",
+    ):
+        self.lowercase = lowercase
+        self.strip_accents = strip_accents
+        self.stopwords = frozenset(stopwords)
+        self.min_length = min_length
+        self._pattern = re.compile(pattern)
+
+    def tokenize(self, text: Any) -> List[str]:
+        """Returns terms of the text (lists are joined, `None` has no terms)."""
+        if text is None:
+            return []
+        if isinstance(text, (list, tuple, set)):
+            text = " ".join(str(t) for t in text)
+        text = str(text)
+        if self.lowercase:
+            text = text.lower()
+        if self.strip_accents:
+            text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+        return [
+            term
+            for term in self._pattern.findall(text)
+            if len(term) >= self.min_length and term not in self.stopwords
+        ]
+
+
+DEFAULT_TOKENIZER = Tokenizer()
+
+
+def contains_text(value: Any, query: str, tokenizer: Tokenizer = DEFAULT_TOKENIZER) -> bool:
+    """Checks if the value contains all terms of the query (`"contains_text"` operator)."""
+    terms = set(tokenizer.tokenize(value))
+    return all(term in terms for term in tokenizer.tokenize(query))
+
+
+class InvertedIndex:
+    """Inverted index of texts (term -> keys) scored with BM25.
+
+    The index is maintained incrementally (`update()`, `remove()`). If `path` is set,
+    changes are appended to a journal file (JSON lines) which is replayed when
+    the index is created and rewritten when it gets much bigger than the index.
+
+    Args:
+        tokenizer: Tokenizer of texts and queries.
+        path: Journal file (`None` - the index is kept only in memory).
+        k1: BM25 term frequency saturation.
+        b: BM25 document length normalization.
+    """
+
+    def __init__(
+        self,
+        tokenizer: Optional[Tokenizer] = None,
+        path: Optional[Path] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        self.tokenizer = tokenizer or DEFAULT_TOKENIZER
+        self.path = Path(path) if path else None
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._documents: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._journal_lines = 0
+        if self.path and self.path.exists():
+            self._replay()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._documents
+
+    @property
+    def persisted(self) -> bool:
+        """The index was loaded from (non empty) journal."""
+        return self._journal_lines > 0
+
+    def update(self, key: str, text: Any) -> None:
+        """Indexes (or reindexes) the text of the key."""
+        terms = dict(Counter(self.tokenizer.tokenize(text)))
+        if self._documents.get(key) == terms:
+            return
+        self._set(key, terms)
+        self._journal({"key": key, "terms": terms})
+
+    def remove(self, key: str) -> None:
+        if key in self._documents:
+            self._set(key, None)
+            self._journal({"key": key})
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._documents.clear()
+        self._lengths.clear()
+        self._total_length = 0
+        if self.path:
+            self.path.unlink(missing_ok=True)
+        self._journal_lines = 0
+
+    def matches(self, query: str) -> Set[str]:
+        """Returns keys of texts which contain all terms of the query."""
+        terms = set(self.tokenizer.tokenize(query))
+        if not terms:
+            return set(self._documents)
+        postings = sorted((self._postings.get(term, {}) for term in terms), key=len)
+        ret = set(postings[0])
+        for posting in postings[1:]:
+            ret.intersection_update(posting)
+        return ret
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Returns keys of texts which contain any term of the query with BM25 scores.
+
+        Args:
+            query: Searched text.
+            limit: Maximal number of results (`None` - all).
+        Returns:
+            Keys and scores sorted by score (descending).
+        """
+        if not self._documents:
+            return []
+        count = len(self._documents)
+        average_length = self._total_length / count or 1.0
+        lengths = self._lengths
+        scores: Dict[str, float] = {}
+        for term in set(self.tokenizer.tokenize(query)):
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log((count - len(posting) + 0.5) / (len(posting) + 0.5) + 1)
+            for key, tf in posting.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * lengths[key] / average_length)
+                scores[key] = scores.get(key, 0.0) + idf * tf * (self.k1 + 1) / norm
+        ret = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ret[:limit] if limit is not None else ret
+
+    def compact(self) -> None:
+        """Rewrites the journal with the current state of the index."""
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, terms in self._documents.items():
+                f.write(json.dumps({"key": key, "terms": terms}, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._journal_lines = len(self._documents)
+
+    def _set(self, key: str, terms: Optional[Dict[str, int]]) -> None:
+        previous = self._documents.pop(key, None)
+        if previous is not None:
+            self._total_length -= self._lengths.pop(key)
+            for term in previous:
+                posting = self._postings[term]
+                del posting[key]
+                if not posting:
+                    del self._postings[term]
+        if terms is not None:
+            length = sum(terms.values())
+            self._documents[key] = terms
+            self._lengths[key] = length
+            self._total_length += length
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[key] = tf
+
+    def _journal(self, entry: Dict[str, Any]) -> None:
+        if not self.path:
+            return
+        if self._journal_lines > 2 * len(self._documents) + 1000:
+            self.compact()
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._journal_lines += 1
+
+    def _replay(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:  # type: ignore
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._set(entry["key"], entry.get("terms"))
+                self._journal_lines += 1
+
+
+def fuse_scores(
+    text_scores: Iterable[Tuple[str, float]],
+    vector_scores: Iterable[Tuple[str, float]],
+    alpha: float = 0.5,
+) -> List[Tuple[str, float]]:
+    """Combines text (BM25) and vector (similarity) scores of keys.
+
+    Both kinds of scores are divided by their maximum and summed with weights
+    `alpha` (text) and `1 - alpha` (vector). A key missing in one of them gets 0 for it.
+
+    Returns:
+        Keys and combined scores sorted by score (descending).
+    """
+    ret: Dict[str, float] = {}
+    for weight, scores in ((alpha, dict(text_scores)), (1 - alpha, dict(vector_scores))):
+        if not scores or not weight:
+            continue
+        high = max(scores.values())
+        for key, score in scores.items():
+            ret[key] = ret.get(key, 0.0) + (weight * score / high if high > 0 else 0.0)
+    return sorted(ret.items(), key=lambda item: item[1], reverse=True)
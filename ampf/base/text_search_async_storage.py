@@ -0,0 +1,243 @@
+"""Storage decorator which keeps full-text indexes of text fields"""
+
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .base_async_query import BaseAsyncQuery
+from .base_async_query_storage import BaseAsyncQueryStorage
+from .base_async_storage import BaseAsyncStorage
+from .base_query import OP
+from .similarity import cosine_similarity
+from .text_index import InvertedIndex, Tokenizer, fuse_scores
+
+
+class TextSearchAsyncStorage[T: BaseModel](BaseAsyncQueryStorage[T]):
+    """Storage decorator which keeps full-text (BM25) indexes of text fields.
+
+    Indexes are built from all items on the first search and then they are
+    updated by writes, so all writes have to go through the decorator.
+    They are used by `text_search()`, `hybrid_search()` and by the `"contains_text"`
+    operator of `where()` on indexed fields.
+
+    Indexes of storages kept in a folder (e.g. `JsonMultiFilesAsyncStorage`)
+    are persisted next to it (`{folder}.text_index/{field}.jsonl`), so they
+    are not rebuilt when the application starts. Call `rebuild_index()` if
+    the storage was modified without the decorator.
+
+    Args:
+        decorated: Decorated storage.
+        fields: Names of indexed text fields (`str` or list of `str`).
+        tokenizer: Tokenizer of texts and queries.
+        index_path: Folder of persisted indexes (`None` - default for storages kept in a folder, otherwise in memory only).
+    """
+
+    def __init__(
+        self,
+        decorated: BaseAsyncStorage[T],
+        fields: str | List[str],
+        tokenizer: Optional[Tokenizer] = None,
+        index_path: Optional[str | Path] = None,
+    ):
+        super().__init__(
+            decorated.collection_name,
+            decorated.clazz,
+            decorated.key,
+            decorated.embedding_field_name,
+            decorated.embedding_search_limit,
+        )
+        self.decorated = decorated
+        self.fields = [fields] if isinstance(fields, str) else list(fields)
+        if index_path is None and getattr(decorated, "folder_path", None) is not None:
+            folder_path = Path(decorated.folder_path)  # type: ignore
+            index_path = folder_path.with_name(f"{folder_path.name}.text_index")
+        self.index_path = Path(index_path) if index_path else None
+        self._indexes = {
+            field: InvertedIndex(tokenizer, self.index_path.joinpath(f"{field}.jsonl") if self.index_path else None)
+            for field in self.fields
+        }
+        self._built = all(index.persisted for index in self._indexes.values())
+        self._build_lock = asyncio.Lock()
+
+    async def put(self, key: Any, value: T) -> None:
+        await self.decorated.put(key, value)
+        # The item is stored under the key taken from the value
+        new_key = self.get_key(value)
+        self._index(new_key, value)
+        if str(key) != new_key:
+            self._unindex(str(key))
+
+    async def put_many(self, values: List[T]) -> None:
+        await self.decorated.put_many(values)
+        for value in values:
+            self._index(self.get_key(value), value)
+
+    async def get(self, key: Any) -> T:
+        return await self.decorated.get(key)
+
+    async def get_many(self, keys: List[Any]) -> Dict[str, T]:
+        return await self.decorated.get_many(keys)
+
+    async def keys(self) -> AsyncIterator[str]:
+        async for key in self.decorated.keys():
+            yield key
+
+    async def get_all(self, sort: Any = None) -> AsyncIterator[T]:
+        async for item in self.decorated.get_all():
+            yield item
+
+    async def key_exists(self, key: Any) -> bool:
+        return await self.decorated.key_exists(key)
+
+    async def is_empty(self) -> bool:
+        return await self.decorated.is_empty()
+
+    async def delete(self, key: Any) -> None:
+        await self.decorated.delete(key)
+        self._unindex(str(key))
+
+    async def delete_many(self, keys: List[Any]) -> None:
+        await self.decorated.delete_many(keys)
+        for key in keys:
+            self._unindex(str(key))
+
+    async def patch(self, key: Any, patch_data: BaseModel | Dict[str, Any]) -> T:
+        ret = await self.decorated.patch(key, patch_data)
+        self._index(str(key), ret)
+        return ret
+
+    async def increment(self, key: Any, field: str, delta: int | float = 1) -> None:
+        await self.decorated.increment(key, field, delta)
+
+    async def drop(self) -> None:
+        await self.decorated.drop()
+        for index in self._indexes.values():
+            index.clear()
+        self._built = True
+
+    def where(self, field: str, op: OP, value: Any) -> BaseAsyncQuery[T]:
+        if op == "contains_text" and field in self._indexes:
+
+            async def it() -> AsyncIterator[T]:
+                await self._ensure_index()
+                keys = sorted(self._indexes[field].matches(value))
+                for item in (await self.decorated.get_many(keys)).values():
+                    yield item
+
+            return BaseAsyncQuery(it, self.embedding_field_name, self.embedding_search_limit)
+        return self.decorated.where(field, op, value)
+
+    async def find_nearest(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> AsyncIterable[T]:
+        async for item in self.decorated.find_nearest(embedding, limit, distance_threshold):
+            yield item
+
+    async def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
+        return await self.decorated.find_nearest_with_distances(embedding, limit, distance_threshold)
+
+    async def text_search(self, field: str, query: str, limit: Optional[int] = None) -> AsyncIterator[T]:
+        """Finds items whose text field matches the query best (BM25).
+
+        Not indexed fields are searched by indexing all items on every call.
+
+        Args:
+            field: Name of a text field.
+            query: Searched text.
+            limit: The maximum number of results to return (`None` - all matching items).
+        Returns:
+            An iterator of items sorted by relevance.
+        """
+        if field not in self._indexes:
+            async for item in super().text_search(field, query, limit):
+                yield item
+            return
+        async for item, _ in self._found(await self.text_search_scores(field, query, limit)):
+            yield item
+
+    async def text_search_scores(self, field: str, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Returns keys of items matching the query with their BM25 scores (sorted by score)."""
+        await self._ensure_index()
+        return self._get_index(field).search(query, limit)
+
+    async def hybrid_search(
+        self,
+        field: str,
+        query: str,
+        embedding: List[float],
+        limit: Optional[int] = None,
+        alpha: float = 0.5,
+    ) -> AsyncIterator[T]:
+        """Finds items by both text (BM25) and vector (cosine) similarity.
+
+        Normalized scores are combined with weights `alpha` (text) and `1 - alpha` (vector),
+        see `fuse_scores()`. Vector similarity is calculated for all items with embedding.
+
+        Args:
+            field: Name of an indexed field.
+            query: Searched text.
+            embedding: Searched vector.
+            limit: The maximum number of results to return (default - `embedding_search_limit`).
+            alpha: Weight of text score (0 - only vector, 1 - only text).
+        Returns:
+            An iterator of items sorted by combined score.
+        """
+        text_scores = await self.text_search_scores(field, query)
+        items: Dict[str, T] = {}
+        vector_scores: List[Tuple[str, float]] = []
+        async for item in self.decorated.get_all():
+            key = self.get_key(item)
+            items[key] = item
+            em = getattr(item, self.embedding_field_name, None)
+            if em:
+                vector_scores.append((key, cosine_similarity(embedding, em)))
+        limit = limit or self.embedding_search_limit
+        for key, _ in fuse_scores(text_scores, vector_scores, alpha)[:limit]:
+            if key in items:
+                yield items[key]
+
+    async def rebuild_index(self) -> None:
+        """Indexes all items of the decorated storage again."""
+        for index in self._indexes.values():
+            index.clear()
+        async for item in self.decorated.get_all():
+            key = self.get_key(item)
+            for field, index in self._indexes.items():
+                index.update(key, getattr(item, field, None))
+        for index in self._indexes.values():
+            index.compact()
+        self._built = True
+
+    async def _ensure_index(self) -> None:
+        if self._built:
+            return
+        async with self._build_lock:
+            if not self._built:
+                await self.rebuild_index()
+
+    def _get_index(self, field: str) -> InvertedIndex:
+        if field not in self._indexes:
+            raise ValueError(f"Field {field} is not indexed")
+        return self._indexes[field]
+
+    async def _found(self, scores: List[Tuple[str, float]]) -> AsyncIterator[Tuple[T, float]]:
+        found = await self.decorated.get_many([key for key, _ in scores])
+        for key, score in scores:
+            if key in found:
+                yield found[key], score
+
+    def _index(self, key: str, value: T) -> None:
+        if self._built:
+            for field, index in self._indexes.items():
+                index.update(key, getattr(value, field, None))
+
+    def _unindex(self, key: str) -> None:
+        if self._built:
+            for index in self._indexes.values():
+                index.remove(key)
@@ -0,0 +1,219 @@
+"""Storage decorator which expires items"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .base_async_query import BaseAsyncQuery
+from .base_async_query_storage import BaseAsyncQueryStorage
+from .base_async_storage import BaseAsyncStorage
+from .base_query import OP
+from .exceptions import KeyNotExistsException
+
+
+class TtlAsyncQuery[T: BaseModel](BaseAsyncQuery[T]):
+    """Query which skips expired items"""
+
+    def __init__(self, decorated: BaseAsyncQuery[T], is_expired: Callable[[T], bool]):
+        super().__init__(self._not_expired, decorated.embedding_field_name, decorated.embedding_search_limit)
+        self.decorated = decorated
+        self.is_expired = is_expired
+
+    async def _not_expired(self) -> AsyncIterator[T]:
+        async for item in self.decorated.get_all():
+            if not self.is_expired(item):
+                yield item
+
+    def where(self, field: str, op: OP, value: Any) -> TtlAsyncQuery[T]:
+        return TtlAsyncQuery(self.decorated.where(field, op, value), self.is_expired)
+
+    async def find_nearest(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> AsyncIterable[T]:
+        async for item in self.decorated.find_nearest(embedding, limit, distance_threshold):
+            if not self.is_expired(item):
+                yield item
+
+    async def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
+        found = await self.decorated.find_nearest_with_distances(embedding, limit, distance_threshold)
+        return [(item, distance) for item, distance in found if not self.is_expired(item)]
+
+
+class TtlAsyncStorage[T: BaseModel](BaseAsyncQueryStorage[T]):
+    """Storage decorator which expires items.
+
+    The expiration time of an item is stored in its `ttl_field` (`datetime`,
+    naive values are treated as UTC, `None` - never expires). Expired items
+    are not returned by reads and they are deleted by `sweep()` which is also
+    run in background (at most once per `sweep_interval` seconds) when the
+    storage is used.
+
+    Storages which delete expired items themselves (`native_ttl`, e.g.
+    Firestore with TTL policy) are not swept - expired items are only
+    filtered out until they are deleted.
+
+    Args:
+        decorated: Decorated storage.
+        ttl_field: Name of the field with expiration time.
+        sweep_interval: Minimal time (in seconds) between background sweeps (`None` - no background sweeps).
+        sweep_batch_size: Number of items deleted in one batch.
+    """
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        decorated: BaseAsyncStorage[T],
+        ttl_field: str,
+        sweep_interval: Optional[float] = 60.0,
+        sweep_batch_size: int = 100,
+    ):
+        super().__init__(
+            decorated.collection_name,
+            decorated.clazz,
+            decorated.key,
+            decorated.embedding_field_name,
+            decorated.embedding_search_limit,
+        )
+        self.decorated = decorated
+        self.ttl_field = ttl_field
+        self.sweep_interval = sweep_interval
+        self.sweep_batch_size = sweep_batch_size
+        self._last_sweep: Optional[float] = None
+        self._sweep_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+
+    def is_expired(self, value: T) -> bool:
+        """Is the item expired?"""
+        exp = getattr(value, self.ttl_field, None)
+        if exp is None:
+            return False
+        if exp.tzinfo is None:
+            exp = exp.replace(tzinfo=timezone.utc)
+        return exp <= datetime.now(timezone.utc)
+
+    async def put(self, key: Any, value: T) -> None:
+        self._schedule_sweep()
+        async with self._write_lock:
+            await self.decorated.put(key, value)
+
+    async def get(self, key: Any) -> T:
+        self._schedule_sweep()
+        ret = await self.decorated.get(key)
+        if self.is_expired(ret):
+            raise KeyNotExistsException(self.collection_name, self.clazz, key)
+        return ret
+
+    async def get_many(self, keys: List[Any]) -> Dict[str, T]:
+        self._schedule_sweep()
+        found = await self.decorated.get_many(keys)
+        return {key: value for key, value in found.items() if not self.is_expired(value)}
+
+    async def keys(self) -> AsyncIterator[str]:
+        async for item in self.get_all():
+            yield self.get_key(item)
+
+    async def delete(self, key: Any) -> None:
+        async with self._write_lock:
+            await self.decorated.delete(key)
+
+    async def delete_many(self, keys: List[Any]) -> None:
+        async with self._write_lock:
+            await self.decorated.delete_many(keys)
+
+    async def patch(self, key: Any, patch_data: BaseModel | Dict[str, Any]) -> T:
+        await self.get(key)
+        async with self._write_lock:
+            return await self.decorated.patch(key, patch_data)
+
+    async def increment(self, key: Any, field: str, delta: int | float = 1) -> None:
+        await self.get(key)
+        async with self._write_lock:
+            await self.decorated.increment(key, field, delta)
+
+    async def drop(self) -> None:
+        async with self._write_lock:
+            await self.decorated.drop()
+
+    async def get_all(self, sort: Any = None) -> AsyncIterator[T]:
+        self._schedule_sweep()
+        async for item in self.decorated.get_all():
+            if not self.is_expired(item):
+                yield item
+
+    def where(self, field: str, op: OP, value: Any) -> TtlAsyncQuery[T]:
+        return TtlAsyncQuery(self.decorated.where(field, op, value), self.is_expired)
+
+    async def find_nearest(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> AsyncIterable[T]:
+        async for item in self.decorated.find_nearest(embedding, limit, distance_threshold):
+            if not self.is_expired(item):
+                yield item
+
+    async def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
+        found = await self.decorated.find_nearest_with_distances(embedding, limit, distance_threshold)
+        return [(item, distance) for item, distance in found if not self.is_expired(item)]
+
+    async def sweep(self) -> int:
+        """Deletes expired items (in batches of `sweep_batch_size`).
+
+        Candidates are selected by `where(ttl_field, "<=", now)` without blocking writes.
+        Each batch is read again and deleted with writes blocked, so items whose
+        expiration was extended in the meantime are kept.
+
+        Returns:
+            Number of deleted items.
+        """
+        self._last_sweep = time.monotonic()
+        candidates = await self._expired_keys()
+        deleted = 0
+        for i in range(0, len(candidates), self.sweep_batch_size):
+            async with self._write_lock:
+                found = await self.decorated.get_many(candidates[i : i + self.sweep_batch_size])
+                expired = [key for key, value in found.items() if self.is_expired(value)]
+                if expired:
+                    await self.decorated.delete_many(expired)
+            deleted += len(expired)
+        if deleted:
+            self._log.debug("Deleted %d expired items from %s", deleted, self.collection_name)
+        return deleted
+
+    async def _expired_keys(self) -> List[str]:
+        """Returns keys of expired items found by the query of the decorated storage (e.g. Firestore index)."""
+        now = datetime.now(timezone.utc)
+        try:
+            return [
+                self.get_key(item)
+                async for item in self.decorated.where(self.ttl_field, "<=", now).get_all()  # type: ignore
+                if self.is_expired(item)
+            ]
+        except (NotImplementedError, TypeError):
+            # The storage can't query (or compare) expiration times - all items are checked
+            return [self.get_key(item) async for item in self.decorated.get_all() if self.is_expired(item)]
+
+    def _schedule_sweep(self) -> None:
+        if self.sweep_interval is None or self.decorated.native_ttl:
+            return
+        if self._sweep_task and not self._sweep_task.done():
+            return
+        if self._last_sweep is not None and time.monotonic() - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = time.monotonic()
+        self._sweep_task = asyncio.create_task(self._background_sweep())
+
+    async def _background_sweep(self) -> None:
+        try:
+            await self.sweep()
+        except Exception as e:
+            self._log.warning("Sweeping %s failed: %s", self.collection_name, e)
@@ -5,6 +5,8 @@ from typing import (
     ClassVar,
     Dict,
     Literal,
+    Optional,
+    Tuple,
     Type,
     Union,
     get_args,
@@ -55,15 +57,20 @@ class VersionedBaseModel(BaseModel, ABC):
         return self.model_dump(by_alias=True, exclude_none=True)
 
 
-def resolve_versioned_class[T](clazz: Type[T], data: Dict[str, Any]) -> Type[T]:
-    """Resolve the real class for a versioned model based on the discriminator field in the data.
-    
-    Args:
-        clazz: The base class to resolve.
-        data: The data to resolve.
-    Returns:
-        The real class.
+# Cache of dispatch tables: id(clazz) -> (clazz, base type, discriminator, discriminator value -> class)
+# (annotated unions are not always hashable, so `id()` is used and `clazz` is kept to check identity)
+_dispatch_tables: Dict[int, Tuple[Any, Any, Optional[str], Optional[Dict[Any, Any]]]] = {}
+
+
+def _get_dispatch_table(clazz: Any) -> Tuple[Any, Optional[str], Optional[Dict[Any, Any]]]:
+    """Returns base type, discriminator and discriminator value -> class map (`None` if not a union).
+
+    It is computed once per `clazz`.
     """
+    cached = _dispatch_tables.get(id(clazz))
+    if cached and cached[0] is clazz:
+        return cached[1:]
+
     origin = get_origin(clazz)
 
     # unwrap Annotated
@@ -80,19 +87,42 @@ def resolve_versioned_class[T](clazz: Type[T], data: Dict[str, Any]) -> Type[T]:
         discriminator = None
 
     if get_origin(base_type) is not Union:
-        return base_type
-
-    if not discriminator:
+        table = None
+    elif not discriminator:
         raise ValueError("Discriminator not defined")
+    else:
+        table = {}
+        for cls in get_args(base_type):
+            field = cls.model_fields.get(discriminator)
+            if field and get_origin(field.annotation) is Literal:
+                for value in get_args(field.annotation):
+                    table.setdefault(value, cls)
 
-    discriminator_value = data.get(discriminator)
+    if len(_dispatch_tables) >= 1024:
+        # Classes created dynamically shouldn't grow the cache forever
+        _dispatch_tables.clear()
+    _dispatch_tables[id(clazz)] = (clazz, base_type, discriminator, table)
+    return base_type, discriminator, table
+
+
+def resolve_versioned_class[T](clazz: Type[T], data: Dict[str, Any]) -> Type[T]:
+    """Resolve the real class for a versioned model based on the discriminator field in the data.
+
+    Args:
+        clazz: The base class to resolve.
+        data: The data to resolve.
+    Returns:
+        The real class.
+    """
+    base_type, discriminator, table = _get_dispatch_table(clazz)
+    if table is None:
+        return base_type
+
+    discriminator_value = data.get(discriminator)  # type: ignore
     if discriminator_value is None:
         raise ValueError(f"Missing discriminator field '{discriminator}'")
 
-    for cls in get_args(base_type):
-        field = cls.model_fields.get(discriminator)
-        if field and get_origin(field.annotation) is Literal:
-            if discriminator_value in get_args(field.annotation):
-                return cls
-
-    raise ValueError("No matching class found")
+    try:
+        return table[discriminator_value]
+    except (KeyError, TypeError):
+        raise ValueError("No matching class found")
@@ -0,0 +1,17 @@
+from .backends import BACKENDS, Backend, BenchmarkItem
+from .benchmark_runner import OPERATIONS, BenchmarkReport, BenchmarkResult, BenchmarkRunner, compare_reports
+from .startup_benchmark import STARTUP_FACTORIES, STARTUP_OPERATIONS, run_startup_benchmark
+
+__all__ = [
+    "BACKENDS",
+    "Backend",
+    "BenchmarkItem",
+    "OPERATIONS",
+    "BenchmarkRunner",
+    "BenchmarkResult",
+    "BenchmarkReport",
+    "compare_reports",
+    "STARTUP_FACTORIES",
+    "STARTUP_OPERATIONS",
+    "run_startup_benchmark",
+]
@@ -0,0 +1,107 @@
+"""Storage benchmark.
+
+Usage:
+    python -m ampf.benchmark --sizes 1000,10000 --output results.json
+    python -m ampf.benchmark --compare baseline.json results.json
+    python -m ampf.benchmark --startup --storages 10
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from .backends import BACKENDS
+from .benchmark_runner import DEFAULT_SIZES, OPERATIONS, BenchmarkReport, BenchmarkRunner, compare_reports, new_report
+from .startup_benchmark import STARTUP_FACTORIES, run_startup_benchmark
+
+
+def _split(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m ampf.benchmark", description="Benchmarks ampf storages (offline).")
+    parser.add_argument("--backends", type=_split, default=list(BACKENDS), help=f"Comma separated: {','.join(BACKENDS)}")
+    parser.add_argument(
+        "--sizes", type=lambda v: [int(s) for s in _split(v)], default=list(DEFAULT_SIZES), help="Numbers of items"
+    )
+    parser.add_argument("--operations", type=_split, default=list(OPERATIONS), help=f"Comma separated: {','.join(OPERATIONS)}")
+    parser.add_argument("--max-calls", type=int, default=1000, help="Maximum number of calls of one operation")
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="Maximum time of measuring one operation")
+    parser.add_argument("--blob-size", type=int, default=64 * 1024, help="Size of blobs in bytes")
+    parser.add_argument("--no-memory", action="store_true", help="Don't measure memory (no extra traced call)")
+    parser.add_argument("--root-path", type=Path, default=None, help="Folder for temporary data")
+    parser.add_argument("--output", "-o", type=Path, default=None, help="JSON file with results")
+    parser.add_argument(
+        "--compare", nargs=2, type=Path, metavar=("BASELINE", "CURRENT"), help="Compare two JSON files and exit"
+    )
+    parser.add_argument(
+        "--startup", action="store_true", help=f"Measure start-up of factories: {','.join(STARTUP_FACTORIES)}"
+    )
+    parser.add_argument("--factories", type=_split, default=None, help="Comma separated factories (with --startup)")
+    parser.add_argument("--storages", type=int, default=10, help="Number of storages created (with --startup)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown treated as a regression")
+    return parser.parse_args(argv)
+
+
+def _print_report(report: BenchmarkReport) -> None:
+    print(f"{'backend':<24} {'size':>7} {'operation':<14} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'peak MiB':>9} {'B/item':>8}")
+    for r in report.results:
+        if r.skipped:
+            print(f"{r.backend:<24} {r.size:>7} {r.operation:<14} skipped: {r.skipped}")
+            continue
+        memory = f"{r.peak_memory_bytes / 2**20:9.2f}" if r.peak_memory_bytes is not None else f"{'-':>9}"
+        per_item = f"{r.memory_per_item_bytes:8.0f}" if r.memory_per_item_bytes is not None else f"{'-':>8}"
+        print(
+            f"{r.backend:<24} {r.size:>7} {r.operation:<14} {r.ops_per_sec:>10.1f} {r.p50_ms:>9.3f} {r.p99_ms:>9.3f} {memory} {per_item}"
+        )
+
+
+def _compare(baseline_path: Path, current_path: Path, threshold: float) -> int:
+    baseline = BenchmarkReport.model_validate_json(baseline_path.read_text())
+    current = BenchmarkReport.model_validate_json(current_path.read_text())
+    rows = compare_reports(baseline, current, threshold)
+    print(f"{'backend':<24} {'size':>7} {'operation':<14} {'baseline':>10} {'current':>10} {'change':>8}")
+    for row in rows:
+        mark = "  REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['backend']:<24} {row['size']:>7} {row['operation']:<14} "
+            f"{row['baseline']:>10.1f} {row['current']:>10.1f} {row['change']:>+8.1%}{mark}"
+        )
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    if args.compare:
+        return _compare(*args.compare, args.threshold)
+    logging.basicConfig(level=logging.WARNING)
+    if args.startup:
+        report = new_report()
+        report.results = run_startup_benchmark(args.factories, args.storages, root_path=args.root_path)
+        _print_report(report)
+        if args.output:
+            args.output.write_text(report.model_dump_json(indent=2))
+        return 0
+    runner = BenchmarkRunner(
+        backends=args.backends,
+        sizes=args.sizes,
+        operations=args.operations,
+        max_calls=args.max_calls,
+        max_seconds=args.max_seconds,
+        blob_size=args.blob_size,
+        measure_memory=not args.no_memory,
+        root_path=args.root_path,
+    )
+    report = asyncio.run(runner.run())
+    _print_report(report)
+    if args.output:
+        args.output.write_text(report.model_dump_json(indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""Storage backends compared by the benchmark (all of them work offline)"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from ampf.in_memory import InMemoryAsyncFactory, InMemoryFactory
+from ampf.local import LocalAsyncFactory, LocalFactory
+
+
+class BenchmarkItem(BaseModel):
+    """Item stored by the benchmark"""
+
+    id: str
+    name: str
+    group: int
+    value: float
+    tags: List[str] = []
+    embedding: Optional[List[float]] = None
+
+
+@dataclass
+class Backend:
+    """Storage backend: factory and the way storages are created"""
+
+    name: str
+    is_async: bool
+    create_factory: Callable[[Path], Any]
+    storage_method: str = "create_storage"
+    """Name of the factory method creating the storage"""
+
+    def create_storage(self, factory: Any, collection_name: str) -> Any:
+        return getattr(factory, self.storage_method)(collection_name, BenchmarkItem)
+
+    def create_blob_storage(self, factory: Any, collection_name: str) -> Any:
+        return factory.create_blob_storage(collection_name)
+
+
+BACKENDS: Dict[str, Backend] = {
+    b.name: b
+    for b in [
+        Backend("in_memory", False, lambda _: InMemoryFactory()),
+        Backend("in_memory_array", False, lambda _: InMemoryFactory(), "create_array_storage"),
+        Backend("local_multi_files", False, lambda path: LocalFactory(path)),
+        Backend("local_one_file", False, lambda path: LocalFactory(path), "create_compact_storage"),
+        Backend("local_shared", False, lambda path: LocalFactory(path), "create_shared_storage"),
+        Backend("in_memory_async", True, lambda _: InMemoryAsyncFactory()),
+        Backend("in_memory_array_async", True, lambda _: InMemoryAsyncFactory(), "create_array_storage"),
+        Backend("local_async_multi_files", True, lambda path: LocalAsyncFactory(path)),
+        Backend("local_async_one_file", True, lambda path: LocalAsyncFactory(path), "create_compact_storage"),
+        Backend("local_async_shared", True, lambda path: LocalAsyncFactory(path), "create_shared_storage"),
+    ]
+}
+"""Available backends by name"""
@@ -0,0 +1,354 @@
+"""Runs the same workload on all storage backends"""
+
+from __future__ import annotations
+
+import inspect
+import logging
+import math
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+
+from pydantic import BaseModel
+
+from ampf.base import Blob
+
+from .backends import BACKENDS, Backend, BenchmarkItem
+
+OPERATIONS = (
+    "load",
+    "put",
+    "get",
+    "get_all",
+    "where",
+    "where_range",
+    "find_nearest",
+    "blob_upload",
+    "blob_download",
+)
+"""Benchmarked operations (in order of execution)"""
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+
+class BenchmarkResult(BaseModel):
+    """Measurements of one operation on one backend with given number of items"""
+
+    backend: str
+    size: int
+    operation: str
+    calls: int = 0
+    items: int = 0
+    """Number of items written or read by all the calls"""
+    total_seconds: float = 0.0
+    ops_per_sec: float = 0.0
+    items_per_sec: float = 0.0
+    p50_ms: float = 0.0
+    p99_ms: float = 0.0
+    peak_memory_bytes: Optional[int] = None
+    retained_memory_bytes: Optional[int] = None
+    """Memory still allocated after one call (for `load` - memory of all stored items)"""
+    memory_per_item_bytes: Optional[float] = None
+    """Retained memory per item written by one call (`load` only)"""
+    skipped: Optional[str] = None
+
+
+class BenchmarkReport(BaseModel):
+    """All measurements of one benchmark run"""
+
+    created_at: datetime
+    python: str
+    platform: str
+    ampf_version: str
+    results: List[BenchmarkResult] = []
+
+
+class BenchmarkRunner:
+    """Runs the same workload on all (offline) storage backends.
+
+    For every backend and size the storage is loaded with `size` items (`put_many()`)
+    and then each operation is called repeatedly - at most `max_calls` times
+    or `max_seconds` seconds (but at least once). Peak and retained memory are measured
+    in one extra call, so allocation tracing doesn't distort the latencies.
+    The storage is emptied before the extra `load` call, so its retained memory
+    is the memory of all stored items.
+
+    Args:
+        backends: Names of backends (see `BACKENDS`, default - all).
+        sizes: Numbers of items in the storage.
+        operations: Names of operations (see `OPERATIONS`, default - all).
+        max_calls: Maximum number of calls of one operation.
+        max_seconds: Maximum time of measuring one operation.
+        blob_size: Size of uploaded blobs in bytes.
+        dimensions: Number of dimensions of embeddings.
+        measure_memory: Measure peak memory of one call (an extra call traced by `tracemalloc`).
+        seed: Seed of the random generator (the same data for each run).
+        root_path: Folder for temporary data of local backends (default - system temp folder).
+    """
+
+    _log = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        backends: Optional[Sequence[str]] = None,
+        sizes: Sequence[int] = DEFAULT_SIZES,
+        operations: Sequence[str] = OPERATIONS,
+        max_calls: int = 1000,
+        max_seconds: float = 10.0,
+        blob_size: int = 64 * 1024,
+        dimensions: int = 32,
+        measure_memory: bool = True,
+        seed: int = 42,
+        root_path: Optional[Path] = None,
+    ):
+        unknown = set(backends or []) - BACKENDS.keys() | set(operations) - set(OPERATIONS)
+        if unknown:
+            raise ValueError(f"Unknown backends or operations: {', '.join(sorted(unknown))}")
+        self.backends = [BACKENDS[name] for name in backends or BACKENDS]
+        self.sizes = sizes
+        self.operations = operations
+        self.max_calls = max_calls
+        self.max_seconds = max_seconds
+        self.blob_size = blob_size
+        self.dimensions = dimensions
+        self.measure_memory = measure_memory
+        self.seed = seed
+        self.root_path = root_path
+
+    async def run(self) -> BenchmarkReport:
+        """Runs the benchmark.
+
+        Returns:
+            Report with all measurements.
+        """
+        report = new_report()
+        for size in self.sizes:
+            for backend in self.backends:
+                with tempfile.TemporaryDirectory(dir=self.root_path) as tmp:
+                    report.results.extend(await self._run_backend(backend, size, Path(tmp)))
+        return report
+
+    async def _run_backend(self, backend: Backend, size: int, path: Path) -> List[BenchmarkResult]:
+        self._log.info("Benchmarking %s with %d items", backend.name, size)
+        rnd = random.Random(self.seed)
+        items = [self._create_item(rnd, i) for i in range(size)]
+        factory = backend.create_factory(path)
+        storage = backend.create_storage(factory, "benchmark")
+        blob_storage = backend.create_blob_storage(factory, "benchmark-blobs")
+        await _call(storage.drop)
+        uploaded: List[str] = []
+
+        async def load(_: int) -> int:
+            await _call(storage.put_many, items)
+            return size
+
+        async def put(_: int) -> int:
+            item = items[rnd.randrange(size)].model_copy(update={"value": rnd.random()})
+            await _call(storage.put, item.id, item)
+            return 1
+
+        async def get(_: int) -> int:
+            await _call(storage.get, items[rnd.randrange(size)].id)
+            return 1
+
+        async def get_all(_: int) -> int:
+            return await _count(storage.get_all())
+
+        async def where(i: int) -> int:
+            return await _count(storage.where("group", "==", i % 10).get_all())
+
+        async def where_range(i: int) -> int:
+            low = rnd.random() * 0.9
+            query = storage.where("value", ">=", low).where("value", "<", low + 0.1)
+            return await _count(query.where("group", "in", [i % 10, (i + 1) % 10]).get_all())
+
+        async def find_nearest(_: int) -> int:
+            return await _count(storage.find_nearest(self._create_embedding(rnd), 10))
+
+        payload = rnd.randbytes(self.blob_size)
+
+        async def blob_upload(i: int) -> int:
+            name = f"blob-{i}"
+            blob = Blob(name=name, content=payload, content_type="application/octet-stream")
+            await _call(blob_storage.upload_async if backend.is_async else blob_storage.upload, blob)
+            uploaded.append(name)
+            return 1
+
+        async def blob_download(i: int) -> int:
+            name = uploaded[i % len(uploaded)]
+            blob = await _call(blob_storage.download_async if backend.is_async else blob_storage.download, name)
+            return len(blob.content) // self.blob_size
+
+        operations: Dict[str, Callable[[int], Awaitable[int]]] = {
+            "load": load,
+            "put": put,
+            "get": get,
+            "get_all": get_all,
+            "where": where,
+            "where_range": where_range,
+            "find_nearest": find_nearest,
+            "blob_upload": blob_upload,
+            "blob_download": blob_download,
+        }
+        results = []
+        try:
+            # Data must be loaded even if loading is not measured
+            if "load" not in self.operations:
+                await load(0)
+            for operation in OPERATIONS:
+                if operation not in self.operations:
+                    continue
+                if operation == "blob_download" and not uploaded:
+                    await blob_upload(0)
+                max_calls = 1 if operation == "load" else min(self.max_calls, size)
+                result = await self._measure(
+                    backend.name,
+                    size,
+                    operation,
+                    operations[operation],
+                    max_calls,
+                    before_traced=(lambda: _call(storage.drop)) if operation == "load" else None,
+                )
+                results.append(result)
+        finally:
+            await _call(storage.drop)
+            # Only uploaded blobs are deleted, `drop()` of some sync blob storages removes the bucket
+            for name in set(uploaded):
+                await _call(blob_storage.delete_async if backend.is_async else blob_storage.delete, name)
+        return results
+
+    async def _measure(
+        self,
+        backend: str,
+        size: int,
+        operation: str,
+        func: Callable[[int], Awaitable[int]],
+        max_calls: int,
+        before_traced: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> BenchmarkResult:
+        result = BenchmarkResult(backend=backend, size=size, operation=operation)
+        latencies: List[float] = []
+        start = time.perf_counter()
+        while result.calls < max_calls and (not latencies or time.perf_counter() - start < self.max_seconds):
+            call_start = time.perf_counter()
+            result.items += await func(result.calls)
+            latencies.append(time.perf_counter() - call_start)
+            result.calls += 1
+            if operation == "find_nearest" and not result.items:
+                result.skipped = "find_nearest() returned no items (is it supported?)"
+                break
+        result.total_seconds = time.perf_counter() - start
+        if self.measure_memory and not result.skipped:
+            # One more call - tracing allocations would distort the latencies
+            if before_traced:
+                await before_traced()
+            tracemalloc.start()
+            try:
+                items = await func(result.calls)
+                result.retained_memory_bytes, result.peak_memory_bytes = tracemalloc.get_traced_memory()
+                if operation == "load" and items:
+                    result.memory_per_item_bytes = result.retained_memory_bytes / items
+            finally:
+                tracemalloc.stop()
+        result.ops_per_sec = result.calls / result.total_seconds
+        result.items_per_sec = result.items / result.total_seconds
+        latencies.sort()
+        result.p50_ms = _percentile(latencies, 50) * 1000
+        result.p99_ms = _percentile(latencies, 99) * 1000
+        return result
+
+    def _create_item(self, rnd: random.Random, i: int) -> BenchmarkItem:
+        return BenchmarkItem(
+            id=f"{i:08d}",
+            name=f"item-{i}",
+            group=i % 10,
+            value=rnd.random(),
+            tags=[f"tag-{i % 7}", f"tag-{i % 13}"],
+            embedding=self._create_embedding(rnd),
+        )
+
+    def _create_embedding(self, rnd: random.Random) -> List[float]:
+        embedding = [rnd.gauss(0.0, 1.0) for _ in range(self.dimensions)]
+        norm = math.sqrt(sum(x * x for x in embedding)) or 1.0
+        return [x / norm for x in embedding]
+
+
+def new_report() -> BenchmarkReport:
+    """Creates an empty report of the current environment."""
+    try:
+        ampf_version = version("ampf")
+    except PackageNotFoundError:
+        ampf_version = "unknown"
+    return BenchmarkReport(
+        created_at=datetime.now(timezone.utc),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        ampf_version=ampf_version,
+    )
+
+
+def compare_reports(
+    baseline: BenchmarkReport, current: BenchmarkReport, threshold: float = 0.2
+) -> List[Dict[str, Any]]:
+    """Compares throughput of two benchmark runs.
+
+    Args:
+        baseline: Report of the previous run.
+        current: Report of the current run.
+        threshold: Relative slowdown treated as a regression (0.2 - 20% fewer ops/s).
+    Returns:
+        Rows with `backend`, `size`, `operation`, `baseline`, `current` (ops/s),
+        `change` (relative) and `regression` flag - only for results present in both reports.
+    """
+    previous = {(r.backend, r.size, r.operation): r for r in baseline.results if not r.skipped}
+    rows = []
+    for r in current.results:
+        base = previous.get((r.backend, r.size, r.operation))
+        if r.skipped or base is None or not base.ops_per_sec:
+            continue
+        change = r.ops_per_sec / base.ops_per_sec - 1.0
+        rows.append(
+            {
+                "backend": r.backend,
+                "size": r.size,
+                "operation": r.operation,
+                "baseline": base.ops_per_sec,
+                "current": r.ops_per_sec,
+                "change": change,
+                "regression": change < -threshold,
+            }
+        )
+    return rows
+
+
+async def _call(func: Callable[..., Any], *args: Any) -> Any:
+    """Calls sync or async function"""
+    ret = func(*args)
+    if inspect.isawaitable(ret):
+        ret = await ret
+    return ret
+
+
+async def _count(iterator: Iterable[Any] | Any) -> int:
+    """Consumes sync or async iterator and returns the number of items"""
+    count = 0
+    if hasattr(iterator, "__aiter__"):
+        async for _ in iterator:
+            count += 1
+    else:
+        for _ in iterator:
+            count += 1
+    return count
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Returns percentile of sorted values (nearest rank)"""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
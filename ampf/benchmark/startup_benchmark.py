@@ -0,0 +1,110 @@
+"""Measures start-up time of factories (construction and creating storages)"""
+
+from __future__ import annotations
+
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from ampf.in_memory import InMemoryAsyncFactory, InMemoryFactory
+from ampf.local import LocalAsyncFactory, LocalFactory
+
+from .backends import BenchmarkItem
+from .benchmark_runner import BenchmarkResult, _percentile
+
+_log = logging.getLogger(__name__)
+
+STARTUP_OPERATIONS = ("factory", "first_storage", "storages")
+"""Measured steps: factory construction, creating the first storage, creating the next storages"""
+
+
+def _gcp_factories() -> Dict[str, Callable[[Path], Any]]:
+    """GCP factories with anonymous credentials (no network calls until storages are used)."""
+    try:
+        from google.auth.credentials import AnonymousCredentials
+
+        from ampf.gcp import GcpAsyncFactory, GcpFactory
+    except ImportError:
+        return {}
+    options = {"bucket_name": "benchmark", "project_id": "benchmark"}
+    return {
+        "gcp": lambda _: GcpFactory(credentials=AnonymousCredentials(), **options),
+        "gcp_async": lambda _: GcpAsyncFactory(credentials=AnonymousCredentials(), **options),
+        "gcp_async_pool4": lambda _: GcpAsyncFactory(
+            credentials=AnonymousCredentials(), channel_pool_size=4, **options
+        ),
+    }
+
+
+STARTUP_FACTORIES: Dict[str, Callable[[Path], Any]] = {
+    "in_memory": lambda _: InMemoryFactory(),
+    "in_memory_async": lambda _: InMemoryAsyncFactory(),
+    "local": lambda path: LocalFactory(path),
+    "local_async": lambda path: LocalAsyncFactory(path),
+    **_gcp_factories(),
+}
+"""Factories measured by the start-up benchmark by name (GCP ones only if `ampf.gcp` can be imported)"""
+
+
+def run_startup_benchmark(
+    factories: Optional[Sequence[str]] = None,
+    storages: int = 10,
+    repeat: int = 5,
+    root_path: Optional[Path] = None,
+) -> List[BenchmarkResult]:
+    """Measures how long it takes to construct a factory and create its storages.
+
+    Each measurement is repeated `repeat` times with a new factory. The `storages`
+    step creates `storages` data storages and `storages` blob storages, so it shows
+    the cost of clients created (or not shared) per storage.
+
+    Args:
+        factories: Names of factories (see `STARTUP_FACTORIES`, default - all).
+        storages: Number of storages created by the `storages` step.
+        repeat: Number of measurements of each step.
+        root_path: Folder for temporary data of local factories (default - system temp folder).
+    Returns:
+        Results with `size` equal to `storages`.
+    """
+    unknown = set(factories or []) - STARTUP_FACTORIES.keys()
+    if unknown:
+        raise ValueError(f"Unknown factories: {', '.join(sorted(unknown))}")
+    results = []
+    for name in factories or STARTUP_FACTORIES:
+        _log.info("Benchmarking start-up of %s", name)
+        latencies: Dict[str, List[float]] = {operation: [] for operation in STARTUP_OPERATIONS}
+        for _ in range(repeat):
+            with tempfile.TemporaryDirectory(dir=root_path) as tmp:
+                start = time.perf_counter()
+                factory = STARTUP_FACTORIES[name](Path(tmp))
+                latencies["factory"].append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                factory.create_storage("startup-0", BenchmarkItem)
+                latencies["first_storage"].append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                for j in range(storages):
+                    factory.create_storage(f"startup-{j + 1}", BenchmarkItem)
+                    factory.create_blob_storage(f"startup-blobs-{j}")
+                latencies["storages"].append(time.perf_counter() - start)
+        for operation, values in latencies.items():
+            results.append(_result(name, storages, operation, values))
+    return results
+
+
+def _result(name: str, storages: int, operation: str, latencies: List[float]) -> BenchmarkResult:
+    total = sum(latencies)
+    latencies.sort()
+    return BenchmarkResult(
+        backend=name,
+        size=storages,
+        operation=operation,
+        calls=len(latencies),
+        total_seconds=total,
+        ops_per_sec=len(latencies) / total if total else 0.0,
+        p50_ms=_percentile(latencies, 50) * 1000,
+        p99_ms=_percentile(latencies, 99) * 1000,
+    )
@@ -1,6 +1,16 @@
 from .blob_streaming_response import BlobStreamingResponse
+from .data_loaders import DataLoaders, DataLoadersDep, get_data_loaders
 from .json_streaming_response import JsonStreamingResponse, StreamedException
 from .static_file_response import StaticFileResponse, get_static_file_response
 
 
-__all__ = ["JsonStreamingResponse", "StreamedException", "StaticFileResponse", "BlobStreamingResponse", "get_static_file_response"]
+__all__ = [
+    "JsonStreamingResponse",
+    "StreamedException",
+    "StaticFileResponse",
+    "BlobStreamingResponse",
+    "get_static_file_response",
+    "DataLoaders",
+    "DataLoadersDep",
+    "get_data_loaders",
+]
@@ -8,7 +8,9 @@ from ampf.base.blob_model import Blob
 class BlobStreamingResponse(StreamingResponse):
     def __init__(self, blob: Blob, cache_control: Optional[str] = None, headers: Optional[Dict[str, str]] = None):
         """Streams Blob to client.
-        
+
+        `Content-Length` is set if the size of the blob is known (e.g. streamed download).
+
         Args:
             blob: The blob to stream.
             cache_control: The cache control header.
@@ -17,4 +19,6 @@ class BlobStreamingResponse(StreamingResponse):
         if cache_control:
             headers = headers or {}
             headers["Cache-Control"] = cache_control
+        if blob.size is not None:
+            headers = {"Content-Length": str(blob.size), **(headers or {})}
         super().__init__(blob.stream(), media_type=blob.metadata.content_type, headers=headers)
@@ -0,0 +1,44 @@
+from typing import Annotated, AsyncIterator, Dict, Tuple
+
+from fastapi import Depends
+from pydantic import BaseModel
+
+from ampf.base import AsyncDataLoader, BaseAsyncStorage
+
+
+class DataLoaders:
+    """Request scoped data loaders - one `AsyncDataLoader` per storage.
+
+    Args:
+        max_batch_size: Maximum number of keys read by one `get_many()` call.
+    """
+
+    def __init__(self, max_batch_size: int = 500):
+        self.max_batch_size = max_batch_size
+        self._loaders: Dict[int, Tuple[BaseAsyncStorage, AsyncDataLoader]] = {}
+
+    def get[T: BaseModel](self, storage: BaseAsyncStorage[T]) -> AsyncDataLoader[T]:
+        """Returns data loader of the storage (it is created on the first call)."""
+        entry = self._loaders.get(id(storage))
+        if entry is None or entry[0] is not storage:
+            entry = (storage, AsyncDataLoader(storage, self.max_batch_size))
+            self._loaders[id(storage)] = entry
+        return entry[1]
+
+    def clear(self) -> None:
+        """Clears all data loaders (their identity maps)."""
+        for _, loader in self._loaders.values():
+            loader.clear()
+        self._loaders.clear()
+
+
+async def get_data_loaders() -> AsyncIterator[DataLoaders]:
+    """FastAPI dependency - data loaders cleared at the end of the request."""
+    loaders = DataLoaders()
+    try:
+        yield loaders
+    finally:
+        loaders.clear()
+
+
+DataLoadersDep = Annotated[DataLoaders, Depends(get_data_loaders)]
@@ -2,6 +2,7 @@ from .gcp_async_blob_storage import GcpAsyncBlobStorage
 from .gcp_async_factory import GcpAsyncFactory
 from .gcp_async_storage import GcpAsyncStorage
 from .gcp_blob_storage import GcpBlobStorage
+from .gcp_clients import GcpClients
 from .gcp_factory import GcpFactory
 from .gcp_pubsub_model import GcpPubsubMessage, GcpPubsubRequest, GcpPubsubResponse
 from .gcp_pubsub_process_push import gcp_pubsub_process_push
@@ -22,6 +23,7 @@ __all__ = [
     "GcpAsyncStorage",
     "GcpBlobStorage",
     "GcpAsyncBlobStorage",
+    "GcpClients",
     "GcpTopic",
     "GcpSubscription",
     "GcpPubsubRequest",
@@ -1,25 +1,45 @@
 import asyncio
 import logging
-from typing import AsyncGenerator, Awaitable, Callable, Optional, Type, override
+import time
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Optional, Tuple, Type, override
 
+import google.auth.credentials
 import google.auth.exceptions
 import google.auth.transport.requests
 from google.api_core import exceptions
 from google.cloud import storage
 import httpx2
-from urllib.parse import quote, unquote
+from urllib.parse import quote, unquote, urlencode
 
 from ampf.base.base_async_blob_storage import BaseAsyncBlobStorage
 from ampf.base.blob_model import BaseBlobMetadata, Blob, BlobHeader
 from ampf.base.exceptions import KeyExistsException, KeyNotExistsException
+from ampf.base.storage_cache import StorageCache
 
 from .gcp_base_blob_storage import GcpBaseBlobStorage
+from .gcp_clients import SCOPES
 
 _log = logging.getLogger(__name__)
 
 
 class GcpAsyncBlobStorage[T: BaseBlobMetadata](GcpBaseBlobStorage, BaseAsyncBlobStorage):
+    """Async blob storage using Google Cloud Storage XML API over `httpx2`.
+
+    Requests are authorized with the bearer token of the credentials, so no URL
+    has to be signed. With `use_signed_urls` they are sent to V4 signed URLs
+    instead (e.g. credentials which can't be used directly). Signed URLs are cached
+    and reused until `signed_url_expiry_margin` seconds before they expire,
+    so an IAM `signBlob` call is not made for every request.
+
+    Listing and patching metadata use JSON API (always with bearer token).
+    """
+
     chunk_size = 1024 * 1024  # 1MB
+    list_page_size = 1000
+    """Number of blobs listed by one JSON API request"""
+    signed_url_cache_size = 1024
+    signed_url_expiry_margin = 300
+    """Seconds before expiration when a cached signed URL is not used anymore"""
 
     def __init__(
         self,
@@ -29,6 +49,8 @@ class GcpAsyncBlobStorage[T: BaseBlobMetadata](GcpBaseBlobStorage, BaseAsyncBlob
         content_type: str = "text/plain",
         storage_client: storage.Client | None = None,
         httpx_async_client: httpx2.AsyncClient | None = None,
+        credentials: google.auth.credentials.Credentials | None = None,
+        use_signed_urls: bool = False,
     ):
         BaseAsyncBlobStorage.__init__(self, collection_name, clazz, content_type)
         GcpBaseBlobStorage.__init__(self, bucket_name, collection_name, clazz, content_type, storage_client)
@@ -36,9 +58,100 @@ class GcpAsyncBlobStorage[T: BaseBlobMetadata](GcpBaseBlobStorage, BaseAsyncBlob
         self._httpx_async_client = httpx_async_client or httpx2.AsyncClient()
         self.max_retries_per_transaction = 5
 
-        scopes = ["https://www.googleapis.com/auth/cloud-platform"]
-        self._creds, _ = google.auth.default(scopes=scopes)
-        self._auth_request = google.auth.transport.requests.Request()
+        if credentials is None:
+            credentials, _ = google.auth.default(scopes=SCOPES)
+        self._creds = credentials
+        self._auth_request: google.auth.transport.requests.Request | None = None
+        self.use_signed_urls = use_signed_urls
+        self._signed_urls: StorageCache[Tuple[str, float]] = StorageCache(self.signed_url_cache_size)
+        self._api_endpoint = getattr(self._storage_client, "api_endpoint", None) or "https://storage.googleapis.com"
+
+    async def _refresh_credentials(self) -> None:
+        """Refreshes credentials (in a thread) if their token is missing or expired."""
+        if self._creds.valid:
+            return
+        if self._auth_request is None:
+            self._auth_request = google.auth.transport.requests.Request()
+        try:
+            await asyncio.to_thread(self._creds.refresh, self._auth_request)
+        except google.auth.exceptions.RefreshError as e:
+            _log.error("Failed to refresh GCP credentials %s", e)
+
+    async def _authorize(
+        self,
+        name: str,
+        method: str,
+        headers: Dict[str, str] | None = None,
+        query_parameters: Dict[str, str] | None = None,
+    ) -> Tuple[str, Dict[str, str]]:
+        """Returns URL and headers of an XML API request of the blob.
+
+        Args:
+            name: The name identifying the blob.
+            method: The HTTP method of the request.
+            headers: Headers of the request (signed with the URL if `use_signed_urls`).
+            query_parameters: Query parameters of the request.
+        Returns:
+            URL (bearer token or signed) and headers of the request.
+        """
+        headers = dict(headers or {})
+        if self.use_signed_urls:
+            signed_url = await self._get_signed_url(
+                name, method, headers=headers or None, query_parameters=query_parameters
+            )
+            return signed_url, headers
+        url = f"{self._api_endpoint}/{self.bucket_name}/{quote(self.get_full_name(name))}"
+        if query_parameters:
+            url = f"{url}?{urlencode(query_parameters)}"
+        return url, await self._bearer_headers(headers)
+
+    async def _bearer_headers(self, headers: Dict[str, str] | None = None) -> Dict[str, str]:
+        """Returns headers with the bearer token of the credentials."""
+        await self._refresh_credentials()
+        headers = dict(headers or {})
+        headers["Authorization"] = f"Bearer {self._creds.token}"
+        return headers
+
+    def _json_api_url(self, name: str | None = None) -> str:
+        """Returns JSON API URL of the objects of the bucket or of one object."""
+        url = f"{self._api_endpoint}/storage/v1/b/{quote(self.bucket_name, safe='')}/o"
+        return f"{url}/{quote(self.get_full_name(name), safe='')}" if name is not None else url
+
+    async def _list_pages(
+        self,
+        prefix: str,
+        fields: str,
+        delimiter: Optional[str] = None,
+        max_results: Optional[int] = None,
+    ) -> AsyncGenerator[Dict[str, Any]]:
+        """Lists objects with JSON API page by page.
+
+        Args:
+            prefix: Full prefix of listed objects.
+            fields: Projection of listed objects (e.g. `items(name)`).
+            delimiter: Objects with the delimiter after the prefix are returned as `prefixes`.
+            max_results: The maximum number of objects and prefixes (`None` - all).
+        Returns:
+            Pages with `items` and `prefixes` (if any).
+        """
+        params = {"prefix": prefix, "fields": f"nextPageToken,prefixes,{fields}"}
+        if delimiter:
+            params["delimiter"] = delimiter
+        remaining = max_results
+        while remaining is None or remaining > 0:
+            params["maxResults"] = str(min(self.list_page_size, remaining or self.list_page_size))
+            response = await self._httpx_async_client.get(
+                self._json_api_url(), params=params, headers=await self._bearer_headers()
+            )
+            response.raise_for_status()
+            page = response.json()
+            yield page
+            if remaining is not None:
+                remaining -= len(page.get("items", [])) + len(page.get("prefixes", []))
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return
+            params["pageToken"] = page_token
 
     async def _get_signed_url(
         self,
@@ -60,13 +173,21 @@ class GcpAsyncBlobStorage[T: BaseBlobMetadata](GcpBaseBlobStorage, BaseAsyncBlob
             query_parameters: Additional query parameters to include in the signed URL (optional).
 
         Returns:
-            The signed URL.
+            The signed URL (cached one if it is not going to expire soon).
         """
-        if not self._creds.valid:
-            try:
-                await asyncio.to_thread(self._creds.refresh, self._auth_request)
-            except google.auth.exceptions.RefreshError as e:
-                _log.error("Failed to refresh GCP credentials %s", e)
+        cache_key = (
+            name,
+            method,
+            content_type,
+            expiration,
+            tuple(sorted((headers or {}).items())),
+            tuple(sorted((query_parameters or {}).items())),
+        )
+        now = time.monotonic()
+        cached = self._signed_urls.get(cache_key)
+        if cached and cached[1] - self.signed_url_expiry_margin > now:
+            return cached[0]
+        await self._refresh_credentials()
         service_account_email = getattr(self._creds, "service_account_email", None)
         access_token = self._creds.token
 
@@ -81,6 +202,7 @@ class GcpAsyncBlobStorage[T: BaseBlobMetadata](GcpBaseBlobStorage, BaseAsyncBlob
             service_account_email=service_account_email,
             access_token=access_token,
         )
+        self._signed_urls.put(cache_key, (signed_url, now + expiration))
         return signed_url
 
     @override
@@ -91,27 +213,70 @@ class GcpAsyncBlobStorage[T: BaseBlobMetadata](GcpBaseBlobStorage, BaseAsyncBlob
             blob: The blob object containing data and metadata to upload.
         """
         headers = self._prepare_metadata_headers(blob.metadata)
-        signed_url = await self._get_signed_url(blob.name, "PUT", headers=headers)
-        response = await self._httpx_async_client.put(signed_url, content=blob.stream(), headers=headers)
+        url, headers = await self._authorize(blob.name, "PUT", headers=headers)
+        response = await self._httpx_async_client.put(url, content=blob.stream(), headers=headers)
         response.raise_for_status()
 
     @override
-    async def download_async(self, name: str) -> Blob[T]:
+    async def download_async(self, name: str, stream: bool = False) -> Blob[T]:
         """Downloads binary data based on the blob key.
 
         Args:
             name: The name identifying the blob to download.
+            stream: Return the blob before its content is downloaded - it is read
+                from the connection by `blob.stream()` or `await blob.read()` (once).
 
         Returns:
             The downloaded blob object.
         """
-        signed_url = await self._get_signed_url(name, "GET")
-        response = await self._httpx_async_client.get(signed_url)
-        if response.status_code == 404:
-            raise KeyNotExistsException(self.collection_name, self.clazz, name)
-        response.raise_for_status()
-        metadata = self._parse_metadata(response)
-        return Blob[T](name=name, content=response.content, metadata=metadata)
+        return await self._download(name, {}, stream)
+
+    @override
+    async def download_range(self, name: str, start: int, end: Optional[int] = None, stream: bool = False) -> Blob[T]:
+        """Downloads a part of the blob (like `content[start:end]`) with HTTP `Range` request.
+
+        Args:
+            name: The name identifying the blob to download.
+            start: Position of the first byte.
+            end: Position after the last byte (`None` - to the end of the blob).
+            stream: Return the blob before its content is downloaded (see `download_async()`).
+
+        Returns:
+            The blob object with the part of its content.
+        Raises:
+            ValueError: If the range is empty.
+        """
+        if end is not None and end <= start:
+            raise ValueError(f"Range {start}:{end} of blob {name} is empty")
+        return await self._download(name, {"Range": f"bytes={start}-{end - 1 if end is not None else ''}"}, stream)
+
+    async def _download(self, name: str, headers: Dict[str, str], stream: bool) -> Blob[T]:
+        url, auth_headers = await self._authorize(name, "GET")
+        request = self._httpx_async_client.build_request("GET", url, headers={**auth_headers, **headers})
+        response = await self._httpx_async_client.send(request, stream=True)
+        try:
+            if response.status_code == 404:
+                raise KeyNotExistsException(self.collection_name, self.clazz, name)
+            if response.status_code == 416:
+                raise ValueError(f"Range {headers.get('Range')} of blob {name} is not satisfiable")
+            response.raise_for_status()
+            metadata = self._parse_metadata(response)
+            if not stream:
+                content = await response.aread()
+                await response.aclose()
+                return Blob[T](name=name, content=content, metadata=metadata)
+        except BaseException:
+            await response.aclose()
+            raise
+        size = int(response.headers["content-length"]) if "content-length" in response.headers else None
+        return Blob[T](name=name, async_data=self._iter_response(response), metadata=metadata, size=size)
+
+    async def _iter_response(self, response: httpx2.Response) -> AsyncGenerator[bytes]:
+        try:
+            async for chunk in response.aiter_bytes(self.chunk_size):
+                yield chunk
+        finally:
+            await response.aclose()
 
     @override
     async def delete_async(self, name: str) -> None:
@@ -120,37 +285,61 @@ class GcpAsyncBlobStorage[T: BaseBlobMetadata](GcpBaseBlobStorage, BaseAsyncBlob
         Args:
             name: The name of the blob to delete.
         """
-        signed_url = await self._get_signed_url(name, "DELETE")
-        response = await self._httpx_async_client.delete(signed_url)
+        url, headers = await self._authorize(name, "DELETE")
+        response = await self._httpx_async_client.delete(url, headers=headers)
         if response.status_code == 404:
             raise KeyNotExistsException(self.collection_name, self.clazz, name)
         response.raise_for_status()
 
     @override
-    async def names(self, prefix: Optional[str] = None) -> AsyncGenerator[str]:
-        prefix = self.get_full_name(prefix or "")
+    async def names(
+        self, prefix: Optional[str] = None, delimiter: Optional[str] = None, max_results: Optional[int] = None
+    ) -> AsyncGenerator[str]:
+        """Returns names of blobs, optionally filtered by a prefix.
+
+        Args:
+            prefix: The prefix to filter the blobs by.
+            delimiter: Blobs "in subfolders" (with the delimiter after the prefix) are returned
+                as one name ending with the delimiter.
+            max_results: The maximum number of returned names (`None` - all).
+
+        Returns:
+            Names of blobs (relative to the collection).
+        """
         col_name_len = len(self.collection_name) + 1 if self.collection_name else 0
-        for blob in self._bucket.list_blobs(prefix=prefix):
-            yield blob.name[col_name_len:]
+        async for page in self._list_pages(self.get_full_name(prefix or ""), "items(name)", delimiter, max_results):
+            for item in page.get("items", []):
+                yield item["name"][col_name_len:]
+            for folder in page.get("prefixes", []):
+                yield folder[col_name_len:]
 
     @override
-    async def list_blobs(self, prefix: Optional[str] = None) -> AsyncGenerator[BlobHeader[T]]:
+    async def list_blobs(
+        self, prefix: Optional[str] = None, delimiter: Optional[str] = None, max_results: Optional[int] = None
+    ) -> AsyncGenerator[BlobHeader[T]]:
         """Returns a list of blob headers, optionally filtered by a prefix.
 
+        Blobs are listed by JSON API page by page (`list_page_size` blobs), so the event
+        loop is not blocked and the first blobs are returned before all of them are listed.
+
         Args:
             prefix: The prefix to filter the blobs by.
+            delimiter: Blobs "in subfolders" (with the delimiter after the prefix) are skipped.
+            max_results: The maximum number of returned blob headers (`None` - all).
 
         Returns:
             A list of blob headers.
         """
-        prefix = self.get_full_name(prefix or "")
         col_name_len = len(self.collection_name) + 1 if self.collection_name else 0
-        for blob in self._bucket.list_blobs(prefix=prefix):
-            try:
-                metadata = self.clazz.model_validate_unquoted(blob.metadata or {}, blob.content_type, blob.generation)
-                yield BlobHeader(name=blob.name[col_name_len:], metadata=metadata)
-            except Exception as e:
-                _log.warning("Failed to parse metadata for blob '%s': %s", blob.name, e)
+        fields = "items(name,contentType,generation,metadata)"
+        async for page in self._list_pages(self.get_full_name(prefix or ""), fields, delimiter, max_results):
+            for item in page.get("items", []):
+                try:
+                    generation = int(item["generation"]) if "generation" in item else None
+                    metadata = self.clazz.model_validate_unquoted(item.get("metadata"), item.get("contentType"), generation)
+                    yield BlobHeader(name=item["name"][col_name_len:], metadata=metadata)
+                except Exception as e:
+                    _log.warning("Failed to parse metadata for blob '%s': %s", item.get("name"), e)
 
     @override
     async def _upsert_transactional(
@@ -183,10 +372,10 @@ class GcpAsyncBlobStorage[T: BaseBlobMetadata](GcpBaseBlobStorage, BaseAsyncBlob
                 query_parameters = {"ifGenerationMatch": str(generation_to_match)}
                 # According to documentation it should be query parameter but header works !!!
                 headers["x-goog-if-generation-match"] = str(generation_to_match)
-                signed_url = await self._get_signed_url(
+                url, headers = await self._authorize(
                     new_blob.name, "PUT", headers=headers, query_parameters=query_parameters
                 )
-                response = await self._httpx_async_client.put(signed_url, content=new_blob.stream(), headers=headers)
+                response = await self._httpx_async_client.put(url, content=new_blob.stream(), headers=headers)
                 if response.status_code == 412:
                     raise exceptions.PreconditionFailed(response.reason_phrase)
                 response.raise_for_status()
@@ -208,9 +397,15 @@ class GcpAsyncBlobStorage[T: BaseBlobMetadata](GcpBaseBlobStorage, BaseAsyncBlob
             name: The name of the blob.
             metadata: The metadata to put.
         """
-        blob = self._get_blob(name)
-        blob.metadata = metadata.model_dump_quoted()
-        blob.patch()
+        response = await self._httpx_async_client.patch(
+            self._json_api_url(name),
+            params={"fields": "name"},
+            json={"metadata": metadata.model_dump_quoted()},
+            headers=await self._bearer_headers(),
+        )
+        if response.status_code == 404:
+            raise KeyNotExistsException(self.collection_name, self.clazz, name)
+        response.raise_for_status()
 
     async def get_metadata(self, name: str) -> T:
         """Gets metadata for a blob.
@@ -221,8 +416,8 @@ class GcpAsyncBlobStorage[T: BaseBlobMetadata](GcpBaseBlobStorage, BaseAsyncBlob
         Returns:
             The metadata of the blob.
         """
-        signed_url = await self._get_signed_url(name, "GET")
-        response = await self._httpx_async_client.head(signed_url)
+        url, headers = await self._authorize(name, "GET")
+        response = await self._httpx_async_client.head(url, headers=headers)
         if response.status_code == 404:
             raise KeyNotExistsException(self.collection_name, self.clazz, name)
         response.raise_for_status()
@@ -1,7 +1,7 @@
 from typing import Callable, Type, override
 
+import google.auth.credentials
 import httpx2
-from google.cloud import firestore, storage
 from pydantic import BaseModel
 
 from ampf.base import BaseAsyncBlobStorage, BaseAsyncFactory, BaseAsyncStorage
@@ -9,10 +9,29 @@ from ampf.base.blob_model import BaseBlobMetadata, BlobLocation
 
 from .gcp_async_blob_storage import GcpAsyncBlobStorage
 from .gcp_async_storage import GcpAsyncStorage
+from .gcp_clients import GcpClients
 from .gcp_base_factory import GcpBaseFactory
 
 
 class GcpAsyncFactory(GcpBaseFactory, BaseAsyncFactory):
+    """Factory of async Google Cloud storages.
+
+    Clients are created on first use and shared by all created storages (see `GcpClients`),
+    so all blob storages use one credentials object and one pooled HTTP client.
+
+    Args:
+        root_storage: Root collection of all storages.
+        bucket_name: Default bucket of blob storages.
+        project_id: The GCP project ID (`None` - from credentials).
+        database: The Firestore database (`None` - default database).
+        httpx_async_client: HTTP client of blob storages (`None` - one pooled client created on first use).
+        credentials: Credentials of all clients (`None` - `google.auth.default()`).
+        channel_pool_size: Number of async Firestore clients (gRPC channels), storages get them in round-robin order.
+        use_signed_urls: Blob storages send requests to signed URLs instead of using bearer token.
+        native_ttl: Firestore TTL policies are configured for collections with `ttl_field`,
+            so expired documents are not swept (see `GcpAsyncStorage.configure_ttl_policy()`).
+    """
+
     def __init__(
         self,
         root_storage: str | None = None,
@@ -20,28 +39,42 @@ class GcpAsyncFactory(GcpBaseFactory, BaseAsyncFactory):
         project_id: str | None = None,
         database: str | None = None,
         httpx_async_client: httpx2.AsyncClient | None = None,
+        credentials: google.auth.credentials.Credentials | None = None,
+        channel_pool_size: int = 1,
+        use_signed_urls: bool = False,
+        native_ttl: bool = False,
     ):
         super().__init__(root_storage, bucket_name)
         BaseAsyncFactory.__init__(self)
-        self._async_db = firestore.AsyncClient(project=project_id, database=database)
-        self._storage_client = storage.Client(project=project_id)
-        self._httpx_async_client = httpx_async_client
-        self.project_id = project_id or self._async_db.project
+        self.clients = GcpClients(project_id, database, credentials, channel_pool_size, httpx_async_client)
         self.database = database
+        self.use_signed_urls = use_signed_urls
+        self.native_ttl = native_ttl
+
+    @property
+    def project_id(self) -> str:
+        return self.clients.project_id
 
     @override
     def get_project_id(self) -> str:
         return self.project_id
 
+    async def close(self) -> None:
+        """Closes clients created by the factory."""
+        await self.clients.aclose()
+
     def create_storage[T: BaseModel](
         self, collection_name: str, clazz: Type[T], key: Callable[[T], str] | None = None
     ) -> BaseAsyncStorage[T]:
         return GcpAsyncStorage(
             collection_name,
             clazz,
-            db=self._async_db,
+            db=self.clients.get_async_firestore(),
+            database=self.database,
             key=key,
             root_storage=self.root_storage,
+            native_ttl=self.native_ttl,
+            credentials=self.clients.credentials,
         )
 
     def create_blob_storage[T: BaseBlobMetadata](
@@ -61,8 +94,10 @@ class GcpAsyncFactory(GcpBaseFactory, BaseAsyncFactory):
             collection_name=collection_name,
             clazz=clazz,
             content_type=content_type,
-            storage_client=self._storage_client,
-            httpx_async_client=self._httpx_async_client,
+            storage_client=self.clients.get_storage_client(),
+            httpx_async_client=self.clients.get_httpx_async_client(),
+            credentials=self.clients.credentials,
+            use_signed_urls=self.use_signed_urls,
         )
 
     def create_blob_location(self, name: str, bucket: str | None = None) -> BlobLocation:
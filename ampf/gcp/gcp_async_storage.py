@@ -1,21 +1,26 @@
 from __future__ import annotations
 
-from typing import Any, AsyncIterator, Callable, Coroutine, Dict, List, Optional, Type, override
+import asyncio
+from typing import Any, AsyncIterator, Callable, Coroutine, Dict, List, Optional, Tuple, Type, override
 
+import google.auth.credentials
+from google.api_core.exceptions import NotFound
 from google.cloud import firestore
 from google.cloud.firestore_v1.base_query import FieldFilter
 from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
+from google.cloud.firestore_v1.field_path import FieldPath
 from google.cloud.firestore_v1.vector import Vector
 from pydantic import BaseModel
 
-from ampf.base import BaseAsyncQueryStorage, KeyNotExistsException
+from ampf.base import BaseAsyncQueryStorage, ChangeEvent, KeyNotExistsException
 from ampf.base.base_async_query import BaseAsyncQuery
 from ampf.base.base_decorator import BaseDecorator
 from ampf.base.base_query import OP
+from ampf.base.change_tracker import FieldChanges
 from ampf.base.exceptions import KeyExistsException
 from ampf.base.versioned_base_model import VersionedBaseModel, resolve_versioned_class
 
-from .gcp_storage import convert_uuids
+from .gcp_storage import _DISTANCE_FIELD, convert_uuids, firestore_op
 
 
 class GcpAsyncQuery[T: BaseModel | VersionedBaseModel](BaseDecorator[firestore.AsyncQuery], BaseAsyncQuery[T]):
@@ -39,32 +44,65 @@ class GcpAsyncQuery[T: BaseModel | VersionedBaseModel](BaseDecorator[firestore.A
     @override
     def where(self, field: str, op: OP, value: Any) -> GcpAsyncQuery[T]:
         coll_ref = self.decorated
-        coll_ref = coll_ref.where(filter=FieldFilter(field, op, convert_uuids(value)))
-        return GcpAsyncQuery(coll_ref, self.clazz, self.embedding_field_name, self.embedding_search_limit)
+        coll_ref = coll_ref.where(filter=FieldFilter(field, firestore_op(op), convert_uuids(value)))
+        ret = GcpAsyncQuery(coll_ref, self.clazz, self.embedding_field_name, self.embedding_search_limit)
+        ret.from_storage = self.from_storage
+        return ret
 
-    async def find_nearest(self, embedding: List[float], limit: Optional[int] = None) -> AsyncIterator[T]:
+    async def find_nearest(
+        self,
+        embedding: List[float],
+        limit: Optional[int] = None,
+        distance_threshold: Optional[float] = None,
+        distance_result_field: Optional[str] = None,
+    ) -> AsyncIterator[T]:
         """Finds the nearest knowledge base items to the given vector.
 
+        Filters of the query are applied by Firestore before the vector search
+        (it requires a composite vector index).
+
         Args:
             embedding: The vector to search for.
             limit: The maximum number of results to return.
+            distance_threshold: The maximum cosine distance of returned items.
+            distance_result_field: The field of items where Firestore stores their distance.
         Returns:
             An iterator of the nearest items.
         """
-        coll_ref = self.decorated
-        async for ds in coll_ref.find_nearest(
+        async for item, _ in self._find_nearest(embedding, limit, distance_threshold, distance_result_field):
+            yield item
+
+    async def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
+        return [
+            (item, distance)
+            async for item, distance in self._find_nearest(embedding, limit, distance_threshold, _DISTANCE_FIELD)
+        ]
+
+    async def _find_nearest(
+        self,
+        embedding: List[float],
+        limit: Optional[int],
+        distance_threshold: Optional[float],
+        distance_result_field: Optional[str],
+    ) -> AsyncIterator[Tuple[T, Optional[float]]]:
+        async for ds in self.decorated.find_nearest(
             vector_field=self.embedding_field_name,
             query_vector=Vector(embedding),
             distance_measure=DistanceMeasure.COSINE,
             limit=limit or self.embedding_search_limit,
+            distance_threshold=distance_threshold,
+            distance_result_field=distance_result_field,
         ).stream():  # type: ignore
             d = ds.to_dict()
             if not d:
                 continue
+            distance = d.pop(_DISTANCE_FIELD, None)
             ret = self.from_storage(d)
             if isinstance(ret, Coroutine):
                 ret = await ret
-            yield ret
+            yield ret, distance
 
     @override
     async def get_all(self, order_by: Optional[List[str | tuple[str, Any]]] = None) -> AsyncIterator[T]:
@@ -93,7 +131,14 @@ class GcpAsyncQuery[T: BaseModel | VersionedBaseModel](BaseDecorator[firestore.A
 
 
 class GcpAsyncStorage[T: BaseModel | VersionedBaseModel](BaseAsyncQueryStorage[T]):
-    """A simple wrapper around Google Cloud Firestore."""
+    """A simple wrapper around Google Cloud Firestore.
+
+    Args:
+        native_ttl: Firestore TTL policy is configured for the collection, so expired
+            documents are not swept by `TtlAsyncStorage` (see `configure_ttl_policy()`).
+        credentials: Credentials of the admin client used by `configure_ttl_policy()`
+            (`None` - `google.auth.default()`).
+    """
 
     def __init__(
         self,
@@ -106,12 +151,18 @@ class GcpAsyncStorage[T: BaseModel | VersionedBaseModel](BaseAsyncQueryStorage[T
         embedding_field_name: str = "embedding",
         embedding_search_limit: int = 5,
         root_storage: Optional[str] = None,
+        native_ttl: bool = False,
+        credentials: Optional[google.auth.credentials.Credentials] = None,
     ):
         super().__init__(collection, clazz, key, embedding_field_name, embedding_search_limit)
         self._db = db or firestore.AsyncClient(project=project, database=database)
+        self.database = database
+        self.native_ttl = native_ttl
+        self._credentials = credentials
         self.root_storage = root_storage
         self._collection = f"{root_storage}/{collection}" if root_storage else collection
         self._coll_ref = self._db.collection(self._collection)
+        self._watch_db: Optional[firestore.Client] = None
 
     def on_before_save(self, data: Dict[str, Any]) -> dict:
         """Converts the embedding field to a Vector object.
@@ -122,7 +173,7 @@ class GcpAsyncStorage[T: BaseModel | VersionedBaseModel](BaseAsyncQueryStorage[T
             The preprocessed data.
         """
         data = convert_uuids(data)  # type: ignore
-        if self.embedding_field_name in data:
+        if isinstance(data.get(self.embedding_field_name), list):
             data[self.embedding_field_name] = Vector(data[self.embedding_field_name])
         return data
 
@@ -131,6 +182,14 @@ class GcpAsyncStorage[T: BaseModel | VersionedBaseModel](BaseAsyncQueryStorage[T
         data_dict = self.to_storage(data)
         if isinstance(data_dict, Coroutine):
             data_dict = await data_dict
+        changes = self._changes(key, data, data_dict)
+        if changes is not None:
+            # Only changed fields are written (or nothing at all)
+            if changes:
+                await self._update_fields(key, data_dict, changes)
+            await self._track(data, data_dict)
+            return
+        stored = data_dict
         data_dict = self.on_before_save(data_dict)  # Preprocess data
         new_key = self.get_key(data)
         # If the key of the value has changed, remove the old key
@@ -145,6 +204,20 @@ class GcpAsyncStorage[T: BaseModel | VersionedBaseModel](BaseAsyncQueryStorage[T
                 await run_in_transaction(transaction)
         else:
             await self._coll_ref.document(new_key).set(data_dict)
+        await self._track(data, stored)
+
+    async def _update_fields(self, key: Any, data_dict: Dict[str, Any], changes: FieldChanges) -> None:
+        """Updates changed fields of the document (the whole document is set if it doesn't exist)."""
+        update: Dict[str, Any] = {
+            FieldPath(name).to_api_repr(): value for name, value in self.on_before_save(changes.updated).items()
+        }
+        for name in changes.removed:
+            update[FieldPath(name).to_api_repr()] = firestore.DELETE_FIELD
+        doc_ref = self._coll_ref.document(str(key))
+        try:
+            await doc_ref.update(update)
+        except NotFound:
+            await doc_ref.set(self.on_before_save(data_dict))
 
     async def patch(self, key: Any, patch_data: BaseModel | Dict[str, Any]) -> T:
         """Patch the object with new data.
@@ -172,10 +245,18 @@ class GcpAsyncStorage[T: BaseModel | VersionedBaseModel](BaseAsyncQueryStorage[T
         if isinstance(new_value, Coroutine):
             new_value = await new_value
         if self.get_key(new_value) != key:
+            self._forget_tracked([key])
             await doc_ref.delete()
             await self.create(new_value)
         return new_value
 
+    async def increment(self, key: Any, field: str, delta: int | float = 1) -> None:
+        """Atomically adds `delta` to the field (Firestore `Increment` transform, no read)."""
+        try:
+            await self._coll_ref.document(str(key)).update({FieldPath(field).to_api_repr(): firestore.Increment(delta)})
+        except NotFound:
+            raise KeyNotExistsException(self.collection_name, self.clazz, key)
+
     async def get(self, key: Any) -> T:
         """Get a document from the collection."""
         doc = await self._coll_ref.document(str(key)).get()
@@ -184,10 +265,26 @@ class GcpAsyncStorage[T: BaseModel | VersionedBaseModel](BaseAsyncQueryStorage[T
             ret = self.from_storage(data)
             if isinstance(ret, Coroutine):
                 ret = await ret
-            return ret
+            return await self._track(ret)
         else:
             raise KeyNotExistsException(self.collection_name, self.clazz, key)
 
+    async def get_many(self, keys: List[Any]) -> Dict[str, T]:
+        """Get documents in one batched read (at most 500 documents per request)."""
+        unique = list(dict.fromkeys(str(key) for key in keys))
+        ret = {}
+        for i in range(0, len(unique), 500):
+            refs = [self._coll_ref.document(key) for key in unique[i : i + 500]]
+            async for doc in self._db.get_all(refs):
+                data = doc.to_dict()
+                if not data:
+                    continue
+                value = self.from_storage(data)
+                if isinstance(value, Coroutine):
+                    value = await value
+                ret[doc.id] = await self._track(value)
+        return ret
+
     async def keys(self) -> AsyncIterator[str]:
         """Return a list of keys in the collection."""
         async for doc in self._coll_ref.stream():
@@ -195,6 +292,7 @@ class GcpAsyncStorage[T: BaseModel | VersionedBaseModel](BaseAsyncQueryStorage[T
 
     async def delete(self, key: Any) -> None:
         """Delete a document from the collection."""
+        self._forget_tracked([key])
         doc_ref = self._coll_ref.document(str(key))
         doc = await doc_ref.get()
         if doc.exists:
@@ -202,8 +300,55 @@ class GcpAsyncStorage[T: BaseModel | VersionedBaseModel](BaseAsyncQueryStorage[T
         else:
             raise KeyNotExistsException(key)
 
+    async def configure_ttl_policy(self, ttl_field: str) -> None:
+        """Configures Firestore TTL policy for the collection (group).
+
+        It is a one-off admin call which requires Datastore Owner role, so usually
+        it is run once during deployment (the blocking admin client runs in a thread).
+        Firestore deletes expired documents within 24 hours after their expiration time,
+        so after the policy is configured, the storage is marked as `native_ttl`.
+
+        Args:
+            ttl_field: Name of the field with expiration time (timestamp).
+        """
+        await asyncio.to_thread(self._configure_ttl_policy, ttl_field)
+        self.native_ttl = True
+
+    def _configure_ttl_policy(self, ttl_field: str) -> None:
+        from google.cloud import firestore_admin_v1
+
+        client = firestore_admin_v1.FirestoreAdminClient(credentials=self._credentials)
+        collection_group = self._collection.split("/")[-1]
+        name = client.field_path(self._db.project, self.database or "(default)", collection_group, ttl_field)
+        operation = client.update_field(
+            field=firestore_admin_v1.Field(name=name, ttl_config=firestore_admin_v1.Field.TtlConfig()),
+            update_mask={"paths": ["ttl_config"]},
+        )
+        operation.result()
+
+    async def put_many(self, values: List[T]) -> None:
+        """Put documents in batches (at most 500 operations per batch)."""
+        for i in range(0, len(values), 500):
+            batch = self._db.batch()
+            for value in values[i : i + 500]:
+                data_dict = self.to_storage(value)
+                if isinstance(data_dict, Coroutine):
+                    data_dict = await data_dict
+                batch.set(self._coll_ref.document(self.get_key(value)), self.on_before_save(data_dict))
+            await batch.commit()
+
+    async def delete_many(self, keys: List[Any]) -> None:
+        """Delete documents in batches (at most 500 operations per batch)."""
+        self._forget_tracked(keys)
+        for i in range(0, len(keys), 500):
+            batch = self._db.batch()
+            for key in keys[i : i + 500]:
+                batch.delete(self._coll_ref.document(str(key)))
+            await batch.commit()
+
     async def drop(self) -> None:
         """Delete all documents from the collection."""
+        self._forget_tracked()
         async for doc in self._coll_ref.stream():
             await doc.reference.delete()
 
@@ -222,7 +367,59 @@ class GcpAsyncStorage[T: BaseModel | VersionedBaseModel](BaseAsyncQueryStorage[T
                 ret = self.from_storage(data_dict)
                 if isinstance(ret, Coroutine):
                     ret = await ret
-                yield ret
+                yield await self._track(ret)
+
+    async def watch(
+        self, poll_interval: float = 1.0, ready: Optional[asyncio.Event] = None
+    ) -> AsyncIterator[ChangeEvent[T]]:
+        """Watches the collection and yields changes made after the call.
+
+        Changes are delivered by Firestore snapshot listener (`on_snapshot`).
+
+        Args:
+            poll_interval: How often (in seconds) the listener is checked. If it is
+                disconnected, `ConnectionError` is raised.
+            ready: Set when the listener receives its first snapshot.
+        """
+        if not self._watch_db:
+            # Snapshot listeners are available only in the synchronous client
+            self._watch_db = firestore.Client(
+                project=self._db.project, credentials=self._credentials, database=self.database
+            )
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        initial = True
+
+        def on_snapshot(_, changes, __):
+            nonlocal initial
+            if initial:
+                # The first snapshot contains all existing documents
+                initial = False
+                if ready:
+                    loop.call_soon_threadsafe(ready.set)
+                return
+            for change in changes:
+                change_type = change.type.name.lower()
+                data = change.document.to_dict() if change_type != "removed" else None
+                loop.call_soon_threadsafe(queue.put_nowait, (change_type, change.document.id, data))
+
+        watch = self._watch_db.collection(self._collection).on_snapshot(on_snapshot)
+        try:
+            while True:
+                try:
+                    change_type, key, data = await asyncio.wait_for(queue.get(), poll_interval)
+                except asyncio.TimeoutError:
+                    if not watch.is_active:
+                        raise ConnectionError(f"Snapshot listener of {self._collection} disconnected")
+                    continue
+                value = None
+                if data:
+                    value = self.from_storage(data)
+                    if isinstance(value, Coroutine):
+                        value = await value
+                yield ChangeEvent(change_type, key, value)
+        finally:
+            watch.unsubscribe()
 
     async def create(self, value: T) -> None:
         """Adds to collection a new element but only if such key doesn't already exist"""
@@ -242,31 +439,42 @@ class GcpAsyncStorage[T: BaseModel | VersionedBaseModel](BaseAsyncQueryStorage[T
         async with self._db.transaction() as transaction:
             await create_in_transaction(transaction)
 
-    async def find_nearest(self, embedding: List[float], limit: Optional[int] = None) -> AsyncIterator[T]:
+    async def find_nearest(
+        self,
+        embedding: List[float],
+        limit: Optional[int] = None,
+        distance_threshold: Optional[float] = None,
+        distance_result_field: Optional[str] = None,
+    ) -> AsyncIterator[T]:
         """Finds the nearest knowledge base items to the given vector.
 
         Args:
             embedding: The vector to search for.
             limit: The maximum number of results to return.
+            distance_threshold: The maximum cosine distance of returned items.
+            distance_result_field: The field of items where Firestore stores their distance.
         Returns:
             An iterator of the nearest items.
         """
-        async for ds in self._coll_ref.find_nearest(
-            vector_field=self.embedding_field_name,
-            query_vector=Vector(embedding),
-            distance_measure=DistanceMeasure.COSINE,
-            limit=limit or self.embedding_search_limit,
-        ).stream():  # type: ignore
-            ret = self.from_storage(ds.to_dict())
-            if isinstance(ret, Coroutine):
-                ret = await ret
-            yield ret
+        query = self._query()
+        async for item in query.find_nearest(embedding, limit, distance_threshold, distance_result_field):
+            yield item
+
+    async def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
+        return await self._query().find_nearest_with_distances(embedding, limit, distance_threshold)
+
+    def _query(self) -> GcpAsyncQuery[T]:
+        ret = GcpAsyncQuery(self._coll_ref, self.clazz, self.embedding_field_name, self.embedding_search_limit)
+        ret.from_storage = self.from_storage
+        return ret
 
     @override
     def where(self, field: str, op: OP, value: Any) -> GcpAsyncQuery[T]:
         """Apply a filter to the query"""
         coll_ref = self._coll_ref
-        coll_ref = coll_ref.where(field, op, convert_uuids(value))
+        coll_ref = coll_ref.where(field, firestore_op(op), convert_uuids(value))
         ret = GcpAsyncQuery(coll_ref, self.clazz, self.embedding_field_name, self.embedding_search_limit)
         ret.from_storage = self.from_storage
         return ret
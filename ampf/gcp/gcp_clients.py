@@ -0,0 +1,131 @@
+"""Google Cloud clients created lazily and shared by storages of a factory"""
+
+import itertools
+import logging
+import threading
+from typing import List, Optional
+
+import google.auth
+import google.auth.credentials
+import httpx2
+from google.cloud import firestore, storage
+
+_log = logging.getLogger(__name__)
+
+SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+
+
+class GcpClients:
+    """Google Cloud clients created on first use and shared by all storages of a factory.
+
+    Credentials are resolved once (`google.auth.default()`) and passed to all
+    clients. Async Firestore clients are kept in a pool of `channel_pool_size`
+    clients (each of them has its own gRPC channel) and given out in round-robin
+    order, so high-QPS applications can spread the load over several channels.
+
+    Args:
+        project_id: The GCP project ID (`None` - from credentials).
+        database: The Firestore database (`None` - default database).
+        credentials: Credentials of all clients (`None` - `google.auth.default()`).
+        channel_pool_size: Number of async Firestore clients (gRPC channels).
+        httpx_async_client: HTTP client of blob storages (`None` - one pooled client created on first use).
+    """
+
+    def __init__(
+        self,
+        project_id: Optional[str] = None,
+        database: Optional[str] = None,
+        credentials: Optional[google.auth.credentials.Credentials] = None,
+        channel_pool_size: int = 1,
+        httpx_async_client: Optional[httpx2.AsyncClient] = None,
+    ):
+        if channel_pool_size < 1:
+            raise ValueError("channel_pool_size must be at least 1")
+        self.database = database
+        self.channel_pool_size = channel_pool_size
+        self._project_id = project_id
+        self._credentials = credentials
+        self._httpx_async_client = httpx_async_client
+        self._own_httpx_async_client = False
+        self._db: Optional[firestore.Client] = None
+        self._async_dbs: List[firestore.AsyncClient] = []
+        self._async_db_counter = itertools.count()
+        self._storage_client: Optional[storage.Client] = None
+        self._lock = threading.RLock()
+
+    @property
+    def credentials(self) -> google.auth.credentials.Credentials:
+        """Credentials shared by all clients."""
+        if self._credentials is None:
+            with self._lock:
+                if self._credentials is None:
+                    _log.debug("Resolving default GCP credentials")
+                    credentials, project_id = google.auth.default(scopes=SCOPES)
+                    self._project_id = self._project_id or project_id
+                    self._credentials = credentials
+        return self._credentials
+
+    @property
+    def project_id(self) -> str:
+        """The GCP project ID (given or resolved from credentials)."""
+        if self._project_id is None:
+            credentials = self.credentials
+            if self._project_id is None:
+                self._project_id = getattr(credentials, "project_id", None) or self.get_firestore().project
+        return self._project_id  # type: ignore
+
+    def get_firestore(self) -> firestore.Client:
+        """Returns the sync Firestore client."""
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    # Credentials are resolved first, they may fill the project ID.
+                    creds = self.credentials
+                    self._db = firestore.Client(project=self._project_id, credentials=creds, database=self.database)
+        return self._db
+
+    def get_async_firestore(self) -> firestore.AsyncClient:
+        """Returns the next async Firestore client from the pool."""
+        with self._lock:
+            i = next(self._async_db_counter) % self.channel_pool_size
+            if i == len(self._async_dbs):
+                _log.debug("Creating async Firestore client %d/%d", i + 1, self.channel_pool_size)
+                creds = self.credentials
+                self._async_dbs.append(
+                    firestore.AsyncClient(project=self._project_id, credentials=creds, database=self.database)
+                )
+            return self._async_dbs[i]
+
+    def get_storage_client(self) -> storage.Client:
+        """Returns the Cloud Storage client."""
+        if self._storage_client is None:
+            with self._lock:
+                if self._storage_client is None:
+                    creds = self.credentials
+                    self._storage_client = storage.Client(project=self._project_id, credentials=creds)
+        return self._storage_client
+
+    def get_httpx_async_client(self) -> httpx2.AsyncClient:
+        """Returns the HTTP client shared by blob storages (one connection pool)."""
+        if self._httpx_async_client is None:
+            with self._lock:
+                if self._httpx_async_client is None:
+                    self._httpx_async_client = httpx2.AsyncClient()
+                    self._own_httpx_async_client = True
+        return self._httpx_async_client
+
+    async def aclose(self) -> None:
+        """Closes created clients (a given HTTP client is left open).
+
+        Async Firestore clients are forgotten, so new ones are created on next use.
+        """
+        with self._lock:
+            async_dbs = self._async_dbs
+            self._async_dbs = []
+            self._async_db_counter = itertools.count()
+        for db in async_dbs:
+            db.close()
+        if self._own_httpx_async_client and self._httpx_async_client is not None:
+            await self._httpx_async_client.aclose()
+            self._httpx_async_client = None
+            self._own_httpx_async_client = False
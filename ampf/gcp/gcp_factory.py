@@ -1,7 +1,7 @@
 import logging
 from typing import Callable, Type, override
 
-from google.cloud import firestore, storage
+import google.auth.credentials
 from pydantic import BaseModel
 
 from ampf.base.blob_model import BaseBlobMetadata
@@ -10,27 +10,44 @@ from ..base import BaseAsyncStorage, BaseBlobStorage, BaseFactory, BaseStorage
 from .gcp_async_storage import GcpAsyncStorage
 from .gcp_base_factory import GcpBaseFactory
 from .gcp_blob_storage import GcpBlobStorage
+from .gcp_clients import GcpClients
 from .gcp_storage import GcpStorage
 
 _log = logging.getLogger(__name__)
 
 
 class GcpFactory(GcpBaseFactory, BaseFactory):
+    """Factory of Google Cloud storages.
+
+    Clients are created on first use and shared by all created storages (see `GcpClients`).
+
+    Args:
+        root_storage: Root collection of all storages.
+        bucket_name: Default bucket of blob storages.
+        project_id: The GCP project ID (`None` - from credentials).
+        database: The Firestore database (`None` - default database).
+        credentials: Credentials of all clients (`None` - `google.auth.default()`).
+        channel_pool_size: Number of async Firestore clients (gRPC channels) used by async storages.
+    """
+
     def __init__(
         self,
         root_storage: str | None = None,
         bucket_name: str | None = None,
         project_id: str | None = None,
         database: str | None = None,
+        credentials: google.auth.credentials.Credentials | None = None,
+        channel_pool_size: int = 1,
     ):
         super().__init__(root_storage, bucket_name)
         BaseFactory.__init__(self)
-        self._db = firestore.Client(project=project_id, database=database)
-        self._async_db = firestore.AsyncClient(project=project_id, database=database)
-        self._storage_client = storage.Client(project=project_id)
-        self.project_id = project_id or self._db.project
+        self.clients = GcpClients(project_id, database, credentials, channel_pool_size)
         self.database = database
 
+    @property
+    def project_id(self) -> str:
+        return self.clients.project_id
+
     @override
     def get_project_id(self) -> str:
         return self.project_id
@@ -45,7 +62,7 @@ class GcpFactory(GcpBaseFactory, BaseFactory):
         return GcpStorage(
             collection_name,
             clazz,
-            db=self._db,
+            db=self.clients.get_firestore(),
             key_name=key_name,
             key=key,
             root_storage=self.root_storage,
@@ -68,7 +85,7 @@ class GcpFactory(GcpBaseFactory, BaseFactory):
             collection_name=collection_name,
             clazz=clazz,
             content_type=content_type,
-            storage_client=self._storage_client,
+            storage_client=self.clients.get_storage_client(),
         )
 
     def create_async_storage[T: BaseModel](
@@ -82,6 +99,6 @@ class GcpFactory(GcpBaseFactory, BaseFactory):
         return GcpAsyncStorage(
             f"{self.root_storage}/{collection_name}" if self.root_storage else collection_name,
             clazz,
-            db=self._async_db,
+            db=self.clients.get_async_firestore(),
             key=key or key_name,
         )
@@ -1,14 +1,13 @@
 from __future__ import annotations
 
 import uuid
-from typing import Any, Callable, Dict, Iterator, List, Optional, Type, override
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type, override
 
 from google.cloud import exceptions, firestore
 from google.cloud.firestore import DocumentReference
 from google.cloud.firestore_v1.base_query import FieldFilter
 from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
 from google.cloud.firestore_v1.vector import Vector
-from google.cloud.firestore_v1.vector_query import VectorQuery
 from pydantic import BaseModel
 
 from ampf.base.base_decorator import BaseDecorator
@@ -28,6 +27,24 @@ def convert_uuids(obj):
         return obj
 
 
+def firestore_op(op: OP) -> OP:
+    """Returns the operator if it is supported by Firestore.
+
+    Raises:
+        ValueError: For `"contains_text"` (use `TextSearchAsyncStorage` or filter items in Python).
+    """
+    if op == "contains_text":
+        raise ValueError(
+            'Firestore does not support the "contains_text" operator; '
+            "wrap the storage in TextSearchAsyncStorage or filter items in Python"
+        )
+    return op
+
+
+_DISTANCE_FIELD = "_ampf_distance"
+"""Field of documents returned by vector search where Firestore stores their distance"""
+
+
 class GcpQuery[T: BaseModel](BaseDecorator[firestore.Query], BaseQuery[T]):
     def __init__(
         self,
@@ -49,26 +66,55 @@ class GcpQuery[T: BaseModel](BaseDecorator[firestore.Query], BaseQuery[T]):
     @override
     def where(self, field: str, op: OP, value: Any) -> GcpQuery[T]:
         coll_ref = self.decorated
-        coll_ref = coll_ref.where(filter=FieldFilter(field, op, convert_uuids(value)))
-        return GcpQuery(coll_ref, self.clazz)
+        coll_ref = coll_ref.where(filter=FieldFilter(field, firestore_op(op), convert_uuids(value)))
+        return GcpQuery(coll_ref, self.clazz, self.embedding_field_name, self.embedding_search_limit)
 
-    def find_nearest(self, embedding: List[float], limit: Optional[int] = None) -> Iterator[T]:
+    def find_nearest(
+        self,
+        embedding: List[float],
+        limit: Optional[int] = None,
+        distance_threshold: Optional[float] = None,
+        distance_result_field: Optional[str] = None,
+    ) -> Iterator[T]:
         """Finds the nearest knowledge base items to the given vector."
 
+        Filters of the query are applied by Firestore before the vector search
+        (it requires a composite vector index).
+
         Args:
             embedding: The vector to search for.
             limit: The maximum number of results to return.
+            distance_threshold: The maximum cosine distance of returned items.
+            distance_result_field: The field of items where Firestore stores their distance.
         Returns:
             An iterator of the nearest items.
         """
-        coll_ref = self.decorated
-        for ds in coll_ref.find_nearest(
+        for item, _ in self._find_nearest(embedding, limit, distance_threshold, distance_result_field):
+            yield item
+
+    def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
+        return list(self._find_nearest(embedding, limit, distance_threshold, _DISTANCE_FIELD))  # type: ignore
+
+    def _find_nearest(
+        self,
+        embedding: List[float],
+        limit: Optional[int],
+        distance_threshold: Optional[float],
+        distance_result_field: Optional[str],
+    ) -> Iterator[Tuple[T, Optional[float]]]:
+        for ds in self.decorated.find_nearest(
             vector_field=self.embedding_field_name,
             query_vector=Vector(embedding),
             distance_measure=DistanceMeasure.COSINE,
             limit=limit or self.embedding_search_limit,
+            distance_threshold=distance_threshold,
+            distance_result_field=distance_result_field,
         ).stream():  # type: ignore
-            yield self.clazz.model_validate(ds.to_dict())
+            d = ds.to_dict() or {}
+            distance = d.pop(_DISTANCE_FIELD, None)
+            yield self.clazz.model_validate(d), distance
 
     @override
     def get_all(self, order_by: Optional[List[str | tuple[str, Any]]] = None) -> Iterator[T]:
@@ -220,23 +266,31 @@ class GcpStorage[T: BaseModel](BaseQueryStorage[T]):
         for doc in self._coll_ref.stream():
             doc.reference.delete()
 
-    def find_nearest(self, embedding: List[float], limit: Optional[int] = None) -> Iterator[T]:
+    def find_nearest(
+        self,
+        embedding: List[float],
+        limit: Optional[int] = None,
+        distance_threshold: Optional[float] = None,
+        distance_result_field: Optional[str] = None,
+    ) -> Iterator[T]:
         """Finds the nearest knowledge base items to the given vector."
 
         Args:
             embedding: The vector to search for.
             limit: The maximum number of results to return.
+            distance_threshold: The maximum cosine distance of returned items.
+            distance_result_field: The field of items where Firestore stores their distance.
         Returns:
             An iterator of the nearest items.
         """
-        vq: VectorQuery = self._coll_ref.find_nearest(
-            vector_field=self.embedding_field_name,
-            query_vector=Vector(embedding),
-            distance_measure=DistanceMeasure.COSINE,
-            limit=limit or self.embedding_search_limit,
-        ).get()  # type: ignore
-        for ds in vq:  # type: ignore
-            yield self.clazz(**ds.to_dict())
+        query = GcpQuery(self._coll_ref, self.clazz, self.embedding_field_name, self.embedding_search_limit)
+        return query.find_nearest(embedding, limit, distance_threshold, distance_result_field)
+
+    def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
+        query = GcpQuery(self._coll_ref, self.clazz, self.embedding_field_name, self.embedding_search_limit)
+        return query.find_nearest_with_distances(embedding, limit, distance_threshold)
 
     def create_collection[C: BaseModel](
         self,
@@ -253,5 +307,5 @@ class GcpStorage[T: BaseModel](BaseQueryStorage[T]):
     def where(self, field: str, op: OP, value: Any) -> GcpQuery[T]:
         """Apply a filter to the query"""
         coll_ref = self._coll_ref
-        coll_ref = coll_ref.where(field, op, convert_uuids(value))
+        coll_ref = coll_ref.where(field, firestore_op(op), convert_uuids(value))
         return GcpQuery(coll_ref, self.clazz, self.embedding_field_name, self.embedding_search_limit)
\ No newline at end of file
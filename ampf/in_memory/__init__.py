@@ -1,6 +1,7 @@
 from .in_memory_factory import InMemoryFactory
 from .in_memory_async_factory import InMemoryAsyncFactory
 from .in_memory_storage import InMemoryStorage
+from .in_memory_array_storage import InMemoryArrayStorage
 from .in_memory_async_storage import InMemoryAsyncStorage
 from .in_memory_blob_storage import InMemoryBlobStorage
 from .in_memory_blob_async_storage import InMemoryBlobAsyncStorage, InMemoryAsyncBlobStorage
@@ -8,6 +9,7 @@ from .in_memory_blob_async_storage import InMemoryBlobAsyncStorage, InMemoryAsyn
 
 __all__ = [
     "InMemoryStorage",
+    "InMemoryArrayStorage",
     "InMemoryAsyncFactory",
     "InMemoryAsyncStorage",
     "InMemoryFactory",
@@ -0,0 +1,167 @@
+"""Queries evaluated on columns of `InMemoryArrayStorage` instead of materialized items"""
+
+from __future__ import annotations
+
+import operator
+from array import array
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from ampf.base.base_async_query import BaseAsyncQuery
+from ampf.base.base_query import OP, BaseQuery
+from ampf.base.similarity import NearestCollector
+from ampf.base.text_index import contains_text
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional - filters are evaluated in Python then
+    np = None
+
+if TYPE_CHECKING:
+    from .in_memory_array_storage import InMemoryArrayStorage, _Column
+
+type Filter = Tuple[str, OP, Any]
+
+_ORDERING = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+_TESTS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    **_ORDERING,
+    "in": lambda v, value: v in value,
+    "array_contains_any": lambda v, value: v is not None and any(e in value for e in v),
+    "contains_text": contains_text,
+}
+_NUMPY_TYPES = {"q": "int64", "d": "float64", "b": "int8"}
+
+
+class ColumnarQuery[T: BaseModel](BaseQuery[T]):
+    """Query of `InMemoryArrayStorage` evaluated on its columns.
+
+    Filters are collected by `where()` and evaluated together by `get_all()`:
+    numeric columns with NumPy (boolean masks, if it is installed), the other ones
+    by one scan of the column. Only matching items are materialized.
+    Items with `None` value don't match ordering operators (`<`, `<=`, `>`, `>=`).
+
+    Args:
+        storage: Queried storage.
+        filters: Filters (`field`, `op`, `value`) applied to the storage.
+    """
+
+    def __init__(self, storage: InMemoryArrayStorage[T], filters: Sequence[Filter] = ()):
+        super().__init__(self._get_all, storage.embedding_field_name, storage.embedding_search_limit)
+        self.storage = storage
+        self.filters = tuple(filters)
+
+    def where(self, field: str, op: OP, value: Any) -> BaseQuery[T]:
+        if op not in _TESTS:
+            raise ValueError(f"Unknown operator {op}")
+        if field not in self.storage._table.columns_by_name:
+            # Not stored field (e.g. property) - filtered on materialized items
+            return BaseQuery.where(self, field, op, value)
+        return ColumnarQuery(self.storage, self.filters + ((field, op, value),))
+
+    def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
+        """Scores embeddings of matching rows on the column, only the nearest items are materialized."""
+        table = self.storage._table
+        column = table.columns_by_name.get(self.embedding_field_name)
+        if column is None:
+            return super().find_nearest_with_distances(embedding, limit, distance_threshold)
+        nearest: NearestCollector[str] = NearestCollector(
+            embedding, limit or self.embedding_search_limit, distance_threshold
+        )
+        values = column.values
+        for row in self._rows():
+            stored = values[row]
+            nearest.add(table.keys[row], stored if column.kind == "floats" else column.decode(stored))
+        return [(self.storage.get(key), distance) for key, distance in nearest.result()]
+
+    def keys(self) -> List[str]:
+        """Returns keys of matching items (without materializing them)."""
+        table = self.storage._table
+        return [table.keys[row] for row in self._rows()]
+
+    def _get_all(self) -> Iterator[T]:
+        for key in self.keys():
+            # The item could have been deleted while iterating
+            if self.storage.key_exists(key):
+                yield self.storage.get(key)
+
+    def _rows(self) -> Sequence[int]:
+        columns = self.storage._table.columns_by_name
+        size = len(self.storage._table.keys)
+        vectorized: List[Filter] = []
+        scanned: List[Filter] = []
+        for field, op, value in self.filters:
+            (vectorized if _is_vectorizable(columns[field], op, value) else scanned).append((field, op, value))
+        rows: Optional[Sequence[int]] = None
+        if vectorized and size:
+            mask = np.ones(size, dtype=bool)  # type: ignore
+            for field, op, value in vectorized:
+                mask &= _numpy_mask(columns[field].values, op, value)  # type: ignore
+            rows = np.flatnonzero(mask).tolist()  # type: ignore
+        # The rest of filters only checks rows matching the previous ones
+        for field, op, value in scanned:
+            rows = _scan(columns[field], op, value, rows)
+        return range(size) if rows is None else rows
+
+
+class ColumnarAsyncQuery[T: BaseModel](BaseAsyncQuery[T]):
+    """Asynchronous interface of `ColumnarQuery` (for `InMemoryAsyncStorage`)
+
+    Args:
+        query: Wrapped synchronous query.
+    """
+
+    def __init__(self, query: BaseQuery[T]):
+        super().__init__(self._get_all, query.embedding_field_name, query.embedding_search_limit)
+        self.query = query
+
+    def where(self, field: str, op: OP, value: Any) -> BaseAsyncQuery[T]:
+        return ColumnarAsyncQuery(self.query.where(field, op, value))
+
+    async def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
+        return self.query.find_nearest_with_distances(embedding, limit, distance_threshold)
+
+    async def _get_all(self) -> AsyncIterator[T]:
+        for item in self.query.get_all():
+            yield item
+
+
+def _is_vectorizable(column: _Column, op: OP, value: Any) -> bool:
+    if np is None or not isinstance(column.values, array):
+        return False
+    if op == "in":
+        return isinstance(value, (list, tuple, set, frozenset)) and all(_is_number(v) for v in value)
+    return op != "array_contains_any" and _is_number(value)
+
+
+def _is_number(value: Any) -> bool:
+    if isinstance(value, int):
+        # Comparison with an int out of int64 range is left to Python
+        return -(2**63) <= value < 2**63
+    return isinstance(value, float)
+
+
+def _numpy_mask(values: array, op: OP, value: Any) -> Any:
+    # The view must not outlive the call - the array can't grow while its buffer is exported
+    view = np.frombuffer(values, dtype=_NUMPY_TYPES[values.typecode])  # type: ignore
+    if op == "in":
+        return np.isin(view, list(value))  # type: ignore
+    return _TESTS[op](view, value)
+
+
+def _scan(column: _Column, op: OP, value: Any, rows: Optional[Sequence[int]]) -> List[int]:
+    values = column.values
+    decode = column.decoder
+    test = _TESTS[op]
+    indexed = enumerate(values) if rows is None else ((row, values[row]) for row in rows)
+    if decode is not None:
+        indexed = ((row, v if v is None else decode(v)) for row, v in indexed)
+    if op in _ORDERING:
+        return [row for row, v in indexed if v is not None and test(v, value)]
+    return [row for row, v in indexed if test(v, value)]
@@ -0,0 +1,312 @@
+"""In memory storage keeping items in columns (arrays) instead of dictionaries"""
+
+from __future__ import annotations
+
+import sys
+import weakref
+from array import array
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from types import NoneType, UnionType
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Tuple, Type, Union, get_args, get_origin
+from uuid import UUID
+
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+
+from ampf.base import KeyNotExistsException
+from ampf.base.base_query import OP, BaseQuery
+from ampf.base.base_query_storage import BaseQueryStorage
+
+from .columnar_query import ColumnarQuery
+
+from .in_memory_storage import InMemoryStorage
+
+type ColumnKind = Literal["int", "float", "bool", "str", "object", "floats", "strs", "json"]
+
+_ARRAY_TYPECODES = {"int": "q", "float": "d", "bool": "b"}
+_IMMUTABLE_TYPES = (int, float, bool, str, bytes, datetime, date, time, timedelta, Decimal, UUID)
+
+
+def _column_kind(annotation: Any) -> ColumnKind:
+    """Returns the way values of a field with given type are stored"""
+    if annotation in (int, float, bool):
+        return annotation.__name__  # type: ignore
+    if annotation is str:
+        return "str"
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin in (Union, UnionType) and NoneType in args:
+        # Optional[X] - arrays can't store None
+        not_none = [a for a in args if a is not NoneType]
+        if len(not_none) == 1:
+            kind = _column_kind(not_none[0])
+            if kind in ("int", "float", "bool", "str"):
+                return "str" if kind == "str" else "object"
+            return kind
+    if origin in (list, List) and args == (float,):
+        return "floats"
+    if origin in (list, List) and args == (str,):
+        return "strs"
+    if isinstance(annotation, type) and (issubclass(annotation, _IMMUTABLE_TYPES) or issubclass(annotation, Enum)):
+        return "object"
+    return "json"
+
+
+class _Column:
+    """Values of one field of all items (one value per row)"""
+
+    def __init__(self, name: str, annotation: Any):
+        self.name = name
+        self.kind = _column_kind(annotation)
+        self.values: array | List[Any] = (
+            array(_ARRAY_TYPECODES[self.kind]) if self.kind in _ARRAY_TYPECODES else []
+        )
+        self._adapter = TypeAdapter(annotation) if self.kind == "json" else None
+        self.decoder = self._get_decoder()
+
+    def encode(self, value: Any) -> Any:
+        if value is None:
+            return None
+        if self.kind == "str":
+            return sys.intern(value)
+        if self.kind == "floats":
+            return array("d", value)
+        if self.kind == "strs":
+            return tuple(sys.intern(v) for v in value)
+        if self.kind == "json":
+            return to_json(value)
+        return value
+
+    def decode(self, stored: Any) -> Any:
+        return stored if stored is None or self.decoder is None else self.decoder(stored)
+
+    def append(self, value: Any) -> None:
+        try:
+            self.values.append(self.encode(value))
+        except (OverflowError, TypeError):
+            # e.g. too big int - the column falls back to a list
+            self._to_list()
+            self.values.append(self.encode(value))
+
+    def set(self, row: int, value: Any) -> None:
+        try:
+            self.values[row] = self.encode(value)
+        except (OverflowError, TypeError):
+            self._to_list()
+            self.values[row] = self.encode(value)
+
+    def _to_list(self) -> None:
+        if isinstance(self.values, array):
+            self.values = self.values.tolist()
+            self.kind = "object"
+            self.decoder = self._get_decoder()
+
+    def _get_decoder(self) -> Optional[Callable[[Any], Any]]:
+        if self.kind == "floats":
+            return array.tolist
+        if self.kind == "strs":
+            return list
+        if self.kind == "json":
+            return self._adapter.validate_json  # type: ignore
+        if self.kind == "bool":
+            return bool
+        return None
+
+
+class _Table:
+    """Rows of one collection (key -> row index) and their columns"""
+
+    def __init__(self, clazz: Type[BaseModel]):
+        self.clazz = clazz
+        self.columns = [_Column(name, field.annotation) for name, field in clazz.model_fields.items()]
+        self.columns_by_name = {column.name: column for column in self.columns}
+        self.rows: Dict[str, int] = {}
+        self.keys: List[str] = []
+
+
+class InMemoryArrayStorage[T: BaseModel](InMemoryStorage[T]):
+    """In memory storage for big, rarely modified collections (e.g. lookup tables).
+
+    Items are not kept as dictionaries but field by field in columns: numeric fields
+    in `array`s, strings interned, lists of floats (embeddings) as `array("d")`,
+    lists of strings as tuples of interned strings, other immutable values
+    as they are and the rest as JSON bytes. Items are materialized on demand,
+    items of frozen models (`model_config = ConfigDict(frozen=True)`) are cached
+    and shared while they are in use.
+
+    Only fields of the storage class are stored (subclasses are stored as the class).
+    Columns support the buffer protocol, so numeric ones can be used by NumPy
+    without copying (`numpy.asarray(storage.column("price"))`). An array can't be
+    resized while such a view exists, so adding and deleting items raise `BufferError`
+    then (the storage is left unchanged). Release views before writing or copy
+    the column (`storage.column("price", copy=True)`). Queries (`where()`)
+    are evaluated on columns and only matching items are materialized.
+    """
+
+    _tables: Dict[str, _Table] = {}
+
+    def __init__(
+        self,
+        collection_name: str,
+        clazz: Type[T],
+        key_name: Optional[str] = None,
+        key: Optional[Callable[[T], str]] = None,
+    ):
+        BaseQueryStorage.__init__(self, collection_name, clazz, key or key_name)
+        table = self.__class__._tables.get(self.collection_name)
+        if table is None or table.clazz is not clazz:
+            table = _Table(clazz)
+            self.__class__._tables[self.collection_name] = table
+        self._table = table
+        self._frozen = bool(clazz.model_config.get("frozen"))
+        self._instances: weakref.WeakValueDictionary[str, T] = weakref.WeakValueDictionary()
+
+    @property
+    def items(self) -> Dict[str, Dict]:
+        return {key: self._record(row) for key, row in self._table.rows.items()}
+
+    def column(self, field: str, copy: bool = False) -> array | List[Any]:
+        """Returns stored values of the field (in the same order as `keys()`).
+
+        Args:
+            field: Name of the field.
+            copy: Return a copy, which can be used while the storage is modified.
+        """
+        values = self._table.columns_by_name[field].values
+        return values[:] if copy else values
+
+    def where(self, field: str, op: OP, value: Any) -> BaseQuery[T]:
+        """Apply a filter to the query - it is evaluated on columns (see `ColumnarQuery`)"""
+        return ColumnarQuery(self).where(field, op, value)
+
+    def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
+        return ColumnarQuery(self).find_nearest_with_distances(embedding, limit, distance_threshold)
+
+    def put(self, key: Any, value: T) -> None:
+        new_key = str(self.get_key(value))
+        table = self._table
+        # If the key of the value has changed, remove the old key
+        if str(key) != new_key and str(key) in table.rows:
+            self._remove(str(key))
+            self._notify("removed", str(key))
+        row = table.rows.get(new_key)
+        if row is None:
+            change_type = "added"
+            self._append_row(value)
+            table.rows[new_key] = len(table.keys)
+            table.keys.append(sys.intern(new_key))
+        else:
+            change_type = "modified"
+            self._set_row(row, value)
+        self._instances.pop(new_key, None)
+        if self._has_watchers():
+            self._notify(change_type, new_key, self.to_storage(value))
+
+    def put_many(self, values: List[T]) -> None:
+        for value in values:
+            self.put(self.get_key(value), value)
+
+    def get(self, key: Any) -> T:
+        key = str(key)
+        row = self._table.rows.get(key)
+        if row is None:
+            raise KeyNotExistsException(self.collection_name, self.clazz, key)
+        if not self._frozen:
+            return self._materialize(row)
+        ret = self._instances.get(key)
+        if ret is None:
+            ret = self._materialize(row)
+            self._instances[key] = ret
+        return ret
+
+    def get_all(self, sort: Any = None) -> Iterator[T]:
+        for key in list(self._table.keys):
+            if key in self._table.rows:
+                yield self.get(key)
+
+    def keys(self) -> Iterator[str]:
+        yield from list(self._table.keys)
+
+    def delete(self, key: Any) -> None:
+        key = str(key)
+        if key in self._table.rows:
+            self._remove(key)
+            self._notify("removed", key)
+
+    def key_exists(self, needle: Any) -> bool:
+        return str(needle) in self._table.rows
+
+    def is_empty(self) -> bool:
+        return not self._table.rows
+
+    def count(self) -> int:
+        return len(self._table.rows)
+
+    def drop(self):
+        keys = list(self._table.keys)
+        self.__class__._tables[self.collection_name] = self._table = _Table(self.clazz)
+        self._instances.clear()
+        for key in keys:
+            self._notify("removed", key)
+
+    def _record(self, row: int) -> Dict[str, Any]:
+        return {column.name: column.decode(column.values[row]) for column in self._table.columns}
+
+    def _materialize(self, row: int) -> T:
+        return self.clazz.model_validate(self._record(row))
+
+    def _append_row(self, value: T) -> None:
+        """Appends values to all columns - or to none of them if any append fails"""
+        appended: List[_Column] = []
+        try:
+            for column in self._table.columns:
+                column.append(getattr(value, column.name))
+                appended.append(column)
+        except BaseException:
+            for column in appended:
+                column.values.pop()
+            raise
+
+    def _set_row(self, row: int, value: T) -> None:
+        """Sets values of the row in all columns - or in none of them if any fails"""
+        previous: List[Tuple[_Column, Any]] = []
+        try:
+            for column in self._table.columns:
+                stored = column.values[row]
+                column.set(row, getattr(value, column.name))
+                previous.append((column, stored))
+        except BaseException:
+            for column, stored in previous:
+                column.values[row] = stored
+            raise
+
+    def _remove(self, key: str) -> None:
+        """Removes the row - the last row is moved in its place"""
+        table = self._table
+        row = table.rows[key]
+        last = len(table.keys) - 1
+        # Columns are shrunk first (it fails if a column is exported), so nothing is changed on failure
+        popped: List[Tuple[_Column, Any]] = []
+        try:
+            for column in table.columns:
+                popped.append((column, column.values.pop()))
+        except BaseException:
+            for column, stored in reversed(popped):
+                column.values.append(stored)
+            raise
+        del table.rows[key]
+        if row != last:
+            moved_key = table.keys[last]
+            table.keys[row] = moved_key
+            table.rows[moved_key] = row
+            for column, stored in popped:
+                column.values[row] = stored
+        table.keys.pop()
+        self._instances.pop(key, None)
+
+    def _has_watchers(self) -> bool:
+        return bool(self.__class__._watchers.get(self.collection_name))
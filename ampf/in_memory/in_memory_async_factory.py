@@ -3,6 +3,7 @@ from typing import Callable, Dict, Optional, Type
 from pydantic import BaseModel
 
 from ampf.base import BaseAsyncBlobStorage, BaseAsyncFactory, BaseAsyncStorage, BaseBlobMetadata
+from .in_memory_array_storage import InMemoryArrayStorage
 from .in_memory_storage import InMemoryStorage
 
 from .in_memory_async_storage import InMemoryAsyncStorage
@@ -26,16 +27,28 @@ class InMemoryAsyncFactory(BaseAsyncFactory):
                 key_name=key_name,
                 key=key,
             )
-        storage = self.collections[collection_name]
-        instance = InMemoryAsyncStorage(
-            storage.collection_name,
-            storage.clazz,
-            storage.key,
-            storage.embedding_field_name,
-            storage.embedding_search_limit,
-        )
-        instance.storage = storage
-        return instance
+        return self._create_async_storage(self.collections[collection_name])
+
+    def create_array_storage[T: BaseModel](
+        self,
+        collection_name: str,
+        clazz: Type[T],
+        key_name: Optional[str] = None,
+        key: Optional[Callable[[T], str]] = None,
+    ) -> BaseAsyncStorage[T]:
+        """Creates storage keeping items in columns (`InMemoryArrayStorage`).
+
+        It needs much less memory than `create_storage()` for big collections.
+        Items are materialized directly from columns, so `from_storage()` is not called.
+        """
+        if not isinstance(self.collections.get(collection_name), InMemoryArrayStorage):
+            self.collections[collection_name] = InMemoryArrayStorage[T](
+                collection_name=collection_name,
+                clazz=clazz,
+                key_name=key_name,
+                key=key,
+            )
+        return self._create_async_storage(self.collections[collection_name])
 
     def create_blob_storage[T: BaseBlobMetadata](
         self,
@@ -47,4 +60,17 @@ class InMemoryAsyncFactory(BaseAsyncFactory):
         return InMemoryBlobAsyncStorage(collection_name, clazz, content_type)
 
     def drop(self):
-        self.collections = {}
\ No newline at end of file
+        self.collections = {}
+        self._storage_cache.clear()
+        self._collection_cache.clear()
+
+    def _create_async_storage[T: BaseModel](self, storage: InMemoryStorage[T]) -> InMemoryAsyncStorage[T]:
+        instance = InMemoryAsyncStorage(
+            storage.collection_name,
+            storage.clazz,
+            storage.key,
+            storage.embedding_field_name,
+            storage.embedding_search_limit,
+        )
+        instance.storage = storage
+        return instance
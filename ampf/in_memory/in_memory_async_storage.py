@@ -1,10 +1,13 @@
 import asyncio
-from typing import Any, AsyncIterator, Callable, Coroutine, Dict, Optional, Type
+from typing import Any, AsyncIterator, Callable, Coroutine, Dict, List, Optional, Tuple, Type
 
 from pydantic import BaseModel
 
-from ampf.base import BaseAsyncQueryStorage
+from ampf.base import BaseAsyncQuery, BaseAsyncQueryStorage, ChangeEvent
+from ampf.base.base_query import OP
 from ampf.base.exceptions import KeyNotExistsException
+from ampf.in_memory.columnar_query import ColumnarAsyncQuery
+from ampf.in_memory.in_memory_array_storage import InMemoryArrayStorage
 from ampf.in_memory.in_memory_storage import InMemoryStorage
 
 
@@ -28,12 +31,25 @@ class InMemoryAsyncStorage[T: BaseModel](BaseAsyncQueryStorage):
         self.storage.from_storage = self._from_storage
 
     async def put(self, key: str, value: T) -> None:
-        self.storage.put(key, value)
+        if isinstance(self.storage, InMemoryArrayStorage):
+            # Items are kept in columns (`to_storage()` is not used)
+            self.storage.put(key, value)
+            return
+        # Items are converted here, so `to_storage()` of this object can be async or replaced by decorators
+        data = self.to_storage(value)
+        if isinstance(data, Coroutine):
+            data = await data
+        self.storage.put_data(key, self.get_key(value), data)
 
     async def get(self, key: str) -> T:
-        if not self.storage.key_exists(key):
+        if isinstance(self.storage, InMemoryArrayStorage):
+            if not self.storage.key_exists(key):
+                raise KeyNotExistsException(self.collection_name, self.clazz, key)
+            return self.storage.get(key)
+        data = self.storage.get_data(key)
+        if not data:
             raise KeyNotExistsException(self.collection_name, self.clazz, key)
-        ret = self.storage.get(key)
+        ret = self.from_storage(data)
         if isinstance(ret, Coroutine):
             ret = await ret
         return ret # type: ignore
@@ -57,6 +73,43 @@ class InMemoryAsyncStorage[T: BaseModel](BaseAsyncQueryStorage):
     async def is_empty(self) -> bool:
         return self.storage.is_empty()
 
+    def where(self, field: str, op: OP, value: Any) -> BaseAsyncQuery[T]:
+        if isinstance(self.storage, InMemoryArrayStorage):
+            # Evaluated on columns of the storage
+            return ColumnarAsyncQuery(self.storage.where(field, op, value))
+        return super().where(field, op, value)
+
+    async def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
+        if isinstance(self.storage, InMemoryArrayStorage):
+            return self.storage.find_nearest_with_distances(embedding, limit, distance_threshold)
+        return await super().find_nearest_with_distances(embedding, limit, distance_threshold)
+
+    async def watch(
+        self, poll_interval: float = 1.0, ready: Optional[asyncio.Event] = None
+    ) -> AsyncIterator[ChangeEvent[T]]:
+        """Watches the storage and yields changes made after the call.
+
+        Changes are delivered by in-process notifications, so `poll_interval` is not used.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        unsubscribe = self.storage.subscribe(lambda *change: loop.call_soon_threadsafe(queue.put_nowait, change))
+        if ready:
+            ready.set()
+        try:
+            while True:
+                change_type, key, data = await queue.get()
+                value = None
+                if data is not None:
+                    value = self.from_storage(data)
+                    if isinstance(value, Coroutine):
+                        value = await value
+                yield ChangeEvent(change_type, key, value)
+        finally:
+            unsubscribe()
+
     def _to_storage(self, data: T) -> Dict[str, Any]:
         ret = self.to_storage(data)
         if isinstance(ret, Coroutine):
@@ -23,7 +23,7 @@ class InMemoryAsyncBlobStorage[T: BaseBlobMetadata](BaseAsyncBlobStorage):
         self.buckets[self.collection_name][blob.name] = blob
 
     @override
-    async def download_async(self, key: str) -> Blob[T]:
+    async def download_async(self, key: str, stream: bool = False) -> Blob[T]:
         try:
             return self.buckets[self.collection_name][key]
         except KeyError:
@@ -52,16 +52,39 @@ class InMemoryAsyncBlobStorage[T: BaseBlobMetadata](BaseAsyncBlobStorage):
         return key in self.buckets[self.collection_name]
 
     @override
-    async def names(self, prefix: Optional[str] = None) -> AsyncGenerator[str]:
-        for name, blob in self.buckets[self.collection_name].items():
-            if prefix is None or name.startswith(prefix):
-                yield name
+    async def names(
+        self, prefix: Optional[str] = None, delimiter: Optional[str] = None, max_results: Optional[int] = None
+    ) -> AsyncGenerator[str]:
+        folders = set()
+        count = 0
+        for name in list(self.buckets[self.collection_name]):
+            if prefix is not None and not name.startswith(prefix):
+                continue
+            if max_results is not None and count >= max_results:
+                return
+            folder = self._subfolder(name, prefix, delimiter)
+            if folder is not None:
+                if folder in folders:
+                    continue
+                folders.add(folder)
+                name = folder
+            count += 1
+            yield name
 
     @override
-    async def list_blobs(self, prefix: Optional[str] = None) -> AsyncGenerator[BlobHeader[T]]:
-        for name, blob in self.buckets[self.collection_name].items():
-            if prefix is None or name.startswith(prefix):
-                yield BlobHeader(name=name, metadata=blob.metadata)
+    async def list_blobs(
+        self, prefix: Optional[str] = None, delimiter: Optional[str] = None, max_results: Optional[int] = None
+    ) -> AsyncGenerator[BlobHeader[T]]:
+        count = 0
+        for name, blob in list(self.buckets[self.collection_name].items()):
+            if prefix is not None and not name.startswith(prefix):
+                continue
+            if self._subfolder(name, prefix, delimiter) is not None:
+                continue
+            if max_results is not None and count >= max_results:
+                return
+            count += 1
+            yield BlobHeader(name=name, metadata=blob.metadata)
 
     @override
     async def _upsert_transactional(
@@ -5,6 +5,7 @@ from pydantic import BaseModel
 from ampf.base import BaseFactory, BaseStorage
 from ampf.base.base_blob_storage import BaseBlobStorage
 
+from .in_memory_array_storage import InMemoryArrayStorage
 from .in_memory_blob_storage import InMemoryBlobStorage
 from .in_memory_storage import InMemoryStorage
 
@@ -28,6 +29,26 @@ class InMemoryFactory(BaseFactory):
             )
         return self.collections.get(collection_name) # type: ignore
 
+    def create_array_storage[T: BaseModel](
+        self,
+        collection_name: str,
+        clazz: Type[T],
+        key_name: Optional[str] = None,
+        key: Optional[Callable[[T], str]] = None,
+    ) -> BaseStorage[T]:
+        """Creates storage keeping items in columns (`InMemoryArrayStorage`).
+
+        It needs much less memory than `create_storage()` for big collections.
+        """
+        if not isinstance(self.collections.get(collection_name), InMemoryArrayStorage):
+            self.collections[collection_name] = InMemoryArrayStorage(
+                collection_name=collection_name,
+                clazz=clazz,
+                key_name=key_name,
+                key=key,
+            )
+        return self.collections.get(collection_name)  # type: ignore
+
     def create_blob_storage[T: BaseModel](
         self, collection_name: str, clazz: Optional[Type[T]] = None, content_type: Optional[str] = None,
         bucket_name: Optional[str] = None
@@ -1,15 +1,19 @@
-from typing import Any, Callable, Dict, Iterator, Optional, Type
+from typing import Any, Callable, Dict, Iterator, List, Optional, Type
 
 from pydantic import BaseModel
 
 from ampf.base import KeyNotExistsException
 from ampf.base.base_query_storage import BaseQueryStorage
+from ampf.base.change_event import ChangeType
+
+type ChangeCallback = Callable[[ChangeType, str, Optional[Dict]], None]
 
 
 class InMemoryStorage[T: BaseModel](BaseQueryStorage[T]):
     """In memory storage implementation"""
 
     _items: Dict[str, Dict[str, Dict]] = {}
+    _watchers: Dict[str, List[ChangeCallback]] = {}
 
     def __init__(
         self,
@@ -26,31 +30,72 @@ class InMemoryStorage[T: BaseModel](BaseQueryStorage[T]):
     def items(self) -> Dict[str, Dict]:
         return self.__class__._items[self.collection_name]
 
+    def subscribe(self, callback: ChangeCallback) -> Callable[[], None]:
+        """Registers a callback called on every change in the collection.
+
+        The callback gets change type, key and stored data (`None` for removed items).
+
+        Args:
+            callback: Function called on every change.
+        Returns:
+            Function which unregisters the callback.
+        """
+        watchers = self.__class__._watchers.setdefault(self.collection_name, [])
+        watchers.append(callback)
+        return lambda: watchers.remove(callback) if callback in watchers else None
+
+    def _notify(self, change_type: ChangeType, key: str, data: Optional[Dict] = None) -> None:
+        for callback in list(self.__class__._watchers.get(self.collection_name, [])):
+            callback(change_type, key, data)
+
     def put(self, key: Any, value: T) -> None:
-        new_key = self.get_key(value)
+        self.put_data(key, str(self.get_key(value)), self.to_storage(value))
+
+    def put_data(self, key: Any, new_key: str, data: Dict) -> None:
+        """Stores data of an item already converted by `to_storage()` (e.g. by an async storage).
+
+        Args:
+            key: The key the item is put with.
+            new_key: The key of the item (if it differs from `key`, the old key is removed).
+            data: Stored representation of the item.
+        """
         # If the key of the value has changed, remove the old key
         if str(key) != new_key and str(key) in self.items:
             self.items.pop(str(key))
+            self._notify("removed", str(key))
         # Store the value with the new key
-        self.items[str(new_key)] = self.to_storage(value)
+        change_type: ChangeType = "modified" if new_key in self.items else "added"
+        self.items[new_key] = data
+        self._notify(change_type, new_key, data)
 
     def get(self, key: Any) -> T:
-        ret = self.items.get(str(key))
+        ret = self.get_data(key)
         if ret:
             return self.from_storage(ret)
         else:
             raise KeyNotExistsException(self.collection_name, self.clazz, key)
 
+    def get_data(self, key: Any) -> Optional[Dict]:
+        """Returns stored data of the item (`None` if it doesn't exist), it is converted by `from_storage()`."""
+        return self.items.get(str(key))
+
     def keys(self) -> Iterator[str]:
         for key in self.items.keys():
             yield key
 
     def delete(self, key: Any) -> None:
-        self.items.pop(str(key), None)
+        if self.items.pop(str(key), None) is not None:
+            self._notify("removed", str(key))
+
+    def key_exists(self, needle: Any) -> bool:
+        return str(needle) in self.items
 
     def is_empty(self) -> bool:
-        keys = list(self.keys())
-        return not bool(keys)
+        return not self.items
 
     def drop(self):
+        keys = list(self.items.keys())
         self.__class__._items[self.collection_name] = {}
+        for key in keys:
+            self._notify("removed", key)
+
@@ -0,0 +1,25 @@
+from .base_metrics_sink import BaseMetricsSink
+from .in_memory_metrics_sink import DEFAULT_BUCKETS, InMemoryMetricsSink, OperationStats
+from .instrumented import (
+    InstrumentedAsyncBlobStorage,
+    InstrumentedAsyncQuery,
+    InstrumentedAsyncStorage,
+    InstrumentedStorage,
+    InstrumentedTopic,
+    instrument,
+)
+from .open_telemetry_metrics_sink import OpenTelemetryMetricsSink
+
+__all__ = [
+    "BaseMetricsSink",
+    "InMemoryMetricsSink",
+    "OperationStats",
+    "DEFAULT_BUCKETS",
+    "OpenTelemetryMetricsSink",
+    "InstrumentedAsyncStorage",
+    "InstrumentedAsyncQuery",
+    "InstrumentedStorage",
+    "InstrumentedAsyncBlobStorage",
+    "InstrumentedTopic",
+    "instrument",
+]
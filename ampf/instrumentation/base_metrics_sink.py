@@ -0,0 +1,29 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class BaseMetricsSink(ABC):
+    """Receives measurements of storage, blob storage and topic operations."""
+
+    @abstractmethod
+    def record(
+        self,
+        kind: str,
+        collection: str,
+        operation: str,
+        duration: float,
+        error: bool = False,
+        items: Optional[int] = None,
+        size: Optional[int] = None,
+    ) -> None:
+        """Records one operation.
+
+        Args:
+            kind: Kind of the instrumented object (`storage`, `blob_storage`, `topic`).
+            collection: Collection (or topic) name.
+            operation: Operation name (e.g. `get`, `put`, `get_all`).
+            duration: Duration of the operation in seconds.
+            error: Did the operation raise an exception?
+            items: Number of items returned by scans (`keys`, `get_all`, ...).
+            size: Payload size in bytes.
+        """
@@ -0,0 +1,122 @@
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .base_metrics_sink import BaseMetricsSink
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+"""Upper bounds (in seconds) of latency histogram buckets"""
+
+type MetricKey = Tuple[str, str, str]
+"""Kind, collection and operation"""
+
+
+@dataclass
+class OperationStats:
+    """Statistics of one operation on one collection"""
+
+    count: int = 0
+    errors: int = 0
+    duration_sum: float = 0.0
+    buckets: List[int] = field(default_factory=list)
+    """Number of calls in each bucket (not cumulative), the last one is `+Inf`"""
+    items: int = 0
+    size: int = 0
+
+
+class InMemoryMetricsSink(BaseMetricsSink):
+    """Keeps metrics in memory. They can be exported in Prometheus text format.
+
+    Args:
+        buckets: Upper bounds (in seconds) of latency histogram buckets.
+        prefix: Prefix of Prometheus metric names.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, prefix: str = "ampf"):
+        self.bucket_bounds = tuple(sorted(buckets))
+        self.prefix = prefix
+        self.stats: Dict[MetricKey, OperationStats] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        kind: str,
+        collection: str,
+        operation: str,
+        duration: float,
+        error: bool = False,
+        items: Optional[int] = None,
+        size: Optional[int] = None,
+    ) -> None:
+        with self._lock:
+            stats = self.stats.get((kind, collection, operation))
+            if stats is None:
+                stats = OperationStats(buckets=[0] * (len(self.bucket_bounds) + 1))
+                self.stats[(kind, collection, operation)] = stats
+            stats.count += 1
+            if error:
+                stats.errors += 1
+            stats.duration_sum += duration
+            stats.buckets[bisect_left(self.bucket_bounds, duration)] += 1
+            if items:
+                stats.items += items
+            if size:
+                stats.size += size
+
+    def get(self, kind: str, collection: str, operation: str) -> Optional[OperationStats]:
+        """Returns statistics of the operation (`None` if it wasn't called)."""
+        return self.stats.get((kind, collection, operation))
+
+    def clear(self) -> None:
+        """Removes all the metrics."""
+        with self._lock:
+            self.stats.clear()
+
+    def to_prometheus(self) -> str:
+        """Returns metrics in Prometheus text exposition format."""
+        p = self.prefix
+        with self._lock:
+            stats = sorted(self.stats.items())
+        lines = [
+            f"# HELP {p}_operations_total Number of operations.",
+            f"# TYPE {p}_operations_total counter",
+        ]
+        lines += [f"{p}_operations_total{{{_labels(k)}}} {s.count}" for k, s in stats]
+        lines += [
+            f"# HELP {p}_operation_errors_total Number of failed operations.",
+            f"# TYPE {p}_operation_errors_total counter",
+        ]
+        lines += [f"{p}_operation_errors_total{{{_labels(k)}}} {s.errors}" for k, s in stats]
+        lines += [
+            f"# HELP {p}_operation_duration_seconds Duration of operations.",
+            f"# TYPE {p}_operation_duration_seconds histogram",
+        ]
+        for k, s in stats:
+            labels = _labels(k)
+            cumulative = 0
+            for bound, count in zip((*self.bucket_bounds, "+Inf"), s.buckets):
+                cumulative += count
+                lines.append(f'{p}_operation_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{p}_operation_duration_seconds_sum{{{labels}}} {s.duration_sum}")
+            lines.append(f"{p}_operation_duration_seconds_count{{{labels}}} {s.count}")
+        lines += [
+            f"# HELP {p}_items_total Number of items returned by scans.",
+            f"# TYPE {p}_items_total counter",
+        ]
+        lines += [f"{p}_items_total{{{_labels(k)}}} {s.items}" for k, s in stats if s.items]
+        lines += [
+            f"# HELP {p}_bytes_total Payload size in bytes.",
+            f"# TYPE {p}_bytes_total counter",
+        ]
+        lines += [f"{p}_bytes_total{{{_labels(k)}}} {s.size}" for k, s in stats if s.size]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key: MetricKey) -> str:
+    kind, collection, operation = key
+    return f'kind="{_escape(kind)}",collection="{_escape(collection)}",operation="{_escape(operation)}"'
@@ -0,0 +1,344 @@
+"""Decorators measuring operations of storages, blob storages and topics"""
+
+from __future__ import annotations
+
+from time import perf_counter
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+from ampf.base import BaseAsyncBlobStorage, BaseAsyncQuery, BaseAsyncStorage, BaseDecorator, BaseStorage, BaseTopic
+from ampf.base.base_query import OP
+from ampf.base.blob_model import Blob
+
+from .base_metrics_sink import BaseMetricsSink
+
+
+def _payload_size(value: Any) -> int:
+    if isinstance(value, BaseModel):
+        return len(value.model_dump_json(exclude_none=True))
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, bytes):
+        return len(value)
+    return 0
+
+
+class _Instrumented[D](BaseDecorator[D]):
+    """Common part of instrumented objects"""
+
+    kind = ""
+
+    def __init__(self, decorated: D, sink: BaseMetricsSink, name: str, measure_payload: bool = False):
+        super().__init__(decorated)
+        self._sink = sink
+        self._name = name
+        self._measure_payload = measure_payload
+
+    async def _measure[R](
+        self, operation: str, awaitable: Awaitable[R], size: Callable[[R], Optional[int]] | None = None
+    ) -> R:
+        start = perf_counter()
+        try:
+            ret = await awaitable
+        except BaseException:
+            self._sink.record(self.kind, self._name, operation, perf_counter() - start, error=True)
+            raise
+        self._sink.record(self.kind, self._name, operation, perf_counter() - start, size=size(ret) if size else None)
+        return ret
+
+    def _measure_sync[R](self, operation: str, func: Callable[[], R], size: Optional[int] = None) -> R:
+        start = perf_counter()
+        try:
+            ret = func()
+        except BaseException:
+            self._sink.record(self.kind, self._name, operation, perf_counter() - start, error=True)
+            raise
+        self._sink.record(self.kind, self._name, operation, perf_counter() - start, size=size)
+        return ret
+
+    async def _measure_scan[R](self, operation: str, iterator: AsyncIterator[R]) -> AsyncIterator[R]:
+        """Measures the whole scan (until the iterator is exhausted or closed)"""
+        start = perf_counter()
+        items = 0
+        error = False
+        try:
+            async for item in iterator:
+                items += 1
+                yield item
+        except Exception:
+            error = True
+            raise
+        finally:
+            self._sink.record(self.kind, self._name, operation, perf_counter() - start, error=error, items=items)
+
+    def _measure_sync_scan[R](self, operation: str, iterator: Iterator[R]) -> Iterator[R]:
+        start = perf_counter()
+        items = 0
+        error = False
+        try:
+            for item in iterator:
+                items += 1
+                yield item
+        except Exception:
+            error = True
+            raise
+        finally:
+            self._sink.record(self.kind, self._name, operation, perf_counter() - start, error=error, items=items)
+
+    def _size(self, value: Any) -> Optional[int]:
+        return _payload_size(value) if self._measure_payload else None
+
+
+class InstrumentedAsyncQuery[T: BaseModel](_Instrumented[BaseAsyncQuery[T]]):
+    """Query measuring its scans (operation `query`)"""
+
+    kind = "storage"
+
+    def where(self, field: str, op: OP, value: Any) -> InstrumentedAsyncQuery[T]:
+        return InstrumentedAsyncQuery(self.decorated.where(field, op, value), self._sink, self._name)
+
+    def get_all(self) -> AsyncIterator[T]:
+        return self._measure_scan("query", self.decorated.get_all())
+
+    def find_nearest(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> AsyncIterator[T]:
+        return self._measure_scan(
+            "find_nearest", aiter(self.decorated.find_nearest(embedding, limit, distance_threshold))
+        )
+
+
+class InstrumentedAsyncStorage[T: BaseModel](_Instrumented[BaseAsyncStorage[T]]):
+    """Async storage decorator recording count, errors, latency, scanned items
+    and (optionally) payload size of each operation.
+
+    Args:
+        decorated: Decorated storage.
+        sink: Metrics sink.
+        measure_payload: Measure size of stored / read items (costs an extra serialization).
+    """
+
+    kind = "storage"
+
+    def __init__(self, decorated: BaseAsyncStorage[T], sink: BaseMetricsSink, measure_payload: bool = False):
+        super().__init__(decorated, sink, decorated.collection_name, measure_payload)
+
+    async def put(self, key: Any, value: T) -> None:
+        size = self._size(value)
+        return await self._measure("put", self.decorated.put(key, value), lambda _: size)
+
+    async def get(self, key: Any) -> T:
+        return await self._measure("get", self.decorated.get(key), self._size)
+
+    def keys(self) -> AsyncIterator[str]:
+        return self._measure_scan("keys", self.decorated.keys())
+
+    async def delete(self, key: Any) -> None:
+        return await self._measure("delete", self.decorated.delete(key))
+
+    async def get_many(self, keys: List[Any]) -> Dict[str, T]:
+        start = perf_counter()
+        try:
+            ret = await self.decorated.get_many(keys)
+        except BaseException:
+            self._sink.record(self.kind, self._name, "get_many", perf_counter() - start, error=True)
+            raise
+        size = sum(_payload_size(v) for v in ret.values()) if self._measure_payload else None
+        self._sink.record(self.kind, self._name, "get_many", perf_counter() - start, items=len(ret), size=size)
+        return ret
+
+    async def put_many(self, values: List[T]) -> None:
+        size = sum(_payload_size(v) for v in values) if self._measure_payload else None
+        return await self._measure("put_many", self.decorated.put_many(values), lambda _: size)
+
+    async def delete_many(self, keys: List[Any]) -> None:
+        return await self._measure("delete_many", self.decorated.delete_many(keys))
+
+    async def create(self, value: T) -> None:
+        size = self._size(value)
+        return await self._measure("create", self.decorated.create(value), lambda _: size)
+
+    async def save(self, value: T) -> None:
+        size = self._size(value)
+        return await self._measure("save", self.decorated.save(value), lambda _: size)
+
+    async def patch(self, key: Any, patch_data: BaseModel | Dict[str, Any]) -> T:
+        return await self._measure("patch", self.decorated.patch(key, patch_data), self._size)
+
+    async def increment(self, key: Any, field: str, delta: int | float = 1) -> None:
+        return await self._measure("increment", self.decorated.increment(key, field, delta))
+
+    async def drop(self) -> None:
+        return await self._measure("drop", self.decorated.drop())
+
+    def get_all(self, *args, **kwargs) -> AsyncIterator[T]:
+        return self._measure_scan("get_all", self.decorated.get_all(*args, **kwargs))
+
+    async def key_exists(self, key: Any) -> bool:
+        return await self._measure("key_exists", self.decorated.key_exists(key))
+
+    async def is_empty(self) -> bool:
+        return await self._measure("is_empty", self.decorated.is_empty())
+
+    def find_nearest(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> AsyncIterator[T]:
+        return self._measure_scan(
+            "find_nearest", aiter(self.decorated.find_nearest(embedding, limit, distance_threshold))
+        )
+
+    def where(self, field: str, op: OP, value: Any) -> InstrumentedAsyncQuery[T]:
+        return InstrumentedAsyncQuery(self.decorated.where(field, op, value), self._sink, self._name)
+
+
+class InstrumentedStorage[T: BaseModel](_Instrumented[BaseStorage[T]]):
+    """Storage decorator recording count, errors, latency, scanned items
+    and (optionally) payload size of each operation.
+
+    Args:
+        decorated: Decorated storage.
+        sink: Metrics sink.
+        measure_payload: Measure size of stored / read items (costs an extra serialization).
+    """
+
+    kind = "storage"
+
+    def __init__(self, decorated: BaseStorage[T], sink: BaseMetricsSink, measure_payload: bool = False):
+        super().__init__(decorated, sink, decorated.collection_name, measure_payload)
+
+    def put(self, key: Any, value: T) -> None:
+        return self._measure_sync("put", lambda: self.decorated.put(key, value), self._size(value))
+
+    def get(self, key: Any) -> T:
+        return self._measure_sync("get", lambda: self.decorated.get(key))
+
+    def keys(self) -> Iterator[str]:
+        return self._measure_sync_scan("keys", self.decorated.keys())
+
+    def delete(self, key: Any) -> None:
+        return self._measure_sync("delete", lambda: self.decorated.delete(key))
+
+    def create(self, value: T) -> None:
+        return self._measure_sync("create", lambda: self.decorated.create(value), self._size(value))
+
+    def save(self, value: T) -> None:
+        return self._measure_sync("save", lambda: self.decorated.save(value), self._size(value))
+
+    def drop(self) -> None:
+        return self._measure_sync("drop", self.decorated.drop)
+
+    def get_all(self, *args, **kwargs) -> Iterator[T]:
+        return self._measure_sync_scan("get_all", self.decorated.get_all(*args, **kwargs))
+
+    def key_exists(self, key: Any) -> bool:
+        return self._measure_sync("key_exists", lambda: self.decorated.key_exists(key))
+
+    def is_empty(self) -> bool:
+        return self._measure_sync("is_empty", self.decorated.is_empty)
+
+
+class InstrumentedAsyncBlobStorage[T: BaseModel](_Instrumented[BaseAsyncBlobStorage]):
+    """Async blob storage decorator recording count, errors, latency and size of blobs.
+
+    Args:
+        decorated: Decorated blob storage.
+        sink: Metrics sink.
+    """
+
+    kind = "blob_storage"
+
+    def __init__(self, decorated: BaseAsyncBlobStorage, sink: BaseMetricsSink):
+        super().__init__(decorated, sink, decorated.collection_name or "", True)
+
+    async def upload_async(self, blob: Blob) -> None:
+        size = blob.size
+        return await self._measure("upload", self.decorated.upload_async(blob), lambda _: size)
+
+    async def download_async(self, name: str, stream: bool = False) -> Blob:
+        return await self._measure("download", self.decorated.download_async(name, stream), _blob_size)
+
+    async def download_range(self, name: str, start: int, end: Optional[int] = None, stream: bool = False) -> Blob:
+        return await self._measure(
+            "download_range", self.decorated.download_range(name, start, end, stream), _blob_size
+        )
+
+    async def delete_async(self, name: str) -> None:
+        return await self._measure("delete", self.decorated.delete_async(name))
+
+    def exists(self, name: str) -> bool:
+        return self._measure_sync("exists", lambda: self.decorated.exists(name))
+
+    def list_blobs(
+        self, prefix: Optional[str] = None, delimiter: Optional[str] = None, max_results: Optional[int] = None
+    ) -> AsyncIterator:
+        return self._measure_scan("list_blobs", self.decorated.list_blobs(prefix, delimiter, max_results))
+
+    def names(
+        self, prefix: Optional[str] = None, delimiter: Optional[str] = None, max_results: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        return self._measure_scan("names", self.decorated.names(prefix, delimiter, max_results))
+
+    async def put_metadata(self, name: str, metadata: Any) -> None:
+        return await self._measure("put_metadata", self.decorated.put_metadata(name, metadata))
+
+    async def get_metadata(self, name: str) -> Any:
+        return await self._measure("get_metadata", self.decorated.get_metadata(name))
+
+    async def drop(self) -> None:
+        return await self._measure("drop", self.decorated.drop())
+
+    async def delete_folder(self, folder_name: str) -> None:
+        return await self._measure("delete_folder", self.decorated.delete_folder(folder_name))
+
+
+class InstrumentedTopic[T: BaseModel](_Instrumented[BaseTopic[T]]):
+    """Topic decorator recording count, errors, latency and size of published messages.
+
+    Args:
+        decorated: Decorated topic.
+        sink: Metrics sink.
+        name: Topic name (id).
+    """
+
+    kind = "topic"
+
+    def __init__(self, decorated: BaseTopic[T], sink: BaseMetricsSink, name: str):
+        super().__init__(decorated, sink, name, True)
+
+    def publish(self, data: T | str | bytes, *args, **kwargs) -> str:
+        return self._measure_sync(
+            "publish", lambda: self.decorated.publish(data, *args, **kwargs), _payload_size(data)
+        )
+
+    async def publish_async(self, data: T | str | bytes, *args, **kwargs) -> str:
+        size = _payload_size(data)
+        return await self._measure("publish", self.decorated.publish_async(data, *args, **kwargs), lambda _: size)
+
+
+def instrument[O](obj: O, sink: BaseMetricsSink, name: Optional[str] = None) -> O:
+    """Wraps storage, blob storage or topic with appropriate instrumentation decorator.
+
+    Args:
+        obj: Instrumented object.
+        sink: Metrics sink.
+        name: Name of the topic (required for topics only).
+    Returns:
+        Instrumented object.
+    """
+    if isinstance(obj, _Instrumented):
+        return obj
+    if isinstance(obj, BaseAsyncStorage):
+        return InstrumentedAsyncStorage(obj, sink)  # type: ignore
+    if isinstance(obj, BaseStorage):
+        return InstrumentedStorage(obj, sink)  # type: ignore
+    if isinstance(obj, BaseAsyncBlobStorage):
+        return InstrumentedAsyncBlobStorage(obj, sink)  # type: ignore
+    if isinstance(obj, BaseTopic):
+        return InstrumentedTopic(obj, sink, name or "")  # type: ignore
+    raise TypeError(f"Cannot instrument {obj.__class__.__name__}")
+
+
+def _blob_size(blob: Blob) -> Optional[int]:
+    """Size of a downloaded blob (`None` if it is not known, e.g. streamed without `Content-Length`)"""
+    return blob.size
@@ -0,0 +1,51 @@
+import logging
+from typing import Any, Optional
+
+from .base_metrics_sink import BaseMetricsSink
+
+_log = logging.getLogger(__name__)
+
+
+class OpenTelemetryMetricsSink(BaseMetricsSink):
+    """Sends metrics to OpenTelemetry (`opentelemetry-api` package is required).
+
+    Args:
+        meter: OpenTelemetry meter (default - `metrics.get_meter("ampf")`).
+        prefix: Prefix of metric names.
+    """
+
+    def __init__(self, meter: Optional[Any] = None, prefix: str = "ampf"):
+        try:
+            from opentelemetry import metrics
+        except ImportError:
+            _log.error("The package `opentelemetry-api` is not installed")
+            _log.error("Try: pip install ampf[opentelemetry]")
+            raise
+        meter = meter or metrics.get_meter("ampf")
+        self._operations = meter.create_counter(f"{prefix}.operations", description="Number of operations")
+        self._errors = meter.create_counter(f"{prefix}.operation_errors", description="Number of failed operations")
+        self._duration = meter.create_histogram(
+            f"{prefix}.operation_duration", unit="s", description="Duration of operations"
+        )
+        self._items = meter.create_counter(f"{prefix}.items", description="Number of items returned by scans")
+        self._bytes = meter.create_counter(f"{prefix}.bytes", unit="By", description="Payload size in bytes")
+
+    def record(
+        self,
+        kind: str,
+        collection: str,
+        operation: str,
+        duration: float,
+        error: bool = False,
+        items: Optional[int] = None,
+        size: Optional[int] = None,
+    ) -> None:
+        attributes = {"kind": kind, "collection": collection, "operation": operation}
+        self._operations.add(1, attributes)
+        if error:
+            self._errors.add(1, attributes)
+        self._duration.record(duration, attributes)
+        if items:
+            self._items.add(items, attributes)
+        if size:
+            self._bytes.add(size, attributes)
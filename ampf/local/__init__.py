@@ -1,4 +1,5 @@
 from .async_local_factory import LocalAsyncFactory
+from .embedding_codec import EmbeddingEncoding, decode_embedding, encode_embedding
 from .file_async_storage import FileAsyncStorage
 from .file_storage import FileStorage, StrPath
 from .json_multi_files_async_storage import JsonMultiFilesAsyncStorage
@@ -8,6 +9,9 @@ from .json_one_file_storage import JsonOneFileStorage
 from .local_blob_async_storage import LocalAsyncBlobStorage
 from .local_blob_storage import LocalBlobStorage
 from .local_factory import LocalFactory
+from .shared_file_async_storage import SharedFileAsyncStorage
+from .shared_file_storage import SharedFileStorage
+from .shared_log import SharedLog
 
 __all__ = [
     "StrPath",
@@ -21,4 +25,10 @@ __all__ = [
     "FileAsyncStorage",
     "JsonOneFileAsyncStorage",
     "JsonMultiFilesAsyncStorage",
+    "SharedLog",
+    "SharedFileStorage",
+    "SharedFileAsyncStorage",
+    "EmbeddingEncoding",
+    "encode_embedding",
+    "decode_embedding",
 ]
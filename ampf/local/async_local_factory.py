@@ -5,15 +5,25 @@ from pydantic import BaseModel
 
 from ..base import BaseAsyncBlobStorage, BaseAsyncFactory, BaseAsyncStorage, BaseBlobMetadata
 from ..local.file_storage import StrPath
+from .embedding_codec import EmbeddingEncoding
 from .json_multi_files_async_storage import JsonMultiFilesAsyncStorage
 from .json_one_file_async_storage import JsonOneFileAsyncStorage
 from .local_blob_async_storage import LocalAsyncBlobStorage
+from .shared_file_async_storage import SharedFileAsyncStorage
 
 
 class LocalAsyncFactory(BaseAsyncFactory):
-    def __init__(self, root_path: StrPath):
+    """Factory of asynchronous storages kept in local files.
+
+    Args:
+        root_path: Folder of all collections.
+        embedding_encoding: Encoding of embeddings in files (see `EmbeddingEncoding`).
+    """
+
+    def __init__(self, root_path: StrPath, embedding_encoding: EmbeddingEncoding = "json"):
         super().__init__()
         self._root_path = Path(root_path)
+        self.embedding_encoding: EmbeddingEncoding = embedding_encoding
 
     def create_storage[T: BaseModel](
         self,
@@ -26,6 +36,7 @@ class LocalAsyncFactory(BaseAsyncFactory):
             clazz=clazz,
             key=key,
             root_path=self._root_path,
+            embedding_encoding=self.embedding_encoding,
         )
 
     def create_compact_storage[T: BaseModel](
@@ -41,6 +52,21 @@ class LocalAsyncFactory(BaseAsyncFactory):
             root_path=self._root_path,
         )
 
+    def create_shared_storage[T: BaseModel](
+        self,
+        collection_name: str,
+        clazz: Type[T],
+        key: Optional[Callable[[T], str] | str] = None,
+    ) -> BaseAsyncStorage[T]:
+        """Creates storage shared by all processes (e.g. gunicorn workers) - `SharedFileAsyncStorage`."""
+        return SharedFileAsyncStorage(
+            collection_name=collection_name,
+            clazz=clazz,
+            key=key,
+            root_path=self._root_path,
+            embedding_encoding=self.embedding_encoding,
+        )
+
     def create_blob_storage[T: BaseBlobMetadata](
         self,
         collection_name: str,
@@ -0,0 +1,70 @@
+"""Compact encoding of embeddings stored in local files"""
+
+import base64
+import sys
+from array import array
+from typing import Any, Literal, Sequence
+
+type EmbeddingEncoding = Literal["json", "float32", "int8"]
+"""Encoding of embeddings in files:
+
+- `json` - list of floats (default),
+- `float32` - base64 of little-endian float32 values (`"f32:..."`, about 5x smaller),
+- `int8` - base64 of values quantized to int8 with a scale (`"i8:<scale>:..."`, about 20x smaller,
+  precision of about 1% of the largest absolute value).
+"""
+
+_FLOAT32 = "f32:"
+_INT8 = "i8:"
+
+
+def encode_embedding(values: Sequence[float], encoding: EmbeddingEncoding) -> Any:
+    """Encodes the embedding.
+
+    Args:
+        values: Embedding.
+        encoding: Target encoding.
+    Returns:
+        JSON compatible value (`list` or `str`).
+    """
+    if encoding == "json":
+        return list(values)
+    if encoding == "float32":
+        return _FLOAT32 + _to_base64(array("f", values))
+    if encoding == "int8":
+        scale = max((abs(v) for v in values), default=0.0) / 127 or 1.0
+        return f"{_INT8}{scale!r}:" + _to_base64(array("b", (round(v / scale) for v in values)))
+    raise ValueError(f"Unknown embedding encoding {encoding}")
+
+
+def decode_embedding(stored: Any) -> Any:
+    """Decodes the embedding encoded by `encode_embedding()` (other values are returned unchanged)."""
+    if not isinstance(stored, str):
+        return stored
+    if stored.startswith(_FLOAT32):
+        return _from_base64("f", stored[len(_FLOAT32) :]).tolist()
+    if stored.startswith(_INT8):
+        scale, data = stored[len(_INT8) :].split(":", 1)
+        factor = float(scale)
+        return [v * factor for v in _from_base64("b", data)]
+    return stored
+
+
+def _to_base64(values: array) -> str:
+    if sys.byteorder == "big":
+        values.byteswap()
+    return base64.b64encode(values.tobytes()).decode("ascii")
+
+
+def _from_base64(typecode: str, data: str) -> array:
+    ret = array(typecode)
+    ret.frombytes(base64.b64decode(data))
+    if sys.byteorder == "big":
+        ret.byteswap()
+    return ret
+
+
+def embedding_key(clazz: Any, embedding_field_name: str) -> str:
+    """Returns the key of the embedding in stored data (alias of the field if it has one)."""
+    field = getattr(clazz, "model_fields", {}).get(embedding_field_name)
+    return (field.alias if field is not None and field.alias else None) or embedding_field_name
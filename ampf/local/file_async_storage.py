@@ -1,4 +1,6 @@
+import os
 from pathlib import Path
+from typing import Tuple
 
 import aiofiles
 
@@ -6,8 +8,24 @@ from ampf.local.file_storage import FileStorage
 
 type StrPath = str | Path
 
+type FileVersion = Tuple[int, int, int, int]
+
+FILE_TIME_GRANULARITY_NS = 2_000_000_000
+"""Coarsest resolution of file modification times (FAT) - files modified more recently may change
+without a change of their modification time and size"""
+
 
 class FileAsyncStorage(FileStorage):
+    @staticmethod
+    def _file_version(stat: os.stat_result) -> FileVersion:
+        """Returns inode, modification and change times and size of the file."""
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_ctime_ns, stat.st_size)
+
+    @staticmethod
+    def _is_settled(stat: os.stat_result, now_ns: int) -> bool:
+        """Checks if the file (stated after `now_ns`) can't be rewritten without a change of its version."""
+        return now_ns - max(stat.st_mtime_ns, stat.st_ctime_ns) > FILE_TIME_GRANULARITY_NS
+
     async def _async_write_to_file(self, full_path: StrPath, data: str) -> None:
         async with aiofiles.open(full_path, "w", encoding="utf-8") as file:
             await file.write(data)
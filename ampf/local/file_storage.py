@@ -2,7 +2,9 @@ import os
 import shutil
 from abc import ABC
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Optional
+
+from .embedding_codec import EmbeddingEncoding, decode_embedding, embedding_key, encode_embedding
 
 type StrPath = str | Path
 
@@ -21,6 +23,9 @@ class FileStorage(ABC):
         subfolder_characters: liczba początkowych znaków, które tworzą opcjonalny podkatalog
     """
 
+    embedding_encoding: EmbeddingEncoding = "json"
+    """Encoding of embeddings in files (see `EmbeddingEncoding`)"""
+
     def __init__(
         self,
         folder_name: Optional[str] = None,
@@ -59,6 +64,22 @@ class FileStorage(ABC):
     def drop(self):
         shutil.rmtree(self.folder_path)
 
+    def _encode_embedding(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Encodes the embedding of stored data with `embedding_encoding` (see `encode_embedding()`)."""
+        if self.embedding_encoding == "json":
+            return data
+        key = embedding_key(getattr(self, "clazz", None), getattr(self, "embedding_field_name", "embedding"))
+        if not isinstance(data.get(key), list):
+            return data
+        return {**data, key: encode_embedding(data[key], self.embedding_encoding)}
+
+    def _decode_embedding(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Decodes the embedding of stored data (in any encoding)."""
+        key = embedding_key(getattr(self, "clazz", None), getattr(self, "embedding_field_name", "embedding"))
+        if not isinstance(data.get(key), str):
+            return data
+        return {**data, key: decode_embedding(data[key])}
+
     def _write_to_file(self, full_path: Path, data: str) -> None:
         with open(full_path, "w", encoding="utf-8") as file:
             file.write(data)
@@ -4,8 +4,9 @@ import inspect
 import json
 import logging
 import os
+import time
 from pathlib import Path
-from typing import Any, AsyncIterator, Callable, Optional, Type
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple, Type
 
 import aiofiles
 import aiofiles.os
@@ -14,7 +15,8 @@ from pydantic import BaseModel
 from ampf.base import BaseAsyncQueryStorage
 from ampf.base.exceptions import KeyNotExistsException
 
-from .file_async_storage import FileAsyncStorage, StrPath
+from .embedding_codec import EmbeddingEncoding
+from .file_async_storage import FileAsyncStorage, FileVersion, StrPath
 
 
 class JsonMultiFilesAsyncStorage[T: BaseModel](BaseAsyncQueryStorage[T], FileAsyncStorage):
@@ -29,6 +31,7 @@ class JsonMultiFilesAsyncStorage[T: BaseModel](BaseAsyncQueryStorage[T], FileAsy
         embedding_search_limit: int = 5,
         subfolder_characters: Optional[int] = None,
         root_path: Optional[StrPath] = None,
+        embedding_encoding: EmbeddingEncoding = "json",
     ):
         BaseAsyncQueryStorage.__init__(self, collection_name, clazz, key, embedding_field_name, embedding_search_limit)
         FileAsyncStorage.__init__(
@@ -38,10 +41,20 @@ class JsonMultiFilesAsyncStorage[T: BaseModel](BaseAsyncQueryStorage[T], FileAsy
             subfolder_characters=subfolder_characters,
             root_path=root_path,
         )
+        self.embedding_encoding = embedding_encoding
         self._log = logging.getLogger(__name__)
+        # key -> (file version, content hash, the file is settled) of the last snapshot
+        self._fingerprints: Dict[str, Tuple[FileVersion, Optional[int], bool]] = {}
 
     async def put(self, key: Any, value: T) -> None:
         key = str(key)
+        data = self.to_storage(value)
+        if inspect.iscoroutine(data):
+            data = await data
+        changes = self._changes(key, value, data)
+        if changes is not None and not changes:
+            # Nothing has changed - the file isn't rewritten
+            return
         new_key = self.get_key(value)
         # If the key of the value has changed, remove the old key
         if key != new_key:
@@ -50,21 +63,19 @@ class JsonMultiFilesAsyncStorage[T: BaseModel](BaseAsyncQueryStorage[T], FileAsy
             key = new_key
 
         full_path = self._key_to_full_path(key)
-        data = self.to_storage(value)
-        if inspect.iscoroutine(data):
-            data = await data
-        json_str = json.dumps(data, indent=2, ensure_ascii=False, default=str)
+        json_str = json.dumps(self._encode_embedding(data), indent=2, ensure_ascii=False, default=str)
         await self._async_write_to_file(full_path, json_str)
+        await self._track(value, data)
 
     async def get(self, key: Any) -> T:
         key = str(key)
         full_path = self._key_to_full_path(key)
         try:
             data = await self._async_read_from_file(full_path)
-            ret = self.from_storage(json.loads(data))
+            ret = self.from_storage(self._decode_embedding(json.loads(data)))
             if inspect.iscoroutine(ret):
                 ret = await ret
-            return ret # type: ignore
+            return await self._track(ret)  # type: ignore
         except FileNotFoundError:
             raise KeyNotExistsException(self.collection_name, self.clazz, key)
 
@@ -93,12 +104,46 @@ class JsonMultiFilesAsyncStorage[T: BaseModel](BaseAsyncQueryStorage[T], FileAsy
                 yield k[:-5] if k.endswith(".json") else k
 
     async def delete(self, key: Any) -> None:
+        self._forget_tracked([key])
         full_path = self._key_to_full_path(str(key))
         try:
             await aiofiles.os.remove(full_path)
         except FileNotFoundError:
             raise KeyNotExistsException(self.collection_name, self.clazz, key)
 
+    async def _snapshot(self) -> Dict[str, Any]:
+        """Returns file versions (inode, times and size) as fingerprints.
+
+        Only recently modified files are read: their content hash is added to the fingerprint,
+        because they can be rewritten within one modification time tick (coarse-timestamp file systems).
+        """
+        now = time.time_ns()
+        ret: Dict[str, Any] = {}
+        fingerprints: Dict[str, Tuple[FileVersion, Optional[int], bool]] = {}
+        async for key in self.keys():
+            full_path = self._key_to_full_path(key)
+            try:
+                stat = os.stat(full_path)
+            except FileNotFoundError:
+                continue
+            version = self._file_version(stat)
+            settled = self._is_settled(stat, now)
+            previous = self._fingerprints.get(key)
+            if previous is not None and previous[0] == version and previous[2]:
+                fingerprint = previous
+            elif settled and (previous is None or previous[0] != version):
+                fingerprint = (version, None, True)
+            else:
+                try:
+                    content = await self._async_read_from_file(full_path)
+                except FileNotFoundError:
+                    continue
+                fingerprint = (version, hash(content), settled)
+            fingerprints[key] = fingerprint
+            ret[key] = fingerprint[:2]
+        self._fingerprints = fingerprints
+        return ret
+
     def _key_to_full_path(self, key: Any) -> Path:
         return self._create_file_path(str(key))
 
@@ -117,4 +162,5 @@ class JsonMultiFilesAsyncStorage[T: BaseModel](BaseAsyncQueryStorage[T], FileAsy
             root_path=self._root_path,
             embedding_field_name=self.embedding_field_name,
             embedding_search_limit=self.embedding_search_limit,
+            embedding_encoding=self.embedding_encoding,
         )
@@ -9,6 +9,7 @@ from typing import Any, Callable, Iterator, Optional, Self, Type
 from pydantic import BaseModel
 
 from ..base import BaseQueryStorage, KeyNotExistsException
+from .embedding_codec import EmbeddingEncoding
 from .file_storage import FileStorage
 
 
@@ -24,6 +25,7 @@ class JsonMultiFilesStorage[T: BaseModel](BaseQueryStorage[T], FileStorage):
         embedding_search_limit: int = 5,
         subfolder_characters: Optional[int] = None,
         root_path: Optional[Path] = None,
+        embedding_encoding: EmbeddingEncoding = "json",
     ):
         BaseQueryStorage.__init__(
             self,
@@ -40,6 +42,7 @@ class JsonMultiFilesStorage[T: BaseModel](BaseQueryStorage[T], FileStorage):
             subfolder_characters=subfolder_characters,
             root_path=root_path,
         )
+        self.embedding_encoding = embedding_encoding
         self._log = logging.getLogger(__name__)
 
     def put(self, key: Any, value: T) -> None:
@@ -54,7 +57,7 @@ class JsonMultiFilesStorage[T: BaseModel](BaseQueryStorage[T], FileStorage):
         full_path = self._key_to_full_path(key)
         self._log.debug("put: %s (%s)", key, full_path)
         data = self.to_storage(value)
-        json_str = json.dumps(data, indent=2, ensure_ascii=False, default=str)
+        json_str = json.dumps(self._encode_embedding(data), indent=2, ensure_ascii=False, default=str)
         self._write_to_file(full_path, json_str)
 
     def get(self, key: Any) -> T:
@@ -63,7 +66,7 @@ class JsonMultiFilesStorage[T: BaseModel](BaseQueryStorage[T], FileStorage):
         full_path = self._key_to_full_path(key)
         try:
             data = self._read_from_file(full_path)
-            return self.from_storage(json.loads(data))
+            return self.from_storage(self._decode_embedding(json.loads(data)))
         except FileNotFoundError:
             raise KeyNotExistsException(self.collection_name, self.clazz, key)
 
@@ -121,4 +124,5 @@ class JsonMultiFilesStorage[T: BaseModel](BaseQueryStorage[T], FileStorage):
             root_path=self._root_path,
             embedding_field_name=self.embedding_field_name,
             embedding_search_limit=self.embedding_search_limit,
+            embedding_encoding=self.embedding_encoding,
         )
@@ -1,15 +1,18 @@
 """Stores data on disk in json files"""
 
+import asyncio
 import json
 import logging
-from typing import Any, AsyncIterator, Callable, Coroutine, Optional, Type
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Coroutine, Dict, List, Optional, Tuple, Type
 
 from pydantic import BaseModel
 
 from ampf.base.exceptions import KeyNotExistsException
 
 from ..base import BaseAsyncQueryStorage
-from .file_async_storage import FileAsyncStorage, StrPath
+from .file_async_storage import FileAsyncStorage, FileVersion, StrPath
 
 DEF_EXT = "json"
 
@@ -33,6 +36,10 @@ class JsonOneFileAsyncStorage[T: BaseModel](BaseAsyncQueryStorage[T], FileAsyncS
             self.file_name = collection_name
         self.file_path = self.folder_path.joinpath(self.file_name)
         self._log = logging.getLogger(__name__)
+        # (file version, fingerprints of items, the file is settled) of the last snapshot
+        self._last_snapshot: Optional[Tuple[FileVersion, Dict[str, Any], bool]] = None
+        # Guards read-modify-write of the file
+        self._lock = asyncio.Lock()
 
     async def _load_data(self) -> dict[str, Any]:
         try:
@@ -49,23 +56,61 @@ class JsonOneFileAsyncStorage[T: BaseModel](BaseAsyncQueryStorage[T], FileAsyncS
             sort_keys=True,
             default=str,
         )
-        await self._async_write_to_file(self.file_path, jdata)
+        # Write to a temporary file and replace, so readers never see a partially written file
+        tmp_path = self.file_path.with_name(f"{self.file_name}.tmp")
+        await self._async_write_to_file(tmp_path, jdata)
+        os.replace(tmp_path, self.file_path)
 
-    async def put(self, key: Any, value: T) -> None:
-        key = str(key)
+    async def _to_stored_value(self, value: T) -> Dict[str, Any]:
         dv = self.to_storage(value)
         if isinstance(dv, Coroutine):
             dv = await dv
-        if isinstance(self.key, str):
-            dv.pop(self.key, None)
-        data = await self._load_data()
-        new_key = self.get_key(value)
-        # If the key of the value has changed, remove the old key
-        if str(key) != new_key and str(key) in data:
-            data.pop(str(key))
-        # Store the value with the new key
-        data[str(new_key)] = dv
-        await self._save_data(data)
+        return self._without_key(dv)
+
+    def _without_key(self, dv: Dict[str, Any]) -> Dict[str, Any]:
+        if isinstance(self.key, str) and self.key in dv:
+            dv = dict(dv)
+            dv.pop(self.key)
+        return dv
+
+    async def put(self, key: Any, value: T) -> None:
+        key = str(key)
+        stored = self.to_storage(value)
+        if isinstance(stored, Coroutine):
+            stored = await stored
+        changes = self._changes(key, value, stored)
+        if changes is not None and not changes:
+            # Nothing has changed - the file isn't rewritten
+            return
+        dv = self._without_key(stored)
+        async with self._lock:
+            data = await self._load_data()
+            new_key = self.get_key(value)
+            # If the key of the value has changed, remove the old key
+            if str(key) != new_key and str(key) in data:
+                data.pop(str(key))
+                self._forget_tracked([key])
+            # Store the value with the new key
+            data[str(new_key)] = dv
+            await self._save_data(data)
+        await self._track(value, stored)
+
+    async def put_many(self, values: List[T]) -> None:
+        dvs = {self.get_key(value): await self._to_stored_value(value) for value in values}
+        async with self._lock:
+            data = await self._load_data()
+            data.update(dvs)
+            await self._save_data(data)
+
+    async def increment(self, key: Any, field: str, delta: int | float = 1) -> None:
+        key = str(key)
+        async with self._lock:
+            data = await self._load_data()
+            if key not in data:
+                raise KeyNotExistsException(self.collection_name, self.clazz, key)
+            dv = data[key]
+            dv[field] = (dv.get(field) or 0) + delta
+            await self._save_data(data)
 
     async def get(self, key: Any) -> T:
         key = str(key)
@@ -77,20 +122,82 @@ class JsonOneFileAsyncStorage[T: BaseModel](BaseAsyncQueryStorage[T], FileAsyncS
             ret = self.from_storage(dv)
             if isinstance(ret, Coroutine):
                 ret = await ret
-            return ret
+            return await self._track(ret)
         except KeyError:
             raise KeyNotExistsException(self.collection_name, self.clazz, key)
 
+    async def get_many(self, keys: List[Any]) -> Dict[str, T]:
+        # The file is read once (not once per key)
+        data = await self._load_data()
+        ret = {}
+        for key in map(str, keys):
+            dv = data.get(key)
+            if dv is None or key in ret:
+                continue
+            if isinstance(self.key, str):
+                dv[self.key] = key
+            value = self.from_storage(dv)
+            if isinstance(value, Coroutine):
+                value = await value
+            ret[key] = await self._track(value)
+        return ret
+
     async def keys(self) -> AsyncIterator[str]:
         data = await self._load_data()
         for k in data.keys():
             yield k
 
+    async def get_all(self, sort: Any = None) -> AsyncIterator[T]:
+        # The file is read once (not once per key)
+        data = await self._load_data()
+        for key, dv in data.items():
+            if isinstance(self.key, str):
+                dv[self.key] = key
+            ret = self.from_storage(dv)
+            if isinstance(ret, Coroutine):
+                ret = await ret
+            yield await self._track(ret)
+
+    async def delete_many(self, keys: List[Any]) -> None:
+        self._forget_tracked(keys)
+        async with self._lock:
+            data = await self._load_data()
+            count = len(data)
+            for key in keys:
+                data.pop(str(key), None)
+            if len(data) != count:
+                await self._save_data(data)
+
+    async def _snapshot(self) -> Dict[str, Any]:
+        """Returns fingerprints of items.
+
+        The file is read only if it was modified (or recently, because it can be rewritten
+        within one modification time tick on coarse-timestamp file systems).
+        """
+        now = time.time_ns()
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return {}
+        file_version = self._file_version(stat)
+        if self._last_snapshot and self._last_snapshot[0] == file_version and self._last_snapshot[2]:
+            return dict(self._last_snapshot[1])
+        try:
+            data = await self._load_data()
+        except json.JSONDecodeError:
+            # The file is being written - use the previous snapshot until the next poll
+            return dict(self._last_snapshot[1]) if self._last_snapshot else {}
+        ret = {k: hash(json.dumps(v, sort_keys=True, default=str)) for k, v in data.items()}
+        self._last_snapshot = (file_version, ret, self._is_settled(stat, now))
+        return dict(ret)
+
     async def delete(self, key: Any) -> None:
         key = str(key)
-        data = await self._load_data()
-        if key in data:
-            data.pop(key, None)
-            await self._save_data(data)
-        else:
-            raise KeyNotExistsException(self.collection_name, self.clazz, key)
+        self._forget_tracked([key])
+        async with self._lock:
+            data = await self._load_data()
+            if key in data:
+                data.pop(key, None)
+                await self._save_data(data)
+            else:
+                raise KeyNotExistsException(self.collection_name, self.clazz, key)
@@ -99,7 +99,7 @@ class LocalAsyncBlobStorage[T: BaseBlobMetadata](BaseAsyncBlobStorage[T]):
         await asyncio.gather(write_data(), write_meta())
 
     @override
-    async def download_async(self, key: str) -> Blob[T]:
+    async def download_async(self, key: str, stream: bool = False) -> Blob[T]:
         meta_path = self._get_meta_path(key)
         data_path = self._find_data_path(key)
 
@@ -130,7 +130,10 @@ class LocalAsyncBlobStorage[T: BaseBlobMetadata](BaseAsyncBlobStorage[T]):
         return data_path is not None and self._get_meta_path(key).exists()
 
     @override
-    async def list_blobs(self, prefix: Optional[str] = None) -> AsyncGenerator[BlobHeader[T]]:
+    async def list_blobs(
+        self, prefix: Optional[str] = None, delimiter: Optional[str] = None, max_results: Optional[int] = None
+    ) -> AsyncGenerator[BlobHeader[T]]:
+        count = 0
         # Use rglob to recursively find all .json files in the directory tree.
         for meta_file in self.base_path.rglob("*.json"):
             # Calculate the key by making the path relative to the base_path
@@ -139,6 +142,11 @@ class LocalAsyncBlobStorage[T: BaseBlobMetadata](BaseAsyncBlobStorage[T]):
 
             if prefix and not key.startswith(prefix):
                 continue
+            if self._subfolder(key, prefix, delimiter) is not None:
+                continue
+            if max_results is not None and count >= max_results:
+                return
+            count += 1
             metadata = await self.get_metadata(key)
             yield BlobHeader(name=key, metadata=metadata)
 
@@ -7,16 +7,26 @@ from pydantic import BaseModel
 from ampf.base.blob_model import BaseBlobMetadata, BlobLocation
 
 from ..base import BaseFactory, BaseStorage
+from .embedding_codec import EmbeddingEncoding
 from .file_storage import StrPath
 from .json_multi_files_storage import JsonMultiFilesStorage
 from .json_one_file_storage import JsonOneFileStorage
 from .local_blob_storage import LocalBlobStorage
+from .shared_file_storage import SharedFileStorage
 
 
 class LocalFactory(BaseFactory):
-    def __init__(self, root_path: StrPath):
+    """Factory of storages kept in local files.
+
+    Args:
+        root_path: Folder of all collections.
+        embedding_encoding: Encoding of embeddings in files (see `EmbeddingEncoding`).
+    """
+
+    def __init__(self, root_path: StrPath, embedding_encoding: EmbeddingEncoding = "json"):
         super().__init__()
         self._root_path = Path(os.path.abspath(root_path))
+        self.embedding_encoding: EmbeddingEncoding = embedding_encoding
 
     def create_storage[T: BaseModel](
         self,
@@ -29,6 +39,7 @@ class LocalFactory(BaseFactory):
             clazz=clazz,
             key=key,
             root_path=self._root_path,
+            embedding_encoding=self.embedding_encoding,
         )
 
     def create_compact_storage[T: BaseModel](
@@ -46,6 +57,21 @@ class LocalFactory(BaseFactory):
             root_path=self._root_path,
         )
 
+    def create_shared_storage[T: BaseModel](
+        self,
+        collection_name: str,
+        clazz: Type[T],
+        key: Optional[Callable[[T], str] | str] = None,
+    ) -> BaseStorage[T]:
+        """Creates storage shared by all processes (e.g. gunicorn workers) - `SharedFileStorage`."""
+        return SharedFileStorage(
+            collection_name=collection_name,
+            clazz=clazz,
+            key=key,
+            root_path=self._root_path,
+            embedding_encoding=self.embedding_encoding,
+        )
+
     def create_blob_storage[T: BaseBlobMetadata](
         self,
         collection_name: str,
@@ -0,0 +1,107 @@
+"""Asynchronous storage shared by processes (e.g. gunicorn workers) in a memory mapped file"""
+
+from typing import Any, AsyncIterator, Callable, Coroutine, Dict, List, Optional, Type
+
+from pydantic import BaseModel
+from pydantic_core import from_json, to_json
+
+from ..base import BaseAsyncQueryStorage, KeyNotExistsException
+from .embedding_codec import EmbeddingEncoding
+from .file_storage import FileStorage, StrPath
+from .shared_file_storage import DEF_EXT, shared_log
+
+
+class SharedFileAsyncStorage[T: BaseModel](BaseAsyncQueryStorage[T], FileStorage):
+    """Asynchronous version of `SharedFileStorage`.
+
+    Operations work on the memory mapped file directly (reads don't do any I/O
+    if the data is in the page cache). `watch()` polls only the version of the
+    collection, so it is cheap to poll often.
+
+    Args:
+        collection_name: Name of the collection (and of the file).
+        clazz: Class of items.
+        key: Name of the key field or a function returning the key.
+        root_path: Folder of the file.
+        embedding_encoding: Encoding of embeddings (see `EmbeddingEncoding`).
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        clazz: Type[T],
+        key: Optional[str | Callable[[T], str]] = None,
+        embedding_field_name: str = "embedding",
+        embedding_search_limit: int = 5,
+        root_path: Optional[StrPath] = None,
+        embedding_encoding: EmbeddingEncoding = "json",
+    ):
+        BaseAsyncQueryStorage.__init__(self, collection_name, clazz, key, embedding_field_name, embedding_search_limit)
+        FileStorage.__init__(self, default_ext=DEF_EXT, root_path=root_path)
+        self.embedding_encoding = embedding_encoding
+        self.log = shared_log(self.folder_path.joinpath(f"{collection_name}.{DEF_EXT}"))
+        self._last_snapshot: Optional[tuple[int, Dict[str, Any]]] = None
+
+    @property
+    def version(self) -> int:
+        """Number of writes to the collection (by all processes)."""
+        return self.log.version
+
+    async def put(self, key: Any, value: T) -> None:
+        new_key = str(self.get_key(value))
+        data = await self._to_payload(value)
+        # If the key of the value has changed, the old key is removed
+        self.log.put([(new_key, data)], delete=[str(key)] if str(key) != new_key else [])
+
+    async def put_many(self, values: List[T]) -> None:
+        self.log.put([(str(self.get_key(value)), await self._to_payload(value)) for value in values])
+
+    async def get(self, key: Any) -> T:
+        data = self.log.get(str(key))
+        if data is None:
+            raise KeyNotExistsException(self.collection_name, self.clazz, key)
+        return await self._from_payload(data)
+
+    async def keys(self) -> AsyncIterator[str]:
+        for key in self.log.keys():
+            yield key
+
+    async def get_all(self, sort: Any = None) -> AsyncIterator[T]:
+        for key in self.log.keys():
+            data = self.log.get(key)
+            if data is not None:
+                yield await self._from_payload(data)
+
+    async def delete(self, key: Any) -> None:
+        self.log.delete([str(key)])
+
+    async def delete_many(self, keys: List[Any]) -> None:
+        self.log.delete([str(key) for key in keys])
+
+    async def key_exists(self, key: Any) -> bool:
+        return str(key) in self.log
+
+    async def is_empty(self) -> bool:
+        return not len(self.log)
+
+    async def drop(self) -> None:
+        self.log.clear()
+
+    async def _snapshot(self) -> Dict[str, Any]:
+        # Stamps (versions of last writes) are fingerprints - they are copied only after a write
+        version = self.log.version
+        if self._last_snapshot is None or self._last_snapshot[0] != version:
+            self._last_snapshot = (version, self.log.stamps())
+        return dict(self._last_snapshot[1])
+
+    async def _to_payload(self, value: T) -> bytes:
+        data = self.to_storage(value)
+        if isinstance(data, Coroutine):
+            data = await data
+        return to_json(self._encode_embedding(data))
+
+    async def _from_payload(self, data: bytes) -> T:
+        ret = self.from_storage(self._decode_embedding(from_json(data)))
+        if isinstance(ret, Coroutine):
+            ret = await ret
+        return ret
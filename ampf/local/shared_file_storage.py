@@ -0,0 +1,102 @@
+"""Storage shared by processes (e.g. gunicorn workers) in a memory mapped file"""
+
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Type
+
+from pydantic import BaseModel
+from pydantic_core import from_json, to_json
+
+from ..base import BaseQueryStorage, KeyNotExistsException
+from .embedding_codec import EmbeddingEncoding
+from .file_storage import FileStorage, StrPath
+from .shared_log import SharedLog
+
+DEF_EXT = "log"
+
+
+class SharedFileStorage[T: BaseModel](BaseQueryStorage[T], FileStorage):
+    """Stores items as JSON records in one append-only file (`SharedLog`)
+    mapped into memory of all processes which use it.
+
+    All workers of one machine (e.g. gunicorn workers) share one copy of data
+    in the page cache instead of holding their own copies (`InMemoryStorage`),
+    and writes of one worker are visible to the others on the next read.
+    Reads don't lock, writes are serialized by a file lock.
+
+    Args:
+        collection_name: Name of the collection (and of the file).
+        clazz: Class of items.
+        key: Name of the key field or a function returning the key.
+        root_path: Folder of the file.
+        embedding_encoding: Encoding of embeddings (see `EmbeddingEncoding`).
+    """
+
+    _logs: Dict[Path, SharedLog] = {}
+
+    def __init__(
+        self,
+        collection_name: str,
+        clazz: Type[T],
+        key: Optional[str | Callable[[T], str]] = None,
+        embedding_field_name: str = "embedding",
+        embedding_search_limit: int = 5,
+        root_path: Optional[StrPath] = None,
+        embedding_encoding: EmbeddingEncoding = "json",
+    ):
+        BaseQueryStorage.__init__(self, collection_name, clazz, key, embedding_field_name, embedding_search_limit)
+        FileStorage.__init__(self, default_ext=DEF_EXT, root_path=root_path)
+        self.embedding_encoding = embedding_encoding
+        self.log = shared_log(self.folder_path.joinpath(f"{collection_name}.{DEF_EXT}"))
+
+    @property
+    def version(self) -> int:
+        """Number of writes to the collection (by all processes)."""
+        return self.log.version
+
+    def put(self, key: Any, value: T) -> None:
+        new_key = str(self.get_key(value))
+        # If the key of the value has changed, the old key is removed
+        self.log.put([(new_key, to_json(self._encode_embedding(self.to_storage(value))))], delete=[str(key)] if str(key) != new_key else [])
+
+    def put_many(self, values: List[T]) -> None:
+        self.log.put([(str(self.get_key(value)), to_json(self._encode_embedding(self.to_storage(value)))) for value in values])
+
+    def get(self, key: Any) -> T:
+        data = self.log.get(str(key))
+        if data is None:
+            raise KeyNotExistsException(self.collection_name, self.clazz, key)
+        return self.from_storage(self._decode_embedding(from_json(data)))
+
+    def keys(self) -> Iterator[str]:
+        yield from self.log.keys()
+
+    def get_all(self, sort: Any = None) -> Iterator[T]:
+        for key in self.log.keys():
+            data = self.log.get(key)
+            if data is not None:
+                yield self.from_storage(self._decode_embedding(from_json(data)))
+
+    def delete(self, key: Any) -> None:
+        self.log.delete([str(key)])
+
+    def key_exists(self, needle: Any) -> bool:
+        return str(needle) in self.log
+
+    def is_empty(self) -> bool:
+        return not len(self.log)
+
+    def count(self) -> int:
+        return len(self.log)
+
+    def drop(self) -> None:
+        self.log.clear()
+
+
+def shared_log(path: Path) -> SharedLog:
+    """Returns the log of the file (one instance per file in the process)."""
+    path = Path(path).absolute()
+    log = SharedFileStorage._logs.get(path)
+    if log is None:
+        log = SharedLog(path)
+        SharedFileStorage._logs[path] = log
+    return log
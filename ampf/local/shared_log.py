@@ -0,0 +1,286 @@
+"""Append-only log of records in a memory mapped file shared by processes"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+_MAGIC = b"AMPFLOG1"
+_HEADER = struct.Struct("<8sQQQ")
+"""magic, end of the last committed record, version, replaced flag"""
+_HEADER_SIZE = 64
+_END_OFFSET = 8
+_REPLACED_OFFSET = 24
+_RECORD = struct.Struct("<BHIQ")
+"""operation, key length, payload length, stamp (version of the write)"""
+_PUT = 1
+_DELETE = 2
+
+
+class _Entry(NamedTuple):
+    offset: int
+    length: int
+    stamp: int
+
+
+_open_logs: weakref.WeakSet[SharedLog] = weakref.WeakSet()
+"""Logs of the process (reopened in forked child processes)"""
+
+
+def _reopen_after_fork() -> None:
+    for log in list(_open_logs):
+        log._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reopen_after_fork)
+
+
+class SharedLog:
+    """Records (key -> bytes) kept in an append-only file mapped into memory
+    of all processes which use it (e.g. gunicorn workers).
+
+    Each process keeps only an index (key -> offset of the last record) and reads
+    records directly from the shared page cache without a file lock (threads of one
+    process are serialized by a thread lock, because the file may be reopened). Writes are serialized
+    by a file lock (`{path}.lock`): a record is appended and then the header
+    (end of the log and version) is updated, so readers never see a partial record.
+    Every read checks the header and indexes records appended by other processes.
+
+    Processes forked after the log was opened (e.g. gunicorn `--preload`) reopen
+    the files, because inherited descriptors share the file lock with the parent.
+
+    When overwritten and deleted records take more than `compact_ratio` of the log
+    (and at least `min_compact_bytes`), the log is rewritten to a new file which replaces
+    the old one. The old file is marked as replaced, so other processes reopen it.
+
+    Args:
+        path: Path of the log file (created if it doesn't exist).
+        compact_ratio: Maximal part of dead records in the log.
+        min_compact_bytes: Minimal size of dead records to compact the log.
+    """
+
+    def __init__(self, path: Path, compact_ratio: float = 0.5, min_compact_bytes: int = 1024 * 1024):
+        if fcntl is None:
+            raise NotImplementedError("SharedLog requires POSIX file locks (fcntl)")
+        self.path = Path(path)
+        self.compact_ratio = compact_ratio
+        self.min_compact_bytes = min_compact_bytes
+        self._lock_path = self.path.with_name(f"{self.path.name}.lock")
+        self._thread_lock = threading.RLock()
+        self._lock_fd: Optional[int] = None
+        self._fd: Optional[int] = None
+        self._mm: Optional[mmap.mmap] = None
+        self._index: Dict[str, _Entry] = {}
+        self._position = _HEADER_SIZE
+        self._dead = 0
+        self.generation = 0
+        """Incremented whenever the file is (re)opened - indexes built before are obsolete"""
+        _open_logs.add(self)
+
+    @property
+    def version(self) -> int:
+        """Number of writes to the log (it changes after every write of any process)."""
+        with self._thread_lock:
+            self.refresh()
+            return _HEADER.unpack_from(self._mm)[2]  # type: ignore
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns the payload of the key (`None` if it doesn't exist)."""
+        # The thread lock keeps other threads from reopening or remapping the file
+        # between the lookup and the read (it doesn't block other processes)
+        with self._thread_lock:
+            self.refresh()
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            return self._mm[entry.offset : entry.offset + entry.length]  # type: ignore
+
+    def keys(self) -> List[str]:
+        with self._thread_lock:
+            self.refresh()
+            return list(self._index.keys())
+
+    def stamps(self) -> Dict[str, int]:
+        """Returns versions of last writes of all keys (key -> stamp)."""
+        with self._thread_lock:
+            self.refresh()
+            return {key: entry.stamp for key, entry in self._index.items()}
+
+    def __contains__(self, key: str) -> bool:
+        with self._thread_lock:
+            self.refresh()
+            return key in self._index
+
+    def __len__(self) -> int:
+        with self._thread_lock:
+            self.refresh()
+            return len(self._index)
+
+    def put(self, records: Iterable[Tuple[str, bytes]], delete: Iterable[str] = ()) -> None:
+        """Writes payloads of keys (all of them with one lock).
+
+        Args:
+            records: Keys and their payloads.
+            delete: Keys deleted in the same write (e.g. an old key of a renamed item).
+        """
+        with self._locked():
+            deleted = [(_DELETE, key, b"") for key in delete if key in self._index]
+            self._append_locked(deleted + [(_PUT, key, payload) for key, payload in records])
+
+    def delete(self, keys: Iterable[str]) -> None:
+        """Deletes the keys (not existing ones are ignored)."""
+        with self._locked():
+            self._append_locked([(_DELETE, key, b"") for key in keys if key in self._index])
+
+    def clear(self) -> None:
+        """Deletes all keys."""
+        with self._locked():
+            self._rewrite_locked([])
+
+    def compact(self) -> None:
+        """Rewrites the log without overwritten and deleted records."""
+        with self._locked():
+            self._rewrite_locked(list(self._index))
+
+    def close(self) -> None:
+        with self._thread_lock:
+            self._close_file()
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+    def _after_fork(self) -> None:
+        # The lock of the parent may be held by its other thread
+        self._thread_lock = threading.RLock()
+        # Inherited descriptors share one open file description (and its flock) with the parent
+        self._close_file()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def refresh(self) -> None:
+        """Indexes records written by other processes (called by every read)."""
+        with self._thread_lock:
+            if self._mm is None:
+                with self._locked():
+                    return
+            _, end, _, replaced = _HEADER.unpack_from(self._mm)
+            if replaced:
+                self._open()
+            elif end > self._position:
+                if end > len(self._mm):
+                    self._remap()
+                if end <= len(self._mm):
+                    self._index_records(end)
+
+    def _append_locked(self, records: List[Tuple[int, str, bytes]]) -> None:
+        if not records:
+            return
+        _, end, version, _ = _HEADER.unpack_from(self._mm)  # type: ignore
+        version += 1
+        data = b"".join(self._encode(op, key, payload, version) for op, key, payload in records)
+        os.pwrite(self._fd, data, end)  # type: ignore
+        # The header is updated after the records, so readers never see a partial record
+        os.pwrite(self._fd, struct.pack("<QQ", end + len(data), version), _END_OFFSET)  # type: ignore
+        self.refresh()
+        live = self._position - _HEADER_SIZE - self._dead
+        if self._dead >= self.min_compact_bytes and self._dead > live * self.compact_ratio:
+            self._rewrite_locked(list(self._index))
+
+    def _rewrite_locked(self, keys: List[str]) -> None:
+        _, _, version, _ = _HEADER.unpack_from(self._mm)  # type: ignore
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _HEADER_SIZE, version + 1, 0).ljust(_HEADER_SIZE, b"\0"))
+            end = _HEADER_SIZE
+            for key in keys:
+                entry = self._index[key]
+                record = self._encode(_PUT, key, self._mm[entry.offset : entry.offset + entry.length], entry.stamp)  # type: ignore
+                f.write(record)
+                end += len(record)
+            f.seek(_END_OFFSET)
+            f.write(struct.pack("<Q", end))
+        os.replace(tmp_path, self.path)
+        # Other processes reopen the file when they see the flag
+        os.pwrite(self._fd, struct.pack("<Q", 1), _REPLACED_OFFSET)  # type: ignore
+        self._open()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._thread_lock:
+            if self._lock_fd is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._lock_fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)  # type: ignore
+            try:
+                if self._mm is None:
+                    self._open()
+                else:
+                    self.refresh()
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)  # type: ignore
+
+    def _open(self) -> None:
+        self._close_file()
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(fd).st_size < _HEADER_SIZE:
+            # New file - it is created only with the lock held
+            os.pwrite(fd, _HEADER.pack(_MAGIC, _HEADER_SIZE, 0, 0).ljust(_HEADER_SIZE, b"\0"), 0)
+        self._fd = fd
+        self._mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != _MAGIC:
+            self._close_file()
+            raise ValueError(f"{self.path} is not a shared log file")
+        self._index = {}
+        self._position = _HEADER_SIZE
+        self._dead = 0
+        self.generation += 1
+        self._index_records(_HEADER.unpack_from(self._mm)[1])
+
+    def _remap(self) -> None:
+        self._mm.close()  # type: ignore
+        self._mm = mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ)  # type: ignore
+
+    def _close_file(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _index_records(self, end: int) -> None:
+        mm = self._mm
+        position = self._position
+        while position < end:
+            op, key_length, length, stamp = _RECORD.unpack_from(mm, position)  # type: ignore
+            key_offset = position + _RECORD.size
+            key = mm[key_offset : key_offset + key_length].decode()  # type: ignore
+            offset = key_offset + key_length
+            previous = self._index.pop(key, None)
+            if previous is not None:
+                self._dead += _RECORD.size + len(key.encode()) + previous.length
+            if op == _PUT:
+                self._index[key] = _Entry(offset, length, stamp)
+            else:
+                self._dead += offset - position
+            position = offset + length
+        self._position = position
+
+    @staticmethod
+    def _encode(op: int, key: str, payload: bytes, stamp: int) -> bytes:
+        key_bytes = key.encode()
+        return _RECORD.pack(op, len(key_bytes), len(payload), stamp) + key_bytes + payload
@@ -1,7 +1,7 @@
 import json
 import logging
 import uuid
-from typing import Any, Callable, Iterable, Iterator, List, Optional, Type
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, Type
 
 from pydantic import BaseModel
 
@@ -94,14 +94,22 @@ class WeaviateStorage[T: BaseModel](BaseStorage[T]):
     def drop(self):
         self.collection.data.delete_many(where=Filter.by_property("key").like("*"))
 
-    def find_nearest(self, embedding: List[float], limit: Optional[int] = None) -> Iterator[T]:
+    def find_nearest(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> Iterator[T]:
+        for item, _ in self.find_nearest_with_distances(embedding, limit, distance_threshold):
+            yield item
+
+    def find_nearest_with_distances(
+        self, embedding: List[float], limit: Optional[int] = None, distance_threshold: Optional[float] = None
+    ) -> List[Tuple[T, float]]:
         response = self.collection.query.near_vector(
-            near_vector=embedding, limit=limit, return_metadata=MetadataQuery(distance=True)
+            near_vector=embedding,
+            limit=limit,
+            distance=distance_threshold,
+            return_metadata=MetadataQuery(distance=True),
         )
-        for o in response.objects:
-            print(o.properties)
-            print(o.metadata.distance)
-            yield self.clazz.model_validate(o.properties)
+        return [(self.clazz.model_validate(o.properties), o.metadata.distance) for o in response.objects]
 
     def where(self, field: str, op: OP, value: Any) -> BaseQuery[T]:
         return super().where(field, op, value)
@@ -32,7 +32,7 @@ async def async_factory(request, tmp_path):
     elif request.param == GcpAsyncFactory:
         async_factory: GcpAsyncFactory = request.param(bucket_name="unit-tests-001")
         yield async_factory
-        async_factory._async_db.close()
+        await async_factory.close()
         async_factory: GcpAsyncFactory = request.param(bucket_name="unit-tests-001")
         storage = async_factory.create_storage("documents", Document)
         blob_storage = async_factory.create_blob_storage("documents")
@@ -0,0 +1,87 @@
+import asyncio
+from typing import Dict, List
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from ampf.fastapi import DataLoaders, DataLoadersDep
+from ampf.in_memory import InMemoryAsyncStorage
+
+
+class Author(BaseModel):
+    id: str
+    name: str
+
+
+class Book(BaseModel):
+    id: str
+    title: str
+    author_id: str
+
+
+class CountingStorage(InMemoryAsyncStorage[Author]):
+    def __init__(self):
+        super().__init__("data_loader_authors", Author)
+        self.calls: List[List[str]] = []
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Author]:
+        self.calls.append(keys)
+        return await super().get_many(keys)
+
+
+@pytest.fixture
+async def authors() -> CountingStorage:
+    authors = CountingStorage()
+    await authors.drop()
+    await authors.save(Author(id="1", name="Lem"))
+    await authors.save(Author(id="2", name="Tolkien"))
+    return authors
+
+
+@pytest.fixture
+def client(authors: CountingStorage) -> TestClient:
+    books = [
+        Book(id="a", title="Solaris", author_id="1"),
+        Book(id="b", title="The Hobbit", author_id="2"),
+        Book(id="c", title="Fiasco", author_id="1"),
+    ]
+    app = FastAPI()
+
+    @app.get("/books")
+    async def get_books(loaders: DataLoadersDep):
+        loader = loaders.get(authors)
+
+        async def with_author(book: Book):
+            author = await loader.load(book.author_id)
+            return {"title": book.title, "author": author.name}
+
+        return await asyncio.gather(*(with_author(book) for book in books))
+
+    return TestClient(app)
+
+
+def test_n_plus_one_is_one_read(client: TestClient, authors: CountingStorage):
+    # When: A list with related items is requested
+    response = client.get("/books")
+    # Then: Related items are read at once
+    assert 200 == response.status_code
+    assert ["Lem", "Tolkien", "Lem"] == [b["author"] for b in response.json()]
+    assert [["1", "2"]] == authors.calls
+
+
+def test_loaders_are_request_scoped(client: TestClient, authors: CountingStorage):
+    # When: The same list is requested twice
+    client.get("/books")
+    client.get("/books")
+    # Then: Items are read again (nothing is cached between requests)
+    assert 2 == len(authors.calls)
+
+
+async def test_one_loader_per_storage(authors: CountingStorage):
+    # Given: Request scoped data loaders
+    loaders = DataLoaders()
+    # When: A loader of the same storage is requested twice
+    # Then: The same loader is returned
+    assert loaders.get(authors) is loaders.get(authors)
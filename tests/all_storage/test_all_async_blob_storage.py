@@ -218,6 +218,22 @@ async def test_list_blobs(storage: BaseAsyncBlobStorage):
     assert blobs[0].metadata.age == blob.metadata.age
 
 
+@pytest.mark.asyncio
+async def test_list_with_delimiter(storage: BaseAsyncBlobStorage):
+    # Given: Blobs in a folder and its subfolder
+    for name in ["dir/a.txt", "dir/b.txt", "dir/sub/c.txt"]:
+        await storage.upload_async(Blob(name=name, content="test data", metadata=MyMetadata(name="test", age=10)))
+    # When: Blobs are listed with a delimiter
+    names = sorted([n async for n in storage.names("dir/", delimiter="/")])
+    blobs = sorted([b.name async for b in storage.list_blobs("dir/", delimiter="/")])
+    # Then: The subfolder is returned as one name and its blobs are skipped
+    assert ["dir/a.txt", "dir/b.txt", "dir/sub/"] == names
+    assert ["dir/a.txt", "dir/b.txt"] == blobs
+    # And: The number of results can be limited
+    assert 2 == len([n async for n in storage.names("dir/", max_results=2)])
+    assert 1 == len([b async for b in storage.list_blobs("dir/", delimiter="/", max_results=1)])
+
+
 @pytest.mark.asyncio
 async def test_delete_folder(storage: BaseAsyncBlobStorage):
     # Give: An uploaded blob in test1 folder
@@ -364,3 +380,15 @@ async def test_upsert_transactional_concurrent_creation(storage: BaseAsyncBlobSt
     final_blob = await storage.download_async("concurrent_blob")
     # The final result depends on which function executed first on the final successful write
     assert final_blob.content == b"created2_updated1" or final_blob.content == b"created1_updated2"
+
+
+@pytest.mark.asyncio
+async def test_download_range(storage: BaseAsyncBlobStorage):
+    # Given: A stored blob
+    await storage.upload_async(Blob(name="file.txt", content="0123456789", metadata=MyMetadata(name="test", age=10)))
+    # When: Parts of it are downloaded
+    middle = await storage.download_range("file.txt", 2, 5)
+    tail = await storage.download_range("file.txt", 7)
+    # Then: Only requested bytes are returned
+    assert b"234" == middle.content
+    assert b"789" == tail.content
@@ -0,0 +1,127 @@
+import asyncio
+from typing import Dict, List
+
+import pytest
+from pydantic import BaseModel
+
+from ampf.base import AsyncDataLoader, BaseAsyncStorage, KeyNotExistsException
+from ampf.in_memory import InMemoryAsyncStorage
+from ampf.local import JsonOneFileAsyncStorage
+
+
+class D(BaseModel):
+    name: str
+
+
+class CountingStorage(InMemoryAsyncStorage[D]):
+    def __init__(self):
+        super().__init__("data_loader", D, key="name")
+        self.calls: List[List[str]] = []
+
+    async def get_many(self, keys: List[str]) -> Dict[str, D]:
+        self.calls.append(keys)
+        return await super().get_many(keys)
+
+
+@pytest.fixture
+async def storage() -> CountingStorage:
+    storage = CountingStorage()
+    await storage.drop()
+    for name in ["a", "b", "c"]:
+        await storage.save(D(name=name))
+    return storage
+
+
+async def test_loads_are_batched(storage: CountingStorage):
+    # Given: A data loader
+    loader = AsyncDataLoader(storage)
+    # When: Many keys (with duplicates) are loaded at once
+    a, b, a2, c = await asyncio.gather(loader.load("a"), loader.load("b"), loader.load("a"), loader.load("c"))
+    # Then: They are read with one call without duplicates
+    assert [["a", "b", "c"]] == storage.calls
+    assert ["a", "b", "c"] == [a.name, b.name, c.name]
+    # And: The same key returns the same object
+    assert a is a2
+
+
+async def test_loaded_values_are_cached(storage: CountingStorage):
+    # Given: A loaded value
+    loader = AsyncDataLoader(storage)
+    a = await loader.load("a")
+    # When: It is loaded again
+    a2 = await loader.load("a")
+    # Then: It is not read again
+    assert 1 == len(storage.calls)
+    assert a is a2
+    # When: The cache is cleared
+    loader.clear("a")
+    await loader.load("a")
+    # Then: It is read again
+    assert 2 == len(storage.calls)
+
+
+async def test_max_batch_size(storage: CountingStorage):
+    # Given: A data loader with small batches
+    loader = AsyncDataLoader(storage, max_batch_size=2)
+    # When: More keys are loaded
+    ret = await loader.load_many(["a", "b", "c"])
+    # Then: They are read in batches
+    assert [["a", "b"], ["c"]] == storage.calls
+    assert ["a", "b", "c"] == [d.name for d in ret if d]
+
+
+async def test_missing_key(storage: CountingStorage):
+    # Given: A data loader
+    loader = AsyncDataLoader(storage)
+    # When: Not existing key is loaded
+    # Then: Exception is raised
+    with pytest.raises(KeyNotExistsException):
+        await loader.load("x")
+    # And: Optional load returns None
+    assert await loader.load_optional("x") is None
+    assert [None, "a"] == [d.name if d else None for d in await loader.load_many(["x", "a"])]
+
+
+async def test_prime(storage: CountingStorage):
+    # Given: A value put into the cache
+    loader = AsyncDataLoader(storage)
+    loader.prime("z", D(name="z"))
+    # When: It is loaded
+    z = await loader.load("z")
+    # Then: It is not read from the storage
+    assert "z" == z.name
+    assert [] == storage.calls
+
+
+async def test_error_is_not_cached(storage: CountingStorage):
+    # Given: A storage which fails once
+    loader = AsyncDataLoader(storage)
+    get_many = storage.get_many
+
+    async def failing(keys):
+        storage.get_many = get_many
+        raise RuntimeError("Unavailable")
+
+    storage.get_many = failing
+    # When: A key is loaded
+    with pytest.raises(RuntimeError):
+        await loader.load("a")
+    # Then: It can be loaded again
+    assert "a" == (await loader.load("a")).name
+
+
+@pytest.mark.parametrize("storage_type", ["in_memory", "one_file"])
+async def test_get_many(storage_type: str, tmp_path):
+    # Given: A storage with items
+    if storage_type == "in_memory":
+        storage: BaseAsyncStorage[D] = InMemoryAsyncStorage("get_many", D, key="name")
+        await storage.drop()
+    else:
+        storage = JsonOneFileAsyncStorage("get_many", D, key="name", root_path=tmp_path)
+    await storage.save(D(name="a"))
+    await storage.save(D(name="b"))
+    # When: Many keys are read
+    ret = await storage.get_many(["a", "x", "b", "a"])
+    # Then: Only existing items are returned
+    assert {"a", "b"} == set(ret.keys())
+    assert "b" == ret["b"].name
@@ -133,3 +133,41 @@ async def test_register_and_get_collection(factory: BaseAsyncFactory):
 
     with pytest.raises(KeyNotExistsException):
         factory.get_collection(UnregisteredModel)
+
+
+def test_get_storage_is_cached(factory: BaseAsyncFactory):
+    # When: The same storage is requested twice
+    s1 = factory.get_storage("cached", D)
+    s2 = factory.get_storage("cached", D)
+    # Then: The same instance is returned
+    assert s1 is s2
+    # And: Compact storage is cached separately
+    assert factory.get_compact_storage("cached", D) is factory.get_compact_storage("cached", D)
+
+
+def test_get_collection_is_cached(factory: BaseAsyncFactory):
+    # Given: Registered collection with a subcollection
+    factory.register_collections([CollectionDef("parents", D1, subcollections=[CollectionDef("children", D2)])])
+    # When: The collection is requested twice
+    c1 = factory.get_collection("parents")
+    c2 = factory.get_collection(D1)
+    # Then: The same object is returned
+    assert c1 is c2
+    # And: Subcollections are reused
+    key = uuid4()
+    assert c1.get_collection(key, "children") is c1.get_collection(key, D2)
+    assert c1.get_collection(key, "children") is not c1.get_collection(uuid4(), "children")
+
+
+def test_subcollection_cache_is_bounded(factory: BaseAsyncFactory):
+    # Given: Collection with small subcollection cache
+    factory.register_collections([CollectionDef("bounded", D1, subcollections=[CollectionDef("children", D2)])])
+    collection = factory.get_collection("bounded")
+    collection._subcollection_cache.maxsize = 2
+    first = collection.get_collection("k1", "children")
+    # When: More subcollections than cache size are requested
+    collection.get_collection("k2", "children")
+    collection.get_collection("k3", "children")
+    # Then: The least recently used one is dropped
+    assert len(collection._subcollection_cache) == 2
+    assert collection.get_collection("k1", "children") is not first
@@ -1,6 +1,9 @@
 from io import BytesIO
 from pathlib import Path
-from ampf.base.blob_model import Blob, BlobCreate
+
+import pytest
+
+from ampf.base.blob_model import Blob, BlobCreate, BlobError
 
 
 def test_get_content():
@@ -53,3 +56,20 @@ def test_blob_from_blob_create_from_file_with_name():
     assert blob.name == "test2.txt"
     assert blob.content == b"This is the test file."
     assert blob.metadata.content_type == "text/plain"
+
+
+async def test_blob_from_async_stream():
+    # Given: Async stream of bytes
+    async def chunks():
+        yield b"foo"
+        yield b"bar"
+
+    # When: Blob is created from it
+    blob = Blob(name="foo.txt", async_data=chunks(), size=6)
+    # Then: Size is known and content is read once
+    assert 6 == blob.size
+    assert b"foobar" == await blob.read()
+    assert b"foobar" == blob.content
+    # And: Only one data source is allowed
+    with pytest.raises(BlobError):
+        Blob(name="foo.txt", content=b"foo", async_data=chunks())
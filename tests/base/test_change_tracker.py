@@ -0,0 +1,63 @@
+import gc
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from ampf.base import ChangeTracker
+
+
+class D(BaseModel):
+    name: str
+    description: Optional[str] = None
+    embedding: List[float] = []
+
+
+def test_unchanged_item():
+    # Given: A tracked item
+    tracker = ChangeTracker()
+    item = D(name="a", description="desc", embedding=[0.1] * 100)
+    tracker.track(item, "a", item.model_dump(exclude_none=True))
+    # When: It is checked without modifications
+    changes = tracker.changes(item, "a", item.model_dump(exclude_none=True))
+    # Then: Nothing has changed
+    assert changes is not None
+    assert not changes
+
+
+def test_changed_fields():
+    # Given: A tracked item
+    tracker = ChangeTracker()
+    item = D(name="a", description="desc", embedding=[0.1] * 100)
+    tracker.track(item, "a", item.model_dump(exclude_none=True))
+    # When: One field is modified and another one is removed
+    item.embedding[0] = 0.2
+    item.description = None
+    changes = tracker.changes(item, "a", item.model_dump(exclude_none=True))
+    # Then: Only these fields are reported
+    assert changes
+    assert ["embedding"] == list(changes.updated.keys())
+    assert ["description"] == changes.removed
+
+
+def test_untracked_item():
+    # Given: A tracked item
+    tracker = ChangeTracker()
+    item = D(name="a")
+    tracker.track(item, "a", item.model_dump())
+    # When: Another item or another key is checked
+    # Then: Changes are unknown
+    assert tracker.changes(D(name="a"), "a", item.model_dump()) is None
+    assert tracker.changes(item, "b", item.model_dump()) is None
+
+
+def test_items_are_tracked_weakly():
+    # Given: A tracked item
+    tracker = ChangeTracker()
+    item = D(name="a")
+    tracker.track(item, "a", item.model_dump())
+    assert 1 == len(tracker)
+    # When: The item is released
+    del item
+    gc.collect()
+    # Then: It is not tracked anymore
+    assert 0 == len(tracker)
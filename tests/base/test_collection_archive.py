@@ -0,0 +1,104 @@
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+from pydantic import BaseModel
+
+from ampf.base import CollectionDef, export_collection, import_collection
+from ampf.local import LocalAsyncFactory
+
+
+class Order(BaseModel):
+    id: str
+    amount: int
+
+
+class User(BaseModel):
+    id: str
+    name: str
+    created_at: datetime
+
+
+USERS = CollectionDef("users", User, subcollections=[CollectionDef("orders", Order)])
+
+
+@pytest.fixture
+async def source(tmp_path):
+    factory = LocalAsyncFactory(tmp_path / "source")
+    users = factory.create_collection(USERS)
+    for i in range(5):
+        await users.save(User(id=f"u{i}", name=f"User {i}", created_at=datetime(2025, 1, i + 1, tzinfo=timezone.utc)))
+        orders = users.get_collection(f"u{i}", "orders")
+        for j in range(i):
+            await orders.save(Order(id=f"o{j}", amount=j))
+    return factory
+
+
+async def test_export_import(source: LocalAsyncFactory, tmp_path):
+    # Given: An exported collection tree (5 users, 10 orders)
+    manifest = await export_collection(source, USERS, tmp_path / "archive", partition_size=4)
+    # When: It is imported to another factory
+    target = LocalAsyncFactory(tmp_path / "target")
+    imported = await import_collection(target, USERS, tmp_path / "archive")
+    # Then: All items are exported in partitions
+    assert 15 == manifest.records
+    assert 4 == len(manifest.partitions)
+    assert [4, 4, 4, 3] == [p.records for p in manifest.partitions]
+    # And: All items are imported
+    assert 15 == imported
+    users = target.create_collection(USERS)
+    assert sorted([u async for u in source.create_collection(USERS).get_all()], key=lambda u: u.id) == sorted(
+        [u async for u in users.get_all()], key=lambda u: u.id
+    )
+    # And: Subcollections are imported
+    orders = [o async for o in users.get_collection("u3", "orders").get_all()]
+    assert ["o0", "o1", "o2"] == sorted(o.id for o in orders)
+
+
+async def test_archive_is_gzipped_jsonl(source: LocalAsyncFactory, tmp_path):
+    # When: A collection is exported
+    manifest = await export_collection(source, USERS, tmp_path / "archive")
+    # Then: Partitions are gzipped JSON lines with a path to the (sub)collection
+    with gzip.open(tmp_path / "archive" / manifest.partitions[0].file_name, "rt") as f:
+        records = [json.loads(line) for line in f]
+    assert 15 == len(records)
+    assert {"p": [], "v": {"id": "u0", "name": "User 0", "created_at": "2025-01-01T00:00:00Z"}} in records
+    assert {"p": [["u1", "orders"]], "v": {"id": "o0", "amount": 0}} in records
+
+
+async def test_import_selected_partitions(source: LocalAsyncFactory, tmp_path):
+    # Given: An archive with many partitions
+    await export_collection(source, USERS, tmp_path / "archive", partition_size=5)
+    target = LocalAsyncFactory(tmp_path / "target")
+    # When: Partitions are imported separately (e.g. by different workers)
+    first = await import_collection(target, USERS, tmp_path / "archive", partitions=[0])
+    rest = await import_collection(target, USERS, tmp_path / "archive", partitions=[1, 2])
+    # Then: All items are imported
+    assert 5 == first
+    assert 10 == rest
+
+
+async def test_export_import_registered_collection(source: LocalAsyncFactory, tmp_path):
+    # Given: Factories with registered collections
+    source.register_collections([USERS])
+    target = LocalAsyncFactory(tmp_path / "target")
+    target.register_collections([USERS])
+    # When: A collection is exported and imported by its class
+    await export_collection(source, User, tmp_path / "archive")
+    imported = await import_collection(target, User, tmp_path / "archive")
+    # Then: All items are imported
+    assert 15 == imported
+
+
+async def test_export_import_msgpack(source: LocalAsyncFactory, tmp_path):
+    pytest.importorskip("msgpack")
+    # Given: A collection exported in msgpack format
+    manifest = await export_collection(source, USERS, tmp_path / "archive", format="msgpack")
+    # When: It is imported
+    target = LocalAsyncFactory(tmp_path / "target")
+    imported = await import_collection(target, USERS, tmp_path / "archive")
+    # Then: All items are imported
+    assert manifest.partitions[0].file_name.endswith(".msgpack.gz")
+    assert 15 == imported
+    assert "User 4" == (await target.create_collection(USERS).get("u4")).name
@@ -0,0 +1,76 @@
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel
+
+from ampf.base.similarity import NearestCollector
+from ampf.in_memory import InMemoryAsyncFactory, InMemoryFactory
+
+
+class D(BaseModel):
+    name: str
+    tenant: str
+    vector: Optional[List[float]] = None
+
+
+ITEMS = [
+    D(name="a", tenant="t1", vector=[1.0, 0.0]),
+    D(name="b", tenant="t1", vector=[0.8, 0.6]),
+    D(name="c", tenant="t2", vector=[1.0, 0.1]),
+    D(name="d", tenant="t1", vector=[0.0, 1.0]),
+    D(name="e", tenant="t1"),
+]
+
+
+@pytest.fixture(params=["create_storage", "create_array_storage"])
+def storage(request):
+    storage = getattr(InMemoryFactory(), request.param)("test_find_nearest", D, key="name")
+    storage.embedding_field_name = "vector"
+    storage.drop()
+    storage.put_many(ITEMS)
+    yield storage
+    storage.drop()
+
+
+def test_nearest_collector():
+    # Given: Collector of two nearest items
+    nearest = NearestCollector([1.0, 0.0], 2)
+    # When: Items are added
+    for item in ITEMS:
+        nearest.add(item.name, item.vector)
+    # Then: The nearest are kept with their distances
+    ret = nearest.result()
+    assert ["a", "c"] == [name for name, _ in ret]
+    assert 0.0 == pytest.approx(ret[0][1])
+
+
+def test_filtered_find_nearest(storage):
+    # When: Filtered items are searched
+    ret = storage.where("tenant", "==", "t1").find_nearest_with_distances([1.0, 0.0], limit=10)
+    # Then: Only matching items with vectors are returned (the nearest first)
+    assert ["a", "b", "d"] == [item.name for item, _ in ret]
+    assert [0.0, 0.2, 1.0] == pytest.approx([distance for _, distance in ret])
+    # And: The embedding field name is kept by the query
+    assert ["a"] == [item.name for item in storage.where("tenant", "==", "t1").find_nearest([1.0, 0.0], limit=1)]
+
+
+def test_distance_threshold(storage):
+    # When: Items are searched with distance threshold
+    ret = list(storage.find_nearest([1.0, 0.0], limit=10, distance_threshold=0.25))
+    # Then: Only close items are returned
+    assert ["a", "c", "b"] == [item.name for item in ret]
+
+
+async def test_async_filtered_find_nearest():
+    # Given: Async storage
+    storage = InMemoryAsyncFactory().create_storage("test_find_nearest_async", D, key="name")
+    storage.embedding_field_name = "vector"
+    await storage.drop()
+    await storage.put_many(ITEMS)
+    # When: Filtered items are searched
+    query = storage.where("tenant", "==", "t1")
+    ret = await query.find_nearest_with_distances([0.0, 1.0], limit=2, distance_threshold=0.5)
+    # Then: The nearest matching items are returned
+    assert ["d", "b"] == [item.name for item, _ in ret]
+    assert ["d"] == [item.name async for item in query.find_nearest([0.0, 1.0], limit=1)]
+    await storage.drop()
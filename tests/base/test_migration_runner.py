@@ -0,0 +1,131 @@
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from ampf.base import (
+    CollectionDef,
+    MigrationCheckpoint,
+    MigrationRunner,
+    StorageFormatFlags,
+    VersionedBaseModel,
+)
+from ampf.in_memory import InMemoryAsyncStorage
+from ampf.local import JsonMultiFilesAsyncStorage, JsonOneFileAsyncStorage, LocalAsyncFactory
+
+
+class D_v1(BaseModel):
+    name: str
+    value1: str
+
+
+class D_v2(VersionedBaseModel):
+    CURRENT_VERSION = 2
+    name: str
+    value2: str
+
+    @classmethod
+    def from_storage(cls, data: dict):
+        try:
+            return cls.model_validate(data)
+        except ValidationError:
+            v1 = D_v1.model_validate(data)
+            return cls(v=1, name=v1.name, value2=v1.value1)
+
+    def to_storage(self):
+        return self.model_dump(by_alias=True, exclude_none=True)
+
+
+@pytest.fixture(autouse=True)
+def new_format():
+    D_v2.FORMAT_FLAGS = StorageFormatFlags(save_new_format=True, migrate_legacy_on_read=True)
+    yield
+    D_v2.FORMAT_FLAGS = StorageFormatFlags()
+
+
+@pytest.fixture(params=[InMemoryAsyncStorage, JsonOneFileAsyncStorage, JsonMultiFilesAsyncStorage])
+async def storages(request, tmp_path):
+    kwargs = {} if request.param == InMemoryAsyncStorage else {"root_path": tmp_path}
+    storage_v1 = request.param("migrated", D_v1, key="name", **kwargs)
+    await storage_v1.drop()
+    # Given: Ten items stored in the old format
+    for i in range(10):
+        await storage_v1.put(f"k{i}", D_v1(name=f"k{i}", value1=f"v{i}"))
+    return storage_v1, request.param("migrated", D_v2, key="name", **kwargs)
+
+
+async def test_run(storages):
+    storage_v1, storage_v2 = storages
+    # When: Migration is run
+    report = await MigrationRunner(batch_size=3, concurrency=2).run(storage_v2)
+    # Then: All items are migrated
+    assert report.scanned == 10
+    assert report.migrated == 10
+    assert report.throughput > 0
+    assert all([item.v == 2 async for item in storage_v2.get_all()])
+    assert [item.value2 async for item in storage_v2.get_all() if item.name == "k3"] == ["v3"]
+
+
+async def test_run_resumes_after_checkpoint():
+    # Given: Items in old format and a checkpoint after the fifth one
+    storage_v1 = InMemoryAsyncStorage("resumed", D_v1, key="name")
+    await storage_v1.drop()
+    for i in range(10):
+        await storage_v1.put(f"k{i}", D_v1(name=f"k{i}", value1=f"v{i}"))
+    checkpoints = InMemoryAsyncStorage("checkpoints", MigrationCheckpoint)
+    await checkpoints.drop()
+    await checkpoints.save(MigrationCheckpoint(id="resumed", collection_name="resumed", last_key="k4", scanned=5))
+    storage_v2 = InMemoryAsyncStorage("resumed", D_v2, key="name")
+    # When: Migration is run
+    report = await MigrationRunner(checkpoints, batch_size=2, checkpoint_every=1).run(storage_v2)
+    # Then: Only items after the checkpoint are migrated
+    assert report.resumed
+    assert report.scanned == 10
+    assert report.migrated == 5
+    # And: Throughput counts only items scanned by this run
+    assert report.run_scanned == 5
+    assert report.throughput == pytest.approx(5 / report.elapsed)
+    raw = storage_v2.storage.items
+    assert [k for k, v in raw.items() if "v" in v] == ["k5", "k6", "k7", "k8", "k9"]
+    # And: The checkpoint is finished
+    assert (await checkpoints.get("resumed")).finished
+
+
+async def test_run_restarts_without_checkpoint_key():
+    # Given: Items in old format and a checkpoint of a key which doesn't exist anymore
+    storage_v1 = InMemoryAsyncStorage("restarted", D_v1, key="name")
+    await storage_v1.drop()
+    for i in range(10):
+        await storage_v1.put(f"k{i}", D_v1(name=f"k{i}", value1=f"v{i}"))
+    checkpoints = InMemoryAsyncStorage("checkpoints", MigrationCheckpoint)
+    await checkpoints.drop()
+    checkpoint = MigrationCheckpoint(id="restarted", collection_name="restarted", last_key="x", scanned=5, migrated=5)
+    await checkpoints.save(checkpoint)
+    storage_v2 = InMemoryAsyncStorage("restarted", D_v2, key="name")
+    # When: Migration is run
+    report = await MigrationRunner(checkpoints, batch_size=2).run(storage_v2)
+    # Then: All items are counted once
+    assert not report.resumed
+    assert report.scanned == 10
+    assert report.migrated == 10
+    assert (await checkpoints.get("restarted")).scanned == 10
+
+
+async def test_run_tree(tmp_path):
+    # Given: Collection tree with items in old format
+    factory = LocalAsyncFactory(tmp_path)
+    tree_v1 = factory.create_collection(CollectionDef("parents", D_v1, "name", [CollectionDef("children", D_v1, "name")]))
+    await tree_v1.drop()
+    await tree_v1.put("p", D_v1(name="p", value1="x"))
+    await tree_v1.get_collection("p", "children").put("c", D_v1(name="c", value1="y"))
+    tree_v2 = factory.create_collection(CollectionDef("parents", D_v2, "name", [CollectionDef("children", D_v2, "name")]))
+    # When: The tree is migrated
+    reports = await MigrationRunner().run_tree(tree_v2)
+    # Then: Items of all collections are migrated
+    assert [(r.collection_name, r.migrated) for r in reports] == [("parents", 1), ("parents/p/children", 1)]
+
+
+async def test_run_requires_new_format(storages):
+    # Given: Data are still saved in the old format
+    D_v2.FORMAT_FLAGS = StorageFormatFlags()
+    # When / Then: Migration is refused
+    with pytest.raises(ValueError):
+        await MigrationRunner().run(storages[1])
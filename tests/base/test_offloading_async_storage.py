@@ -0,0 +1,104 @@
+import json
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel
+
+from ampf.base import BaseAsyncFactory, OffloadingAsyncStorage
+from ampf.in_memory import InMemoryAsyncFactory
+from ampf.local import LocalAsyncFactory
+
+
+class Doc(BaseModel):
+    id: str
+    title: str
+    text: Optional[str] = None
+    embedding: List[float] = []
+
+
+BIG_TEXT = "lorem ipsum " * 1000
+
+
+@pytest.fixture(params=["local", "in_memory"])
+def factory(request, tmp_path) -> BaseAsyncFactory:
+    if request.param == "in_memory":
+        return InMemoryAsyncFactory()
+    return LocalAsyncFactory(tmp_path)
+
+
+@pytest.fixture
+async def storage(factory: BaseAsyncFactory) -> OffloadingAsyncStorage[Doc]:
+    storage = factory.create_offloading_storage("docs", Doc, threshold=1024)
+    await storage.drop()
+    await storage.save(Doc(id="d1", title="Big", text=BIG_TEXT, embedding=[0.5] * 10))
+    return storage
+
+
+async def test_large_field_is_offloaded(storage: OffloadingAsyncStorage[Doc], factory: BaseAsyncFactory):
+    # When: An item with a large field is read from the decorated storage without rehydration
+    if isinstance(factory, LocalAsyncFactory):
+        raw = json.loads((factory._root_path / "docs" / "d1.json").read_text())
+    else:
+        raw = storage.decorated.storage.get_data("d1")  # type: ignore
+    # Then: Only a pointer is stored in the item
+    assert {"$offloaded": {"name": "docs/d1/text"}} == raw["text"]
+    # And: Small fields are stored in the item
+    assert "Big" == raw["title"]
+    assert [0.5] * 10 == raw["embedding"]
+    # And: The field is in the blob storage
+    assert ["docs/d1/text"] == [name async for name in storage.blob_storage.names()]
+
+
+async def test_eager_rehydration(storage: OffloadingAsyncStorage[Doc]):
+    # When: An item is read
+    doc = await storage.get("d1")
+    # Then: The offloaded field is downloaded
+    assert BIG_TEXT == doc.text
+    assert [BIG_TEXT] == [d.text async for d in storage.get_all()]
+
+
+async def test_deferred_rehydration(factory: BaseAsyncFactory, storage: OffloadingAsyncStorage[Doc]):
+    # Given: A deferred storage of the same collection
+    deferred = factory.create_offloading_storage("docs", Doc, threshold=1024, deferred=True)
+    # When: An item is read
+    doc = await deferred.get("d1")
+    # Then: The offloaded field is not downloaded
+    assert doc.text is None
+    assert ["text"] == deferred.unloaded_fields(doc)
+    # When: The item is rehydrated
+    await deferred.rehydrate(doc)
+    # Then: The field is downloaded
+    assert BIG_TEXT == doc.text
+    assert [] == deferred.unloaded_fields(doc)
+
+
+async def test_unloaded_field_is_kept_on_write(factory: BaseAsyncFactory, storage: OffloadingAsyncStorage[Doc]):
+    # Given: An item read in deferred mode
+    deferred = factory.create_offloading_storage("docs", Doc, threshold=1024, deferred=True)
+    doc = await deferred.get("d1")
+    # When: Other field is modified and the item is saved
+    doc.title = "Modified"
+    await deferred.save(doc)
+    # Then: The offloaded field is kept
+    doc = await storage.get("d1")
+    assert "Modified" == doc.title
+    assert BIG_TEXT == doc.text
+
+
+async def test_unloaded_field_set_before_write(factory: BaseAsyncFactory, storage: OffloadingAsyncStorage[Doc]):
+    # Given: An item read in deferred mode
+    deferred = factory.create_offloading_storage("docs", Doc, threshold=1024, deferred=True)
+    doc = await deferred.get("d1")
+    # When: The unloaded field is set and the item is saved
+    doc.text = "Short"
+    await deferred.save(doc)
+    # Then: The new value is stored
+    assert "Short" == (await storage.get("d1")).text
+
+
+async def test_delete_removes_blobs(storage: OffloadingAsyncStorage[Doc]):
+    # When: An item is deleted
+    await storage.delete("d1")
+    # Then: Its offloaded fields are deleted
+    assert [] == [name async for name in storage.blob_storage.names()]
+    assert not await storage.key_exists("d1")
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+from ampf.base import BaseAsyncStorage, KeyNotExistsException, ReplicatedAsyncStorage
+from ampf.in_memory import InMemoryAsyncFactory, InMemoryAsyncStorage
+
+
+class D(BaseModel):
+    name: str
+    value: str
+
+
+@pytest.fixture
+async def source():
+    storage = InMemoryAsyncStorage("replicated", D)
+    await storage.drop()
+    await storage.put("foo", D(name="foo", value="beer"))
+    return storage
+
+
+@pytest.fixture
+async def replica(source):
+    async with ReplicatedAsyncStorage(source, reconnect_delay=0.01) as replica:
+        yield replica
+
+
+async def test_reads_from_memory(replica: ReplicatedAsyncStorage[D]):
+    # Then: The collection is loaded at startup
+    assert replica.is_live
+    assert replica.staleness == 0.0
+    assert await replica.get("foo") == D(name="foo", value="beer")
+    assert [d.name async for d in replica.where("value", "==", "beer").get_all()] == ["foo"]
+    with pytest.raises(KeyNotExistsException):
+        await replica.get("bar")
+
+
+async def test_follows_changes_made_elsewhere(replica: ReplicatedAsyncStorage[D]):
+    # Given: Another storage object for the same collection
+    other = InMemoryAsyncStorage("replicated", D)
+    # When: It changes the collection
+    await other.put("bar", D(name="bar", value="wine"))
+    await other.delete("foo")
+    await asyncio.sleep(0.01)
+    # Then: The replica is updated
+    assert [k async for k in replica.keys()] == ["bar"]
+    assert await replica.get("bar") == D(name="bar", value="wine")
+
+
+async def test_writes_are_forwarded(source: InMemoryAsyncStorage[D], replica: ReplicatedAsyncStorage[D]):
+    # When: Replica is modified
+    await replica.put("foo", D(name="foo", value="wine"))
+    await replica.create(D(name="baz", value="water"))
+    # Then: The source storage is modified too
+    assert await source.get("foo") == D(name="foo", value="wine")
+    assert await source.get("baz") == D(name="baz", value="water")
+    # And: Changes are visible in the replica immediately
+    assert await replica.get("baz") == D(name="baz", value="water")
+
+
+async def test_falls_back_to_source_when_stopped(source: InMemoryAsyncStorage[D], replica: ReplicatedAsyncStorage[D]):
+    # When: The replica is stopped
+    await replica.stop()
+    await source.put("bar", D(name="bar", value="wine"))
+    # Then: Reads go directly to the source
+    assert not replica.is_live
+    assert replica.staleness > 0.0
+    assert await replica.get("bar") == D(name="bar", value="wine")
+
+
+def test_factory_creates_replica():
+    # When: Factory creates replicated storage
+    storage = InMemoryAsyncFactory().create_replicated_storage("replicated", D)
+    # Then: It is not started yet
+    assert isinstance(storage, ReplicatedAsyncStorage)
+    assert not storage.is_live
+
+
+async def test_reconnects_after_disconnection(source: InMemoryAsyncStorage[D]):
+    # Given: A change feed which disconnects once
+    watch = source.watch
+    calls = 0
+
+    async def flaky_watch(poll_interval: float = 1.0, ready=None):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise ConnectionError("disconnected")
+        async for event in watch(poll_interval, ready):
+            yield event
+
+    source.watch = flaky_watch  # type: ignore
+    # When: The replica is started
+    async with ReplicatedAsyncStorage(source, reconnect_delay=0.01) as replica:
+        # Then: It reads from the source until reconnected
+        assert not replica.is_live
+        assert await replica.get("foo") == D(name="foo", value="beer")
+        await asyncio.sleep(0.05)
+        assert replica.is_live
+        assert calls == 2
+
+
+class PollingStorage(InMemoryAsyncStorage[D]):
+    """Storage with the default polling `watch()` which takes its first snapshot slowly"""
+
+    watch = BaseAsyncStorage.watch
+    snapshots = 0
+
+    async def _snapshot(self):
+        self.snapshots += 1
+        if self.snapshots == 1:
+            await asyncio.sleep(0.05)
+        return await super()._snapshot()
+
+
+async def test_loads_after_change_feed_is_ready(source: InMemoryAsyncStorage[D]):
+    # Given: A replica of a storage with polling change feed
+    polling = PollingStorage("replicated", D)
+    async with ReplicatedAsyncStorage(polling, poll_interval=0.01, reconnect_delay=0.01) as replica:
+        # When: The collection is changed right after the start
+        await source.put("bar", D(name="bar", value="wine"))
+        await asyncio.sleep(0.1)
+        # Then: The change is not lost
+        assert await replica.get("bar") == D(name="bar", value="wine")
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+from ampf.base import BaseAsyncStorage, CounterShard, KeyNotExistsException, ShardedCounter
+from ampf.in_memory import InMemoryAsyncStorage
+from ampf.local import JsonMultiFilesAsyncStorage, JsonOneFileAsyncStorage
+
+
+class Usage(BaseModel):
+    api_key: str
+    calls: int = 0
+    cost: float | None = None
+
+
+@pytest.fixture(params=["in_memory", "one_file", "multi_files"])
+async def usage(request, tmp_path) -> BaseAsyncStorage[Usage]:
+    if request.param == "in_memory":
+        storage = InMemoryAsyncStorage("usage", Usage)
+        await storage.drop()
+    elif request.param == "one_file":
+        storage = JsonOneFileAsyncStorage("usage", Usage, root_path=tmp_path)
+    else:
+        storage = JsonMultiFilesAsyncStorage("usage", Usage, root_path=tmp_path)
+    await storage.save(Usage(api_key="k1"))
+    return storage
+
+
+async def test_increment(usage: BaseAsyncStorage[Usage]):
+    # When: A field is incremented concurrently
+    await asyncio.gather(*(usage.increment("k1", "calls") for _ in range(20)))
+    # Then: No increment is lost
+    assert 20 == (await usage.get("k1")).calls
+
+
+async def test_increment_missing_field(usage: BaseAsyncStorage[Usage]):
+    # When: Not set field is incremented
+    await usage.increment("k1", "cost", 0.5)
+    await usage.increment("k1", "cost", -0.25)
+    # Then: It starts from 0
+    assert 0.25 == (await usage.get("k1")).cost
+
+
+async def test_increment_missing_key(usage: BaseAsyncStorage[Usage]):
+    # When: Not existing item is incremented
+    # Then: Exception is raised
+    with pytest.raises(KeyNotExistsException):
+        await usage.increment("k2", "calls")
+
+
+@pytest.fixture
+async def counter() -> ShardedCounter:
+    storage = InMemoryAsyncStorage("counter_shards", CounterShard)
+    await storage.drop()
+    return ShardedCounter(storage, num_shards=4)
+
+
+async def test_sharded_counter(counter: ShardedCounter):
+    # When: A counter is incremented many times
+    await asyncio.gather(*(counter.increment("task-1") for _ in range(100)))
+    await counter.increment("task-1", -10)
+    # Then: Its value is the sum of shards
+    assert 90 == await counter.get("task-1")
+    # And: Writes are spread over shards
+    assert 1 < len([k async for k in counter.storage.keys()]) <= 4
+
+
+async def test_sharded_counter_missing_and_reset(counter: ShardedCounter):
+    # Given: A counter
+    await counter.increment("a", 5)
+    # Then: Not existing counter is 0
+    assert 0 == await counter.get("b")
+    # When: The counter is reset
+    await counter.reset("a")
+    # Then: It is 0
+    assert 0 == await counter.get("a")
@@ -0,0 +1,219 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+from ampf.base import (
+    Blob,
+    BlobLocation,
+    KeyNotExistsException,
+    SingleFlight,
+    SingleFlightAsyncBlobStorage,
+    SingleFlightAsyncStorage,
+)
+from ampf.in_memory import InMemoryAsyncBlobStorage, InMemoryAsyncFactory, InMemoryAsyncStorage
+from ampf.instrumentation import InMemoryMetricsSink
+from ampf.local import LocalAsyncBlobStorage, LocalAsyncFactory
+
+
+class D(BaseModel):
+    name: str
+    value: int = 0
+
+
+class SlowStorage(InMemoryAsyncStorage[D]):
+    def __init__(self):
+        super().__init__("single_flight", D, key="name")
+        self.calls = 0
+
+    async def get(self, key) -> D:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return await super().get(key)
+
+
+class SlowBlobStorage(InMemoryAsyncBlobStorage):
+    def __init__(self):
+        super().__init__("single_flight")
+        self.calls = 0
+
+    async def download_async(self, key: str, stream: bool = False) -> Blob:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return await super().download_async(key, stream)
+
+
+@pytest.fixture
+async def storage() -> SlowStorage:
+    storage = SlowStorage()
+    await storage.drop()
+    await storage.save(D(name="hot", value=1))
+    return storage
+
+
+async def test_concurrent_gets_share_one_call(storage: SlowStorage):
+    # Given: A storage with singleflight
+    sf = SingleFlightAsyncStorage(storage)
+    # When: The same key is read concurrently
+    ret = await asyncio.gather(*(sf.get("hot") for _ in range(10)))
+    # Then: The storage is called only once
+    assert 1 == storage.calls
+    assert all(1 == d.value for d in ret)
+
+
+async def test_nothing_is_cached(storage: SlowStorage):
+    # Given: A storage with singleflight
+    sf = SingleFlightAsyncStorage(storage)
+    # When: The same key is read sequentially
+    await sf.get("hot")
+    await sf.get("hot")
+    # Then: Each read calls the storage
+    assert 2 == storage.calls
+    assert 0 == sf.single_flight.in_flight()
+
+
+async def test_errors_are_propagated_to_all_waiters(storage: SlowStorage):
+    # Given: A storage with singleflight
+    sf = SingleFlightAsyncStorage(storage)
+    # When: Not existing key is read concurrently
+    ret = await asyncio.gather(*(sf.get("cold") for _ in range(5)), return_exceptions=True)
+    # Then: All callers get the exception
+    assert 1 == storage.calls
+    assert all(isinstance(e, KeyNotExistsException) for e in ret)
+
+
+async def test_write_starts_new_call(storage: SlowStorage):
+    # Given: A read in flight
+    sf = SingleFlightAsyncStorage(storage)
+    first = asyncio.create_task(sf.get("hot"))
+    await asyncio.sleep(0)
+    # When: The value is modified and read again
+    await sf.save(D(name="hot", value=2))
+    second = await sf.get("hot")
+    # Then: The next read doesn't join the stale one
+    await first
+    assert 2 == storage.calls
+    assert 2 == second.value
+
+
+async def test_cancelled_caller_does_not_cancel_others(storage: SlowStorage):
+    # Given: Two concurrent reads
+    sf = SingleFlightAsyncStorage(storage)
+    first = asyncio.create_task(sf.get("hot"))
+    second = asyncio.create_task(sf.get("hot"))
+    await asyncio.sleep(0)
+    # When: The first one is cancelled
+    first.cancel()
+    # Then: The second one gets the value
+    assert 1 == (await second).value
+    assert 1 == storage.calls
+
+
+async def test_blob_downloads_share_one_call():
+    # Given: A blob storage with singleflight
+    storage = SlowBlobStorage()
+    await storage.upload_async(Blob(name="hot.txt", content=b"hot", content_type="text/plain"))
+    sf = SingleFlightAsyncBlobStorage(storage)
+    # When: The same blob is downloaded and its metadata is read concurrently
+    blobs = await asyncio.gather(*(sf.download_async("hot.txt") for _ in range(10)))
+    metadata = await asyncio.gather(*(sf.get_metadata("hot.txt") for _ in range(3)))
+    # Then: It is downloaded only once
+    assert 1 == storage.calls
+    assert all(b"hot" == blob.content for blob in blobs)
+    assert all("text/plain" == m.content_type for m in metadata)
+
+
+async def test_streamed_blob_downloads_are_not_shared():
+    # Given: A blob storage with singleflight
+    storage = SlowBlobStorage()
+    await storage.upload_async(Blob(name="hot.txt", content=b"hot world", content_type="text/plain"))
+    sf = SingleFlightAsyncBlobStorage(storage)
+    # When: The same blob is streamed and its range is downloaded concurrently
+    blobs = await asyncio.gather(*(sf.download_async("hot.txt", stream=True) for _ in range(3)))
+    part = await sf.download_range("hot.txt", 4, stream=True)
+    # Then: Each streamed download is a separate call
+    assert 4 == storage.calls
+    assert all(b"hot world" == blob.content for blob in blobs)
+    assert b"world" == part.content
+
+
+async def test_local_blob_downloads_are_not_shared(tmp_path):
+    # Given: A local blob storage (blobs backed by files) with singleflight
+    storage = LocalAsyncBlobStorage("single_flight", root_path=tmp_path)
+    await storage.upload_async(Blob(name="hot.txt", content=b"hello world", content_type="text/plain"))
+    sf = SingleFlightAsyncBlobStorage(storage)
+    # When: The same blob is downloaded and streamed concurrently
+    blobs = await asyncio.gather(*(sf.download_async("hot.txt") for _ in range(3)))
+
+    async def read(blob: Blob) -> bytes:
+        return b"".join([chunk async for chunk in blob.stream(4)])
+
+    contents = await asyncio.gather(*(read(blob) for blob in blobs))
+    # Then: Each caller gets its own blob with the whole content
+    assert 3 == len({id(blob) for blob in blobs})
+    assert [b"hello world"] * 3 == contents
+    assert all("text/plain" == blob.content_type for blob in blobs)
+
+
+async def test_single_flight_do():
+    # Given: Shared in-flight calls
+    single_flight = SingleFlight()
+    calls = []
+
+    async def call(key: str) -> str:
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    # When: Calls with different keys are run concurrently
+    ret = await asyncio.gather(*(single_flight.do(k, lambda k=k: call(k)) for k in ["a", "b", "a", "b", "a"]))
+    # Then: One call per key is made
+    assert ["a", "b"] == calls
+    assert ["A", "B", "A", "B", "A"] == ret
+
+
+async def test_factory_single_flight():
+    # Given: A factory with singleflight enabled
+    factory = InMemoryAsyncFactory()
+    factory.enable_single_flight()
+    storage = factory.get_storage("single_flight_factory", D, "name")
+    # Then: Its storages coalesce reads
+    assert isinstance(storage, SingleFlightAsyncStorage)
+    await storage.save(D(name="a"))
+    assert "a" == (await storage.get("a")).name
+    # When: It is disabled
+    factory.enable_single_flight(False)
+    # Then: Storages are not decorated
+    assert not isinstance(factory.get_storage("single_flight_factory", D, "name"), SingleFlightAsyncStorage)
+
+
+async def test_factory_streamed_download_blob():
+    # Given: A factory with singleflight and instrumentation enabled
+    factory = InMemoryAsyncFactory()
+    factory.enable_single_flight()
+    factory.instrument(InMemoryMetricsSink())
+    await factory.upload_blob(
+        BlobLocation(bucket="single_flight", name="big.txt"),
+        Blob(name="big.txt", content=b"big", content_type="text/plain"),
+    )
+    # When: A blob is downloaded as a stream through the decorated storage
+    blob = await factory.download_blob(BlobLocation(bucket="single_flight", name="big.txt"), stream=True)
+    # Then: It is downloaded
+    assert b"big" == await blob.read()
+
+
+async def test_factory_storages_do_not_share_calls(tmp_path):
+    # Given: A factory with singleflight and two storages of the same collection with different classes
+    class E(BaseModel):
+        name: str
+
+    factory = LocalAsyncFactory(tmp_path)
+    factory.enable_single_flight()
+    d_storage = factory.get_storage("single_flight_shared", D, "name")
+    e_storage = factory.get_storage("single_flight_shared", E, "name")
+    await d_storage.save(D(name="k", value=1))
+    # When: The same key is read concurrently from both of them
+    d, e = await asyncio.gather(d_storage.get("k"), e_storage.get("k"))
+    # Then: Each of them returns its own class
+    assert isinstance(d, D)
+    assert isinstance(e, E)
@@ -0,0 +1,118 @@
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel, Field
+
+from ampf.base import KeyNotExistsException, SnapshotAsyncStorage, SnapshotStorage, SnapshotWriter
+from ampf.in_memory import InMemoryAsyncFactory, InMemoryStorage
+
+
+class D(BaseModel):
+    name: str
+    value: int = 0
+    label: Optional[str] = Field(default=None, alias="Label")
+
+
+@pytest.fixture
+def storage():
+    storage = InMemoryStorage("test_snapshot", D, key_name="name")
+    storage.drop()
+    yield storage
+    storage.drop()
+
+
+def test_snapshot_round_trip(storage, tmp_path):
+    # Given: Stored items (with non ASCII keys and an aliased field)
+    items = [D(name=name, value=i, Label=f"l{i}") for i, name in enumerate(["foo", "bar", "żółw", "baz", "a"])]
+    storage.put_many(items)
+    # When: Snapshot is written and opened
+    count = storage.snapshot(tmp_path / "snapshot.bin")
+    snapshot = SnapshotStorage(tmp_path / "snapshot.bin", D, key="name")
+    # Then: All items can be read
+    assert 5 == count
+    assert 5 == snapshot.count()
+    for item in items:
+        assert item == snapshot.get(item.name)
+    # And: Keys are sorted
+    assert sorted(i.name.encode() for i in items) == [k.encode() for k in snapshot.keys()]
+    assert "snapshot" == snapshot.collection_name
+    snapshot.close()
+
+
+def test_not_existing_key(storage, tmp_path):
+    # Given: Snapshot of a collection
+    storage.put_many([D(name="b"), D(name="d")])
+    storage.snapshot(tmp_path / "snapshot.bin")
+    snapshot = SnapshotStorage(tmp_path / "snapshot.bin", D)
+    # Then: Keys out of the snapshot don't exist
+    for key in ["a", "c", "e"]:
+        assert not snapshot.key_exists(key)
+        with pytest.raises(KeyNotExistsException):
+            snapshot.get(key)
+    snapshot.close()
+
+
+def test_empty_snapshot(storage, tmp_path):
+    # When: Snapshot of an empty collection is written
+    assert 0 == storage.snapshot(tmp_path / "snapshot.bin")
+    snapshot = SnapshotStorage(tmp_path / "snapshot.bin", D)
+    # Then: It is empty
+    assert snapshot.is_empty()
+    assert [] == list(snapshot.get_all())
+    assert not snapshot.key_exists("foo")
+    snapshot.close()
+
+
+def test_read_only(storage, tmp_path):
+    # Given: Snapshot
+    storage.snapshot(tmp_path / "snapshot.bin")
+    snapshot = SnapshotStorage(tmp_path / "snapshot.bin", D)
+    # Then: It can't be modified
+    with pytest.raises(NotImplementedError):
+        snapshot.save(D(name="foo"))
+    snapshot.close()
+
+
+def test_query(storage, tmp_path):
+    # Given: Snapshot
+    storage.put_many([D(name="foo", value=1), D(name="bar", value=2)])
+    storage.snapshot(tmp_path / "snapshot.bin")
+    snapshot = SnapshotStorage(tmp_path / "snapshot.bin", D)
+    # When: It is queried
+    ret = list(snapshot.where("value", ">", 1).get_all())
+    # Then: Matching items are returned
+    assert ["bar"] == [d.name for d in ret]
+    snapshot.close()
+
+
+def test_failed_write_keeps_previous_snapshot(tmp_path):
+    # Given: Existing snapshot
+    path = tmp_path / "snapshot.bin"
+    with SnapshotWriter(path) as writer:
+        writer.add_item("foo", D(name="foo"))
+    # When: Writing a new one fails
+    with pytest.raises(RuntimeError):
+        with SnapshotWriter(path) as writer:
+            writer.add_item("bar", D(name="bar"))
+            raise RuntimeError()
+    # Then: The previous one is kept
+    snapshot = SnapshotStorage(path, D)
+    assert ["foo"] == list(snapshot.keys())
+    assert not (tmp_path / "snapshot.bin.tmp").exists()
+    snapshot.close()
+
+
+async def test_async_snapshot(tmp_path):
+    # Given: Async storage with items
+    storage = InMemoryAsyncFactory().create_storage("test_snapshot_async", D, key_name="name")
+    await storage.drop()
+    await storage.put_many([D(name="foo", value=1), D(name="bar", value=2)])
+    # When: Snapshot is written and opened
+    assert 2 == await storage.snapshot(tmp_path / "snapshot.bin")
+    snapshot = SnapshotAsyncStorage(tmp_path / "snapshot.bin", D, key="name")
+    # Then: Items can be read
+    assert D(name="foo", value=1) == await snapshot.get("foo")
+    assert ["bar", "foo"] == [key async for key in snapshot.keys()]
+    assert ["bar"] == [d.name async for d in snapshot.where("value", "==", 2).get_all()]
+    snapshot.close()
+    await storage.drop()
@@ -0,0 +1,175 @@
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel
+
+from ampf.base import InvertedIndex, TextSearchAsyncStorage, Tokenizer, fuse_scores
+from ampf.in_memory import InMemoryAsyncFactory, InMemoryStorage
+from ampf.local import LocalAsyncFactory
+
+
+class D(BaseModel):
+    name: str
+    text: str = ""
+    tags: List[str] = []
+    embedding: Optional[List[float]] = None
+
+
+DOCS = [
+    D(name="a", text="The quick brown fox jumps over the lazy dog", embedding=[1.0, 0.0]),
+    D(name="b", text="A fox, a fox and another fox!", embedding=[0.0, 1.0]),
+    D(name="c", text="Zażółć gęślą jaźń", embedding=[0.7, 0.7]),
+    D(name="d", text="Nothing to see here"),
+]
+
+
+@pytest.fixture
+async def storage():
+    storage = InMemoryAsyncFactory().create_text_search_storage("test_text_search", D, "text", key="name")
+    await storage.drop()
+    await storage.put_many(DOCS)
+    yield storage
+    await storage.drop()
+
+
+def test_tokenizer():
+    # Given: Tokenizer with stopwords
+    tokenizer = Tokenizer(stopwords=["the"], min_length=2)
+    # Then: Terms are normalized
+    assert ["quick", "fox", "zazołc"] == tokenizer.tokenize("The quick, FOX a Zażółć")
+    assert ["foo", "bar"] == tokenizer.tokenize(["foo", "bar"])
+    assert [] == tokenizer.tokenize(None)
+
+
+def test_bm25_ranking():
+    # Given: Indexed texts
+    index = InvertedIndex()
+    for doc in DOCS:
+        index.update(doc.name, doc.text)
+    # When: Index is searched
+    ret = index.search("fox")
+    # Then: Text with more occurrences of the term is first
+    assert ["b", "a"] == [key for key, _ in ret]
+    # And: Only texts with all terms match
+    assert {"a"} == index.matches("lazy fox")
+    # When: Text is reindexed and removed
+    index.update("a", "no animals")
+    index.remove("b")
+    # Then: The index is updated
+    assert [] == index.search("fox")
+
+
+def test_document_lengths():
+    # Given: Indexed texts
+    index = InvertedIndex()
+    index.update("a", "fox fox dog")
+    index.update("b", "")
+    index.update("c", "cat")
+    # When: Texts are reindexed and removed
+    index.update("a", "fox")
+    index.remove("b")
+    index.remove("c")
+    # Then: Lengths of the remaining texts are kept
+    assert {"a": 1} == index._lengths
+    assert 1 == index._total_length
+    assert ["a"] == [key for key, _ in index.search("fox")]
+
+
+def test_index_journal(tmp_path):
+    # Given: Persisted index
+    index = InvertedIndex(path=tmp_path / "index.jsonl")
+    for doc in DOCS:
+        index.update(doc.name, doc.text)
+    index.remove("d")
+    # When: It is loaded again
+    loaded = InvertedIndex(path=tmp_path / "index.jsonl")
+    # Then: It is the same
+    assert loaded.persisted
+    assert 3 == len(loaded)
+    assert index.search("fox gęśla") == loaded.search("fox gęśla")
+    # When: It is compacted
+    loaded.compact()
+    # Then: There is one line per text
+    assert 3 == len((tmp_path / "index.jsonl").read_text().splitlines())
+
+
+def test_fuse_scores():
+    # When: Scores are combined
+    ret = fuse_scores([("a", 10.0), ("b", 5.0)], [("b", 0.9), ("c", 0.1)], alpha=0.5)
+    # Then: Key good at both is first
+    assert ["b", "a", "c"] == [key for key, _ in ret]
+
+
+async def test_text_search(storage: TextSearchAsyncStorage[D]):
+    # When: Items are searched
+    ret = [d.name async for d in storage.text_search("text", "FOX")]
+    # Then: They are sorted by relevance
+    assert ["b", "a"] == ret
+    assert ["c"] == [d.name async for d in storage.text_search("text", "ZAZÓŁĆ", limit=1)]
+    # When: An item is modified and another deleted
+    await storage.save(D(name="d", text="fox"))
+    await storage.delete("b")
+    # Then: The index is updated
+    assert ["d", "a"] == [d.name async for d in storage.text_search("text", "fox")]
+
+
+async def test_put_with_other_key(storage: TextSearchAsyncStorage[D]):
+    # Given: An indexed storage
+    assert {"a", "b"} == {d.name async for d in storage.text_search("text", "fox")}
+    # When: An item with another name is put under an existing key
+    await storage.put("a", D(name="e", text="Red fox"))
+    # Then: The index follows the key of the stored item
+    assert {"b", "e"} == {d.name async for d in storage.text_search("text", "fox")}
+    assert [] == [d.name async for d in storage.text_search("text", "lazy dog")]
+
+
+async def test_contains_text(storage: TextSearchAsyncStorage[D]):
+    # When: Items are filtered by text
+    ret = [d.name async for d in storage.where("text", "contains_text", "lazy FOX").get_all()]
+    # Then: Items with all terms are returned
+    assert ["a"] == ret
+    # And: The operator works on not indexed storages and fields too
+    decorated = storage.decorated
+    assert ["a", "b"] == sorted([d.name async for d in decorated.where("text", "contains_text", "fox").get_all()])
+    assert ["a"] == [d.name async for d in decorated.text_search("text", "lazy")]
+
+
+def test_contains_text_sync():
+    # Given: Sync storage
+    storage = InMemoryStorage("test_contains_text", D, key_name="name")
+    storage.drop()
+    storage.put_many([D(name="a", tags=["Ala", "kot"]), D(name="b", tags=["pies"])])
+    # Then: List fields can be searched
+    assert ["a"] == [d.name for d in storage.where("tags", "contains_text", "ala").get_all()]
+    storage.drop()
+
+
+async def test_hybrid_search(storage: TextSearchAsyncStorage[D]):
+    # When: Items are searched by text and vector
+    text_only = [d.name async for d in storage.hybrid_search("text", "fox", [0.0, 1.0], alpha=1.0)]
+    vector_only = [d.name async for d in storage.hybrid_search("text", "fox", [0.0, 1.0], limit=1, alpha=0.0)]
+    both = [d.name async for d in storage.hybrid_search("text", "fox", [1.0, 0.0], limit=2)]
+    # Then: Scores are weighted
+    assert ["b", "a"] == text_only
+    assert ["b"] == vector_only
+    assert ["a", "b"] == both
+
+
+async def test_persisted_index(tmp_path):
+    # Given: Indexed local storage
+    factory = LocalAsyncFactory(tmp_path)
+    storage = factory.create_text_search_storage("docs", D, "text", key="name")
+    await storage.put_many(DOCS)
+    assert ["b", "a"] == [d.name async for d in storage.text_search("text", "fox")]
+    await storage.delete("a")
+    # When: Storage is created again
+    storage = factory.create_text_search_storage("docs", D, "text", key="name")
+    # Then: The index is loaded (not rebuilt) and it isn't stored in the collection
+    assert (tmp_path / "docs.text_index" / "text.jsonl").is_file()
+    assert storage._built
+    assert ["b"] == [d.name async for d in storage.text_search("text", "fox")]
+    assert {"b", "c", "d"} == {k async for k in storage.keys()}
+    # When: Storage is dropped
+    await storage.drop()
+    # Then: The index is empty
+    assert [] == [d.name async for d in storage.text_search("text", "fox")]
@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from ampf.base import BaseAsyncStorage, CollectionDef, KeyNotExistsException, TtlAsyncStorage
+from ampf.in_memory import InMemoryAsyncFactory, InMemoryAsyncStorage
+from ampf.local import JsonOneFileAsyncStorage
+
+
+class D(BaseModel):
+    name: str
+    exp: Optional[datetime] = None
+
+
+def past() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(minutes=1)
+
+
+def future() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(minutes=1)
+
+
+@pytest.fixture(params=["in_memory", "one_file"])
+async def decorated(request, tmp_path) -> BaseAsyncStorage[D]:
+    if request.param == "in_memory":
+        storage = InMemoryAsyncStorage("ttl", D)
+        await storage.drop()
+        return storage
+    return JsonOneFileAsyncStorage("ttl", D, root_path=tmp_path)
+
+
+@pytest.fixture
+async def storage(decorated: BaseAsyncStorage[D]) -> TtlAsyncStorage[D]:
+    # Given: Stored expired, valid and never expiring items
+    await decorated.put("old", D(name="old", exp=past()))
+    await decorated.put("new", D(name="new", exp=future()))
+    await decorated.put("eternal", D(name="eternal"))
+    return TtlAsyncStorage(decorated, "exp", sweep_interval=None)
+
+
+async def test_reads_skip_expired_items(storage: TtlAsyncStorage[D]):
+    # Then: Expired items are not returned
+    with pytest.raises(KeyNotExistsException):
+        await storage.get("old")
+    assert not await storage.key_exists("old")
+    assert await storage.get("new")
+    assert sorted([k async for k in storage.keys()]) == ["eternal", "new"]
+    assert [d.name async for d in storage.where("name", "==", "old").get_all()] == []
+
+
+async def test_create_overwrites_expired_item(storage: TtlAsyncStorage[D]):
+    # When: An item with the key of the expired one is created
+    await storage.create(D(name="old", exp=future()))
+    # Then: It is stored
+    assert await storage.get("old")
+
+
+async def test_sweep(storage: TtlAsyncStorage[D], decorated: BaseAsyncStorage[D]):
+    # When: Expired items are swept
+    deleted = await storage.sweep()
+    # Then: They are deleted from the decorated storage
+    assert deleted == 1
+    assert not await decorated.key_exists("old")
+    assert sorted([k async for k in decorated.keys()]) == ["eternal", "new"]
+
+
+async def test_sweep_keeps_refreshed_items(storage: TtlAsyncStorage[D], decorated: BaseAsyncStorage[D]):
+    # Given: An expired item refreshed after it was selected by the sweep
+    select = storage._expired_keys
+
+    async def select_and_refresh():
+        keys = await select()
+        await storage.put("old", D(name="old", exp=future()))
+        return keys
+
+    storage._expired_keys = select_and_refresh  # type: ignore
+    # When: Expired items are swept
+    deleted = await storage.sweep()
+    # Then: The refreshed item is kept
+    assert deleted == 0
+    assert await storage.get("old")
+
+
+async def test_sweep_selects_items_by_query(decorated: BaseAsyncStorage[D]):
+    # Given: Items with expiration times
+    await decorated.put("old", D(name="old", exp=past()))
+    await decorated.put("new", D(name="new", exp=future()))
+    storage = TtlAsyncStorage(decorated, "exp", sweep_interval=None)
+    queries = []
+    where = decorated.where
+
+    def spy(field, op, value):
+        queries.append((field, op))
+        return where(field, op, value)
+
+    decorated.where = spy  # type: ignore
+    # When: Expired items are swept
+    deleted = await storage.sweep()
+    # Then: They are selected by the query
+    assert deleted == 1
+    assert [("exp", "<=")] == queries
+    assert [k async for k in decorated.keys()] == ["new"]
+
+
+async def test_background_sweep(decorated: BaseAsyncStorage[D]):
+    # Given: Storage with an expired item and background sweeping
+    await decorated.put("old", D(name="old", exp=past()))
+    storage = TtlAsyncStorage(decorated, "exp", sweep_interval=60)
+    # When: The storage is used
+    await storage.put("new", D(name="new", exp=future()))
+    await asyncio.sleep(0.05)
+    # Then: Expired items are deleted in background
+    assert [k async for k in decorated.keys()] == ["new"]
+
+
+async def test_collection_def_ttl_field():
+    # Given: Collection defined with TTL field
+    factory = InMemoryAsyncFactory()
+    storage = factory.create_collection(CollectionDef("ttl_collection", D, ttl_field="exp"))
+    await storage.drop()
+    # When: Expired item is stored
+    await storage.put("old", D(name="old", exp=past()))
+    # Then: It is not returned
+    assert not await storage.key_exists("old")
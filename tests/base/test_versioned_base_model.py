@@ -0,0 +1,40 @@
+from typing import Annotated, Literal, Union
+
+import pytest
+from pydantic import BaseModel, Field
+
+from ampf.base.versioned_base_model import _dispatch_tables, resolve_versioned_class
+
+
+class C(BaseModel):
+    type: Literal["C"] = "C"
+    name: str
+
+
+class D(BaseModel):
+    type: Literal["D", "DD"] = "D"
+    name: str
+
+
+CD = Annotated[Union[C, D], Field(discriminator="type")]
+
+
+def test_resolve_plain_class():
+    assert resolve_versioned_class(C, {"name": "x"}) is C
+
+
+def test_resolve_annotated_union():
+    # Then: The class is resolved by the discriminator value
+    assert resolve_versioned_class(CD, {"type": "C", "name": "x"}) is C
+    assert resolve_versioned_class(CD, {"type": "DD", "name": "x"}) is D
+    # And: The dispatch table is computed once
+    assert _dispatch_tables[id(CD)][3] == {"C": C, "D": D, "DD": D}
+
+
+def test_resolve_errors():
+    with pytest.raises(ValueError):
+        resolve_versioned_class(CD, {"name": "x"})
+    with pytest.raises(ValueError):
+        resolve_versioned_class(CD, {"type": "E", "name": "x"})
+    with pytest.raises(ValueError):
+        resolve_versioned_class(Union[C, D], {"type": "C"})
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from ampf.benchmark import (
+    BACKENDS,
+    OPERATIONS,
+    STARTUP_OPERATIONS,
+    BenchmarkReport,
+    BenchmarkRunner,
+    compare_reports,
+    run_startup_benchmark,
+)
+from ampf.benchmark.__main__ import main
+
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+async def test_run_backend(backend: str, tmp_path):
+    # Given: A small benchmark of one backend
+    runner = BenchmarkRunner(backends=[backend], sizes=[20], max_calls=3, blob_size=128, root_path=tmp_path)
+    # When: It is run
+    report = await runner.run()
+    # Then: All operations are measured
+    assert list(OPERATIONS) == [r.operation for r in report.results]
+    for result in report.results:
+        assert backend == result.backend
+        assert 20 == result.size
+        if result.skipped:
+            continue
+        assert result.calls >= 1
+        assert result.ops_per_sec > 0
+        assert result.p50_ms <= result.p99_ms
+        assert result.peak_memory_bytes is not None
+    # And: Loading writes all items and scans read all of them
+    results = {r.operation: r for r in report.results}
+    assert 20 == results["load"].items
+    assert results["load"].memory_per_item_bytes > 0
+    assert 20 * results["get_all"].calls == results["get_all"].items
+
+
+async def test_unknown_backend():
+    # When: Not existing backend is requested
+    with pytest.raises(ValueError):
+        BenchmarkRunner(backends=["unknown"])
+
+
+async def test_compare_reports(tmp_path):
+    # Given: Two reports where the second one is much slower
+    report = await BenchmarkRunner(
+        backends=["in_memory_async"], sizes=[10], operations=["load", "get"], max_calls=2, measure_memory=False
+    ).run()
+    slower = report.model_copy(deep=True)
+    for result in slower.results:
+        result.ops_per_sec /= 2
+    # When: They are compared
+    rows = compare_reports(report, slower, threshold=0.2)
+    # Then: Regressions are found
+    assert 2 == len(rows)
+    assert all(row["regression"] for row in rows)
+
+
+def test_main(tmp_path):
+    # Given: Benchmark run from the command line
+    output = tmp_path / "results.json"
+    # When: It is run with output file
+    ret = main(
+        [
+            "--backends",
+            "in_memory",
+            "--sizes",
+            "10",
+            "--operations",
+            "load,get",
+            "--max-calls",
+            "2",
+            "--output",
+            str(output),
+        ]
+    )
+    # Then: Results are saved in JSON
+    assert 0 == ret
+    report = BenchmarkReport.model_validate(json.loads(output.read_text()))
+    assert ["load", "get"] == [r.operation for r in report.results]
+    # And: The same results are not a regression
+    assert 0 == main(["--compare", str(output), str(output)])
+
+
+def test_startup_benchmark(tmp_path):
+    # When: Start-up of factories is measured
+    results = run_startup_benchmark(["in_memory", "local_async"], storages=3, repeat=2, root_path=tmp_path)
+    # Then: All steps of all factories are measured
+    assert [(f, o) for f in ["in_memory", "local_async"] for o in STARTUP_OPERATIONS] == [
+        (r.backend, r.operation) for r in results
+    ]
+    assert all(2 == r.calls and 3 == r.size and r.p50_ms <= r.p99_ms for r in results)
+    # And: Unknown factory is reported
+    with pytest.raises(ValueError):
+        run_startup_benchmark(["unknown"])
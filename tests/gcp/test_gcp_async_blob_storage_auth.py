@@ -0,0 +1,78 @@
+from typing import List
+
+import httpx2
+from google.auth.credentials import AnonymousCredentials, Credentials
+
+from ampf.base import Blob
+from ampf.gcp import GcpAsyncFactory
+
+
+class TokenCredentials(Credentials):
+    """Credentials issuing a new token on every refresh (no network)"""
+
+    def __init__(self):
+        super().__init__()
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+
+
+def create_factory(requests: List[httpx2.Request], credentials: Credentials, **kwargs) -> GcpAsyncFactory:
+    def handler(request: httpx2.Request) -> httpx2.Response:
+        requests.append(request)
+        return httpx2.Response(
+            200, content=b"data", headers={"content-type": "text/plain", "x-goog-generation": "7", "x-goog-meta-a": "b"}
+        )
+
+    return GcpAsyncFactory(
+        bucket_name="bucket",
+        project_id="project",
+        credentials=credentials,
+        httpx_async_client=httpx2.AsyncClient(transport=httpx2.MockTransport(handler)),
+        **kwargs,
+    )
+
+
+async def test_bearer_token():
+    # Given: Blob storage using bearer token
+    requests: List[httpx2.Request] = []
+    credentials = TokenCredentials()
+    storage = create_factory(requests, credentials).create_blob_storage("docs")
+    # When: Blob is uploaded and downloaded
+    await storage.upload_async(Blob(name="a b.txt", content=b"data"))
+    blob = await storage.download_async("a b.txt")
+    # Then: Requests are sent directly to XML API with the token
+    assert ["PUT", "GET"] == [r.method for r in requests]
+    assert "https://storage.googleapis.com/bucket/docs/a%20b.txt" == str(requests[0].url)
+    assert all("Bearer token-1" == r.headers["Authorization"] for r in requests)
+    # And: Token is refreshed once
+    assert 1 == credentials.refreshes
+    # And: Metadata is parsed from the response
+    assert 7 == blob.metadata.generation
+
+
+async def test_signed_url_cache(monkeypatch):
+    # Given: Blob storage using signed URLs
+    requests: List[httpx2.Request] = []
+    storage = create_factory(requests, AnonymousCredentials(), use_signed_urls=True).create_blob_storage("docs")
+    signed = []
+
+    def generate_signed_url(blob, **kwargs):
+        signed.append((blob.name, kwargs["method"]))
+        return f"https://signed/{blob.name}?n={len(signed)}"
+
+    monkeypatch.setattr("google.cloud.storage.Blob.generate_signed_url", generate_signed_url)
+    # When: The same blob is read a few times
+    for _ in range(3):
+        await storage.download_async("a.txt")
+        await storage.get_metadata("a.txt")
+    await storage.delete_async("a.txt")
+    # Then: URL is signed once per method
+    assert [("docs/a.txt", "GET"), ("docs/a.txt", "DELETE")] == signed
+    assert "https://signed/docs/a.txt?n=1" == str(requests[0].url)
+    # And: URL is signed again when it is going to expire
+    storage.signed_url_expiry_margin = 3600
+    await storage.download_async("a.txt")
+    assert 3 == len(signed)
@@ -0,0 +1,110 @@
+import json
+from typing import List
+
+import httpx2
+import pytest
+from google.auth.credentials import Credentials
+
+from ampf.base import BaseBlobMetadata, KeyNotExistsException
+from ampf.gcp import GcpAsyncFactory
+
+NAMES = [f"docs/{i:03d}.txt" for i in range(5)] + ["docs/sub/a.txt", "docs/sub/b.txt"]
+
+
+class TokenCredentials(Credentials):
+    def refresh(self, request):
+        self.token = "token"
+
+
+class FakeJsonApi:
+    """Lists objects page by page like GCS JSON API"""
+
+    def __init__(self):
+        self.requests: List[httpx2.Request] = []
+
+    def __call__(self, request: httpx2.Request) -> httpx2.Response:
+        self.requests.append(request)
+        if request.method == "PATCH":
+            if not request.url.raw_path.decode().startswith("/storage/v1/b/bucket/o/docs%2F000.txt"):
+                return httpx2.Response(404)
+            return httpx2.Response(200, json={"name": "docs/000.txt"})
+        params = request.url.params
+        prefix, delimiter = params["prefix"], params.get("delimiter")
+        items, prefixes = [], []
+        for name in NAMES:
+            rest = name[len(prefix) :]
+            if not name.startswith(prefix):
+                continue
+            if delimiter and delimiter in rest:
+                folder = prefix + rest[: rest.index(delimiter) + 1]
+                if folder not in prefixes:
+                    prefixes.append(folder)
+            else:
+                items.append({"name": name, "contentType": "text/plain", "generation": "3", "metadata": {"a": "x%20y"}})
+        entries = [("item", i) for i in items] + [("prefix", p) for p in prefixes]
+        start = int(params.get("pageToken", "0"))
+        end = start + int(params["maxResults"])
+        page = {
+            "items": [e for kind, e in entries[start:end] if kind == "item"],
+            "prefixes": [e for kind, e in entries[start:end] if kind == "prefix"],
+        }
+        if end < len(entries):
+            page["nextPageToken"] = str(end)
+        return httpx2.Response(200, json=page)
+
+
+class M(BaseBlobMetadata):
+    a: str = ""
+
+
+@pytest.fixture
+def api():
+    return FakeJsonApi()
+
+
+@pytest.fixture
+def storage(api):
+    factory = GcpAsyncFactory(
+        bucket_name="bucket",
+        project_id="project",
+        credentials=TokenCredentials(),
+        httpx_async_client=httpx2.AsyncClient(transport=httpx2.MockTransport(api)),
+    )
+    storage = factory.create_blob_storage("docs", M)
+    storage.list_page_size = 2
+    return storage
+
+
+async def test_list_blobs_by_pages(storage, api):
+    # When: Blobs are listed
+    headers = [h async for h in storage.list_blobs()]
+    # Then: All blobs are listed page by page with projection
+    assert [n[5:] for n in NAMES] == [h.name for h in headers]
+    assert 4 == len(api.requests)
+    assert "nextPageToken,prefixes,items(name,contentType,generation,metadata)" == api.requests[0].url.params["fields"]
+    assert "Bearer token" == api.requests[0].headers["Authorization"]
+    # And: Metadata is parsed
+    assert M(a="x y", content_type="text/plain", generation=3) == headers[0].metadata
+
+
+async def test_names_with_delimiter(storage, api):
+    # When: Names are listed with delimiter
+    names = [n async for n in storage.names(delimiter="/")]
+    # Then: Subfolder is returned as one name
+    assert ["000.txt", "001.txt", "002.txt", "003.txt", "004.txt", "sub/"] == names
+    # And: Number of results can be limited
+    assert ["000.txt", "001.txt", "002.txt"] == [n async for n in storage.names(max_results=3)]
+    assert "1" == api.requests[-1].url.params["maxResults"]
+
+
+async def test_put_metadata(storage, api):
+    # When: Metadata is patched
+    await storage.put_metadata("000.txt", M(a="x y"))
+    # Then: JSON API PATCH request is sent
+    request = api.requests[-1]
+    assert "PATCH" == request.method
+    assert "/storage/v1/b/bucket/o/docs%2F000.txt" == request.url.raw_path.decode().split("?")[0]
+    assert "x%20y" == json.loads(request.content)["metadata"]["a"]
+    # And: Not existing blob is reported
+    with pytest.raises(KeyNotExistsException):
+        await storage.put_metadata("missing.txt", M(a="z"))
@@ -0,0 +1,68 @@
+import httpx2
+import pytest
+from google.auth.credentials import Credentials
+
+from ampf.base import KeyNotExistsException
+from ampf.base.blob_model import BlobStreamError
+from ampf.gcp import GcpAsyncFactory
+
+CONTENT = bytes(range(256)) * 1024
+
+
+class TokenCredentials(Credentials):
+    def refresh(self, request):
+        self.token = "token"
+
+
+def handler(request: httpx2.Request) -> httpx2.Response:
+    if not request.url.path.endswith("video.mp4"):
+        return httpx2.Response(404)
+    headers = {"content-type": "video/mp4", "x-goog-generation": "1"}
+    content = CONTENT
+    if "Range" in request.headers:
+        start, end = request.headers["Range"].removeprefix("bytes=").split("-")
+        content = CONTENT[int(start) : int(end) + 1 if end else None]
+        if not content:
+            return httpx2.Response(416)
+        return httpx2.Response(206, content=content, headers=headers)
+    return httpx2.Response(200, content=content, headers=headers)
+
+
+@pytest.fixture
+def storage():
+    factory = GcpAsyncFactory(
+        bucket_name="bucket",
+        project_id="project",
+        credentials=TokenCredentials(),
+        httpx_async_client=httpx2.AsyncClient(transport=httpx2.MockTransport(handler)),
+    )
+    return factory.create_blob_storage("videos")
+
+
+async def test_download_stream(storage):
+    # When: Blob is downloaded in streaming mode
+    blob = await storage.download_async("video.mp4", stream=True)
+    # Then: Metadata and size are known before the content is read
+    assert "video/mp4" == blob.content_type
+    assert len(CONTENT) == blob.size
+    with pytest.raises(BlobStreamError):
+        blob.content
+    # And: Content is streamed in chunks
+    chunks = [chunk async for chunk in blob.stream(1024)]
+    assert CONTENT == b"".join(chunks)
+
+
+async def test_download_range(storage):
+    # When: Parts of the blob are downloaded
+    blob = await storage.download_range("video.mp4", 10, 20)
+    streamed = await storage.download_range("video.mp4", len(CONTENT) - 5, stream=True)
+    # Then: Only requested bytes are returned
+    assert CONTENT[10:20] == blob.content
+    assert CONTENT[-5:] == await streamed.read()
+    # And: Empty ranges and missing blobs are reported
+    with pytest.raises(ValueError):
+        await storage.download_range("video.mp4", len(CONTENT))
+    with pytest.raises(ValueError):
+        await storage.download_range("video.mp4", 5, 5)
+    with pytest.raises(KeyNotExistsException):
+        await storage.download_async("missing.mp4", stream=True)
@@ -0,0 +1,90 @@
+import pytest
+from google.auth.credentials import AnonymousCredentials
+from pydantic import BaseModel
+
+from ampf.gcp import GcpAsyncFactory, GcpClients, GcpFactory
+
+
+class D(BaseModel):
+    name: str
+
+
+def test_clients_are_created_lazily():
+    # Given: Factory with given project and credentials
+    factory = GcpFactory(bucket_name="bucket", project_id="project", credentials=AnonymousCredentials())
+    # Then: No client is created by the constructor
+    assert factory.clients._db is None
+    assert factory.clients._storage_client is None
+    assert "project" == factory.get_project_id()
+    # When: Storages are created
+    s1 = factory.create_storage("s1", D)
+    s2 = factory.create_storage("s2", D)
+    # Then: They share one client
+    assert s1._db is s2._db  # type: ignore
+    assert factory.clients._storage_client is None
+
+
+async def test_blob_storages_share_clients():
+    # Given: Async factory
+    factory = GcpAsyncFactory(bucket_name="bucket", project_id="project", credentials=AnonymousCredentials())
+    # When: Blob storages are created
+    b1 = factory.create_blob_storage("b1")
+    b2 = factory.create_blob_storage("b2")
+    # Then: They share credentials, storage client and HTTP client
+    assert b1._creds is b2._creds
+    assert b1._storage_client is b2._storage_client
+    assert b1._httpx_async_client is b2._httpx_async_client
+    # And: The HTTP client is closed with the factory
+    await factory.close()
+    assert b1._httpx_async_client.is_closed
+
+
+def test_channel_pool():
+    # Given: Factory with a pool of two async clients
+    factory = GcpAsyncFactory(project_id="project", credentials=AnonymousCredentials(), channel_pool_size=2)
+    # When: Storages are created
+    dbs = [factory.create_storage(f"s{i}", D)._db for i in range(4)]  # type: ignore
+    # Then: Clients are used in round-robin order
+    assert dbs[0] is not dbs[1]
+    assert dbs[0] is dbs[2]
+    assert dbs[1] is dbs[3]
+    # And: Pool can't be empty
+    with pytest.raises(ValueError):
+        GcpAsyncFactory(channel_pool_size=0)
+
+
+def test_native_ttl_is_option():
+    # Given: Factories with and without configured TTL policies
+    factory = GcpAsyncFactory(project_id="project", credentials=AnonymousCredentials())
+    native = GcpAsyncFactory(project_id="project", credentials=AnonymousCredentials(), native_ttl=True)
+    # Then: Expired documents are swept by default
+    assert not factory.create_storage("s", D).native_ttl
+    assert native.create_storage("s", D).native_ttl
+
+
+def test_contains_text_is_rejected():
+    # Given: Firestore storage
+    factory = GcpAsyncFactory(project_id="project", credentials=AnonymousCredentials())
+    storage = factory.create_storage("s", D)
+    # Then: "contains_text" isn't passed to Firestore
+    with pytest.raises(ValueError, match="TextSearchAsyncStorage"):
+        storage.where("name", "contains_text", "fox")
+    with pytest.raises(ValueError, match="TextSearchAsyncStorage"):
+        storage.where("name", "==", "fox").where("name", "contains_text", "fox")
+
+
+async def test_project_is_resolved_with_credentials(monkeypatch):
+    # Given: Clients without project, whose default credentials have a project
+    monkeypatch.setattr("ampf.gcp.gcp_clients.google.auth.default", lambda scopes: (AnonymousCredentials(), "resolved"))
+    monkeypatch.setenv("GOOGLE_CLOUD_PROJECT", "environment")
+    clients = GcpClients()
+    # When: The first clients are created
+    db = clients.get_async_firestore()
+    # Then: They use the project of the credentials
+    assert "resolved" == db.project
+    assert "resolved" == clients.get_firestore().project
+    assert "resolved" == clients.get_storage_client().project
+    # When: Clients are closed
+    await clients.aclose()
+    # Then: Closed clients aren't given out
+    assert clients.get_async_firestore() is not db
@@ -0,0 +1,118 @@
+from typing import Dict, List, Optional
+
+import pytest
+from pydantic import BaseModel
+
+from ampf.in_memory import InMemoryArrayStorage, InMemoryAsyncFactory, InMemoryStorage
+from ampf.in_memory.columnar_query import ColumnarQuery
+
+
+class D(BaseModel):
+    name: str
+    group: int
+    score: float
+    quantity: Optional[int] = None
+    tags: List[str] = []
+    extra: Dict[str, int] = {}
+
+    @property
+    def upper_name(self) -> str:
+        return self.name.upper()
+
+
+ITEMS = [
+    D(name="a", group=1, score=0.1, quantity=5, tags=["x"], extra={"k": 1}),
+    D(name="b", group=2, score=0.5, tags=["y"]),
+    D(name="c", group=1, score=0.9, quantity=1, tags=["x", "z"], extra={"k": 2}),
+    D(name="d", group=3, score=0.7),
+]
+
+
+@pytest.fixture
+def storage():
+    storage = InMemoryArrayStorage("test_columnar", D, key_name="name")
+    storage.drop()
+    storage.put_many(ITEMS)
+    yield storage
+    storage.drop()
+
+
+@pytest.fixture
+def reference():
+    storage = InMemoryStorage("test_columnar_reference", D, key_name="name")
+    storage.drop()
+    storage.put_many(ITEMS)
+    yield storage
+    storage.drop()
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        [("group", "==", 1)],
+        [("group", "!=", 1)],
+        [("score", ">", 0.5)],
+        [("score", ">=", 0.5), ("score", "<", 0.9)],
+        [("score", "<=", 0.5), ("group", "in", [1, 3])],
+        [("name", "in", ["a", "d"])],
+        [("quantity", "==", None)],
+        [("tags", "array_contains_any", ["z", "y"])],
+        [("extra", "==", {"k": 2})],
+        [("upper_name", "==", "B")],
+    ],
+)
+def test_same_results_as_generator_query(storage, reference, filters):
+    # Given: Query with filters on columnar and dictionary storages
+    query = storage
+    expected = reference
+    for field, op, value in filters:
+        query = query.where(field, op, value)
+        expected = expected.where(field, op, value)
+    # When: Items are read
+    ret = list(query.get_all())
+    # Then: The same items are returned
+    assert sorted(d.name for d in expected.get_all()) == sorted(d.name for d in ret)
+    assert all(isinstance(d, D) for d in ret)
+
+
+def test_chained_filters_are_collected(storage):
+    # When: Filters are chained
+    query = storage.where("group", "==", 1).where("score", ">", 0.5)
+    # Then: They are evaluated together on columns
+    assert isinstance(query, ColumnarQuery)
+    assert 2 == len(query.filters)
+    assert ["c"] == query.keys()
+
+
+def test_none_doesnt_match_ordering(storage):
+    # When: Items are filtered by optional field
+    ret = list(storage.where("quantity", ">", 2).get_all())
+    # Then: Items without the value are skipped
+    assert ["a"] == [d.name for d in ret]
+
+
+def test_unknown_operator(storage):
+    # When: Unknown operator is used
+    with pytest.raises(ValueError):
+        storage.where("group", "like", 1)
+
+
+def test_query_sees_current_data(storage):
+    # Given: Query created before modification
+    query = storage.where("group", "==", 1)
+    # When: Item is deleted
+    storage.delete("a")
+    # Then: It is not returned
+    assert ["c"] == [d.name for d in query.get_all()]
+
+
+async def test_async_query():
+    # Given: Async array storage with items
+    storage = InMemoryAsyncFactory().create_array_storage("test_columnar_async", D, key_name="name")
+    await storage.drop()
+    await storage.put_many(ITEMS)
+    # When: It is queried
+    ret = [d.name async for d in storage.where("group", "==", 1).where("score", "<", 0.5).get_all()]
+    # Then: Matching items are returned
+    assert ["a"] == ret
+    await storage.drop()
@@ -0,0 +1,229 @@
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pytest
+from pydantic import BaseModel, ConfigDict
+
+from ampf.base import KeyNotExistsException
+from ampf.in_memory import InMemoryArrayStorage, InMemoryAsyncFactory, InMemoryFactory
+
+
+class Address(BaseModel):
+    city: str
+    zip: Optional[str] = None
+
+
+class D(BaseModel):
+    name: str
+    count: int = 0
+    price: float = 0.0
+    active: bool = True
+    note: Optional[str] = None
+    quantity: Optional[int] = None
+    created: Optional[datetime] = None
+    tags: List[str] = []
+    embedding: Optional[List[float]] = None
+    address: Optional[Address] = None
+    extra: Dict[str, int] = {}
+
+
+class F(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    name: str
+    value: int
+
+
+@pytest.fixture
+def storage():
+    storage = InMemoryArrayStorage("test_array", D, key_name="name")
+    storage.drop()
+    yield storage
+    storage.drop()
+
+
+def test_put_get_all_field_types(storage: InMemoryArrayStorage[D]):
+    # Given: Item with all kinds of fields
+    d = D(
+        name="foo",
+        count=3,
+        price=1.5,
+        active=False,
+        note="n",
+        quantity=7,
+        created=datetime(2025, 1, 2, 3, 4, 5),
+        tags=["a", "b"],
+        embedding=[0.1, 0.2],
+        address=Address(city="Warsaw"),
+        extra={"x": 1},
+    )
+    # When: It is stored and read
+    storage.put("foo", d)
+    ret = storage.get("foo")
+    # Then: The same item is returned
+    assert d == ret
+    assert isinstance(ret.address, Address)
+    # And: Item with default values is returned as well
+    storage.save(D(name="bar"))
+    assert D(name="bar") == storage.get("bar")
+
+
+def test_columns(storage: InMemoryArrayStorage[D]):
+    # Given: Stored items
+    storage.save(D(name="foo", count=1, price=1.5))
+    storage.save(D(name="bar", count=2, price=2.5))
+    # When: Columns are read
+    counts = storage.column("count")
+    prices = storage.column("price")
+    # Then: Numeric values are kept in arrays in the order of keys
+    assert isinstance(counts, array)
+    assert ["foo", "bar"] == list(storage.keys())
+    assert [1, 2] == list(counts)
+    assert [1.5, 2.5] == list(prices)
+    with pytest.raises(KeyError):
+        storage.column("unknown")
+
+
+def check_writes_with_view(storage: InMemoryArrayStorage[D], create_view):
+    # Given: Stored items and a live view of a column
+    storage.save(D(name="foo", count=1, price=1.5))
+    storage.save(D(name="bar", count=2, price=2.5))
+    view = create_view(storage.column("price"))
+    # When: Items are added or deleted
+    with pytest.raises(BufferError):
+        storage.save(D(name="baz", count=3, price=3.5))
+    with pytest.raises(BufferError):
+        storage.delete("foo")
+    # Then: The storage is unchanged
+    assert 2 == storage.count()
+    assert ["foo", "bar"] == list(storage.keys())
+    assert [D(name="foo", count=1, price=1.5), D(name="bar", count=2, price=2.5)] == list(storage.get_all())
+    assert 2 == len(storage.items)
+    # And: Items can be modified in place
+    storage.save(D(name="bar", count=5, price=5.5))
+    assert 5.5 == view[1]
+    # And: A copy doesn't block writes
+    copy = storage.column("count", copy=True)
+    del view
+    storage.save(D(name="baz", count=3, price=3.5))
+    storage.delete("foo")
+    assert ["baz", "bar"] == list(storage.keys())
+    assert [1, 5] == list(copy)
+
+
+def test_writes_with_memoryview(storage: InMemoryArrayStorage[D]):
+    check_writes_with_view(storage, memoryview)
+
+
+def test_writes_with_numpy_view(storage: InMemoryArrayStorage[D]):
+    numpy = pytest.importorskip("numpy")
+    check_writes_with_view(storage, numpy.asarray)
+
+
+def test_delete_moves_last_row(storage: InMemoryArrayStorage[D]):
+    # Given: Three stored items
+    for i, name in enumerate(["foo", "bar", "baz"]):
+        storage.save(D(name=name, count=i))
+    # When: The first one is deleted
+    storage.delete("foo")
+    # Then: The other ones are still available
+    assert 2 == storage.count()
+    assert not storage.key_exists("foo")
+    assert 1 == storage.get("bar").count
+    assert 2 == storage.get("baz").count
+    assert [D(name="baz", count=2), D(name="bar", count=1)] == list(storage.get_all())
+    with pytest.raises(KeyNotExistsException):
+        storage.get("foo")
+
+
+def test_put_modified_and_changed_key(storage: InMemoryArrayStorage[D]):
+    # Given: Stored item
+    storage.save(D(name="foo", count=1))
+    # When: It is modified
+    storage.put("foo", D(name="foo", count=2))
+    # Then: It is replaced
+    assert 1 == storage.count()
+    assert 2 == storage.get("foo").count
+    # When: Its key is changed
+    storage.put("foo", D(name="bar", count=3))
+    # Then: It is stored with the new key only
+    assert ["bar"] == list(storage.keys())
+
+
+def test_big_int_falls_back_to_list(storage: InMemoryArrayStorage[D]):
+    # Given: Stored item
+    storage.save(D(name="foo", count=1))
+    # When: Item with int too big for the array is stored
+    storage.save(D(name="bar", count=2**70))
+    # Then: Both values are available
+    assert 1 == storage.get("foo").count
+    assert 2**70 == storage.get("bar").count
+
+
+def test_query(storage: InMemoryArrayStorage[D]):
+    # Given: Stored items
+    storage.save(D(name="foo", count=1))
+    storage.save(D(name="bar", count=1))
+    storage.save(D(name="baz", count=2))
+    # When: Items are queried
+    ret = list(storage.where("count", "==", 1).get_all())
+    # Then: Matching items are returned
+    assert {"foo", "bar"} == {d.name for d in ret}
+
+
+def test_frozen_items_are_shared():
+    # Given: Storage of frozen items
+    storage = InMemoryArrayStorage("test_array_frozen", F, key_name="name")
+    storage.drop()
+    storage.save(F(name="foo", value=1))
+    # When: The item is read twice
+    first = storage.get("foo")
+    second = storage.get("foo")
+    # Then: The same instance is returned
+    assert first is second
+    # When: The item is modified
+    storage.save(F(name="foo", value=2))
+    # Then: New instance is returned
+    assert 2 == storage.get("foo").value
+    storage.drop()
+
+
+def test_watch_notifications(storage: InMemoryArrayStorage[D]):
+    # Given: Subscribed callback
+    changes = []
+    unsubscribe = storage.subscribe(lambda *change: changes.append(change))
+    # When: Item is added and deleted
+    storage.save(D(name="foo"))
+    storage.delete("foo")
+    unsubscribe()
+    # Then: Changes are notified
+    assert ["added", "removed"] == [c[0] for c in changes]
+    assert "foo" == changes[0][2]["name"]
+
+
+def test_factory_create_array_storage():
+    # Given: Factory
+    factory = InMemoryFactory()
+    # When: Array storage is created
+    storage = factory.create_array_storage("test_array_factory", D, key_name="name")
+    storage.drop()
+    storage.save(D(name="foo"))
+    # Then: It keeps items in columns
+    assert isinstance(storage, InMemoryArrayStorage)
+    assert D(name="foo") == storage.get("foo")
+    storage.drop()
+
+
+async def test_async_factory_create_array_storage():
+    # Given: Async factory
+    factory = InMemoryAsyncFactory()
+    # When: Array storage is created
+    storage = factory.create_array_storage("test_array_async", D, key_name="name")
+    await storage.drop()
+    await storage.save(D(name="foo", tags=["x"]))
+    # Then: Items are stored and read
+    assert D(name="foo", tags=["x"]) == await storage.get("foo")
+    assert ["foo"] == [key async for key in storage.keys()]
+    assert ["foo"] == [d.name async for d in storage.where("tags", "array_contains_any", ["x"]).get_all()]
+    await storage.drop()
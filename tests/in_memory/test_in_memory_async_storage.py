@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from pydantic import BaseModel
 
@@ -52,3 +54,28 @@ async def test_query(storage: BaseAsyncQueryStorage):
     # Then: One item is returned
     assert len(ret) == 1
     assert ret[0].name == "baz"
+
+
+@pytest.mark.asyncio
+async def test_watch(storage: BaseAsyncStorage):
+    # Given: An empty storage and a watcher started before changes
+    await storage.drop()
+    events = []
+
+    async def collect():
+        async for event in storage.watch():
+            events.append(event)
+            if len(events) == 3:
+                break
+
+    task = asyncio.create_task(collect())
+    await asyncio.sleep(0)
+    # When: An item is added, modified and removed
+    await storage.put("foo", D(name="foo", value="beer"))
+    await storage.put("foo", D(name="foo", value="wine"))
+    await storage.delete("foo")
+    await asyncio.wait_for(task, 1)
+    # Then: All changes are reported in order
+    assert [(e.type, e.key) for e in events] == [("added", "foo"), ("modified", "foo"), ("removed", "foo")]
+    assert events[1].value == D(name="foo", value="wine")
+    assert events[2].value is None
@@ -0,0 +1,212 @@
+from typing import Dict, Optional
+
+import pytest
+from pydantic import BaseModel
+
+from ampf.base import BaseTopic, Blob, KeyNotExistsException
+from ampf.in_memory import InMemoryAsyncBlobStorage, InMemoryAsyncFactory, InMemoryFactory
+from ampf.instrumentation import (
+    InMemoryMetricsSink,
+    InstrumentedAsyncBlobStorage,
+    InstrumentedAsyncStorage,
+    InstrumentedTopic,
+)
+
+
+class D(BaseModel):
+    name: str
+    value: str
+
+
+@pytest.fixture
+def sink():
+    return InMemoryMetricsSink()
+
+
+@pytest.fixture
+def factory(sink: InMemoryMetricsSink):
+    factory = InMemoryAsyncFactory()
+    factory.instrument(sink)
+    return factory
+
+
+async def test_factory_storage_is_instrumented(factory: InMemoryAsyncFactory, sink: InMemoryMetricsSink):
+    # Given: An instrumented storage
+    storage = factory.get_storage("instrumented", D)
+    await storage.drop()
+    # When: Items are put, read and scanned
+    await storage.put("1", D(name="1", value="a"))
+    await storage.put("2", D(name="2", value="b"))
+    await storage.get("1")
+    items = [item async for item in storage.get_all()]
+    # Then: Operations are counted
+    assert isinstance(storage, InstrumentedAsyncStorage)
+    assert 2 == len(items)
+    assert 2 == sink.get("storage", "instrumented", "put").count
+    assert 1 == sink.get("storage", "instrumented", "get").count
+    # And: Scanned items are counted
+    assert 2 == sink.get("storage", "instrumented", "get_all").items
+    # And: Payload is not measured by default
+    assert 0 == sink.get("storage", "instrumented", "put").size
+
+
+async def test_errors_are_counted(factory: InMemoryAsyncFactory, sink: InMemoryMetricsSink):
+    # Given: An instrumented storage
+    storage = factory.get_storage("instrumented", D)
+    await storage.drop()
+    # When: Not existing item is read
+    with pytest.raises(KeyNotExistsException):
+        await storage.get("missing")
+    # Then: The error is counted
+    stats = sink.get("storage", "instrumented", "get")
+    assert 1 == stats.count
+    assert 1 == stats.errors
+
+
+async def test_query_is_instrumented(factory: InMemoryAsyncFactory, sink: InMemoryMetricsSink):
+    # Given: An instrumented storage with items
+    storage = factory.get_storage("instrumented", D)
+    await storage.drop()
+    await storage.put("1", D(name="1", value="a"))
+    await storage.put("2", D(name="2", value="b"))
+    # When: The storage is queried
+    items = [item async for item in storage.where("value", "==", "b").get_all()]
+    # Then: The query is measured
+    assert 1 == len(items)
+    stats = sink.get("storage", "instrumented", "query")
+    assert 1 == stats.count
+    assert 1 == stats.items
+
+
+async def test_measure_payload(sink: InMemoryMetricsSink):
+    # Given: A storage instrumented with payload measurement
+    storage = InstrumentedAsyncStorage(InMemoryAsyncFactory().create_storage("payload", D), sink, measure_payload=True)
+    await storage.drop()
+    value = D(name="1", value="a")
+    # When: An item is put and read
+    await storage.put("1", value)
+    await storage.get("1")
+    # Then: Payload sizes are recorded
+    assert len(value.model_dump_json()) == sink.get("storage", "payload", "put").size
+    assert len(value.model_dump_json()) == sink.get("storage", "payload", "get").size
+
+
+async def test_blob_storage_is_instrumented(sink: InMemoryMetricsSink):
+    # Given: An instrumented blob storage
+    storage = InstrumentedAsyncBlobStorage(InMemoryAsyncBlobStorage("blobs"), sink)
+    # When: A blob is uploaded and downloaded
+    await storage.upload_async(Blob(name="test.txt", content=b"hello", content_type="text/plain"))
+    blob = await storage.download_async("test.txt")
+    # Then: Blob sizes are recorded
+    assert b"hello" == blob.content
+    assert 5 == sink.get("blob_storage", "blobs", "upload").size
+    assert 5 == sink.get("blob_storage", "blobs", "download").size
+
+
+async def test_blob_storage_stream_and_range_are_instrumented(sink: InMemoryMetricsSink):
+    # Given: An instrumented blob storage with a blob
+    storage = InstrumentedAsyncBlobStorage(InMemoryAsyncBlobStorage("blobs"), sink)
+    await storage.upload_async(Blob(name="test.txt", content=b"hello world", content_type="text/plain"))
+    # When: The blob is streamed and its range is downloaded
+    blob = await storage.download_async("test.txt", stream=True)
+    part = await storage.download_range("test.txt", 6, stream=True)
+    # Then: Both are measured
+    assert b"hello world" == await blob.read()
+    assert b"world" == await part.read()
+    assert 1 == sink.get("blob_storage", "blobs", "download").count
+    assert 5 == sink.get("blob_storage", "blobs", "download_range").size
+
+
+async def test_blob_storage_listing_is_instrumented(sink: InMemoryMetricsSink):
+    # Given: An instrumented blob storage with blobs in folders
+    storage = InstrumentedAsyncBlobStorage(InMemoryAsyncBlobStorage("blobs"), sink)
+    for name in ["docs/a.txt", "docs/b.txt", "docs/sub/c.txt"]:
+        await storage.upload_async(Blob(name=name, content=b"x", content_type="text/plain"))
+    # When: Blobs are listed with a delimiter and a limit
+    names = [n async for n in storage.names("docs/", delimiter="/")]
+    headers = [h.name async for h in storage.list_blobs("docs/", delimiter="/", max_results=1)]
+    # Then: The arguments reach the decorated storage
+    assert ["docs/a.txt", "docs/b.txt", "docs/sub/"] == names
+    assert ["docs/a.txt"] == headers
+    assert 1 == sink.get("blob_storage", "blobs", "names").count
+
+
+class ListTopic(BaseTopic[D]):
+    def __init__(self):
+        self.messages = []
+
+    def publish(
+        self,
+        data: D | str | bytes,
+        attrs: Optional[Dict[str, str]] = None,
+        response_topic: Optional[str] = None,
+        sender_id: Optional[str] = None,
+    ) -> str:
+        self.messages.append(data)
+        return str(len(self.messages))
+
+
+async def test_topic_is_instrumented(sink: InMemoryMetricsSink):
+    # Given: An instrumented topic
+    topic = InstrumentedTopic(ListTopic(), sink, "events")
+    # When: Messages are published
+    topic.publish("abc")
+    await topic.publish_async(b"de")
+    # Then: Messages and their sizes are recorded
+    stats = sink.get("topic", "events", "publish")
+    assert 2 == stats.count
+    assert 5 == stats.size
+
+
+def test_sync_factory_storage_is_instrumented(sink: InMemoryMetricsSink):
+    # Given: An instrumented sync factory
+    factory = InMemoryFactory()
+    factory.instrument(sink)
+    storage = factory.get_storage("instrumented_sync", D)
+    storage.drop()
+    # When: An item is put and keys are listed
+    storage.put("1", D(name="1", value="a"))
+    keys = list(storage.keys())
+    # Then: Operations are counted
+    assert ["1"] == keys
+    assert 1 == sink.get("storage", "instrumented_sync", "put").count
+    assert 1 == sink.get("storage", "instrumented_sync", "keys").items
+
+
+def test_not_instrumented_by_default():
+    # Given: A factory without metrics sink
+    factory = InMemoryAsyncFactory()
+    # When: A storage is got
+    storage = factory.get_storage("not_instrumented", D)
+    # Then: The storage is not wrapped
+    assert not isinstance(storage, InstrumentedAsyncStorage)
+
+
+def test_instrument_off(factory: InMemoryAsyncFactory):
+    # Given: An instrumented factory with cached storage
+    instrumented = factory.get_storage("instrumented", D)
+    # When: Instrumentation is switched off
+    factory.instrument(None)
+    # Then: Storages are not wrapped anymore
+    storage = factory.get_storage("instrumented", D)
+    assert isinstance(instrumented, InstrumentedAsyncStorage)
+    assert not isinstance(storage, InstrumentedAsyncStorage)
+
+
+def test_to_prometheus():
+    # Given: A sink with measurements
+    sink = InMemoryMetricsSink(buckets=(0.1, 1.0))
+    sink.record("storage", "users", "get", 0.05)
+    sink.record("storage", "users", "get", 0.5, error=True)
+    sink.record("storage", "users", "get_all", 2.0, items=3)
+    # When: Metrics are exported
+    text = sink.to_prometheus()
+    # Then: Counters and histogram are in Prometheus format
+    labels = 'kind="storage",collection="users",operation="get"'
+    assert f"ampf_operations_total{{{labels}}} 2" in text
+    assert f"ampf_operation_errors_total{{{labels}}} 1" in text
+    assert f'ampf_operation_duration_seconds_bucket{{{labels},le="0.1"}} 1' in text
+    assert f'ampf_operation_duration_seconds_bucket{{{labels},le="1.0"}} 2' in text
+    assert f'ampf_operation_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f"ampf_operation_duration_seconds_count{{{labels}}} 2" in text
+    assert 'ampf_items_total{kind="storage",collection="users",operation="get_all"} 3' in text
@@ -0,0 +1,120 @@
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel
+
+from ampf.base import BaseAsyncStorage
+from ampf.local import JsonMultiFilesAsyncStorage, JsonOneFileAsyncStorage
+
+
+class D(BaseModel):
+    name: str
+    description: Optional[str] = None
+    embedding: List[float] = []
+
+
+@pytest.fixture(params=["one_file", "multi_files"])
+async def storage(request, tmp_path) -> BaseAsyncStorage[D]:
+    if request.param == "one_file":
+        storage = JsonOneFileAsyncStorage("tracked", D, root_path=tmp_path)
+    else:
+        storage = JsonMultiFilesAsyncStorage("tracked", D, root_path=tmp_path)
+    storage.track_changes()
+    await storage.save(D(name="a", description="desc", embedding=[0.1] * 100))
+    writes = []
+    write = storage._async_write_to_file
+
+    async def counting_write(*args, **kwargs):
+        writes.append(args)
+        await write(*args, **kwargs)
+
+    storage._async_write_to_file = counting_write
+    storage.writes = writes
+    return storage
+
+
+async def test_unchanged_item_is_not_written(storage):
+    # Given: An item read from the storage
+    item = await storage.get("a")
+    # When: It is saved without modifications
+    await storage.save(item)
+    # Then: Nothing is written
+    assert [] == storage.writes
+
+
+async def test_changed_item_is_written(storage):
+    # Given: An item read from the storage
+    item = await storage.get("a")
+    # When: It is modified and saved
+    item.description = "new"
+    await storage.save(item)
+    # Then: It is written
+    assert 1 == len(storage.writes)
+    assert "new" == (await storage.get("a")).description
+    # When: It is saved again
+    await storage.save(item)
+    # Then: Nothing is written
+    assert 1 == len(storage.writes)
+
+
+async def test_removed_field_is_written(storage):
+    # Given: An item read from the storage
+    item = await storage.get("a")
+    # When: Its field is cleared
+    item.description = None
+    await storage.save(item)
+    # Then: The field is removed
+    assert (await storage.get("a")).description is None
+
+
+async def test_untracked_item_is_written(storage):
+    # When: A new object with the same key is saved
+    await storage.save(D(name="a", description="desc", embedding=[0.1] * 100))
+    # Then: It is written
+    assert 1 == len(storage.writes)
+
+
+async def test_deleted_item_is_written_again(storage):
+    # Given: An item read from the storage
+    item = await storage.get("a")
+    # When: It is deleted and saved without modifications
+    await storage.delete("a")
+    await storage.save(item)
+    # Then: It is stored again
+    assert "desc" == (await storage.get("a")).description
+
+
+async def test_dropped_item_is_written_again(storage):
+    # Given: Items read from the storage
+    item = await storage.get("a")
+    many = await storage.get_many(["a"])
+    # When: The collection is dropped and items are saved without modifications
+    await storage.drop()
+    await storage.save(item)
+    # Then: It is stored again
+    assert "desc" == (await storage.get("a")).description
+    # When: It is deleted by delete_many and saved again
+    await storage.delete_many(["a"])
+    await storage.save(many["a"])
+    # Then: It is stored again
+    assert await storage.key_exists("a")
+
+
+async def test_item_with_changed_key_is_forgotten(storage):
+    # Given: An item read from the storage
+    item = await storage.get("a")
+    # When: It is moved to another key and saved back
+    await storage.put("a", D(name="b", description="desc", embedding=[0.1] * 100))
+    await storage.save(item)
+    # Then: It is stored again
+    assert "desc" == (await storage.get("a")).description
+
+
+async def test_tracking_is_off_by_default(tmp_path):
+    # Given: A storage without change tracking
+    storage = JsonOneFileAsyncStorage("untracked", D, root_path=tmp_path)
+    await storage.save(D(name="a"))
+    # When: An item is read
+    await storage.get("a")
+    # Then: It is not tracked
+    assert storage.change_tracker is None
@@ -0,0 +1,104 @@
+import json
+import random
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel, Field
+
+from ampf.local import (
+    JsonMultiFilesStorage,
+    LocalAsyncFactory,
+    LocalFactory,
+    decode_embedding,
+    encode_embedding,
+)
+
+
+class D(BaseModel):
+    name: str
+    embedding: Optional[List[float]] = None
+
+
+class A(BaseModel):
+    name: str
+    vector: List[float] = Field(alias="Vector")
+
+
+def test_float32_round_trip():
+    # Given: Values exactly representable as float32
+    values = [0.5, -1.25, 3.0, 0.0]
+    # When: They are encoded and decoded
+    encoded = encode_embedding(values, "float32")
+    # Then: They are the same
+    assert encoded.startswith("f32:")
+    assert values == decode_embedding(encoded)
+
+
+def test_int8_round_trip():
+    # Given: Random values
+    rnd = random.Random(1)
+    values = [rnd.uniform(-1, 1) for _ in range(100)]
+    # When: They are quantized
+    decoded = decode_embedding(encode_embedding(values, "int8"))
+    # Then: Error is less than a step of quantization
+    step = max(abs(v) for v in values) / 127
+    assert all(abs(a - b) <= step / 2 + 1e-9 for a, b in zip(values, decoded))
+    # And: Zero vector is supported
+    assert [0.0, 0.0] == decode_embedding(encode_embedding([0.0, 0.0], "int8"))
+
+
+@pytest.mark.parametrize("encoding, ratio", [("float32", 4), ("int8", 12)])
+def test_smaller_files(tmp_path, encoding, ratio):
+    # Given: Storages with JSON and binary embeddings
+    rnd = random.Random(2)
+    item = D(name="foo", embedding=[rnd.uniform(-1, 1) for _ in range(1536)])
+    plain = LocalFactory(tmp_path / "plain").create_storage("docs", D)
+    binary = LocalFactory(tmp_path / "binary", embedding_encoding=encoding).create_storage("docs", D)
+    # When: The same item is stored
+    plain.save(item)
+    binary.save(item)
+    # Then: The file is much smaller
+    plain_size = (tmp_path / "plain" / "docs" / "foo.json").stat().st_size
+    binary_size = (tmp_path / "binary" / "docs" / "foo.json").stat().st_size
+    assert plain_size > ratio * binary_size
+    # And: The model still has a list of floats
+    ret = binary.get("foo")
+    assert 1536 == len(ret.embedding or [])
+    assert ret.embedding == pytest.approx(item.embedding, abs=0.01)
+
+
+def test_reads_other_encodings(tmp_path):
+    # Given: Item stored as JSON list
+    JsonMultiFilesStorage("docs", D, root_path=tmp_path).save(D(name="foo", embedding=[1.0, 2.0]))
+    # When: It is read by storage with binary encoding
+    storage = JsonMultiFilesStorage("docs", D, root_path=tmp_path, embedding_encoding="float32")
+    # Then: It is decoded
+    assert [1.0, 2.0] == storage.get("foo").embedding
+    # And: Items without embedding are stored
+    storage.save(D(name="bar"))
+    assert storage.get("bar").embedding is None
+    # And: Nearest item is found
+    storage.save(D(name="baz", embedding=[2.0, 1.0]))
+    assert ["baz", "foo"] == [d.name for d in storage.find_nearest([1.0, 0.0])]
+
+
+def test_aliased_field(tmp_path):
+    # Given: Storage of a model with aliased embedding
+    storage = JsonMultiFilesStorage("docs", A, root_path=tmp_path, embedding_field_name="vector", embedding_encoding="float32")
+    # When: Item is stored
+    storage.save(A(name="foo", Vector=[1.0, 0.5]))
+    # Then: The aliased key is encoded
+    assert json.loads((tmp_path / "docs" / "foo.json").read_text())["Vector"].startswith("f32:")
+    assert [1.0, 0.5] == storage.get("foo").vector
+
+
+async def test_async_storages(tmp_path):
+    # Given: Async factory with int8 embeddings
+    factory = LocalAsyncFactory(tmp_path, embedding_encoding="int8")
+    for storage in [factory.create_storage("docs", D), factory.create_shared_storage("shared", D)]:
+        # When: Items are stored
+        await storage.put_many([D(name="foo", embedding=[1.0, -0.5]), D(name="bar", embedding=[0.0, 1.0])])
+        # Then: Embeddings are decoded
+        assert [1.0, -0.5] == pytest.approx((await storage.get("foo")).embedding, abs=0.01)
+        assert ["bar"] == [d.name async for d in storage.find_nearest([0.0, 1.0], limit=1)]
+        await storage.drop()
@@ -0,0 +1,58 @@
+import asyncio
+import os
+
+import pytest
+from pydantic import BaseModel
+
+from ampf.base import BaseAsyncStorage
+from ampf.local import JsonMultiFilesAsyncStorage, JsonOneFileAsyncStorage
+from ampf.local.file_async_storage import FileAsyncStorage
+
+
+class D(BaseModel):
+    name: str
+    value: str
+
+
+@pytest.fixture(params=[JsonMultiFilesAsyncStorage, JsonOneFileAsyncStorage])
+def storage(request, tmp_path) -> BaseAsyncStorage[D]:
+    return request.param("test", D, root_path=tmp_path)
+
+
+async def test_watch(storage: BaseAsyncStorage[D]):
+    # Given: Stored element and a watcher started after it
+    await storage.put("bar", D(name="bar", value="beer"))
+    events = []
+
+    async def collect():
+        async for event in storage.watch(poll_interval=0.01):
+            events.append(event)
+            if len(events) == 3:
+                break
+
+    task = asyncio.create_task(collect())
+    await asyncio.sleep(0.2)
+    # When: Elements are added, modified and removed
+    await storage.put("foo", D(name="foo", value="beer"))
+    await asyncio.sleep(0.05)
+    await storage.put("bar", D(name="bar", value="wine"))
+    await asyncio.sleep(0.05)
+    await storage.delete("foo")
+    await asyncio.wait_for(task, 5)
+    # Then: Only changes made after the watcher started are reported
+    assert [(e.type, e.key) for e in events] == [("added", "foo"), ("modified", "bar"), ("removed", "foo")]
+    assert events[1].value == D(name="bar", value="wine")
+
+
+async def test_snapshot_detects_rewrite_within_one_time_tick(storage: BaseAsyncStorage[D], monkeypatch):
+    # Given: A file system where only modification times and sizes of files are reliable
+    monkeypatch.setattr(FileAsyncStorage, "_file_version", staticmethod(lambda stat: (stat.st_mtime_ns, stat.st_size)))
+    await storage.put("bar", D(name="bar", value="beer"))
+    path = storage.file_path if isinstance(storage, JsonOneFileAsyncStorage) else storage._key_to_full_path("bar")
+    mtime_ns = os.stat(path).st_mtime_ns
+    previous = await storage._snapshot()
+    # When: The item is rewritten with the same size in the same time tick
+    await storage.put("bar", D(name="bar", value="wine"))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    # Then: The fingerprint of the item is changed
+    assert previous["bar"] != (await storage._snapshot())["bar"]
@@ -0,0 +1,227 @@
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from pydantic import BaseModel
+
+from ampf.base import KeyNotExistsException
+from ampf.local import LocalAsyncFactory, LocalFactory, SharedFileAsyncStorage, SharedFileStorage, SharedLog
+
+
+class D(BaseModel):
+    name: str
+    value: int = 0
+
+
+def write_in_other_process(root_path: str, count: int) -> None:
+    storage = SharedFileStorage("shared", D, root_path=root_path)
+    for i in range(count):
+        storage.put(f"k{i}", D(name=f"k{i}", value=i))
+
+
+def write_keys_in_child_process(root_path: str, prefix: str, count: int) -> None:
+    storage = SharedFileStorage("shared", D, root_path=root_path)
+    for i in range(count):
+        storage.put(f"{prefix}{i}", D(name=f"{prefix}{i}", value=i))
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = LocalFactory(tmp_path).create_shared_storage("shared", D)
+    yield storage
+    storage.drop()
+
+
+def test_storage_all(storage: SharedFileStorage[D]):
+    assert storage.is_empty()
+    # When: Item is stored
+    storage.put("foo", D(name="foo", value=1))
+    # Then: It can be read
+    assert D(name="foo", value=1) == storage.get("foo")
+    assert ["foo"] == list(storage.keys())
+    assert storage.key_exists("foo")
+    # When: It is modified
+    storage.save(D(name="foo", value=2))
+    # Then: The last value is returned
+    assert 2 == storage.get("foo").value
+    assert 1 == storage.count()
+    # When: It is deleted
+    storage.delete("foo")
+    # Then: It doesn't exist
+    assert storage.is_empty()
+    with pytest.raises(KeyNotExistsException):
+        storage.get("foo")
+
+
+def test_changed_key(storage: SharedFileStorage[D]):
+    # Given: Stored item
+    storage.save(D(name="foo"))
+    # When: It is stored with a new key
+    storage.put("foo", D(name="bar"))
+    # Then: Only the new key exists
+    assert ["bar"] == list(storage.keys())
+
+
+def test_writes_are_visible_to_other_instances(tmp_path):
+    # Given: Two independent logs of the same file (as in two processes)
+    first = SharedLog(tmp_path / "test.log")
+    second = SharedLog(tmp_path / "test.log")
+    # When: One of them writes
+    first.put([("a", b"1"), ("b", b"2")])
+    # Then: The other one reads the records
+    assert b"2" == second.get("b")
+    assert first.version == second.version
+    # When: The other one deletes a key
+    second.delete(["a"])
+    # Then: The first one sees it
+    assert ["b"] == first.keys()
+    first.close()
+    second.close()
+
+
+def test_compaction_is_visible_to_other_instances(tmp_path):
+    # Given: Log compacted after each write with dead records
+    first = SharedLog(tmp_path / "test.log", min_compact_bytes=0)
+    second = SharedLog(tmp_path / "test.log")
+    first.put([("a", b"1"), ("b", b"2")])
+    assert b"1" == second.get("a")
+    size = (tmp_path / "test.log").stat().st_size
+    # When: Records are overwritten many times
+    for i in range(20):
+        first.put([("a", str(i).encode())])
+    # Then: The file doesn't grow and the other instance reads the current values
+    assert (tmp_path / "test.log").stat().st_size <= size + 20
+    assert b"19" == second.get("a")
+    assert b"2" == second.get("b")
+    assert second.generation > 1
+    first.close()
+    second.close()
+
+
+def test_reads_during_compaction_by_other_thread(tmp_path):
+    # Given: One log used by a writer thread which compacts it often
+    log = SharedLog(tmp_path / "test.log", min_compact_bytes=0)
+    log.put([("key", b"value")])
+    errors = []
+    stop = threading.Event()
+
+    def write():
+        for i in range(500):
+            log.put([("key", b"value"), (f"other-{i % 5}", b"x" * 100)])
+        stop.set()
+
+    def read():
+        try:
+            while not stop.is_set():
+                assert b"value" == log.get("key")
+                assert "key" in log.keys()
+                assert "key" in log.stamps()
+        except Exception as e:
+            errors.append(e)
+
+    # When: Other threads read it at the same time (switching threads as often as possible)
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(3)]
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    # Then: Readers always see the whole record
+    assert [] == errors
+    log.close()
+
+
+def test_writes_of_other_process(tmp_path):
+    # Given: Storage opened before other process writes
+    storage = SharedFileStorage("shared", D, root_path=tmp_path)
+    assert storage.is_empty()
+    # When: Other processes write items
+    ctx = multiprocessing.get_context("spawn")
+    processes = [ctx.Process(target=write_in_other_process, args=(str(tmp_path), 50)) for _ in range(2)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join(30)
+    # Then: All of them are visible
+    assert all(p.exitcode == 0 for p in processes)
+    assert 50 == storage.count()
+    assert 49 == storage.get("k49").value
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork()")
+def test_writes_of_forked_processes(tmp_path):
+    # Given: Storage written before processes are forked (e.g. gunicorn --preload)
+    storage = SharedFileStorage("shared", D, root_path=tmp_path)
+    storage.put("parent", D(name="parent"))
+    # When: Forked processes write concurrently
+    ctx = multiprocessing.get_context("fork")
+    processes = [
+        ctx.Process(target=write_keys_in_child_process, args=(str(tmp_path), f"p{i}-", 200)) for i in range(4)
+    ]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join(60)
+    # Then: Their writes are serialized and all of them are kept
+    assert all(p.exitcode == 0 for p in processes)
+    assert 801 == storage.count()
+    assert 199 == storage.get("p3-199").value
+
+
+def test_drop(storage: SharedFileStorage[D], tmp_path: Path):
+    # Given: Stored items and another instance of the storage
+    storage.put_many([D(name="foo"), D(name="bar")])
+    other = SharedLog(tmp_path / "shared.log")
+    assert 2 == len(other)
+    # When: The storage is dropped
+    storage.drop()
+    # Then: The other instance sees empty storage
+    assert 0 == len(other)
+    other.close()
+
+
+async def test_async_storage(tmp_path):
+    # Given: Async shared storage
+    storage = LocalAsyncFactory(tmp_path).create_shared_storage("shared_async", D)
+    assert isinstance(storage, SharedFileAsyncStorage)
+    # When: Items are written
+    await storage.put_many([D(name="foo", value=1), D(name="bar", value=2)])
+    # Then: They are read
+    assert D(name="bar", value=2) == await storage.get("bar")
+    assert {"foo", "bar"} == {d.name async for d in storage.get_all()}
+    assert ["bar"] == [d.name async for d in storage.where("value", ">", 1).get_all()]
+    await storage.drop()
+    assert await storage.is_empty()
+
+
+async def test_async_watch(tmp_path):
+    # Given: Watched storage
+    storage = SharedFileAsyncStorage("shared_watch", D, root_path=tmp_path)
+    events = []
+
+    async def watch():
+        async for event in storage.watch(poll_interval=0.01):
+            events.append(event)
+            if len(events) == 2:
+                return
+
+    task = asyncio.create_task(watch())
+    await asyncio.sleep(0.05)
+    # When: Item is added by other instance (as in other process) and deleted
+    other = SharedLog(tmp_path / "shared_watch.log")
+    other.put([("foo", b'{"name": "foo", "value": 1}')])
+    await asyncio.sleep(0.05)
+    other.delete(["foo"])
+    await asyncio.wait_for(task, 2)
+    # Then: Changes are reported
+    assert ["added", "removed"] == [e.type for e in events]
+    assert D(name="foo", value=1) == events[0].value
+    other.close()